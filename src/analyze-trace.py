@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+from argparse import ArgumentParser
+from collections import Counter
+from statistics import median
+
+from lib.common.constants import (
+    TRACE_ACK_RECEIVED,
+    TRACE_ACK_SENT,
+    TRACE_CHUNK_OUT_OF_ORDER,
+    TRACE_CHUNK_RECEIVED,
+    TRACE_CHUNK_RETRANSMITTED,
+    TRACE_CHUNK_SENT,
+    TRACE_DUPLICATE_ACK_RECEIVED,
+    TRACE_FAST_RETRANSMIT,
+    TRACE_SELECTIVE_ACK_RECEIVED,
+    TRACE_TIMEOUT,
+)
+from lib.common.transfer_trace import load_transfer_trace
+
+DEFAULT_INTERVAL = 0.5
+BYTES_PER_MEGABYTE = 1024 * 1024
+
+
+# What a trace tells of the transfer, both from the side that sent the file
+# and from the one that received it
+class TraceAnalysis:
+    def __init__(self, events: list, interval: float):
+        self.events: list = events
+        self.interval: float = interval
+        self.start: float = events[0][0]
+        self.duration: float = events[-1][0] - self.start
+        self.counts: Counter = Counter(event[1] for event in events)
+
+        # Bytes acked or received, retransmissions and timeouts by interval
+        self.timeline: dict[int, list] = {}
+        self.rtt_samples: list[float] = []
+        self.goodput_bytes: int = 0
+
+        self.analyze()
+
+    def interval_of(self, at: float) -> list:
+        index = int((at - self.start) / self.interval)
+        return self.timeline.setdefault(index, [0, 0, 0])
+
+    # Chunks are acked once, cumulatively or selectively. Those sent more
+    # than once give no RTT sample, it is unknown which copy was acked
+    def analyze(self) -> None:
+        first_sent: dict[int, float] = {}
+        sizes: dict[int, int] = {}
+        retransmitted: set[int] = set()
+        highest_acked = 0
+        selectively_acked: set[int] = set()
+
+        for at, event, chunk, _number, size in self.events:
+            if event == TRACE_CHUNK_SENT:
+                first_sent.setdefault(chunk, at)
+                sizes[chunk] = size
+            elif event == TRACE_CHUNK_RETRANSMITTED:
+                retransmitted.add(chunk)
+                self.interval_of(at)[1] += 1
+            elif event == TRACE_TIMEOUT:
+                self.interval_of(at)[2] += 1
+            elif event == TRACE_ACK_RECEIVED:
+                for acked in range(highest_acked + 1, chunk + 1):
+                    self.on_acked(at, acked, first_sent, sizes, retransmitted)
+                highest_acked = max(highest_acked, chunk)
+            elif event == TRACE_SELECTIVE_ACK_RECEIVED:
+                if chunk not in selectively_acked:
+                    selectively_acked.add(chunk)
+                    self.on_acked(at, chunk, first_sent, sizes, retransmitted)
+            elif event == TRACE_CHUNK_RECEIVED:
+                self.goodput_bytes += size
+                self.interval_of(at)[0] += size
+
+    def on_acked(
+            self,
+            at: float,
+            chunk: int,
+            first_sent: dict[int, float],
+            sizes: dict[int, int],
+            retransmitted: set[int]) -> None:
+        size = sizes.get(chunk, 0)
+        self.goodput_bytes += size
+        self.interval_of(at)[0] += size
+
+        if chunk in first_sent and chunk not in retransmitted:
+            self.rtt_samples.append(at - first_sent[chunk])
+
+    @property
+    def is_sender(self) -> bool:
+        return self.counts[TRACE_CHUNK_SENT] > 0
+
+    @property
+    def goodput(self) -> float:
+        if self.duration == 0:
+            return 0
+        return self.goodput_bytes / BYTES_PER_MEGABYTE / self.duration
+
+    def print_summary(self) -> None:
+        print(f"  duration        {self.duration:.3f} s")
+        print(f"  goodput         {self.goodput:.2f} MB/s")
+
+        if self.is_sender:
+            sent = self.counts[TRACE_CHUNK_SENT]
+            retransmissions = self.counts[TRACE_CHUNK_RETRANSMITTED]
+            print(f"  chunks sent     {sent}")
+            print(
+                f"  retransmitted   {retransmissions} ({
+                    retransmissions / (sent + retransmissions):.1%})")
+            print(f"  timeouts        {self.counts[TRACE_TIMEOUT]}")
+            print(
+                f"  fast retransmit {self.counts[TRACE_FAST_RETRANSMIT]}")
+            print(
+                f"  duplicate acks  {
+                    self.counts[TRACE_DUPLICATE_ACK_RECEIVED]}")
+        else:
+            print(f"  chunks received {self.counts[TRACE_CHUNK_RECEIVED]}")
+            print(
+                f"  out of order    {self.counts[TRACE_CHUNK_OUT_OF_ORDER]}")
+            print(f"  acks sent       {self.counts[TRACE_ACK_SENT]}")
+
+        if self.rtt_samples:
+            samples = sorted(self.rtt_samples)
+            p95 = samples[int(0.95 * (len(samples) - 1))]
+            print(
+                f"  rtt (ms)        min {samples[0] * 1e3:.2f} median {
+                    median(samples) * 1e3:.2f} p95 {
+                    p95 * 1e3:.2f} max {samples[-1] * 1e3:.2f} ({
+                    len(samples)} samples)")
+
+    def print_timeline(self) -> None:
+        print(
+            f"  {'from (s)':>8} {'MB/s':>8} {'retransmitted':>13} "
+            f"{'timeouts':>8}")
+
+        last_interval = max(self.timeline, default=-1)
+        for index in range(last_interval + 1):
+            goodput_bytes, retransmissions, timeouts = self.timeline.get(
+                index, (0, 0, 0))
+            print(
+                f"  {index * self.interval:>8.2f} {
+                    goodput_bytes / BYTES_PER_MEGABYTE / self.interval:>8.2f} "
+                f"{retransmissions:>13} {timeouts:>8}")
+
+
+def analyze_trace(filepath: str, interval: float, timeline: bool) -> None:
+    try:
+        events = load_transfer_trace(filepath)
+    except (OSError, ValueError) as e:
+        print(f"{filepath}: {e}")
+        return
+
+    if not events:
+        print(f"{filepath}: no events")
+        return
+
+    analysis = TraceAnalysis(events, interval)
+    side = "sender" if analysis.is_sender else "receiver"
+    print(f"{filepath} ({side}, {len(events)} events)")
+    analysis.print_summary()
+    if timeline:
+        analysis.print_timeline()
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description="Summarizes the event traces written by the -T option")
+    arg_parser.add_argument("traces", nargs="+", metavar="TRACE")
+    arg_parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        metavar="SECONDS",
+        help="length of the intervals of the timeline",
+    )
+    arg_parser.add_argument(
+        "-t",
+        "--timeline",
+        action="store_true",
+        help="print goodput, retransmissions and timeouts by interval",
+    )
+    args = arg_parser.parse_args()
+
+    for filepath in args.traces:
+        analyze_trace(filepath, args.interval, args.timeline)
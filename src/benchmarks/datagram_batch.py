@@ -0,0 +1,169 @@
+from argparse import ArgumentParser
+from collections import Counter
+from socket import AF_INET, SOCK_DGRAM
+from socket import socket as Socket
+from statistics import median
+from threading import Lock, Thread
+from time import perf_counter, thread_time
+
+from lib.common import datagram_batch
+from lib.common.constants import (
+    FILE_CHUNK_SIZE_GBN,
+    FULL_BUFFER_SIZE,
+    GBN_PROTOCOL_HEADER_SIZE,
+    IPV4_LOCALHOST,
+    USE_ANY_AVAILABLE_PORT,
+    WINDOW_SIZE,
+)
+from lib.common.datagram_batch import DatagramBatcher
+
+DEFAULT_WINDOWS = 2_000
+DEFAULT_REPEATS = 5
+MICROSECONDS_PER_SECOND = 1_000_000
+HEADER = bytes(GBN_PROTOCOL_HEADER_SIZE)
+
+
+# Counts the system calls made for each socket, by its file descriptor
+class SyscallCounter:
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.lock: Lock = Lock()
+
+    def count(self, fd: int) -> None:
+        with self.lock:
+            self.calls[fd] += 1
+
+
+class CountingSocket(Socket):
+    counter: SyscallCounter | None = None
+
+    def recvfrom_into(self, *args):
+        self.counter.count(self.fileno())
+        return super().recvfrom_into(*args)
+
+    def sendmsg(self, *args):
+        self.counter.count(self.fileno())
+        return super().sendmsg(*args)
+
+
+class CountingLibc:
+    def __init__(self, libc, counter: SyscallCounter):
+        self.libc = libc
+        self.counter: SyscallCounter = counter
+
+    def __getattr__(self, name: str):
+        function = getattr(self.libc, name)
+
+        def counted(fd: int, *args):
+            self.counter.count(fd)
+            return function(fd, *args)
+
+        return counted
+
+
+def bound_socket(counter: SyscallCounter) -> CountingSocket:
+    _socket = CountingSocket(AF_INET, SOCK_DGRAM)
+    _socket.counter = counter
+    _socket.bind((IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT))
+    return _socket
+
+
+# Sends windows of chunks the way the windowed senders do and waits for the
+# receiver to acknowledge each of them before sending the next one. The CPU
+# time of each end is measured on its own thread, as on a single CPU both
+# ends take turns and the wall clock time hides what either of them saves
+def run_transfer(is_batched: bool, windows: int, window: int):
+    counter = SyscallCounter()
+    if datagram_batch.LIBC is not None:
+        datagram_batch.LIBC = CountingLibc(datagram_batch.LIBC, counter)
+
+    sender_socket = bound_socket(counter)
+    receiver_socket = bound_socket(counter)
+    sender = DatagramBatcher(sender_socket)
+    receiver = DatagramBatcher(receiver_socket)
+    sender.is_batched = sender.is_batched and is_batched
+    receiver.is_batched = receiver.is_batched and is_batched
+
+    chunk = bytes(FILE_CHUNK_SIZE_GBN)
+    receiver_address = receiver_socket.getsockname()
+
+    receiver_cpu_times = []
+
+    def receive_windows():
+        cpu_start = thread_time()
+        for _ in range(windows):
+            for _ in range(window):
+                _data, sender_address = receiver.receive(FULL_BUFFER_SIZE)
+            receiver.send([HEADER], sender_address)
+        receiver_cpu_times.append(thread_time() - cpu_start)
+
+    receiver_thread = Thread(target=receive_windows)
+    receiver_thread.start()
+
+    start = perf_counter()
+    cpu_start = thread_time()
+    for _ in range(windows):
+        sender.hold_sends()
+        for _ in range(window):
+            sender.send([HEADER, chunk], receiver_address)
+        sender.flush_sends()
+        sender.receive(FULL_BUFFER_SIZE)
+    sender_cpu_time = thread_time() - cpu_start
+    elapsed = perf_counter() - start
+
+    receiver_thread.join()
+    if isinstance(datagram_batch.LIBC, CountingLibc):
+        datagram_batch.LIBC = datagram_batch.LIBC.libc
+
+    packets = windows * window
+    sender_calls = counter.calls[sender_socket.fileno()]
+    receiver_calls = counter.calls[receiver_socket.fileno()]
+    sender_socket.close()
+    receiver_socket.close()
+
+    return (
+        sender_calls / packets,
+        receiver_calls / packets,
+        sender_cpu_time / packets * MICROSECONDS_PER_SECOND,
+        receiver_cpu_times[0] / packets * MICROSECONDS_PER_SECOND,
+        packets * FILE_CHUNK_SIZE_GBN / elapsed / (1024 * 1024),
+    )
+
+
+# Runs alternate between both modes, so a noisy stretch of the machine does
+# not weigh on only one of them. The median of the runs is kept
+def run(windows: int, window: int, repeats: int) -> None:
+    if datagram_batch.LIBC is None:
+        print("sendmmsg and recvmmsg are not available, only measuring a "
+              "call per datagram")
+
+    modes = (("per datagram", False), ("batched", True))
+    results = {name: [] for name, _is_batched in modes}
+    for _ in range(repeats):
+        for name, is_batched in modes:
+            results[name].append(run_transfer(is_batched, windows, window))
+
+    print(f"{'mode':<14} {'sender calls':>12} {'receiver calls':>14} "
+          f"{'sender us':>10} {'receiver us':>11} {'MB/s':>8}")
+    for name, _is_batched in modes:
+        (sender_calls, receiver_calls, sender_cpu, receiver_cpu,
+         throughput) = [
+            median(column) for column in zip(*results[name], strict=True)]
+        print(f"{name:<14} {sender_calls:>12.2f} {receiver_calls:>14.2f} "
+              f"{sender_cpu:>10.2f} {receiver_cpu:>11.2f} "
+              f"{throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description="Measures system calls per packet and throughput of "
+        "sending windows of chunks over loopback")
+    arg_parser.add_argument(
+        "-n", "--windows", type=int, default=DEFAULT_WINDOWS)
+    arg_parser.add_argument(
+        "-w", "--window", type=int, default=WINDOW_SIZE)
+    arg_parser.add_argument(
+        "-r", "--repeats", type=int, default=DEFAULT_REPEATS)
+    args = arg_parser.parse_args()
+
+    run(args.windows, args.window, args.repeats)
@@ -0,0 +1,72 @@
+from argparse import ArgumentParser
+from timeit import repeat
+
+from lib.common.constants import (
+    FILE_CHUNK_SIZE_GBN,
+    FILE_CHUNK_SIZE_SAW,
+    GO_BACK_N_PROTOCOL_TYPE,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+    ZERO_BYTES,
+)
+from lib.common.packet.packet import PacketGbn, PacketParser, PacketSaw
+
+DEFAULT_ITERATIONS = 200_000
+DEFAULT_REPETITIONS = 5
+
+
+def build_packets() -> dict[str, PacketSaw | PacketGbn]:
+    return {
+        "saw data": PacketSaw(
+            STOP_AND_WAIT_PROTOCOL_TYPE,
+            1, False, False, False, 5000,
+            FILE_CHUNK_SIZE_SAW, bytes(FILE_CHUNK_SIZE_SAW)),
+        "saw ack": PacketSaw(
+            STOP_AND_WAIT_PROTOCOL_TYPE,
+            1, True, False, False, 5000, 0, ZERO_BYTES),
+        "gbn data": PacketGbn(
+            GO_BACK_N_PROTOCOL_TYPE,
+            1234, 56, False, False, False, 5000,
+            FILE_CHUNK_SIZE_GBN, bytes(FILE_CHUNK_SIZE_GBN)),
+        "gbn ack": PacketGbn(
+            GO_BACK_N_PROTOCOL_TYPE,
+            1234, 56, True, False, False, 5000, 0, ZERO_BYTES),
+    }
+
+
+def compose(packet: PacketSaw | PacketGbn) -> bytes:
+    if packet.protocol == STOP_AND_WAIT_PROTOCOL_TYPE:
+        return PacketParser.compose_packet_saw_for_net(packet)
+    return PacketParser.compose_packet_gbn_for_net(packet)
+
+
+def nanoseconds_per_call(function, iterations: int, repetitions: int):
+    best = min(repeat(function, number=iterations, repeat=repetitions))
+    return best / iterations * 1e9
+
+
+def run(iterations: int, repetitions: int) -> None:
+    print(f"{'packet':<10} {'encode (ns)':>12} {'decode (ns)':>12}")
+
+    for name, packet in build_packets().items():
+        raw_packet = memoryview(compose(packet))
+
+        encode = nanoseconds_per_call(
+            lambda packet=packet: compose(packet), iterations, repetitions)
+        decode = nanoseconds_per_call(
+            lambda raw_packet=raw_packet: PacketParser.get_packet_from_bytes(
+                raw_packet),
+            iterations, repetitions)
+
+        print(f"{name:<10} {encode:>12.0f} {decode:>12.0f}")
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description="Measures the per packet cost of encoding and decoding")
+    arg_parser.add_argument(
+        "-n", "--iterations", type=int, default=DEFAULT_ITERATIONS)
+    arg_parser.add_argument(
+        "-r", "--repetitions", type=int, default=DEFAULT_REPETITIONS)
+    args = arg_parser.parse_args()
+
+    run(args.iterations, args.repetitions)
@@ -0,0 +1,362 @@
+from argparse import ArgumentParser
+from asyncio import Event, new_event_loop
+from hashlib import sha256
+from json import dump
+from os import makedirs, path, remove
+from random import Random
+from shutil import rmtree
+from socket import AF_INET, SOCK_DGRAM
+from socket import socket as Socket
+from statistics import median
+from subprocess import (
+    DEVNULL,
+    PIPE,
+    CalledProcessError,
+    Popen,
+    TimeoutExpired,
+    run,
+)
+from sys import executable
+from tempfile import mkdtemp
+from threading import Thread
+from time import perf_counter, sleep
+
+from lib.common.address import Address
+from lib.common.constants import (
+    GO_BACK_N_PROTOCOL_TYPE,
+    IPV4_LOCALHOST,
+    PROXY_SEED,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+    USE_ANY_AVAILABLE_PORT,
+)
+from lib.common.logger import get_logger
+from lib.proxy.impaired_link import LinkImpairments
+from lib.proxy.impairment_proxy import ImpairmentProxy
+
+SRC_DIRPATH = path.dirname(path.dirname(path.abspath(__file__)))
+BYTES_PER_MEGABYTE = 1024 * 1024
+DEFAULT_PROTOCOLS = f"{STOP_AND_WAIT_PROTOCOL_TYPE},{GO_BACK_N_PROTOCOL_TYPE}"
+DEFAULT_SIZES = "1,5"
+DEFAULT_LOSSES = "0,10"
+DEFAULT_REPETITIONS = 3
+DEFAULT_TIMEOUT = 300  # seconds
+SERVER_STARTUP = 0.5  # seconds
+DIRECTIONS = ("upload", "download")
+
+
+# Runs the proxy on an event loop of its own, next to the clients and the
+# server the benchmark starts
+class ProxyThread:
+    def __init__(self, proxy: ImpairmentProxy):
+        self.proxy: ImpairmentProxy = proxy
+        self.loop = new_event_loop()
+        self.should_stop: Event | None = None
+        self.thread: Thread = Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        self.should_stop = Event()
+        self.loop.run_until_complete(self.proxy.serve(self.should_stop))
+        self.loop.close()
+
+    def start(self) -> None:
+        self.thread.start()
+        while self.proxy.listening_socket is None:
+            sleep(0.01)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.should_stop.set)
+        self.thread.join()
+
+
+def free_port() -> int:
+    with Socket(AF_INET, SOCK_DGRAM) as _socket:
+        _socket.bind((IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT))
+        return _socket.getsockname()[1]
+
+
+def file_digest(filepath: str) -> str:
+    with open(filepath, "rb") as file:
+        return sha256(file.read()).hexdigest()
+
+
+def run_script(script: str, arguments: list[str], timeout: float) -> bool:
+    try:
+        run([executable, path.join(SRC_DIRPATH, script), "-q", *arguments],
+            stdin=DEVNULL,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            timeout=timeout,
+            check=True)
+    except (CalledProcessError, TimeoutExpired):
+        return False
+    return True
+
+
+# Uploads the file through the proxy, downloads it back and gives how long
+# each of them took, None for the transfers that did not give the file back
+# as it was
+def run_transfers(
+        protocol: str,
+        port: int,
+        filepath: str,
+        dirpath: str,
+        timeout: float) -> dict[str, float | None]:
+    digest = file_digest(filepath)
+    name = path.basename(filepath)
+    client_arguments = [
+        "-H", IPV4_LOCALHOST, "-p", str(port), "-r", protocol, "-n", name]
+    elapsed: dict[str, float | None] = {}
+
+    start = perf_counter()
+    is_done = run_script(
+        "upload.py", [*client_arguments, "-s", filepath], timeout)
+    uploaded = path.join(dirpath, "server", name)
+    is_done = is_done and path.exists(uploaded)
+    elapsed["upload"] = perf_counter() - start if is_done and file_digest(
+        uploaded) == digest else None
+
+    downloaded = path.join(dirpath, "client", f"downloaded-{name}")
+    start = perf_counter()
+    is_done = run_script(
+        "download.py", [*client_arguments, "-d", downloaded], timeout)
+    is_done = is_done and path.exists(downloaded)
+    elapsed["download"] = perf_counter() - start if is_done and file_digest(
+        downloaded) == digest else None
+
+    # Neither the server nor the client take a file that already exists
+    for transferred in (uploaded, downloaded):
+        if path.exists(transferred):
+            remove(transferred)
+    return elapsed
+
+
+class TransferBenchmark:
+    def __init__(self, args):
+        self.protocols: list[str] = args.protocols.split(",")
+        self.sizes: list[float] = [float(s) for s in args.sizes.split(",")]
+        self.losses: list[float] = [
+            float(loss) for loss in args.losses.split(",")]
+        self.repetitions: int = args.repetitions
+        self.timeout: float = args.timeout
+        self.seed: int = args.seed
+        self.args = args
+        self.dirpath: str = mkdtemp(prefix="transfer-benchmark-")
+        self.results: list[dict] = []
+
+    def impairments(self, loss: float) -> LinkImpairments:
+        return LinkImpairments(
+            loss=loss / 100,
+            delay=self.args.delay / 1000,
+            jitter=self.args.jitter / 1000,
+            reorder=self.args.reorder / 100,
+            duplicate=self.args.duplicate / 100,
+            rate=self.args.rate * BYTES_PER_MEGABYTE)
+
+    def create_file(self, size: float) -> str:
+        filepath = path.join(self.dirpath, "client", f"{size:g}MB.bin")
+        # The same seed gives the same files in every run
+        data = Random(self.seed).randbytes(int(size * BYTES_PER_MEGABYTE))
+        with open(filepath, "wb") as file:
+            file.write(data)
+        return filepath
+
+    def run(self) -> None:
+        makedirs(path.join(self.dirpath, "client"))
+        try:
+            filepaths = [self.create_file(size) for size in self.sizes]
+            for protocol in self.protocols:
+                self.run_protocol(protocol, filepaths)
+        finally:
+            rmtree(self.dirpath, ignore_errors=True)
+
+    def run_protocol(self, protocol: str, filepaths: list[str]) -> None:
+        storage = path.join(self.dirpath, "server")
+        makedirs(storage, exist_ok=True)
+        server_port = free_port()
+        server = Popen(
+            [executable, path.join(SRC_DIRPATH, "start-server.py"), "-q",
+             "-H", IPV4_LOCALHOST, "-p", str(server_port),
+             "-s", storage, "-r", protocol],
+            stdin=PIPE,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            text=True)
+        sleep(SERVER_STARTUP)
+
+        try:
+            for loss in self.losses:
+                for size, filepath in zip(self.sizes, filepaths, strict=True):
+                    self.run_case(protocol, loss, size, filepath, server_port)
+        finally:
+            try:
+                server.communicate("q\n", timeout=self.timeout)
+            except TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    def run_case(
+            self,
+            protocol: str,
+            loss: float,
+            size: float,
+            filepath: str,
+            server_port: int) -> None:
+        impairments = self.impairments(loss)
+        samples: dict[str, list[float | None]] = {
+            direction: [] for direction in DIRECTIONS}
+
+        for repetition in range(self.repetitions):
+            # Every repetition goes through a link of its own, seeded apart
+            # so they are not all the same run
+            proxy = ImpairmentProxy(
+                Address(IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT),
+                Address(IPV4_LOCALHOST, server_port),
+                impairments,
+                impairments,
+                get_logger(verbose=False, quiet=True),
+                self.seed + repetition)
+            proxy_thread = ProxyThread(proxy)
+            proxy_thread.start()
+            try:
+                elapsed = run_transfers(
+                    protocol, proxy.port, filepath, self.dirpath,
+                    self.timeout)
+            finally:
+                proxy_thread.stop()
+
+            for direction in DIRECTIONS:
+                samples[direction].append(elapsed[direction])
+
+        result = {
+            "protocol": protocol,
+            "loss": loss,
+            "size": size,
+            "samples": samples,
+        }
+        for direction in DIRECTIONS:
+            times = [t for t in samples[direction] if t is not None]
+            result[direction] = (
+                median(times) if len(times) == self.repetitions else None)
+        self.results.append(result)
+        print(
+            f"{protocol} {loss:g}% {size:g} MB: upload {
+                format_time(result['upload'])} download {
+                format_time(result['download'])}")
+
+    def to_json(self) -> dict:
+        return {
+            "impairments": {
+                "delay": self.args.delay,
+                "jitter": self.args.jitter,
+                "reorder": self.args.reorder,
+                "duplicate": self.args.duplicate,
+                "rate": self.args.rate,
+            },
+            "repetitions": self.repetitions,
+            "seed": self.seed,
+            "results": self.results,
+        }
+
+    # Tables in the layout of benchmark.md, one per direction with a column
+    # per protocol and loss rate
+    def to_markdown(self) -> str:
+        columns = [
+            (protocol, loss)
+            for protocol in self.protocols for loss in self.losses]
+        by_case = {
+            (r["protocol"], r["loss"], r["size"]): r for r in self.results}
+        headers = ["**File Size**"] + [
+            f"**{protocol.upper()} ({loss:g}%)**"
+            for protocol, loss in columns]
+
+        lines: list[str] = []
+        for direction in DIRECTIONS:
+            rows = [
+                [f"`{size:g} MB`"] + [
+                    format_time(by_case[(protocol, loss, size)][direction])
+                    for protocol, loss in columns]
+                for size in self.sizes]
+            lines.append(f"### {direction.capitalize()}")
+            lines.append("")
+            lines.extend(markdown_table(headers, rows))
+            lines.append("")
+        return "\n".join(lines)
+
+
+def format_time(elapsed: float | None) -> str:
+    return "failed" if elapsed is None else f"{elapsed:.4f}s"
+
+
+def markdown_table(headers: list[str], rows: list[list[str]]) -> list[str]:
+    widths = [
+        max(len(cells[i]) for cells in [headers, *rows])
+        for i in range(len(headers))]
+
+    def line(cells: list[str]) -> str:
+        return "| " + " | ".join(
+            cell.ljust(width)
+            for cell, width in zip(cells, widths, strict=True)) + " |"
+
+    return [
+        line(headers),
+        line(["-" * width for width in widths]),
+        *[line(row) for row in rows]]
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description="Times uploads and downloads through a proxy that "
+        "simulates a lossy link, for every protocol, file size and loss rate")
+    arg_parser.add_argument(
+        "-r", "--protocols", default=DEFAULT_PROTOCOLS,
+        help="comma separated error recovery protocols")
+    arg_parser.add_argument(
+        "-s", "--sizes", default=DEFAULT_SIZES,
+        help="comma separated file sizes in MB")
+    arg_parser.add_argument(
+        "-l", "--losses", default=DEFAULT_LOSSES,
+        help="comma separated loss rates in percent, in each direction")
+    arg_parser.add_argument(
+        "-n", "--repetitions", type=int, default=DEFAULT_REPETITIONS,
+        help="runs of each case, the median is reported")
+    arg_parser.add_argument(
+        "--delay", type=float, default=0, help="one way delay in ms")
+    arg_parser.add_argument(
+        "--jitter", type=float, default=0,
+        help="delay variation in ms, uniform around the delay")
+    arg_parser.add_argument(
+        "--reorder", type=float, default=0,
+        help="percent of datagrams held back behind the next ones")
+    arg_parser.add_argument(
+        "--duplicate", type=float, default=0,
+        help="percent of datagrams delivered twice")
+    arg_parser.add_argument(
+        "--rate", type=float, default=0,
+        help="bandwidth cap in MB/s in each direction, none if 0")
+    arg_parser.add_argument(
+        "--seed", type=int, default=PROXY_SEED,
+        help="seed of the files and of the link")
+    arg_parser.add_argument(
+        "--timeout", type=float, default=DEFAULT_TIMEOUT,
+        help="seconds a transfer may take before it counts as failed")
+    arg_parser.add_argument(
+        "-j", "--json", metavar="FILEPATH",
+        help="file the results are written to as JSON")
+    arg_parser.add_argument(
+        "-o", "--markdown", metavar="FILEPATH",
+        help="file the markdown tables are written to, instead of stdout")
+    args = arg_parser.parse_args()
+
+    benchmark = TransferBenchmark(args)
+    benchmark.run()
+
+    if args.json:
+        with open(args.json, "w") as file:
+            dump(benchmark.to_json(), file, indent=2)
+
+    markdown = benchmark.to_markdown()
+    if args.markdown:
+        with open(args.markdown, "w") as file:
+            file.write(markdown)
+    else:
+        print(markdown)
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 from lib.client.client_download import DownloadClient
+from lib.client.client_download_session import DownloadSessionClient
+from lib.client.client_download_striped import StripedDownloadClient
 from lib.client.parser_download import ClientDownloadArgParser
 from lib.common.logger import get_logger
+from lib.common.transfer_session import is_glob_pattern
+from lib.common.transfer_trace import enable_tracing
 
 
 def download():
@@ -13,8 +17,22 @@ def download():
     args_dict = vars(args)
     args_dict.pop("verbose")
     args_dict.pop("quiet")
+    streams = args_dict.pop("streams")
+    enable_tracing(args_dict.pop("trace"))
 
-    client: DownloadClient = DownloadClient(logger, **args_dict)
+    # Glob patterns download a session of every file they match
+    is_session = is_glob_pattern(args.name)
+    if streams > 1 and (is_session or args.resume):
+        logger.warn("Only new single files are striped, using one stream")
+        streams = 1
+
+    if streams > 1:
+        args_dict.pop("resume")
+        client = StripedDownloadClient(logger, streams=streams, **args_dict)
+    elif is_session:
+        client = DownloadSessionClient(logger, **args_dict)
+    else:
+        client = DownloadClient(logger, **args_dict)
     client.run()
 
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import sys
+from asyncio import Event, get_running_loop, run
+
+from lib.common.address import Address
+from lib.common.logger import CoolLogger, get_logger
+from lib.common.wait_for_quit import QUIT_CHARACTER
+from lib.proxy.impaired_link import LinkImpairments
+from lib.proxy.impairment_proxy import ImpairmentProxy
+from lib.proxy.parser import ProxyArgParser
+
+BYTES_PER_KILOBYTE = 1024
+
+
+def impairments_from(args) -> LinkImpairments:
+    return LinkImpairments(
+        loss=args.loss / 100,
+        burst_loss=args.burst_loss / 100,
+        burst_start=args.burst_start / 100,
+        burst_end=args.burst_end / 100,
+        delay=args.delay / 1000,
+        jitter=args.jitter / 1000,
+        distribution=args.distribution,
+        reorder=args.reorder / 100,
+        duplicate=args.duplicate / 100,
+        mtu=args.mtu,
+        rate=args.rate * BYTES_PER_KILOBYTE,
+        bucket=args.bucket)
+
+
+# Stops the proxy once q is read, like the server does. A closed stdin
+# leaves it running until interrupted
+async def relay_until_quit(proxy: ImpairmentProxy, logger: CoolLogger):
+    loop = get_running_loop()
+    should_stop = Event()
+
+    def on_input():
+        line = sys.stdin.readline()
+        if not line:
+            loop.remove_reader(sys.stdin)
+        elif line.strip() == QUIT_CHARACTER:
+            should_stop.set()
+
+    loop.add_reader(sys.stdin, on_input)
+    proxy.start(loop)
+    logger.info(
+        f"Relaying {proxy.listen_address.host}:{proxy.port} to {
+            proxy.server_address.to_combined()}")
+    logger.info(f"Press {QUIT_CHARACTER} and Enter to finish")
+    try:
+        await should_stop.wait()
+    finally:
+        loop.remove_reader(sys.stdin)
+        proxy.close()
+
+
+def start_proxy():
+    arg_parser = ProxyArgParser()
+    args = arg_parser.parse()
+
+    logger = get_logger(args.verbose, args.quiet)
+    impairments = impairments_from(args)
+    proxy = ImpairmentProxy(
+        Address(args.host, args.port),
+        Address(args.server_host, args.server_port),
+        impairments,
+        impairments,
+        logger,
+        args.seed)
+
+    try:
+        run(relay_until_quit(proxy, logger))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        logger.error(f"Cannot relay from {args.host}:{args.port}. {e}")
+        return
+    logger.info(proxy.summary())
+    logger.info("Proxy shutdown")
+
+
+if __name__ == "__main__":
+    start_proxy()
@@ -1,20 +1,26 @@
-from abc import abstractmethod
-from socket import socket as Socket
-from socket import AF_INET, SOCK_DGRAM, SHUT_RDWR
 import sys
+from abc import abstractmethod
+from ctypes import c_bool
 from io import StringIO
 from multiprocessing import Value
-from ctypes import c_bool
+from socket import AF_INET, SHUT_RDWR, SOCK_DGRAM
+from socket import socket as Socket
 from threading import Event, Thread
 
 from lib.client.exceptions.connection_refused import ConnectionRefused
 from lib.client.protocol import ClientProtocol
 from lib.common.address import Address
+from lib.common.chunk_codec import (
+    ChunkCodec,
+    available_codecs,
+    create_chunk_codec,
+)
 from lib.common.constants import (
+    FAST_OPEN_MAX_PAYLOAD_SIZE,
     USE_ANY_AVAILABLE_PORT,
     USE_CURRENT_HOST,
-    SOCKET_CONNECTION_LOST_TIMEOUT,
-    GO_BACK_N_PROTOCOL_TYPE,
+    WINDOWED_PROTOCOL_TYPES,
+    ZERO_BYTES,
 )
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
@@ -22,9 +28,12 @@ from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_fin_nor_ack import MessageNotFinNorAck
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.fast_open import FastOpenAnswer, FastOpenRequest
 from lib.common.logger import CoolLogger
+from lib.common.path_mtu import chunk_size_for, reserve_socket_buffers
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_saw import SocketSaw
+from lib.common.transfer_trace import dump_transfer_trace
 from lib.common.wait_for_quit import wait_for_quit
 
 
@@ -34,7 +43,9 @@ class Client:
             logger: CoolLogger,
             host: str,
             port: int,
-            protocol: str):
+            protocol: str,
+            integrity: bool = True,
+            compression: bool = True):
         self.logger: CoolLogger = logger
         self.server_host: str = host
         self.server_port: int = port
@@ -44,8 +55,8 @@ class Client:
 
         raw_socket: Socket = Socket(AF_INET, SOCK_DGRAM)
         raw_socket.bind((USE_CURRENT_HOST, USE_ANY_AVAILABLE_PORT))
+        reserve_socket_buffers(raw_socket)
         sockname: tuple[str, int] = raw_socket.getsockname()
-        raw_socket.settimeout(SOCKET_CONNECTION_LOST_TIMEOUT)
         self.my_address: Address = Address(sockname[0], sockname[1])
 
         self.socket: SocketSaw = SocketSaw(raw_socket, self.logger)
@@ -63,10 +74,19 @@ class Client:
         )
 
         self.ack_number = None
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.ack_number = SequenceNumber(
                 0, self.protocol.protocol_version)
 
+        # Whether the integrity of the transfer is asked to be checked
+        self.integrity: bool = integrity
+        # Whether codecs are offered for the chunks to be compressed with
+        self.compression: bool = compression
+        # Only set when the server answered the request sent with the SYN
+        self.fast_open_answer: FastOpenAnswer | None = None
+        # Only set when the server picked one of the codecs offered
+        self.codec: ChunkCodec | None = None
+
         self.logger.debug(f"Running on {self.my_address}")
 
     def handshake(self) -> Address:
@@ -75,17 +95,43 @@ class Client:
             f"Requesting connection to {
                 self.server_address}")
 
+        # The request goes along with the SYN, servers that do not know of
+        # it answer as if the SYN carried nothing and it is made apart
+        request = self.fast_open_request().to_bytes()
+        if len(request) > FAST_OPEN_MAX_PAYLOAD_SIZE:
+            request = ZERO_BYTES
+
         self.protocol.request_connection(
-            self.sequence_number, self.ack_number)
+            self.sequence_number, self.ack_number, request)
 
         try:
-            server_address = self.protocol.wait_for_connection_request_answer(
-                self.sequence_number, self.ack_number, exceptions_to_let_through=[
-                    UnexpectedFinMessage, MessageIsNotAck], )
-        except (UnexpectedFinMessage, MessageIsNotAck):
+            packet, server_address = (
+                self.protocol.wait_for_connection_request_answer(
+                    self.sequence_number, self.ack_number,
+                    exceptions_to_let_through=[
+                        UnexpectedFinMessage, MessageIsNotAck], ))
+        except UnexpectedFinMessage as e:
+            if e.packet is None or e.packet.payload_length == 0:
+                self.logger.error("Protocol mismatch")
+                raise ConnectionRefused()
+
+            packet = e.packet
+            server_address = Address(self.server_host, packet.port)
+        except MessageIsNotAck:
             self.logger.error("Protocol mismatch")
             raise ConnectionRefused()
 
+        if packet.payload_length > 0:
+            try:
+                self.fast_open_answer = FastOpenAnswer.from_bytes(packet.data)
+            except ValueError:
+                self.logger.error("Protocol mismatch")
+                raise ConnectionRefused()
+            self.logger.debug("Request answered along with the connection")
+            if self.fast_open_answer.integrity:
+                self.socket.datagrams.checksums = True
+            self.codec = create_chunk_codec(self.fast_open_answer.codec)
+
         self.logger.debug("Connection request accepted")
         self.logger.debug(
             f"Completing handshake with {
@@ -105,8 +151,15 @@ class Client:
         except (ConnectionLost, SocketShutdown):
             self.logger.error("Connection closed")
         finally:
+            self.dump_trace()
             should_stop_event.set()
 
+    def dump_trace(self) -> None:
+        trace_path = dump_transfer_trace(
+            self.socket.trace, f"client-{self.my_address.port}")
+        if trace_path is not None:
+            self.logger.info(f"Trace written to {trace_path}")
+
     def stop(
         self,
         client_start_thread: Thread,
@@ -136,10 +189,63 @@ class Client:
             self.logger.info("Client shutdown")
             self.stopped = True
 
+    # Compression only pays off on links slower than compressing the chunks
+    def offered_codecs(self) -> list[int]:
+        return available_codecs() if self.compression else []
+
+    # Set once the server agreed to check the integrity of the transfer
+    @property
+    def is_integrity_checked(self) -> bool:
+        return (self.fast_open_answer is not None
+                and self.fast_open_answer.integrity)
+
+    # Servers that told the largest datagram they receive are sent chunks as
+    # large as the path to them carries whole
+    def chunk_size_for_sending(self) -> int:
+        datagram_size = None
+        if self.fast_open_answer is not None:
+            datagram_size = self.fast_open_answer.datagram_size
+
+        chunk_size = chunk_size_for(
+            self.protocol.protocol_version,
+            self.server_address.host,
+            datagram_size,
+            self.is_integrity_checked)
+        self.logger.debug(f"Sending chunks of up to {chunk_size} bytes")
+        return chunk_size
+
     @abstractmethod
     def perform_operation(self, server_address: Address):
         pass
 
+    @abstractmethod
+    def fast_open_request(self) -> FastOpenRequest:
+        pass
+
+    def step_numbers(self) -> None:
+        self.sequence_number.step()
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
+            self.ack_number.step()
+
+    # The answer to the request sent with the SYN stands for the operation
+    # confirmation. A rejected request is finalized by the server right
+    # away, as when validation fails in the classic exchange
+    def complete_fast_open(self, server_address: Address) -> FastOpenAnswer:
+        self.step_numbers()
+
+        self.server_address: Address = server_address
+        self.protocol.update_server_address(server_address)
+
+        self.logger.debug("Connection established")
+        return self.fast_open_answer
+
+    # Servers that answered the SYN as usual accept nobody else until the
+    # handshake is completed, so it is before leaving
+    def leave_connection(self, op_code: int, server_address: Address) -> None:
+        self.send_operation_intention(op_code, server_address)
+        self.step_numbers()
+        self.protocol.send_fin(self.sequence_number, self.ack_number)
+
     def send_operation_intention(
             self,
             op_code: int,
@@ -149,7 +255,7 @@ class Client:
 
             self.sequence_number.step()
 
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
                 self.ack_number.step()
 
             self.protocol.send_operation_intention(
@@ -5,26 +5,38 @@ from lib.client.abstract_client import Client
 from lib.client.exceptions.file_does_not_exist import FileDoesNotExist
 from lib.client.go_back_n_receiver_client import GoBackNReceiver
 from lib.client.protocol_gbn import ClientProtocolGbn
+from lib.client.selective_repeat_receiver_client import (
+    SelectiveRepeatReceiverClient,
+)
+from lib.common.ack_policy import AckPolicy
 from lib.common.address import Address
-from lib.common.exceptions.connection_lost import ConnectionLost
-from lib.common.exceptions.message_not_ack import MessageIsNotAck
-from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
-from lib.common.exceptions.socket_shutdown import SocketShutdown
-from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
-from lib.common.hash_compute import compute_chunk_sha256
-from lib.common.logger import CoolLogger
 from lib.common.constants import (
+    ACK_EVERY,
     DOWNLOAD_OPERATION,
     ERROR_EXIT_CODE,
+    FAST_OPEN_RESUME_PAST_END,
     GO_BACK_N_PROTOCOL_TYPE,
-    STOP_AND_WAIT_PROTOCOL_TYPE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
     SHOULD_PRINT_CHUNK_HASH,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+    TRACE_CHUNK_RECEIVED,
+    WINDOWED_PROTOCOL_TYPES,
 )
+from lib.common.exceptions.connection_lost import ConnectionLost
+from lib.common.exceptions.corrupted_transfer import CorruptedTransfer
 from lib.common.exceptions.invalid_filename import InvalidFilename
+from lib.common.exceptions.message_not_ack import MessageIsNotAck
+from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
+from lib.common.exceptions.socket_shutdown import SocketShutdown
+from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.fast_open import FastOpenRequest
 from lib.common.file_handler import FileHandler
+from lib.common.hash_compute import compute_chunk_sha256
+from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.packet.packet import Packet
 from lib.common.socket_gbn import SocketGbn
+from lib.common.transfer_digest import TransferDigest
 
 
 class DownloadClient(Client):
@@ -36,35 +48,70 @@ class DownloadClient(Client):
         dst: str,
         name: str,
         protocol: str,
+        resume: bool = False,
+        ack_every: int = ACK_EVERY,
+        integrity: bool = True,
+        compression: bool = True,
     ):
         self.file_destination: str = dst
         self.filename_for_download: str = name
         self.protocol_version: str = protocol
+        self.resume: bool = resume
+        self.ack_every: int = ack_every
+
+        self.open_destination(logger)
+
+        super().__init__(
+            logger,
+            host,
+            port,
+            self.protocol_version,
+            integrity,
+            compression)
+        self.logger.debug(
+            f"Location to save downloaded file: {self.file_destination}")
+        self.download_completed = False
 
+        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            self.expected_sqn_number: int = 1
+
+    def open_destination(self, logger: CoolLogger) -> None:
         try:
             self.file_handler: FileHandler = FileHandler(getcwd(), logger)
-            self.file = self.file_handler.open_file_write_mode(
-                dst, is_path_complete=True
+            self.file = self.file_handler.open_file_journaled_mode(
+                self.file_destination,
+                is_path_complete=True,
+                resume=self.resume,
             )
         except InvalidFilename:
             logger.error(f"File {self.file_destination} already exists")
             exit(ERROR_EXIT_CODE)
 
-        super().__init__(logger, host, port, self.protocol_version)
-        self.logger.debug(
-            f"Location to save downloaded file: {self.file_destination}")
-        self.download_completed = False
-
-        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
-            self.expected_sqn_number: int = 1
+        if self.file.offset > 0:
+            logger.info(
+                f"Resuming download from {
+                    self.file_handler.bytes_to_megabytes(
+                        self.file.offset)} MB")
 
     def perform_operation(self, server_address: Address) -> None:
         self.perform_download(server_address)
 
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            DOWNLOAD_OPERATION,
+            self.filename_for_download,
+            resume_offset=self.file.offset if self.resume else None,
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
     def perform_download(self, server_address: Address) -> None:
         try:
-            self.send_operation_intention(
-                DOWNLOAD_OPERATION, server_address)
+            if self.fast_open_answer is None:
+                self.send_operation_intention(
+                    DOWNLOAD_OPERATION, server_address)
+            else:
+                self.complete_fast_open_download(server_address)
             packet = self.inform_name_to_download()
             self.receive_file(packet)
             self.handle_connection_finalization()
@@ -73,7 +120,7 @@ class DownloadClient(Client):
             self.logger.error(f"{e.message}")
 
             self.sequence_number.step()
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
                 self.ack_number.step()
 
             self.handle_connection_finalization()
@@ -84,10 +131,21 @@ class DownloadClient(Client):
             self.logger.error(f"Error message: {err}")
             self.file_cleanup_after_error()
 
+    # Once accepted, the name is sent again as in the classic exchange, it
+    # is what the server answers with the first chunk
+    def complete_fast_open_download(self, server_address: Address) -> None:
+        answer = self.complete_fast_open(server_address)
+
+        if answer.status == FAST_OPEN_RESUME_PAST_END:
+            raise FileDoesNotExist(
+                "File in server is no longer than what was downloaded")
+        if not answer.is_accepted:
+            raise FileDoesNotExist()
+
     def inform_name_to_download(self) -> Packet:
         self.sequence_number.step()
 
-        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.ack_number.step()
 
         self.logger.debug(
@@ -96,7 +154,9 @@ class DownloadClient(Client):
         self.protocol.inform_filename(
             self.sequence_number,
             self.ack_number,
-            self.filename_for_download)
+            self.filename_for_download,
+            self.file.offset if self.resume else None,
+        )
 
         self.logger.debug("Waiting for filename confirmation")
         try:
@@ -108,7 +168,9 @@ class DownloadClient(Client):
             )
             return packet
         except UnexpectedFinMessage as e:
-            if e.packet.payload_length > 0:
+            # Once the server accepted the request the file exists, a bare
+            # FIN is the only chunk of an empty one
+            if e.packet.payload_length > 0 or self.fast_open_answer is not None:
                 return e.packet
             else:
                 self.logger.debug("Filename confirmation failed")
@@ -124,6 +186,12 @@ class DownloadClient(Client):
 
         self.sequence_number, packet = self.protocol.receive_file_chunk_saw(
             self.sequence_number)
+        if self.socket.trace is not None:
+            self.socket.trace.record(
+                TRACE_CHUNK_RECEIVED,
+                chunk_number - 1,
+                packet.sequence_number,
+                packet.payload_length)
 
         if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
             if not self.expected_sqn_number == self.sequence_number:
@@ -137,7 +205,7 @@ class DownloadClient(Client):
         if not packet.is_fin:
             self.protocol.send_ack(self.sequence_number, self.ack_number)
 
-        self.logger.debug(f"Received chunk {chunk_number}")
+        self.logger.debug("Received chunk %d", chunk_number)
         self.file_handler.append_to_file(self.file, packet)
 
         return packet
@@ -149,7 +217,7 @@ class DownloadClient(Client):
         if not packet.is_fin:
             self.protocol.send_ack(self.sequence_number, self.ack_number)
 
-        self.logger.debug(f"Received chunk {chunk_number}")
+        self.logger.debug("Received chunk %d", chunk_number)
         self.file_handler.append_to_file(self.file, packet)
 
         if (
@@ -162,11 +230,31 @@ class DownloadClient(Client):
             chunk_number += 1
             packet = self.receive_single_chunk(chunk_number)
 
-        self.logger.force_info("Download completed")
-        self.download_completed = True
-        self.file_handler.close(self.file)
+        self.complete_download()
 
-    def receive_file_gbn(self, first_chunk_packet: Packet) -> None:
+    # Selective acks tell of a single chunk each, none of them is delayed
+    def create_receiver(
+        self, gbn_protocol: ClientProtocolGbn
+    ) -> GoBackNReceiver | SelectiveRepeatReceiverClient:
+        if self.protocol_version == SELECTIVE_REPEAT_PROTOCOL_TYPE:
+            return SelectiveRepeatReceiverClient(
+                self.logger,
+                gbn_protocol,
+                self.file_handler,
+                self.sequence_number,
+                self.ack_number,
+            )
+
+        return GoBackNReceiver(
+            self.logger,
+            gbn_protocol,
+            self.file_handler,
+            self.sequence_number,
+            self.ack_number,
+            AckPolicy(self.ack_every),
+        )
+
+    def receive_file_windowed(self, first_chunk_packet: Packet) -> None:
         self.logger.debug(f"Ready to receive from {self.server_address}")
 
         chunk_number: int = 1
@@ -175,12 +263,13 @@ class DownloadClient(Client):
         if not packet.is_fin:
             self.protocol.send_ack(self.sequence_number, self.ack_number)
 
-        msg = f"Received chunk {chunk_number}. "
+        if self.logger.is_debug_enabled:
+            msg = f"Received chunk {chunk_number}. "
 
-        if SHOULD_PRINT_CHUNK_HASH:
-            msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
+            if SHOULD_PRINT_CHUNK_HASH:
+                msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
 
-        self.logger.debug(msg)
+            self.logger.debug(msg)
 
         self.file_handler.append_to_file(self.file, packet)
 
@@ -188,7 +277,12 @@ class DownloadClient(Client):
             last_transmitted_packet = self.socket.last_raw_packet
 
             self.socket.reset_state()
-            socket_gbn = SocketGbn(self.socket.socket, self.logger)
+            socket_gbn = SocketGbn(
+                self.socket.socket,
+                self.logger,
+                self.socket.rtt_estimator,
+                self.socket.datagrams,
+                self.socket.trace)
             gbn_protocol = ClientProtocolGbn(
                 self.logger,
                 socket_gbn,
@@ -197,16 +291,10 @@ class DownloadClient(Client):
                 self.protocol.protocol_version,
             )
 
-            gbn_receiver = GoBackNReceiver(
-                self.logger,
-                gbn_protocol,
-                self.file_handler,
-                self.sequence_number,
-                self.ack_number,
-            )
+            receiver = self.create_receiver(gbn_protocol)
 
             try:
-                _seq, _ack = gbn_receiver.receive_file(
+                _seq, _ack = receiver.receive_file(
                     self.file, last_transmitted_packet
                 )
                 self.sequence_number = _seq
@@ -215,15 +303,33 @@ class DownloadClient(Client):
                 self.logger.error(
                     "Retransmission needed. Unhandled exception")
 
+        self.complete_download()
+
+    # Downloads that do not match the digest the server told keep nothing of
+    # what arrived, the connection is closed as usual all the same
+    def complete_download(self) -> None:
+        try:
+            self.file_handler.complete(self.file)
+        except CorruptedTransfer as e:
+            self.logger.error(e.message)
+            return
+
+        if self.file.digest is not None and self.file.digest.is_verified:
+            self.logger.info(
+                f"Download verified, SHA-256 {
+                    self.file.digest.hexdigest()}")
         self.logger.force_info("Download completed")
         self.download_completed = True
-        self.file_handler.close(self.file)
 
     def receive_file(self, first_chunk_packet: Packet) -> None:
+        if self.is_integrity_checked:
+            self.file.digest = TransferDigest()
+        self.file.codec = self.codec
+
         if self.protocol_version == STOP_AND_WAIT_PROTOCOL_TYPE:
             self.receive_file_saw(first_chunk_packet)
-        elif self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
-            self.receive_file_gbn(first_chunk_packet)
+        elif self.protocol_version in WINDOWED_PROTOCOL_TYPES:
+            self.receive_file_windowed(first_chunk_packet)
 
     def file_cleanup_after_error(self):
         if not self.file_handler.is_closed(self.file):
@@ -0,0 +1,55 @@
+from sys import exit
+
+from lib.client.client_download import DownloadClient
+from lib.client.exceptions.file_does_not_exist import FileDoesNotExist
+from lib.common.address import Address
+from lib.common.constants import DOWNLOAD_OPERATION, ERROR_EXIT_CODE
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
+from lib.common.logger import CoolLogger
+from lib.common.transfer_session import SessionWriter
+from lib.server.exceptions.invalid_directory import InvalidDirectory
+
+
+# Downloads every file in the server whose name matches a glob pattern over
+# a single connection, into a directory
+class DownloadSessionClient(DownloadClient):
+    def open_destination(self, logger: CoolLogger) -> None:
+        try:
+            self.file_handler: FileHandler = FileHandler(
+                self.file_destination, logger)
+        except InvalidDirectory:
+            logger.error(
+                f"Destination {self.file_destination} is not a directory")
+            exit(ERROR_EXIT_CODE)
+
+        if self.resume:
+            logger.warn("Sessions can not be resumed, receiving every file")
+            self.resume = False
+
+        self.file = SessionWriter(self.file_handler, logger)
+
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            DOWNLOAD_OPERATION,
+            self.filename_for_download,
+            session_files=0,
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
+    # Only servers that answer the request sent with the SYN know of them
+    def perform_download(self, server_address: Address) -> None:
+        if self.fast_open_answer is None:
+            self.logger.error("Server does not support sessions")
+            self.leave_connection(DOWNLOAD_OPERATION, server_address)
+            return
+
+        super().perform_download(server_address)
+
+    def complete_fast_open_download(self, server_address: Address) -> None:
+        answer = self.complete_fast_open(server_address)
+
+        if not answer.is_accepted:
+            raise FileDoesNotExist(
+                f"No file in server matches {self.filename_for_download}")
@@ -0,0 +1,183 @@
+from os import getcwd, path
+from sys import exit
+from threading import Event, Thread
+
+from lib.client.client_download import DownloadClient
+from lib.client.exceptions.file_does_not_exist import FileDoesNotExist
+from lib.client.striped_client import StripedClient
+from lib.common.address import Address
+from lib.common.constants import (
+    ACK_EVERY,
+    DOWNLOAD_OPERATION,
+    ERROR_EXIT_CODE,
+)
+from lib.common.exceptions.invalid_filename import InvalidFilename
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
+from lib.common.file_range import stream_count, stream_range
+from lib.common.logger import CoolLogger
+
+
+# Downloads a range of a file into the destination the other streams of the
+# transfer write too. The range is only known once the server tells the
+# size of the file
+class DownloadStreamClient(DownloadClient):
+    def __init__(
+        self,
+        logger: CoolLogger,
+        host: str,
+        port: int,
+        dst: str,
+        name: str,
+        protocol: str,
+        transfer_id: int,
+        stream: int,
+        streams: int,
+        ack_every: int = ACK_EVERY,
+        integrity: bool = True,
+        compression: bool = True,
+    ):
+        self.transfer_id: int = transfer_id
+        self.stream: int = stream
+        self.streams: int = streams
+        self.total_filesize: int | None = None
+        # Set once the server answered, whether it accepted or not
+        self.answered: Event = Event()
+
+        super().__init__(
+            logger, host, port, dst, name, protocol, ack_every=ack_every,
+            integrity=integrity, compression=compression)
+
+    def open_destination(self, logger: CoolLogger) -> None:
+        self.file_handler: FileHandler = FileHandler(getcwd(), logger)
+        self.file = None
+
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            DOWNLOAD_OPERATION,
+            self.filename_for_download,
+            stream=(self.transfer_id, self.stream, self.streams),
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
+    def client_start(self, should_stop_event: Event) -> None:
+        try:
+            super().client_start(should_stop_event)
+        finally:
+            self.answered.set()
+
+    # Only servers that answer the request sent with the SYN know of them
+    def perform_download(self, server_address: Address) -> None:
+        if self.fast_open_answer is None:
+            self.logger.error("Server does not support striped transfers")
+            self.leave_connection(DOWNLOAD_OPERATION, server_address)
+            return
+
+        super().perform_download(server_address)
+
+    def complete_fast_open_download(self, server_address: Address) -> None:
+        answer = self.complete_fast_open(server_address)
+
+        if not answer.is_accepted or answer.filesize is None:
+            raise FileDoesNotExist()
+
+        start, _length = stream_range(
+            answer.filesize, self.stream, self.streams)
+        try:
+            self.file = self.file_handler.open_file_range_mode(
+                self.file_destination,
+                is_path_complete=True,
+                filesize=answer.filesize,
+                transfer_id=self.transfer_id,
+                start=start,
+            )
+        except InvalidFilename:
+            raise FileDoesNotExist(
+                f"Could not write to {self.file_destination}")
+
+        self.total_filesize = answer.filesize
+        self.answered.set()
+
+    # What other streams wrote is kept, the journal tells what is missing
+    def file_cleanup_after_error(self):
+        if self.file is not None and not self.file_handler.is_closed(
+                self.file):
+            self.file_handler.close(self.file)
+
+
+class StripedDownloadClient(StripedClient):
+    def __init__(
+        self,
+        logger: CoolLogger,
+        host: str,
+        port: int,
+        dst: str,
+        name: str,
+        protocol: str,
+        streams: int,
+        ack_every: int = ACK_EVERY,
+        integrity: bool = True,
+        compression: bool = True,
+    ):
+        super().__init__(logger, streams)
+        self.host: str = host
+        self.port: int = port
+        self.file_destination: str = dst
+        self.filename_for_download: str = name
+        self.protocol_version: str = protocol
+        self.ack_every: int = ack_every
+        self.integrity: bool = integrity
+        self.compression: bool = compression
+
+        self.file_handler: FileHandler = FileHandler(getcwd(), logger)
+        if (path.isfile(dst)
+                and not self.file_handler.has_journal(
+                    dst, is_path_complete=True)):
+            logger.error(f"File {dst} already exists")
+            exit(ERROR_EXIT_CODE)
+
+    def create_stream(self, stream: int) -> DownloadStreamClient:
+        return DownloadStreamClient(
+            self.stream_logger(stream),
+            self.host,
+            self.port,
+            self.file_destination,
+            self.filename_for_download,
+            self.protocol_version,
+            self.transfer_id,
+            stream,
+            self.requested_streams,
+            self.ack_every,
+            self.integrity,
+            self.compression,
+        )
+
+    # The first stream learns the size of the file, which tells how many
+    # more are worth starting
+    def start_streams(self) -> list[Thread]:
+        first_stream = self.create_stream(0)
+        threads = [self.start_stream(first_stream)]
+        first_stream.answered.wait()
+
+        if first_stream.total_filesize is None:
+            return threads
+
+        effective_streams = stream_count(
+            first_stream.total_filesize, self.requested_streams)
+        self.logger.info(
+            f"Downloading {self.filename_for_download} over {
+                effective_streams} streams")
+
+        return threads + [
+            self.start_stream(self.create_stream(stream))
+            for stream in range(1, effective_streams)]
+
+    def report(self) -> None:
+        if self.file_handler.has_journal(
+                self.file_destination, is_path_complete=True):
+            self.logger.warn(
+                f"Download of {self.file_destination} is incomplete, "
+                "run it again with --resume to finish it")
+        elif path.isfile(self.file_destination):
+            self.logger.force_info("Striped download completed")
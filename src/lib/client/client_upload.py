@@ -1,27 +1,42 @@
-from os import path, getcwd
+from os import getcwd, path
 from sys import exit
 
 from lib.client.abstract_client import Client
 from lib.client.exceptions.file_already_exists import FileAlreadyExists
 from lib.client.exceptions.file_too_big import FileTooBig
+from lib.client.go_back_n_sender_client import GoBackNSender
 from lib.client.protocol_gbn import ClientProtocolGbn
+from lib.client.selective_repeat_sender_client import (
+    SelectiveRepeatSenderClient,
+)
 from lib.common.address import Address
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.congestion_control import create_congestion_controller
 from lib.common.constants import (
-    UPLOAD_OPERATION,
+    COMPRESSION_SAMPLE_SIZE,
     ERROR_EXIT_CODE,
-    FILE_CHUNK_SIZE_SAW,
+    FAST_OPEN_FILE_EXISTS,
     GO_BACK_N_PROTOCOL_TYPE,
+    INT_DESERIALIZATION_BYTEORDER,
+    OFFSET_SIZE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
     STOP_AND_WAIT_PROTOCOL_TYPE,
+    TRACE_ACK_RECEIVED,
+    TRACE_CHUNK_SENT,
+    UPLOAD_OPERATION,
+    WINDOWED_PROTOCOL_TYPES,
 )
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.invalid_filename import InvalidFilename
 from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.fast_open import FastOpenRequest
 from lib.common.file_handler import FileHandler
 from lib.common.logger import CoolLogger
-from lib.client.go_back_n_sender_client import GoBackNSender
+from lib.common.packet.packet import Packet
 from lib.common.socket_gbn import SocketGbn
+from lib.common.transfer_digest import TransferDigest
 
 
 class UploadClient(Client):
@@ -33,13 +48,29 @@ class UploadClient(Client):
         src: str,
         name: str,
         protocol: str,
+        congestion: str,
+        resume: bool = False,
+        integrity: bool = True,
+        compression: bool = True,
     ):
         self.src_filepath: str = src
         self.filename_in_server: str = name
         self.protocol_version: str = protocol
+        self.congestion: str = congestion
+        self.resume: bool = resume
+        # Bytes the server already has, only ever set when resuming
+        self.offset: int = 0
+        # Only kept when the server checks the integrity of the transfer
+        self.digest: TransferDigest | None = None
 
+        self.file_handler: FileHandler = FileHandler(getcwd(), logger)
+        self.open_source(logger)
+
+        super().__init__(
+            logger, host, port, protocol, integrity, compression)
+
+    def open_source(self, logger: CoolLogger) -> None:
         try:
-            self.file_handler: FileHandler = FileHandler(getcwd(), logger)
             self.file = self.file_handler.open_file_read_mode(
                 self.src_filepath, is_path_complete=True
             )
@@ -47,21 +78,33 @@ class UploadClient(Client):
                 self.src_filepath, is_path_complete=True
             )
         except InvalidFilename:
-            logger.error(f"Could not find or open file {src}")
+            logger.error(f"Could not find or open file {self.src_filepath}")
             exit(ERROR_EXIT_CODE)
 
-        if name is None or name == "":
+        if self.filename_in_server is None or self.filename_in_server == "":
             self.filename_in_server = path.basename(self.src_filepath)
 
-        super().__init__(logger, host, port, protocol)
-
     def perform_operation(self, server_address: Address) -> None:
         self.perform_upload(server_address)
 
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            UPLOAD_OPERATION,
+            self.filename_in_server,
+            self.filesize,
+            0 if self.resume else None,
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
     def perform_upload(self, server_address: Address) -> None:
         try:
-            self.send_operation_intention(UPLOAD_OPERATION, server_address)
-            self.inform_size_and_name()
+            if self.fast_open_answer is None:
+                self.send_operation_intention(
+                    UPLOAD_OPERATION, server_address)
+                self.inform_size_and_name()
+            else:
+                self.complete_fast_open_upload(server_address)
             already_received_fin_back = self.send_file()
             self.initiate_close_connection(already_received_fin_back)
 
@@ -69,7 +112,7 @@ class UploadClient(Client):
             self.logger.error(f"{e.message}")
 
             self.sequence_number.step()
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
                 self.ack_number.step()
 
             self.handle_connection_finalization()
@@ -88,11 +131,14 @@ class UploadClient(Client):
         self.sequence_number.step()
         self.logger.debug(f"Informing filename: {self.filename_in_server}")
 
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.ack_number.step()
 
         self.protocol.inform_filename(
-            self.sequence_number, self.ack_number, self.filename_in_server
+            self.sequence_number,
+            self.ack_number,
+            self.filename_in_server,
+            0 if self.resume else None,
         )
 
         self.logger.debug("Waiting for filename confirmation")
@@ -112,7 +158,7 @@ class UploadClient(Client):
         self.sequence_number.step()
         self.logger.debug(f"Informing filesize: {self.filesize} bytes")
 
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.ack_number.step()
 
         self.protocol.inform_filesize(
@@ -122,7 +168,7 @@ class UploadClient(Client):
         self.logger.debug("Waiting for filesize confirmation")
 
         try:
-            self.protocol.wait_for_ack(
+            packet = self.protocol.wait_for_ack(
                 self.sequence_number,
                 self.ack_number,
                 exceptions_to_let_through=[
@@ -132,21 +178,86 @@ class UploadClient(Client):
             self.logger.debug("Filesize confirmation failed")
             raise FileTooBig()
 
+        if self.resume:
+            self.skip_bytes_in_server(packet)
+
+    def complete_fast_open_upload(self, server_address: Address) -> None:
+        answer = self.complete_fast_open(server_address)
+
+        if answer.status == FAST_OPEN_FILE_EXISTS:
+            raise FileAlreadyExists()
+        if not answer.is_accepted:
+            raise FileTooBig()
+
+        # The answer stands for the confirmations of the name and the
+        # filesize
+        self.step_numbers()
+        self.step_numbers()
+
+        if self.resume and answer.resume_offset is not None:
+            self.skip_bytes(answer.resume_offset)
+
+    # The server tells how much of the file it kept along with the filesize
+    # confirmation
+    def skip_bytes_in_server(self, packet: Packet) -> None:
+        if packet.payload_length != OFFSET_SIZE:
+            return
+
+        self.skip_bytes(int.from_bytes(
+            packet.data, INT_DESERIALIZATION_BYTEORDER))
+
+    def skip_bytes(self, offset: int) -> None:
+        self.offset = offset
+        if self.offset == 0:
+            return
+
+        self.file_handler.seek(self.file, self.offset)
+        self.logger.info(
+            f"Resuming upload from {
+                self.file_handler.bytes_to_megabytes(self.offset)} MB")
+
     def inform_size_and_name(self) -> None:
         self.inform_filename()
         self.inform_filesize()
 
+    # Files that do not compress are sent as they are, as a sample of their
+    # next bytes tells
+    def codec_for_sending(self, chunk_size: int) -> ChunkCodec | None:
+        if self.codec is None:
+            return None
+
+        sample = self.file_handler.peek(self.file, COMPRESSION_SAMPLE_SIZE)
+        if not self.codec.is_worth_it(sample, chunk_size):
+            self.logger.info("File does not compress, sending it as is")
+            return None
+        return self.codec
+
     def send_file(self) -> bool:
+        if self.is_integrity_checked:
+            self.digest = TransferDigest()
+
         if self.protocol_version == STOP_AND_WAIT_PROTOCOL_TYPE:
             self.send_file_saw()
             return False
         elif self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
-            already_received_fin_back = self.send_file_gbn()
+            already_received_fin_back = self.send_file_windowed(GoBackNSender)
+            return already_received_fin_back
+        elif self.protocol_version == SELECTIVE_REPEAT_PROTOCOL_TYPE:
+            already_received_fin_back = self.send_file_windowed(
+                SelectiveRepeatSenderClient)
             return already_received_fin_back
 
-    def send_file_gbn(self) -> None:
+    def send_file_windowed(
+            self,
+            sender_class: type[
+                GoBackNSender | SelectiveRepeatSenderClient]) -> bool:
         self.socket.reset_state()
-        socket_gbn = SocketGbn(self.socket.socket, self.logger)
+        socket_gbn = SocketGbn(
+            self.socket.socket,
+            self.logger,
+            self.socket.rtt_estimator,
+            self.socket.datagrams,
+            self.socket.trace)
 
         gbn_protocol = ClientProtocolGbn(
             self.logger,
@@ -156,15 +267,21 @@ class UploadClient(Client):
             self.protocol.protocol_version,
         )
 
-        gbn_sender = GoBackNSender(
+        chunk_size = self.chunk_size_for_sending()
+        sender = sender_class(
             self.logger,
             gbn_protocol,
             self.file_handler,
             self.sequence_number,
             self.ack_number,
+            create_congestion_controller(
+                self.congestion, self.socket.rtt_estimator),
+            self.digest,
+            self.codec_for_sending(chunk_size),
+            chunk_size,
         )
-        _seq, _ack, last_raw_packet, already_received_fin_back = gbn_sender.send_file(
-            self.file, self.filesize, self.filename_in_server)
+        _seq, _ack, last_raw_packet, already_received_fin_back = sender.send_file(
+            self.file, self.filesize - self.offset, self.filename_in_server)
         self.sequence_number = _seq
         self.ack_number = _ack
 
@@ -175,10 +292,12 @@ class UploadClient(Client):
 
     def send_file_saw(self) -> None:
         chunk_number: int = 1
+        chunk_size = self.chunk_size_for_sending()
         total_chunks: int = self.file_handler.get_number_of_chunks(
-            self.filesize, FILE_CHUNK_SIZE_SAW
+            self.filesize - self.offset, chunk_size
         )
         is_last_chunk: bool = False
+        codec = self.codec_for_sending(chunk_size)
 
         self.logger.info(
             f"Sending file {
@@ -186,29 +305,59 @@ class UploadClient(Client):
                 self.file_handler.bytes_to_megabytes(
                     self.filesize)} MB")
 
-        while chunk := self.file_handler.read(
-                self.file, FILE_CHUNK_SIZE_SAW):
+        while chunk_number <= total_chunks:
+            chunk = self.file_handler.read(self.file, chunk_size)
             chunk_len = len(chunk)
             self.logger.debug(
-                f"Sending chunk {chunk_number}/{total_chunks} of size {
-                    self.file_handler.bytes_to_kilobytes(chunk_len)} KB")
+                "Sending chunk %d/%d of size %.2f KB",
+                chunk_number,
+                total_chunks,
+                chunk_len / 1024)
 
             if chunk_number == total_chunks:
                 is_last_chunk = True
 
+            digest = None
+            if self.digest is not None:
+                self.digest.update(chunk)
+                if is_last_chunk:
+                    digest = self.digest.digest()
+
+            is_compressed = False
+            if codec is not None:
+                chunk, is_compressed = codec.encode(chunk)
+
             self.sequence_number.step()
             self.protocol.send_file_chunk_saw(
-                self.sequence_number, chunk, chunk_len, is_last_chunk
+                self.sequence_number,
+                chunk,
+                len(chunk),
+                is_last_chunk,
+                digest,
+                is_compressed,
             )
+            if self.socket.trace is not None:
+                self.socket.trace.record(
+                    TRACE_CHUNK_SENT,
+                    chunk_number - 1,
+                    self.sequence_number.value,
+                    len(chunk))
 
             self.logger.debug(
-                f"Waiting confirmation for chunk {chunk_number}/{total_chunks}")
+                "Waiting confirmation for chunk %d/%d",
+                chunk_number,
+                total_chunks)
 
             if not is_last_chunk:
                 self.protocol.wait_for_ack(
                     self.sequence_number,
                     self.ack_number,
                 )
+                if self.socket.trace is not None:
+                    self.socket.trace.record(
+                        TRACE_ACK_RECEIVED,
+                        chunk_number - 1,
+                        self.sequence_number.value)
 
             chunk_number += 1
 
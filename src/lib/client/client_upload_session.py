@@ -0,0 +1,73 @@
+from glob import glob
+from os import listdir, path
+from sys import exit
+
+from lib.client.client_upload import UploadClient
+from lib.common.address import Address
+from lib.common.constants import ERROR_EXIT_CODE, UPLOAD_OPERATION
+from lib.common.fast_open import FastOpenRequest
+from lib.common.logger import CoolLogger
+from lib.common.transfer_session import SessionReader
+
+
+# Regular files of a directory, or the ones a glob pattern matches
+def session_filepaths(src: str) -> list[str]:
+    if path.isdir(src):
+        filepaths = [path.join(src, name) for name in listdir(src)]
+    else:
+        filepaths = glob(src)
+
+    return sorted(
+        filepath for filepath in filepaths if path.isfile(filepath))
+
+
+# Uploads many files over a single connection, each of them keeps its own
+# name in the server
+class UploadSessionClient(UploadClient):
+    def open_source(self, logger: CoolLogger) -> None:
+        if self.filename_in_server:
+            logger.error("A name on the server is only given to a single file")
+            exit(ERROR_EXIT_CODE)
+
+        filepaths = session_filepaths(self.src_filepath)
+        if not filepaths:
+            logger.error(f"Could not find any file at {self.src_filepath}")
+            exit(ERROR_EXIT_CODE)
+
+        names = [path.basename(filepath) for filepath in filepaths]
+        if len(set(names)) != len(names):
+            logger.error("Files of a session must have different names")
+            exit(ERROR_EXIT_CODE)
+
+        if self.resume:
+            logger.warn("Sessions can not be resumed, sending every file")
+            self.resume = False
+
+        self.file = SessionReader(
+            self.file_handler,
+            list(zip(filepaths, names, strict=True)),
+            is_path_complete=True,
+        )
+        self.filesize = self.file.size
+        self.filename_in_server = self.src_filepath
+        logger.info(f"Uploading a session of {len(self.file)} files")
+
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            UPLOAD_OPERATION,
+            "",
+            self.filesize,
+            session_files=len(self.file),
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
+    # Only servers that answer the request sent with the SYN know of them
+    def perform_upload(self, server_address: Address) -> None:
+        if self.fast_open_answer is None:
+            self.logger.error("Server does not support sessions")
+            self.leave_connection(UPLOAD_OPERATION, server_address)
+            self.file_cleanup_after_error()
+            return
+
+        super().perform_upload(server_address)
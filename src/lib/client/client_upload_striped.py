@@ -0,0 +1,110 @@
+from threading import Thread
+
+from lib.client.client_upload import UploadClient
+from lib.client.striped_client import StripedClient
+from lib.common.address import Address
+from lib.common.constants import UPLOAD_OPERATION
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_range import RangeReader, stream_count, stream_range
+from lib.common.logger import CoolLogger
+
+
+# Uploads a range of a file, the server writes it at its offset into the
+# file the other streams of the transfer write too
+class UploadStreamClient(UploadClient):
+    def __init__(
+        self,
+        logger: CoolLogger,
+        host: str,
+        port: int,
+        src: str,
+        name: str,
+        protocol: str,
+        congestion: str,
+        transfer_id: int,
+        stream: int,
+        streams: int,
+        integrity: bool = True,
+        compression: bool = True,
+    ):
+        self.transfer_id: int = transfer_id
+        self.stream: int = stream
+        self.streams: int = streams
+
+        super().__init__(
+            logger, host, port, src, name, protocol, congestion,
+            integrity=integrity, compression=compression)
+
+    def open_source(self, logger: CoolLogger) -> None:
+        super().open_source(logger)
+
+        self.total_filesize: int = self.filesize
+        start, length = stream_range(
+            self.total_filesize, self.stream, self.streams)
+        self.file = RangeReader(self.file, start, length)
+        self.filesize = length
+
+    def fast_open_request(self) -> FastOpenRequest:
+        return FastOpenRequest(
+            UPLOAD_OPERATION,
+            self.filename_in_server,
+            self.total_filesize,
+            stream=(self.transfer_id, self.stream, self.streams),
+            integrity=self.integrity,
+            codecs=self.offered_codecs(),
+        )
+
+    # Only servers that answer the request sent with the SYN know of them
+    def perform_upload(self, server_address: Address) -> None:
+        if self.fast_open_answer is None:
+            self.logger.error("Server does not support striped transfers")
+            self.leave_connection(UPLOAD_OPERATION, server_address)
+            self.file_cleanup_after_error()
+            return
+
+        super().perform_upload(server_address)
+
+
+class StripedUploadClient(StripedClient):
+    def __init__(
+        self,
+        logger: CoolLogger,
+        host: str,
+        port: int,
+        src: str,
+        name: str,
+        protocol: str,
+        congestion: str,
+        streams: int,
+        integrity: bool = True,
+        compression: bool = True,
+    ):
+        super().__init__(logger, streams)
+
+        # The first stream checks the file can be read and names it
+        first_stream = UploadStreamClient(
+            self.stream_logger(0), host, port, src, name, protocol,
+            congestion, self.transfer_id, 0, streams, integrity,
+            compression)
+        self.pending_streams: list[UploadStreamClient] = [first_stream]
+
+        effective_streams = stream_count(first_stream.total_filesize, streams)
+        if effective_streams < streams:
+            logger.warn(
+                f"File is too small for {streams} streams, using {
+                    effective_streams}")
+
+        self.pending_streams += [
+            UploadStreamClient(
+                self.stream_logger(stream), host, port, src,
+                first_stream.filename_in_server, protocol, congestion,
+                self.transfer_id, stream, streams, integrity, compression)
+            for stream in range(1, effective_streams)]
+
+        logger.info(
+            f"Uploading {first_stream.filename_in_server} over {
+                effective_streams} streams")
+
+    def start_streams(self) -> list[Thread]:
+        return [
+            self.start_stream(client) for client in self.pending_streams]
@@ -1,21 +1,29 @@
 from time import time
 
 from lib.client.protocol_gbn import ClientProtocolGbn
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.chunk_source import WindowedChunkSource
+from lib.common.congestion_control import CongestionController
 from lib.common.constants import (
-    WINDOW_SIZE,
+    FAST_RETRANSMIT_DUPLICATE_ACKS,
     FILE_CHUNK_SIZE_GBN,
-    SOCKET_RETRANSMIT_WINDOW_TIMEOUT,
     SHOULD_PRINT_CHUNK_HASH,
+    TRACE_ACK_RECEIVED,
+    TRACE_CHUNK_RETRANSMITTED,
+    TRACE_CHUNK_SENT,
+    TRACE_DUPLICATE_ACK_RECEIVED,
+    TRACE_FAST_RETRANSMIT,
+    TRACE_TIMEOUT,
 )
 from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
 from lib.common.file_handler import FileHandler
 from lib.common.hash_compute import compute_chunk_sha256
 from lib.common.logger import CoolLogger
-from typing import List
-
 from lib.common.mutable_variable import MutableVariable
 from lib.common.sequence_number import SequenceNumber
+from lib.common.transfer_digest import TransferDigest
+from lib.common.transfer_trace import TransferTrace
 
 
 class GoBackNSender:
@@ -26,6 +34,10 @@ class GoBackNSender:
         file_handler: FileHandler,
         sequence_number: SequenceNumber,
         ack_number: SequenceNumber,
+        congestion_controller: CongestionController,
+        digest: TransferDigest | None = None,
+        codec: ChunkCodec | None = None,
+        chunk_size: int = FILE_CHUNK_SIZE_GBN,
     ) -> None:
         self.base: SequenceNumber = SequenceNumber(
             0, protocol.protocol_version)
@@ -37,11 +49,32 @@ class GoBackNSender:
         self.next_seq_num: SequenceNumber = SequenceNumber(
             0, protocol.protocol_version)
         self.file_handler: FileHandler = file_handler
+        self.congestion_controller: CongestionController = (
+            congestion_controller)
+        # Told along with the last chunk, for the receiver to check
+        self.digest: TransferDigest | None = digest
+        # Compresses the chunks it is worth compressing
+        self.codec: ChunkCodec | None = codec
+        # Every chunk but the last one is this large
+        self.chunk_size: int = chunk_size
 
         self.last_ack = self.ack_number.clone()
         self.oldest_packet = None
         self.spent_in_reception: float = 0.0
 
+        # Chunk index -> time of its first transmission. Retransmitted chunks
+        # are left out as their acks can not be told apart (Karn's algorithm)
+        self.send_times: dict[int, float] = {}
+        self.first_unsent_chunk: int = self.base.value
+
+        # Acks of the base in a row since it was last acked. The window only
+        # shrinks once for the chunks in flight when a loss was detected
+        self.duplicate_acks: int = 0
+        self.recovery_point: int = self.base.value
+        self.fast_retransmissions: int = 0
+        # Only kept when the connection is traced
+        self.trace: TransferTrace | None = protocol.socket.trace
+
         self.sqn_number.step()
         self.ack_number.step()
 
@@ -51,14 +84,22 @@ class GoBackNSender:
                 self.base.value + 1}")
         self.next_seq_num.value = self.base.value
         self.spent_in_reception = 0.0
+        self.duplicate_acks = 0
+        if self.trace is not None:
+            self.trace.record(TRACE_TIMEOUT, self.base.value)
+        self.send_times.clear()
+        self.congestion_controller.on_timeout()
+        self.protocol.socket.rtt_estimator.back_off()
+        self.protocol.socket.set_retransmission_timeout()
 
     def send_file(
         self, file, filesize: int, filename: str
     ) -> tuple[SequenceNumber, SequenceNumber, bytes, bool]:
         self.logger.debug(
-            f"Sending file '{filename}' with window size of {WINDOW_SIZE} packets")
+            f"Sending file '{filename}' with an initial window size of {
+                self.congestion_controller.window} packets")
 
-        chunks: List[bytes] = self.split_file_in_chunks(file, filesize)
+        chunks = self.create_chunk_source(file, filesize)
         total_chunks: int = len(chunks)
         pending_last_ack = False
         last_raw_packet = MutableVariable(None)
@@ -76,6 +117,20 @@ class GoBackNSender:
                 self.logger.debug("Retransmission is needed")
                 self.reset_window()
 
+            chunks.release_up_to(self.base.value)
+
+        # A shrunken window may have left the last chunk unsent since the
+        # last timeout, it has to be the packet retransmitted while closing
+        if (not already_received_fin_back.value
+                and self.next_seq_num.value < total_chunks):
+            last_raw_packet.value = self.send_packets_in_window(
+                total_chunks, chunks)
+
+        if self.fast_retransmissions > 0:
+            self.logger.info(
+                f"Fast retransmitted {self.fast_retransmissions} times on "
+                f"duplicate acks")
+
         return (
             SequenceNumber(
                 self.next_seq_num.value +
@@ -93,43 +148,119 @@ class GoBackNSender:
     def send_packets_in_window(
             self,
             total_chunks: int,
-            chunks: List[bytes]) -> bytes:
+            chunks: WindowedChunkSource) -> bytes:
         packet = MutableVariable(None)
 
-        while (
-            self.next_seq_num.value < self.base.value + WINDOW_SIZE
-            and self.next_seq_num.value < total_chunks
-        ):
-            is_last_chunk = self.next_seq_num.value == total_chunks - 1
-            chunk_to_send = chunks[self.next_seq_num.value]
-            chunk_len = len(chunk_to_send)
+        # The whole burst leaves with a single call
+        self.protocol.socket.hold_sends()
+        try:
+            while (
+                self.next_seq_num.value
+                < self.base.value + self.congestion_controller.window
+                and self.next_seq_num.value < total_chunks
+            ):
+                is_last_chunk = self.next_seq_num.value == total_chunks - 1
+                chunk_to_send = chunks[self.next_seq_num.value]
+                chunk_len = len(chunk_to_send)
 
-            msg = f"Sending chunk {
-                self.next_seq_num.value + 1}/{total_chunks} of size {
-                self.file_handler.bytes_to_kilobytes(chunk_len)} KB. "
+                if self.logger.is_debug_enabled:
+                    msg = f"Sending chunk {
+                        self.next_seq_num.value + 1}/{total_chunks} of size {
+                        self.file_handler.bytes_to_kilobytes(chunk_len)} KB. "
 
-            if SHOULD_PRINT_CHUNK_HASH:
-                msg += f"Hash is: {compute_chunk_sha256(chunk_to_send)}"
+                    if SHOULD_PRINT_CHUNK_HASH:
+                        msg += f"Hash is: {
+                            compute_chunk_sha256(chunk_to_send)}"
 
-            self.logger.debug(msg)
+                    self.logger.debug(msg)
 
-            seq_number_to_send = SequenceNumber(
-                self.next_seq_num.value +
-                self.offset_initial_seq_number.value,
-                self.protocol.protocol_version,
-            )
+                seq_number_to_send = SequenceNumber(
+                    self.next_seq_num.value +
+                    self.offset_initial_seq_number.value,
+                    self.protocol.protocol_version,
+                )
 
-            packet.value = self.protocol.send_file_chunk(
-                seq_number_to_send,
-                self.ack_number,
-                chunk_to_send,
-                chunk_len,
-                is_last_chunk,
-            )
-            self.next_seq_num.step()
+                packet.value = self.protocol.send_file_chunk(
+                    seq_number_to_send,
+                    self.ack_number,
+                    chunk_to_send,
+                    chunk_len,
+                    is_last_chunk,
+                    chunks.digest_for(self.next_seq_num.value),
+                    chunks.is_compressed(self.next_seq_num.value),
+                )
+                if self.trace is not None:
+                    self.trace.record(
+                        TRACE_CHUNK_SENT
+                        if self.next_seq_num.value >= self.first_unsent_chunk
+                        else TRACE_CHUNK_RETRANSMITTED,
+                        self.next_seq_num.value,
+                        seq_number_to_send.value,
+                        chunk_len)
+                self.record_send_time(self.next_seq_num.value)
+                self.next_seq_num.step()
+        finally:
+            self.protocol.socket.flush_sends()
 
         return packet.value
 
+    def retransmission_timeout(self) -> float:
+        return self.protocol.socket.rtt_estimator.retransmission_timeout
+
+    def record_send_time(self, chunk_index: int) -> None:
+        if chunk_index >= self.first_unsent_chunk:
+            self.send_times[chunk_index] = time()
+            self.first_unsent_chunk = chunk_index + 1
+
+    def sample_rtt(self, last_acked_chunk: int) -> None:
+        send_time = self.send_times.get(last_acked_chunk)
+        if send_time is not None:
+            self.protocol.socket.rtt_estimator.add_sample(time() - send_time)
+
+        for chunk_index in [
+                index for index in self.send_times
+                if index <= last_acked_chunk]:
+            del self.send_times[chunk_index]
+
+    # Every chunk out of order is answered with the ack of the last one in
+    # order, so acks of the base in a row tell it was lost while the chunks
+    # after it got through
+    def on_duplicate_ack(self, reception_duration: float) -> None:
+        self.duplicate_acks += 1
+        if self.trace is not None:
+            self.trace.record(
+                TRACE_DUPLICATE_ACK_RECEIVED,
+                self.base.value - 1,
+                self.ack_number.value)
+        self.logger.debug(
+            "Received duplicate ack %d of packet %d",
+            self.duplicate_acks, self.base.value + 1)
+
+        if self.duplicate_acks == FAST_RETRANSMIT_DUPLICATE_ACKS:
+            self.fast_retransmit()
+            return
+
+        self.spent_in_reception += reception_duration
+        if self.spent_in_reception >= self.retransmission_timeout():
+            raise RetransmissionNeeded()
+
+    # Goes back to the base right away, the chunks after it are sent again
+    # along with it as the receiver dropped them
+    def fast_retransmit(self) -> None:
+        self.logger.debug(
+            f"Fast retransmitting from packet {self.base.value + 1}")
+        if self.trace is not None:
+            self.trace.record(TRACE_FAST_RETRANSMIT, self.base.value)
+        if self.base.value >= self.recovery_point:
+            self.congestion_controller.on_loss()
+            self.recovery_point = self.next_seq_num.value
+
+        self.next_seq_num.value = self.base.value
+        self.spent_in_reception = 0.0
+        self.send_times.clear()
+        self.protocol.socket.set_retransmission_timeout()
+        self.fast_retransmissions += 1
+
     def await_ack_phase(
         self, total_chunks: int, already_received_fin_back: MutableVariable
     ) -> bool:
@@ -150,18 +281,29 @@ class GoBackNSender:
 
         reception_duration: float = time() - start_time
 
-        if packet.ack_number >= self.ack_number.value:
-            self.base.value += packet.ack_number - self.ack_number.value
+        if packet.is_ack and packet.ack_number == self.ack_number.value:
+            self.on_duplicate_ack(reception_duration)
+        elif packet.ack_number >= self.ack_number.value:
+            acked_chunks = packet.ack_number - self.ack_number.value
+            self.base.value += acked_chunks
+            if self.next_seq_num.value < self.base.value:
+                self.next_seq_num.value = self.base.value
             self.logger.debug(
-                f"Received ack of packet {
-                    self.base.value + 1}")
+                "Received ack of packet %d", self.base.value + 1)
             self.last_ack = self.ack_number.clone()
             self.ack_number = SequenceNumber(
                 packet.ack_number, self.protocol.protocol_version
             )
-            self.protocol.socket.set_timeout(
-                SOCKET_RETRANSMIT_WINDOW_TIMEOUT)
+            if self.trace is not None:
+                self.trace.record(
+                    TRACE_ACK_RECEIVED,
+                    self.base.value - 1,
+                    packet.ack_number)
+            self.sample_rtt(self.base.value - 1)
+            self.protocol.socket.set_retransmission_timeout()
+            self.congestion_controller.on_ack(acked_chunks)
             self.spent_in_reception = 0
+            self.duplicate_acks = 0
         else:
             self.logger.warn(
                 f"Detected ACK from packet {
@@ -172,21 +314,17 @@ class GoBackNSender:
                 f"Acumulated {reception_duration} before retransmission needed. Totalling {
                     self.spent_in_reception}")
             self.spent_in_reception += reception_duration
-            if self.spent_in_reception >= SOCKET_RETRANSMIT_WINDOW_TIMEOUT:
+            if self.spent_in_reception >= self.retransmission_timeout():
                 raise RetransmissionNeeded()
 
         return is_last_chunk_acked.value
 
-    def split_file_in_chunks(self, file, filesize) -> List[bytes]:
-        total_chunks: int = self.file_handler.get_number_of_chunks(
-            filesize, FILE_CHUNK_SIZE_GBN
+    def create_chunk_source(self, file, filesize) -> WindowedChunkSource:
+        return WindowedChunkSource(
+            self.file_handler,
+            file,
+            filesize,
+            self.chunk_size,
+            digest=self.digest,
+            codec=self.codec,
         )
-
-        chunk_list: list[bytes] = []
-
-        for _ in range(total_chunks):
-            chunk = self.file_handler.read(file, FILE_CHUNK_SIZE_GBN)
-            if len(chunk) > 0:
-                chunk_list.append(chunk)
-
-        return chunk_list
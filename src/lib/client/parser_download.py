@@ -1,8 +1,10 @@
 import argparse
 
 from lib.common.constants import (
+    ACK_EVERY,
     DEFAULT_PORT,
     GO_BACK_N_PROTOCOL_TYPE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
     STOP_AND_WAIT_PROTOCOL_TYPE,
 )
 
@@ -55,7 +57,7 @@ class ClientDownloadArgParser:
             required=True,
             type=str,
             metavar="FILEPATH",
-            help="destination file path",
+            help="destination file path, or directory for a pattern",
         )
 
         self.internal_parser.add_argument(
@@ -64,17 +66,71 @@ class ClientDownloadArgParser:
             required=True,
             type=str,
             metavar="FILENAME",
-            help="file name on the server",
+            help="file name on the server, or glob pattern of names",
         )
 
         self.internal_parser.add_argument(
             "-r",
             "--protocol",
             required=False,
-            choices=[STOP_AND_WAIT_PROTOCOL_TYPE, GO_BACK_N_PROTOCOL_TYPE],
+            choices=[
+                STOP_AND_WAIT_PROTOCOL_TYPE,
+                GO_BACK_N_PROTOCOL_TYPE,
+                SELECTIVE_REPEAT_PROTOCOL_TYPE,
+            ],
             default=GO_BACK_N_PROTOCOL_TYPE,
             metavar="PROTOCOL",
             help="error recovery protocol",
         )
 
+        self.internal_parser.add_argument(
+            "-R",
+            "--resume",
+            action="store_true",
+            help="continue an interrupted transfer of the file",
+        )
+
+        self.internal_parser.add_argument(
+            "-S",
+            "--streams",
+            required=False,
+            default=1,
+            type=int,
+            metavar="STREAMS",
+            help="connections a large file is striped across",
+        )
+
+        self.internal_parser.add_argument(
+            "-a",
+            "--ack-every",
+            required=False,
+            default=ACK_EVERY,
+            type=int,
+            metavar="CHUNKS",
+            help="chunks acked at once when receiving with Go-Back-N",
+        )
+
+        self.internal_parser.add_argument(
+            "-T",
+            "--trace",
+            required=False,
+            default=None,
+            metavar="DIRPATH",
+            help="dir the event trace of every connection is written to",
+        )
+
+        self.internal_parser.add_argument(
+            "--no-checksum",
+            dest="integrity",
+            action="store_false",
+            help="check neither the datagrams nor the file once moved",
+        )
+
+        self.internal_parser.add_argument(
+            "--no-compression",
+            dest="compression",
+            action="store_false",
+            help="offer no codec to compress the chunks with",
+        )
+
         return self.internal_parser.parse_args()
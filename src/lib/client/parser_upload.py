@@ -1,8 +1,12 @@
 import argparse
 
 from lib.common.constants import (
+    AIMD_CONGESTION_CONTROL,
+    CUBIC_CONGESTION_CONTROL,
     DEFAULT_PORT,
+    FIXED_CONGESTION_CONTROL,
     GO_BACK_N_PROTOCOL_TYPE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
     STOP_AND_WAIT_PROTOCOL_TYPE,
 )
 
@@ -55,7 +59,7 @@ class ClientUploadArgParser:
             required=True,
             type=str,
             metavar="FILEPATH",
-            help="source file path",
+            help="source file path, directory or glob pattern",
         )
 
         self.internal_parser.add_argument(
@@ -71,10 +75,68 @@ class ClientUploadArgParser:
             "-r",
             "--protocol",
             required=False,
-            choices=[STOP_AND_WAIT_PROTOCOL_TYPE, GO_BACK_N_PROTOCOL_TYPE],
+            choices=[
+                STOP_AND_WAIT_PROTOCOL_TYPE,
+                GO_BACK_N_PROTOCOL_TYPE,
+                SELECTIVE_REPEAT_PROTOCOL_TYPE,
+            ],
             default=GO_BACK_N_PROTOCOL_TYPE,
             metavar="PROTOCOL",
             help="error recovery protocol",
         )
 
+        self.internal_parser.add_argument(
+            "-c",
+            "--congestion",
+            required=False,
+            choices=[
+                FIXED_CONGESTION_CONTROL,
+                AIMD_CONGESTION_CONTROL,
+                CUBIC_CONGESTION_CONTROL,
+            ],
+            default=FIXED_CONGESTION_CONTROL,
+            metavar="ALGORITHM",
+            help="congestion control of the sending window",
+        )
+
+        self.internal_parser.add_argument(
+            "-R",
+            "--resume",
+            action="store_true",
+            help="continue an interrupted transfer of the file",
+        )
+
+        self.internal_parser.add_argument(
+            "-S",
+            "--streams",
+            required=False,
+            default=1,
+            type=int,
+            metavar="STREAMS",
+            help="connections a large file is striped across",
+        )
+
+        self.internal_parser.add_argument(
+            "-T",
+            "--trace",
+            required=False,
+            default=None,
+            metavar="DIRPATH",
+            help="dir the event trace of every connection is written to",
+        )
+
+        self.internal_parser.add_argument(
+            "--no-checksum",
+            dest="integrity",
+            action="store_false",
+            help="check neither the datagrams nor the file once moved",
+        )
+
+        self.internal_parser.add_argument(
+            "--no-compression",
+            dest="compression",
+            action="store_false",
+            help="offer no codec to compress the chunks with",
+        )
+
         return self.internal_parser.parse_args()
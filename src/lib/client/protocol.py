@@ -3,12 +3,13 @@ from lib.client.exceptions.missing_server_address import MissingServerAddress
 from lib.common.address import Address
 from lib.common.constants import (
     FULL_BUFFER_SIZE,
-    STRING_ENCODING_FORMAT,
-    COMMS_BUFFER_SIZE,
-    ZERO_BYTES,
     INT_DESERIALIZATION_BYTEORDER,
+    OFFSET_SIZE,
+    RESUME_OFFSET_SEPARATOR,
     STOP_AND_WAIT_PROTOCOL_TYPE,
-    GO_BACK_N_PROTOCOL_TYPE,
+    STRING_ENCODING_FORMAT,
+    WINDOWED_PROTOCOL_TYPES,
+    ZERO_BYTES,
 )
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
@@ -17,12 +18,12 @@ from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_fin import MessageIsNotFin
 from lib.common.exceptions.message_not_fin_nor_ack import MessageNotFinNorAck
 from lib.common.exceptions.message_not_syn import MessageIsNotSyn
+from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
 from lib.common.logger import CoolLogger
-from lib.common.packet.packet import Packet, PacketParser, PacketSaw, PacketGbn
+from lib.common.packet.packet import Packet, PacketGbn, PacketParser, PacketSaw
 from lib.common.re_listen_decorator import re_listen_if_failed
 from lib.common.sequence_number import SequenceNumber
-from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.socket_saw import SocketSaw
 
 
@@ -106,7 +107,7 @@ class ClientProtocol:
         if not packet.is_ack:
             raise MessageIsNotAck()
 
-        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.validate_ack_number(packet, ack_number)
 
         return packet, packet_type, server_address
@@ -140,6 +141,8 @@ class ClientProtocol:
         port: int,
         payload_length: int,
         data: bytes,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ) -> Packet:
         if protocol == STOP_AND_WAIT_PROTOCOL_TYPE:
             return PacketSaw(
@@ -151,6 +154,8 @@ class ClientProtocol:
                 payload_length=payload_length,
                 sequence_number=sequence_number.value,
                 data=data,
+                digest=digest,
+                is_compressed=is_compressed,
             )
         else:  # if protocol == GO_BACK_N_PROTOCOL_TYPE
             return PacketGbn(
@@ -163,10 +168,15 @@ class ClientProtocol:
                 sequence_number=sequence_number.value,
                 ack_number=ack_number.value,
                 data=data,
+                digest=digest,
+                is_compressed=is_compressed,
             )
 
     def request_connection(
-        self, sequence_number: SequenceNumber, ack_number: SequenceNumber
+        self,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+        data: bytes = ZERO_BYTES,
     ) -> None:
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -174,34 +184,53 @@ class ClientProtocol:
             is_syn=True,
             is_fin=False,
             port=self.my_address.port,
-            payload_length=0,
+            payload_length=len(data),
             sequence_number=sequence_number,
             ack_number=ack_number,
-            data=ZERO_BYTES,
+            data=data,
         )
         self.socket_send_to(packet_to_send, self.server_address)
 
     @re_listen_if_failed()
     def wait_for_connection_request_answer(
         self, sequence_number: SequenceNumber, ack_number: SequenceNumber
-    ) -> Address:
+    ) -> tuple[Packet, Address]:
         try:
             raw_packet, server_address_tuple = self.socket_receive_from(
-                COMMS_BUFFER_SIZE, should_retransmit=True
+                FULL_BUFFER_SIZE, should_retransmit=True
             )
         except ConnectionLost:
             raise ConnectionRefused()
 
-        packet, packet_type, server_address = self.validate_inbound_ack(
-            raw_packet, server_address_tuple, ack_number
+        packet, packet_type, server_address = self.validate_inbound_packet(
+            raw_packet, server_address_tuple
         )
+
+        # Requests made along with the SYN are rejected with a FIN telling
+        # why, and answered where the operation confirmation would be
+        if packet.payload_length > 0:
+            if packet.is_fin:
+                raise UnexpectedFinMessage(packet=packet)
+
+            sequence_number = sequence_number.clone()
+            sequence_number.step()
+            if ack_number is not None:
+                ack_number = ack_number.clone()
+                ack_number.step()
+
+        if not packet.is_ack:
+            raise MessageIsNotAck()
+
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
+            self.validate_ack_number(packet, ack_number)
+
         self.validate_not_fin(packet)
         self.validate_sequence_number(packet, sequence_number)
 
         if not packet.is_syn:
             raise MessageIsNotSyn()
 
-        return Address(server_address.host, packet.port)
+        return packet, Address(server_address.host, packet.port)
 
     def send_operation_intention(
             self,
@@ -230,7 +259,7 @@ class ClientProtocol:
     ) -> Packet:
         try:
             raw_packet, server_address_tuple = self.socket_receive_from(
-                COMMS_BUFFER_SIZE,
+                FULL_BUFFER_SIZE,
                 should_retransmit=True,
             )
         except ConnectionLost:
@@ -250,6 +279,8 @@ class ClientProtocol:
         chunk: bytes,
         chunk_len: int,
         is_last_chunk: bool,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ) -> None:
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -261,6 +292,8 @@ class ClientProtocol:
             sequence_number=sequence_number,
             ack_number=None,
             data=chunk,
+            digest=digest,
+            is_compressed=is_compressed,
         )
 
         self.socket_send_to(packet_to_send, self.server_address)
@@ -270,7 +303,7 @@ class ClientProtocol:
         self, sequence_number: SequenceNumber, ack_number: SequenceNumber
     ) -> Packet:
         raw_packet, server_address_tuple = self.socket_receive_from(
-            COMMS_BUFFER_SIZE, should_retransmit=True
+            FULL_BUFFER_SIZE, should_retransmit=True
         )
 
         packet, packet_type, server_address = self.validate_inbound_ack(
@@ -284,8 +317,12 @@ class ClientProtocol:
             self,
             sequence_number: SequenceNumber,
             ack_number: SequenceNumber,
-            filename: str) -> None:
+            filename: str,
+            resume_offset: int | None = None) -> None:
         data = filename.encode(STRING_ENCODING_FORMAT)
+        if resume_offset is not None:
+            data += RESUME_OFFSET_SEPARATOR + resume_offset.to_bytes(
+                OFFSET_SIZE, byteorder=INT_DESERIALIZATION_BYTEORDER)
 
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -380,7 +417,7 @@ class ClientProtocol:
     ) -> None:
         try:
             raw_packet, client_address_tuple = self.socket_receive_from(
-                COMMS_BUFFER_SIZE, should_retransmit=True
+                FULL_BUFFER_SIZE, should_retransmit=True
             )
         except OSError:
             raise ConnectionLost()
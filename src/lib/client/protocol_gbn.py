@@ -1,6 +1,6 @@
 from lib.client.exceptions.missing_server_address import MissingServerAddress
 from lib.common.address import Address
-from lib.common.constants import COMMS_BUFFER_SIZE, FULL_BUFFER_SIZE, ZERO_BYTES
+from lib.common.constants import FULL_BUFFER_SIZE, ZERO_BYTES
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
 from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
 from lib.common.exceptions.message_not_fin import MessageIsNotFin
@@ -105,6 +105,8 @@ class ClientProtocolGbn:
         chunk: bytes,
         chunk_len: int,
         is_last_chunk: bool,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ) -> bytes:
         packet_to_send: Packet = PacketGbn(
             protocol=self.protocol_version,
@@ -116,18 +118,20 @@ class ClientProtocolGbn:
             sequence_number=sequence_number.value,
             ack_number=ack_number.value,
             data=chunk,
+            digest=digest,
+            is_compressed=is_compressed,
         )
 
-        self.socket_send_to(packet_to_send, self.server_address)
         packet_bin: bytes = PacketParser.compose_packet_gbn_for_net(
             packet_to_send)
+        self.socket.sendto(packet_bin, self.server_address)
         return packet_bin
 
     def wait_for_ack(
         self, _sequence_number: SequenceNumber, ack_number: SequenceNumber
     ) -> PacketGbn:
         raw_packet, server_address_tuple = self.socket_receive_from(
-            COMMS_BUFFER_SIZE)
+            FULL_BUFFER_SIZE)
 
         packet, server_address = self.validate_inbound_ack(
             raw_packet, server_address_tuple, ack_number
@@ -148,6 +152,25 @@ class ClientProtocolGbn:
         self.validate_sequence_number(packet, sequence_number)
         return packet
 
+    def receive_file_chunk_in_any_order(self) -> PacketGbn:
+        raw_packet, server_address_tuple = self.socket_receive_from(
+            FULL_BUFFER_SIZE)
+
+        packet, server_address = self.validate_inbound_packet(
+            raw_packet, server_address_tuple
+        )
+        return packet
+
+    def wait_for_selective_ack(self) -> PacketGbn:
+        raw_packet, server_address_tuple = self.socket_receive_from(
+            FULL_BUFFER_SIZE)
+
+        packet, server_address = self.validate_inbound_packet(
+            raw_packet, server_address_tuple
+        )
+        self.validate_not_fin(packet)
+        return packet
+
     def send_ack(
         self,
         sequence_number: SequenceNumber,
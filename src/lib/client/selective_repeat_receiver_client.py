@@ -0,0 +1,14 @@
+from lib.client.protocol_gbn import ClientProtocolGbn
+from lib.common.selective_repeat_receiver import SelectiveRepeatReceiver
+
+
+# The first chunk of the file is received before this phase starts
+class SelectiveRepeatReceiverClient(SelectiveRepeatReceiver):
+    first_chunk_number: int = 2
+    protocol: ClientProtocolGbn
+
+    def resend_last_answer(self, last_transmitted_packet: bytes) -> None:
+        self.logger.debug("Resending last ACK")
+        self.protocol.socket.sendto(
+            last_transmitted_packet, self.protocol.server_address
+        )
@@ -0,0 +1,42 @@
+from lib.client.protocol_gbn import ClientProtocolGbn
+from lib.common.chunk_source import WindowedChunkSource
+from lib.common.selective_repeat_sender import SelectiveRepeatSender
+from lib.common.sequence_number import SequenceNumber
+
+
+# Every chunk is sent with the window, the first one right after the
+# sequence number of the request
+class SelectiveRepeatSenderClient(SelectiveRepeatSender):
+    protocol: ClientProtocolGbn
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.sqn_number.step()
+
+    def send_file_chunk(
+            self,
+            sequence_number: SequenceNumber,
+            chunk: bytes | memoryview,
+            chunk_len: int,
+            is_last_chunk: bool,
+            digest: bytes | None,
+            is_compressed: bool) -> bytes:
+        return self.protocol.send_file_chunk(
+            sequence_number,
+            self.ack_number,
+            chunk,
+            chunk_len,
+            is_last_chunk,
+            digest,
+            is_compressed,
+        )
+
+    def create_chunk_source(self, file, filesize) -> WindowedChunkSource:
+        return WindowedChunkSource(
+            self.file_handler,
+            file,
+            filesize,
+            self.chunk_size,
+            digest=self.digest,
+            codec=self.codec,
+        )
@@ -0,0 +1,100 @@
+import sys
+from abc import abstractmethod
+from ctypes import c_bool
+from io import StringIO
+from multiprocessing import Value
+from random import getrandbits
+from socket import SHUT_RDWR
+from threading import Event, Thread
+
+from lib.client.abstract_client import Client
+from lib.common.logger import CoolLogger
+from lib.common.wait_for_quit import wait_for_quit
+
+TRANSFER_ID_BITS = 32
+
+
+# Moves a file striped across several connections, each one a client of its
+# own that transfers a range of the file. The server tells the streams of a
+# transfer apart from the ones of any other by its id
+class StripedClient:
+    def __init__(self, logger: CoolLogger, streams: int):
+        self.logger: CoolLogger = logger
+        self.requested_streams: int = streams
+        self.transfer_id: int = getrandbits(TRANSFER_ID_BITS)
+        self.streams: list[Client] = []
+        self.stopped = False
+
+    def stream_logger(self, stream: int) -> CoolLogger:
+        logger = self.logger.clone()
+        logger.set_prefix(f"[STREAM:{stream + 1}]")
+        return logger
+
+    @abstractmethod
+    def start_streams(self) -> list[Thread]:
+        pass
+
+    def start_stream(self, client: Client) -> Thread:
+        self.streams.append(client)
+        thread = Thread(target=client.client_start, args=(Event(),))
+        thread.start()
+        return thread
+
+    def client_start(self, should_stop_event: Event) -> None:
+        try:
+            for thread in self.start_streams():
+                thread.join()
+            self.report()
+        finally:
+            should_stop_event.set()
+
+    def report(self) -> None:
+        pass
+
+    def stop(
+        self,
+        client_start_thread: Thread,
+        wait_for_quit_thread: Thread,
+        quited: Value,  # type: ignore
+    ) -> None:
+        if self.stopped:
+            return
+
+        self.logger.info("Stopping")
+
+        for client in self.streams:
+            try:
+                client.socket.shutdown(SHUT_RDWR)
+            except OSError:
+                try:
+                    client.socket.close()
+                except OSError:
+                    pass
+
+        client_start_thread.join()
+        if not quited.value:
+            sys.stdin = StringIO("q\n")
+            sys.stdin.flush()
+            self.logger.force_info("Press Enter to finish")
+
+        wait_for_quit_thread.join()
+        self.logger.info("Client shutdown")
+        self.stopped = True
+
+    def run(self) -> None:
+        should_stop_event: Event = Event()
+        client_start_thread: Thread = Thread(
+            target=self.client_start, args=(should_stop_event,)
+        )
+        client_start_thread.start()
+
+        quited: Value = Value(c_bool, False)  # type: ignore
+
+        wait_for_quit_thread = Thread(
+            target=wait_for_quit, args=(should_stop_event, quited)
+        )
+        wait_for_quit_thread.start()
+
+        should_stop_event.wait()
+
+        self.stop(client_start_thread, wait_for_quit_thread, quited)
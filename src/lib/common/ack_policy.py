@@ -0,0 +1,57 @@
+from time import time
+
+from lib.common.constants import ACK_DELAY, ACK_EVERY
+
+
+# Tells a receiver when to ack the chunks that arrived in order, and counts
+# the acks it saves. Acking every single chunk acks each one as it arrives
+class AckPolicy:
+    def __init__(
+            self,
+            ack_every: int = ACK_EVERY,
+            ack_delay: float = ACK_DELAY) -> None:
+        self.ack_every: int = max(ack_every, 1)
+        self.ack_delay: float = ack_delay
+        self.unacked_chunks: int = 0
+        self.oldest_unacked_time: float = 0.0
+        # Set by a chunk out of order, the next one in order fills the gap
+        self.is_recovering: bool = False
+
+        self.chunks_received: int = 0
+        self.acks_sent: int = 0
+
+    @property
+    def is_ack_pending(self) -> bool:
+        return self.unacked_chunks > 0
+
+    # Called for every chunk that arrives in order, whether it has to be
+    # acked right away
+    def should_ack(self, at_once: bool = False) -> bool:
+        self.chunks_received += 1
+        if self.unacked_chunks == 0:
+            self.oldest_unacked_time = time()
+        self.unacked_chunks += 1
+
+        is_filling_gap = self.is_recovering
+        self.is_recovering = False
+        return (at_once
+                or is_filling_gap
+                or self.unacked_chunks >= self.ack_every)
+
+    def on_out_of_order(self) -> None:
+        self.is_recovering = True
+
+    def on_ack_sent(self) -> None:
+        self.acks_sent += 1
+        self.unacked_chunks = 0
+
+    # Time left until the pending ack is due
+    def ack_timeout(self) -> float:
+        return max(self.oldest_unacked_time + self.ack_delay - time(), 0.0)
+
+    # Share of the acks an ack per chunk would have sent that were saved
+    @property
+    def ack_reduction(self) -> float:
+        if self.chunks_received == 0:
+            return 0.0
+        return max(1 - self.acks_sent / self.chunks_received, 0.0)
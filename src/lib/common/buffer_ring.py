@@ -0,0 +1,20 @@
+from lib.common.constants import FULL_BUFFER_SIZE, RECEIVE_BUFFER_RING_SIZE
+
+
+class BufferRing:
+    def __init__(
+        self,
+        buffer_size: int = FULL_BUFFER_SIZE,
+        ring_size: int = RECEIVE_BUFFER_RING_SIZE,
+    ) -> None:
+        self.buffers: list[memoryview] = [
+            memoryview(bytearray(buffer_size)) for _ in range(ring_size)
+        ]
+        self.next_index: int = 0
+
+    # The returned buffer is overwritten after ring_size more calls, so
+    # anything read from it that has to live longer must be copied
+    def next_buffer(self) -> memoryview:
+        buffer = self.buffers[self.next_index]
+        self.next_index = (self.next_index + 1) % len(self.buffers)
+        return buffer
@@ -0,0 +1,112 @@
+from zlib import compress as zlib_compress
+from zlib import decompress as zlib_decompress
+
+from lib.common.constants import (
+    LZ4_COMPRESSION,
+    MAX_COMPRESSION_RATIO,
+    ZLIB_COMPRESSION,
+    ZLIB_COMPRESSION_LEVEL,
+    ZSTD_COMPRESSION,
+    ZSTD_COMPRESSION_LEVEL,
+)
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Raw deflate, chunks carry no zlib header nor trailer
+RAW_DEFLATE_WINDOW_BITS = -15
+
+
+# Compresses every chunk on its own with zlib
+class ChunkCodec:
+    codec_id: int = ZLIB_COMPRESSION
+
+    def compress(self, chunk: bytes | memoryview) -> bytes:
+        return zlib_compress(
+            chunk, ZLIB_COMPRESSION_LEVEL, RAW_DEFLATE_WINDOW_BITS)
+
+    def decompress(self, data: bytes | memoryview) -> bytes:
+        return zlib_decompress(data, RAW_DEFLATE_WINDOW_BITS)
+
+    # Chunks that do not shrink are sent as they are, the packet tells which
+    # ones were compressed
+    def encode(
+            self,
+            chunk: bytes | memoryview) -> tuple[bytes | memoryview, bool]:
+        compressed = self.compress(chunk)
+        if len(compressed) >= len(chunk):
+            return chunk, False
+        return compressed, True
+
+    # The sample is compressed in chunks, as the file would be
+    def is_worth_it(self, sample: bytes, chunk_size: int) -> bool:
+        if len(sample) == 0:
+            return False
+
+        view = memoryview(sample)
+        compressed_size = sum(
+            len(self.encode(view[start:start + chunk_size])[0])
+            for start in range(0, len(view), chunk_size))
+        return compressed_size <= len(sample) * MAX_COMPRESSION_RATIO
+
+
+class Lz4ChunkCodec(ChunkCodec):
+    codec_id: int = LZ4_COMPRESSION
+
+    def compress(self, chunk: bytes | memoryview) -> bytes:
+        return lz4_block.compress(chunk)
+
+    def decompress(self, data: bytes | memoryview) -> bytes:
+        return lz4_block.decompress(data)
+
+
+# Compression contexts are reused, every connection has a codec of its own
+class ZstdChunkCodec(ChunkCodec):
+    codec_id: int = ZSTD_COMPRESSION
+
+    def __init__(self) -> None:
+        self.compressor = zstandard.ZstdCompressor(
+            level=ZSTD_COMPRESSION_LEVEL)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, chunk: bytes | memoryview) -> bytes:
+        return self.compressor.compress(chunk)
+
+    def decompress(self, data: bytes | memoryview) -> bytes:
+        return self.decompressor.decompress(data)
+
+
+# Codecs whose module is installed, in order of preference
+def available_codecs() -> list[int]:
+    codecs = []
+    if zstandard is not None:
+        codecs.append(ZSTD_COMPRESSION)
+    if lz4_block is not None:
+        codecs.append(LZ4_COMPRESSION)
+    return [*codecs, ZLIB_COMPRESSION]
+
+
+# The first codec offered that is also available here
+def choose_codec(offered_codecs: list[int]) -> int | None:
+    codecs = available_codecs()
+    return next(
+        (codec_id for codec_id in offered_codecs if codec_id in codecs),
+        None)
+
+
+def create_chunk_codec(codec_id: int | None) -> ChunkCodec | None:
+    if codec_id not in available_codecs():
+        return None
+    elif codec_id == ZSTD_COMPRESSION:
+        return ZstdChunkCodec()
+    elif codec_id == LZ4_COMPRESSION:
+        return Lz4ChunkCodec()
+    else:
+        return ChunkCodec()
@@ -0,0 +1,120 @@
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.constants import CHUNK_READ_AHEAD
+from lib.common.file_handler import FileHandler
+from lib.common.transfer_digest import TransferDigest
+
+
+class WindowedChunkSource:
+    def __init__(
+        self,
+        file_handler: FileHandler,
+        file,
+        filesize: int,
+        chunk_size: int,
+        mapped_file: memoryview | None = None,
+        digest: TransferDigest | None = None,
+        codec: ChunkCodec | None = None,
+    ) -> None:
+        self.file_handler: FileHandler = file_handler
+        self.file = file
+        self.chunk_size: int = chunk_size
+        self.mapped_file: memoryview | None = mapped_file
+        # Chunk 0 starts wherever the file is positioned at creation time
+        self.start_position: int = file_handler.tell(file)
+        self.total_chunks: int = file_handler.get_number_of_chunks(
+            filesize, chunk_size
+        )
+
+        # Only the chunks of the window and the read ahead are kept in memory
+        self.cached_chunks: dict[int, bytes] = {}
+        self.released_up_to: int = 0
+
+        # Chunks are first asked for in order, which is when they are
+        # digested
+        self.digest: TransferDigest | None = digest
+        self.digested_chunks: int = 0
+
+        # Chunks of the window as they are sent, compressed or not, so
+        # retransmissions do not compress them again
+        self.codec: ChunkCodec | None = codec
+        self.encoded_chunks: dict[int, tuple[bytes | memoryview, bool]] = {}
+
+    def __len__(self) -> int:
+        return self.total_chunks
+
+    def __getitem__(self, chunk_index: int) -> bytes | memoryview:
+        if chunk_index in self.encoded_chunks:
+            return self.encoded_chunks[chunk_index][0]
+
+        chunk = self.raw_chunk(chunk_index)
+        if self.digest is not None and chunk_index == self.digested_chunks:
+            self.digest.update(chunk)
+            self.digested_chunks += 1
+
+        if self.codec is not None:
+            self.encoded_chunks[chunk_index] = self.codec.encode(chunk)
+            self.cached_chunks.pop(chunk_index, None)
+            return self.encoded_chunks[chunk_index][0]
+        return chunk
+
+    def raw_chunk(self, chunk_index: int) -> bytes | memoryview:
+        if self.mapped_file is not None:
+            return self.slice_mapped_file(chunk_index)
+
+        if chunk_index not in self.cached_chunks:
+            self.read_from(chunk_index)
+        return self.cached_chunks[chunk_index]
+
+    # Chunks that left before the source was created, such as the first one
+    # sent along with the answer to the name, are digested without sending
+    # them again
+    def digest_through(self, chunk_index: int) -> None:
+        if self.digest is None:
+            return
+
+        while self.digested_chunks <= chunk_index:
+            self.digest.update(self.raw_chunk(self.digested_chunks))
+            self.digested_chunks += 1
+
+    def is_compressed(self, chunk_index: int) -> bool:
+        return (chunk_index in self.encoded_chunks
+                and self.encoded_chunks[chunk_index][1])
+
+    # Told along with the last chunk, every other one was asked for before
+    def digest_for(self, chunk_index: int) -> bytes | None:
+        if self.digest is None or chunk_index != self.total_chunks - 1:
+            return None
+        return self.digest.digest()
+
+    def slice_mapped_file(self, chunk_index: int) -> memoryview:
+        if not self.released_up_to <= chunk_index < self.total_chunks:
+            raise IndexError(f"Chunk {chunk_index} is not available")
+
+        start = self.start_position + chunk_index * self.chunk_size
+        return self.mapped_file[start:start + self.chunk_size]
+
+    def read_from(self, chunk_index: int) -> None:
+        if not self.released_up_to <= chunk_index < self.total_chunks:
+            raise IndexError(f"Chunk {chunk_index} is not available")
+
+        last_index = min(
+            chunk_index + CHUNK_READ_AHEAD, self.total_chunks) - 1
+        while last_index in self.cached_chunks:
+            last_index -= 1
+
+        data = self.file_handler.read_at(
+            self.file,
+            self.start_position + chunk_index * self.chunk_size,
+            (last_index - chunk_index + 1) * self.chunk_size,
+        )
+
+        for index in range(chunk_index, last_index + 1):
+            start = (index - chunk_index) * self.chunk_size
+            self.cached_chunks[index] = data[start:start + self.chunk_size]
+
+    def release_up_to(self, chunk_index: int) -> None:
+        for index in range(self.released_up_to, chunk_index):
+            self.cached_chunks.pop(index, None)
+            self.encoded_chunks.pop(index, None)
+
+        self.released_up_to = max(self.released_up_to, chunk_index)
@@ -0,0 +1,142 @@
+from time import time
+
+from lib.common.constants import (
+    AIMD_CONGESTION_CONTROL,
+    AIMD_DECREASE_FACTOR,
+    CUBIC_CONGESTION_CONTROL,
+    CUBIC_DECREASE_FACTOR,
+    CUBIC_SCALING_FACTOR,
+    INITIAL_CONGESTION_WINDOW,
+    INITIAL_RETRANSMISSION_TIMEOUT,
+    MAX_CONGESTION_WINDOW,
+    MIN_CONGESTION_WINDOW,
+    MIN_SLOW_START_THRESHOLD,
+    WINDOW_SIZE,
+)
+from lib.common.rtt_estimator import RttEstimator
+
+
+# Keeps the window at WINDOW_SIZE chunks whatever happens
+class CongestionController:
+    def __init__(self) -> None:
+        self.window_size: float = WINDOW_SIZE
+
+    @property
+    def window(self) -> int:
+        return min(
+            max(int(self.window_size), MIN_CONGESTION_WINDOW),
+            MAX_CONGESTION_WINDOW)
+
+    def on_ack(self, acked_chunks: int) -> None:
+        pass
+
+    # Chunks were lost but later ones are still getting through
+    def on_loss(self) -> None:
+        pass
+
+    # Nothing got through during a whole retransmission timeout
+    def on_timeout(self) -> None:
+        pass
+
+
+# Slow start followed by additive increase and multiplicative decrease
+class AimdController(CongestionController):
+    decrease_factor: float = AIMD_DECREASE_FACTOR
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.window_size = INITIAL_CONGESTION_WINDOW
+        self.slow_start_threshold: float = MAX_CONGESTION_WINDOW
+
+    def on_ack(self, acked_chunks: int) -> None:
+        for _ in range(acked_chunks):
+            if self.window_size < self.slow_start_threshold:
+                self.window_size += 1
+            else:
+                self.grow_in_congestion_avoidance()
+
+        self.window_size = min(self.window_size, MAX_CONGESTION_WINDOW)
+
+    def grow_in_congestion_avoidance(self) -> None:
+        self.window_size += 1 / self.window_size
+
+    def on_loss(self) -> None:
+        self.slow_start_threshold = max(
+            self.window_size * self.decrease_factor,
+            MIN_SLOW_START_THRESHOLD)
+        self.window_size = self.slow_start_threshold
+
+    def on_timeout(self) -> None:
+        self.on_loss()
+        self.window_size = MIN_CONGESTION_WINDOW
+
+
+# Window growth follows the cubic function of RFC 8312, centered on the size
+# the window had at the last loss. It never grows slower than AIMD would
+class CubicController(AimdController):
+    decrease_factor: float = CUBIC_DECREASE_FACTOR
+
+    def __init__(self, rtt_estimator: RttEstimator) -> None:
+        super().__init__()
+        self.rtt_estimator: RttEstimator = rtt_estimator
+        self.window_before_loss: float = 0
+        self.epoch_start: float | None = None
+        self.origin_point: float = 0
+        self.time_to_origin: float = 0
+        self.aimd_window_size: float = 0
+
+    def rtt(self) -> float:
+        if self.rtt_estimator.smoothed_rtt is None:
+            return INITIAL_RETRANSMISSION_TIMEOUT
+        return self.rtt_estimator.smoothed_rtt
+
+    def start_epoch(self) -> None:
+        self.epoch_start = time()
+        self.aimd_window_size = self.window_size
+
+        if self.window_size < self.window_before_loss:
+            self.time_to_origin = (
+                (self.window_before_loss - self.window_size)
+                / CUBIC_SCALING_FACTOR
+            ) ** (1 / 3)
+            self.origin_point = self.window_before_loss
+        else:
+            self.time_to_origin = 0
+            self.origin_point = self.window_size
+
+    def grow_in_congestion_avoidance(self) -> None:
+        if self.epoch_start is None:
+            self.start_epoch()
+
+        elapsed = time() - self.epoch_start + self.rtt()
+        target = (
+            self.origin_point
+            + CUBIC_SCALING_FACTOR * (elapsed - self.time_to_origin) ** 3
+        )
+
+        if target > self.window_size:
+            self.window_size += (
+                target - self.window_size) / self.window_size
+        else:
+            self.window_size += 0.01 / self.window_size
+
+        self.aimd_window_size += (
+            3 * (1 - self.decrease_factor) / (1 + self.decrease_factor)
+            / self.aimd_window_size
+        )
+        self.window_size = max(self.window_size, self.aimd_window_size)
+
+    def on_loss(self) -> None:
+        self.window_before_loss = self.window_size
+        self.epoch_start = None
+        super().on_loss()
+
+
+def create_congestion_controller(
+        congestion: str, rtt_estimator: RttEstimator) -> CongestionController:
+    if congestion == AIMD_CONGESTION_CONTROL:
+        return AimdController()
+    elif congestion == CUBIC_CONGESTION_CONTROL:
+        return CubicController(rtt_estimator)
+    else:
+        return CongestionController()
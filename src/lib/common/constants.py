@@ -1,21 +1,88 @@
 DEFAULT_PORT = 7777
 STOP_AND_WAIT_PROTOCOL_TYPE = "saw"
 GO_BACK_N_PROTOCOL_TYPE = "gbn"
+SELECTIVE_REPEAT_PROTOCOL_TYPE = "sr"
+# Protocols that use ack numbers and transfer files with a sliding window
+WINDOWED_PROTOCOL_TYPES = (
+    GO_BACK_N_PROTOCOL_TYPE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE)
 IPV4_LOCALHOST = "127.0.0.1"
+IPV4_ANY_ADDRESS = "0.0.0.0"
 
 USE_ANY_AVAILABLE_PORT = 0
 USE_CURRENT_HOST = ""
 
 SOCKET_CONNECTION_LOST_TIMEOUT = 30.0
-SOCKET_RETRANSMISSION_TIMEOUT = 0.015
+# The retransmission timeout is estimated from the RTT of each connection
+INITIAL_RETRANSMISSION_TIMEOUT = 0.2
+MIN_RETRANSMISSION_TIMEOUT = 0.01
+MAX_RETRANSMISSION_TIMEOUT = 2.0
+RTT_SMOOTHING_FACTOR = 0.125
+RTT_VARIATION_SMOOTHING_FACTOR = 0.25
+RTT_VARIATION_WEIGHT = 4
+CLOCK_GRANULARITY = 0.001
+# A steady RTT must not bring the timeout down to the RTT itself, a growing
+# window queues packets and delays acks before any loss happens
+RTT_QUEUEING_MARGIN = 0.5
+MAX_RETRANSMISSION_BACKOFF = 16
 MAX_RETRANSMISSION_ATTEMPTS = 300
+# Timeouts back off, so far fewer of them cover the same amount of time
+MAX_TIMEOUT_RETRANSMISSION_ATTEMPTS = 32
+# Receptions may give up this late past their deadline, so the timeout of
+# their socket is not set again for every one of them
+RECEIVE_TIMEOUT_SLACK = 0.005
 
 WINDOW_SIZE = 10
-SOCKET_RETRANSMIT_WINDOW_TIMEOUT = 0.01
+# Chunks read from disk ahead of the sending window
+CHUNK_READ_AHEAD = WINDOW_SIZE
+
+FIXED_CONGESTION_CONTROL = "fixed"
+AIMD_CONGESTION_CONTROL = "aimd"
+CUBIC_CONGESTION_CONTROL = "cubic"
+CONGESTION_CONTROL_TYPES = (
+    FIXED_CONGESTION_CONTROL,
+    AIMD_CONGESTION_CONTROL,
+    CUBIC_CONGESTION_CONTROL,
+)
+# Windows are measured in chunks
+INITIAL_CONGESTION_WINDOW = WINDOW_SIZE
+MIN_CONGESTION_WINDOW = 1
+MAX_CONGESTION_WINDOW = 64
+MIN_SLOW_START_THRESHOLD = 2
+AIMD_DECREASE_FACTOR = 0.5
+CUBIC_DECREASE_FACTOR = 0.7
+CUBIC_SCALING_FACTOR = 0.4
+# Receivers accept any chunk a sender could have in flight
+RECEIVE_WINDOW_SIZE = MAX_CONGESTION_WINDOW
+# Go-Back-N receivers ack every so many chunks that arrive in order, or once
+# the oldest of them waited this long. Acks are cumulative, so one stands
+# for every chunk before it. Chunks out of order and the one that fills the
+# gap after them are acked at once
+ACK_EVERY = 2
+ACK_DELAY = 0.005
+# Go-Back-N senders go back to the base once it is acked again this many
+# times, instead of waiting for the retransmission timeout
+FAST_RETRANSMIT_DUPLICATE_ACKS = 3
 
 ZERO_BYTES = bytes([])
-FULL_BUFFER_SIZE = 3072  # 3 kB
+# Large enough for the datagrams of a jumbo frame, peers of earlier
+# versions received into 3 kB and are sent chunks of the historical size
+FULL_BUFFER_SIZE = 9216  # 9 kB
+# Messages of the handshake are received into 2 kB, as servers of earlier
+# versions do with the SYN
 COMMS_BUFFER_SIZE = 2048  # 2 kB
+# Datagrams are received into a ring of reusable buffers of FULL_BUFFER_SIZE
+RECEIVE_BUFFER_RING_SIZE = 2 * WINDOW_SIZE
+# Datagrams sent with a single sendmmsg call and received with a single
+# recvmmsg call, half the ring is left to the datagrams already handed out
+SEND_BATCH_SIZE = MAX_CONGESTION_WINDOW
+RECEIVE_BATCH_SIZE = RECEIVE_BUFFER_RING_SIZE // 2
+# Socket buffers hold a whole window of the largest datagrams, the kernel
+# caps them to what net.core.rmem_max and net.core.wmem_max allow
+SOCKET_BUFFER_SIZE = MAX_CONGESTION_WINDOW * FULL_BUFFER_SIZE
+
+# Seconds between checks of the supervisor for dead worker processes
+WORKER_SUPERVISION_INTERVAL = 1.0
 
 DOWNLOAD_OPERATION = 1
 UPLOAD_OPERATION = 2
@@ -33,12 +100,30 @@ INT_DESERIALIZATION_BYTEORDER = "big"
 FOPEN_READ_MODE = "r"
 FOPEN_WRITE_TRUNCATE_MODE = "w+"
 FOPEN_BINARY_MODE = "b"
+FOPEN_READ_WRITE_MODE = "r+"
+
+# Received byte ranges of a partial file are journaled next to it, so an
+# interrupted transfer can be resumed
+JOURNAL_FILE_SUFFIX = ".journal"
+JOURNAL_SAVE_INTERVAL = 1_048_576  # 1 MB
+# The offset to resume from goes after the file name, separated by it
+RESUME_OFFSET_SEPARATOR = b"\x00"
+OFFSET_SIZE = 4
+# Files striped across several connections give each of them a range of at
+# least this size, smaller files use fewer streams
+STREAM_MIN_RANGE_SIZE = 1_048_576  # 1 MB
 
 HISTORICAL_MTU = 1500
 MAX_IP_HEADER_SIZE = 60
 UDP_HEADER_SIZE = 8
 SAW_PROTOCOL_HEADER_SIZE = 6
 GBN_PROTOCOL_HEADER_SIZE = 16
+# Connections whose ends agree to check the integrity of what they move add
+# a CRC32 to every datagram, which takes its room from the chunk, and the
+# SHA-256 of the file to its last chunk, which fits in the room left for IP
+# options
+CHECKSUM_SIZE = 4
+DIGEST_SIZE = 32
 
 FILE_CHUNK_SIZE_SAW = (
     HISTORICAL_MTU -
@@ -52,4 +137,110 @@ FILE_CHUNK_SIZE_GBN = (
     UDP_HEADER_SIZE -
     GBN_PROTOCOL_HEADER_SIZE)
 
+# Peers that tell the largest datagram they receive are sent chunks as large
+# as the path MTU to them allows, discovered when the transfer starts. The
+# datagrams sent carry no IP options
+IPV4_HEADER_SIZE = 20
+MIN_PATH_MTU = 576
+MAX_PATH_MTU = 9000
+# Probes go to a port nobody is expected to listen on, as traceroute does
+PATH_MTU_PROBE_PORT = 33434
+PATH_MTU_PROBE_TIMEOUT = 0.2
+PATH_MTU_PROBE_ATTEMPTS = 8
+# MTUs tried one after the other when a probe gets no answer, those of RFC
+# 1191 along with the one of Ethernet
+PATH_MTU_PLATEAUS = (8166, 4352, 2002, 1500, 1492, 1280, 1006, 576)
+# Kept as long as the kernel keeps what it learns of a path
+PATH_MTU_CACHE_DURATION = 600.0
+# Options of linux/in.h the socket module does not export
+IP_MTU_DISCOVER = 10
+IP_PMTUDISC_DO = 2
+IP_MTU = 14
+
+# Chunks are compressed each on its own, so they are still sent, resent and
+# received in any order. zlib is always there, lz4 and zstd only when their
+# modules are installed
+ZLIB_COMPRESSION = 1
+LZ4_COMPRESSION = 2
+ZSTD_COMPRESSION = 3
+ZLIB_COMPRESSION_LEVEL = 1
+ZSTD_COMPRESSION_LEVEL = 3
+# Leading bytes of a file compressed before sending it, files whose sample
+# does not shrink below the ratio are sent as they are
+COMPRESSION_SAMPLE_SIZE = 65_536  # 64 kB
+MAX_COMPRESSION_RATIO = 0.9
+
+# A SYN may carry the whole request as type-length-value fields, so the
+# connection is opened and the request answered in a single exchange
+FAST_OPEN_OPERATION_FIELD = 1
+FAST_OPEN_FILENAME_FIELD = 2
+FAST_OPEN_FILESIZE_FIELD = 3
+FAST_OPEN_RESUME_OFFSET_FIELD = 4
+FAST_OPEN_STATUS_FIELD = 5
+# Files of a session, many of them sent over the connection as a single one
+FAST_OPEN_SESSION_FIELD = 6
+# Transfer and stream of a file striped across several connections
+FAST_OPEN_STREAM_FIELD = 7
+# Checksums on every datagram and digest of the file, asked for by the client
+# and confirmed by the server
+FAST_OPEN_INTEGRITY_FIELD = 8
+# Codecs the client can compress chunks with, in order of preference, and
+# the one the server picked of them
+FAST_OPEN_COMPRESSION_FIELD = 9
+# Largest datagram either end receives
+FAST_OPEN_DATAGRAM_SIZE_FIELD = 10
+FAST_OPEN_MAX_PAYLOAD_SIZE = COMMS_BUFFER_SIZE - GBN_PROTOCOL_HEADER_SIZE
+
+FAST_OPEN_ACCEPTED = 0
+FAST_OPEN_FILE_EXISTS = 1
+FAST_OPEN_FILE_TOO_BIG = 2
+FAST_OPEN_FILE_NOT_FOUND = 3
+FAST_OPEN_RESUME_PAST_END = 4
+
 SHOULD_PRINT_CHUNK_HASH = False
+
+# Lines the logger writes with a single flush at most, and how long exiting
+# waits for the ones still queued
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_TIMEOUT = 2  # seconds
+
+# Connections traced keep their last TRACE_CAPACITY events, oldest dropped
+TRACE_CAPACITY = 1 << 16
+TRACE_FILE_EXTENSION = ".trace"
+# Events of a trace. Chunks are told by their index in the file
+TRACE_CHUNK_SENT = 1
+TRACE_CHUNK_RETRANSMITTED = 2
+# Every chunk up to the one of the event was acked
+TRACE_ACK_RECEIVED = 3
+# Only the chunk of the event was acked
+TRACE_SELECTIVE_ACK_RECEIVED = 4
+TRACE_DUPLICATE_ACK_RECEIVED = 5
+TRACE_FAST_RETRANSMIT = 6
+TRACE_TIMEOUT = 7
+# Chunks are received once they are written to the file, the ones that
+# arrive ahead of a gap are out of order until then
+TRACE_CHUNK_RECEIVED = 8
+TRACE_CHUNK_OUT_OF_ORDER = 9
+TRACE_ACK_SENT = 10
+TRACE_EVENTS = 11
+
+# Upper bounds of the buckets RTT samples are counted in, longer ones only
+# count in the total
+RTT_HISTOGRAM_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+)  # seconds
+METRICS_PATH = "/metrics"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Datagrams the impairment proxy reorders are held back this much longer
+# than the rest, so the ones behind them get ahead
+PROXY_REORDER_DELAY = 0.01  # seconds
+PROXY_SEED = 1
+PROXY_DEFAULT_PORT = DEFAULT_PORT + 1
+# How the delay of each datagram spreads around the configured one: evenly
+# within the jitter, normally with the jitter as deviation, or with a heavy
+# tail of the given shape scaled by the jitter
+UNIFORM_DELAY_DISTRIBUTION = "uniform"
+NORMAL_DELAY_DISTRIBUTION = "normal"
+PARETO_DELAY_DISTRIBUTION = "pareto"
+PARETO_DELAY_SHAPE = 3
@@ -0,0 +1,358 @@
+import sys
+from collections import deque
+from ctypes import (
+    CDLL,
+    Structure,
+    addressof,
+    c_char,
+    c_int,
+    c_size_t,
+    c_ubyte,
+    c_uint,
+    c_void_p,
+    get_errno,
+    memmove,
+)
+from errno import EAGAIN, EINTR
+from math import ceil
+from os import strerror
+from socket import (
+    AF_INET,
+    SO_RCVTIMEO,
+    SOL_SOCKET,
+    gethostbyname,
+    inet_aton,
+    inet_ntoa,
+)
+from socket import socket as Socket
+from struct import Struct
+from time import monotonic
+
+from lib.common.buffer_ring import BufferRing
+from lib.common.constants import (
+    FULL_BUFFER_SIZE,
+    INT_DESERIALIZATION_BYTEORDER,
+    RECEIVE_BATCH_SIZE,
+    RECEIVE_TIMEOUT_SLACK,
+    SEND_BATCH_SIZE,
+)
+from lib.common.packet.packet import PacketParser
+from lib.common.transfer_metrics import TransferMetrics
+
+# Makes recvmmsg block only until the first datagram arrives
+MSG_WAITFORONE = 0x10000
+SOCKADDR_IN_SIZE = 16
+TIMEVAL = Struct("@ll")
+MICROSECONDS_PER_SECOND = 1_000_000
+
+
+class IoVec(Structure):
+    _fields_ = [
+        ("iov_base", c_void_p),
+        ("iov_len", c_size_t),
+    ]
+
+
+class MsgHdr(Structure):
+    _fields_ = [
+        ("msg_name", c_void_p),
+        ("msg_namelen", c_uint),
+        ("msg_iov", c_void_p),
+        ("msg_iovlen", c_size_t),
+        ("msg_control", c_void_p),
+        ("msg_controllen", c_size_t),
+        ("msg_flags", c_int),
+    ]
+
+
+class MMsgHdr(Structure):
+    _fields_ = [
+        ("msg_hdr", MsgHdr),
+        ("msg_len", c_uint),
+    ]
+
+
+def load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = CDLL(None, use_errno=True)
+        libc.sendmmsg.argtypes = [c_int, c_void_p, c_uint, c_int]
+        libc.recvmmsg.argtypes = [c_int, c_void_p, c_uint, c_int, c_void_p]
+    except (OSError, AttributeError):
+        return None
+
+    libc.sendmmsg.restype = c_int
+    libc.recvmmsg.restype = c_int
+    return libc
+
+
+LIBC = load_libc()
+
+
+# Messages laid out once for sendmmsg and recvmmsg calls, each with a buffer
+# of its own and room for an IPv4 address. A call takes any run of them, so
+# nothing but lengths and addresses is written between calls
+class MessageVector:
+    def __init__(self, buffer_addresses: list[int], buffer_size: int):
+        n_messages = len(buffer_addresses)
+        self.messages = (MMsgHdr * n_messages)()
+        self.buffers = (IoVec * n_messages)()
+        self.names = ((c_ubyte * SOCKADDR_IN_SIZE) * n_messages)()
+
+        self.headers: list[MMsgHdr] = list(self.messages)
+        self.buffer_headers: list[IoVec] = list(self.buffers)
+        self.name_addresses: list[int] = [
+            addressof(name) for name in self.names]
+        # Names received are read through them, without a foreign call
+        self.name_views: list[memoryview] = [
+            memoryview(name) for name in self.names]
+        self.message_addresses: list[int] = [
+            addressof(message) for message in self.messages]
+
+        for index, buffer_address in enumerate(buffer_addresses):
+            self.buffer_headers[index].iov_base = buffer_address
+            self.buffer_headers[index].iov_len = buffer_size
+            header = self.headers[index].msg_hdr
+            header.msg_iov = addressof(self.buffers[index])
+            header.msg_iovlen = 1
+            header.msg_name = self.name_addresses[index]
+            header.msg_namelen = SOCKADDR_IN_SIZE
+
+
+# Sends and receives the datagrams of a socket several at a time, a burst of
+# the sending window leaves with a single sendmmsg call and whatever arrived
+# meanwhile is drained with a single recvmmsg call. Sockets it can not batch
+# for, not IPv4 ones, get a call per datagram. Either
+# way a reception gives up with a TimeoutError once its deadline passes
+class DatagramBatcher:
+    def __init__(self, _socket):
+        self.socket = _socket
+        self.receive_buffers = BufferRing()
+        self.received: deque = deque()
+        self.is_holding: bool = False
+        self.held_sends: int = 0
+        # Once both ends agree on it, every datagram sent carries a checksum
+        # and the ones received without a valid one are dropped as if lost
+        self.checksums: bool = False
+        # Only set for connections the server measures
+        self.metrics: TransferMetrics | None = None
+        # The one set on the socket, it stays blocking for recvmmsg
+        self.receive_timeout: float | None = None
+
+        self.is_batched: bool = (
+            LIBC is not None
+            and isinstance(_socket, Socket)
+            and _socket.family == AF_INET)
+        if not self.is_batched:
+            return
+
+        # Its receptions time out through SO_RCVTIMEO from now on
+        _socket.settimeout(None)
+
+        # Messages past the end of the ring wrap around to its start, so a
+        # batch can begin at any buffer of it
+        buffer_addresses = [
+            addressof(c_char.from_buffer(buffer))
+            for buffer in self.receive_buffers.buffers]
+        self.receive_vector = MessageVector(
+            buffer_addresses + buffer_addresses[:RECEIVE_BATCH_SIZE],
+            FULL_BUFFER_SIZE)
+        self.addresses: dict[bytes, tuple[str, int]] = {}
+
+        self.send_arena = bytearray(SEND_BATCH_SIZE * FULL_BUFFER_SIZE)
+        send_arena_address = addressof(c_char.from_buffer(self.send_arena))
+        self.send_vector = MessageVector(
+            [send_arena_address + index * FULL_BUFFER_SIZE
+             for index in range(SEND_BATCH_SIZE)],
+            FULL_BUFFER_SIZE)
+        self.send_names: dict[tuple[str, int], bytes] = {}
+        # Address each held message was last sent to. Connections send to a
+        # single peer, so it is only written into the message once
+        self.held_addresses: list[tuple[str, int] | None] = [
+            None] * SEND_BATCH_SIZE
+
+    # Empty datagrams come from a shutdown socket, they are never checked
+    def receive(self, buffer_size: int, deadline: float | None = None):
+        while True:
+            data, address_tuple = self.receive_unchecked(
+                buffer_size, deadline)
+            if len(data) == 0 or PacketParser.is_intact(
+                    data, self.checksums):
+                if self.metrics is not None:
+                    self.metrics.on_received(len(data))
+                return data, address_tuple
+
+    def receive_unchecked(
+            self,
+            buffer_size: int,
+            deadline: float | None = None):
+        if not self.received:
+            timeout = time_left(deadline)
+            if not self.is_batched:
+                self.socket.settimeout(timeout)
+                return self.receive_one(buffer_size)
+            self.receive_batch_before(deadline, timeout)
+
+        buffer, n_bytes, address_tuple = self.received.popleft()
+        return buffer[:min(n_bytes, buffer_size)], address_tuple
+
+    # Handed out again by the next receive, for datagrams read ahead of the
+    # receiver meant to get them
+    def put_back(self, data, address_tuple: tuple[str, int]) -> None:
+        self.received.appendleft((data, len(data), address_tuple))
+
+    def receive_one(self, buffer_size: int):
+        buffer = self.receive_buffers.next_buffer()
+        n_bytes, address_tuple = self.socket.recvfrom_into(
+            buffer, buffer_size)
+        return buffer[:n_bytes], address_tuple
+
+    # The timeout set is kept while it wakes the reception up by the
+    # deadline, most deadlines are just as far as the one before. Waking up
+    # earlier only costs setting the time left and waiting again
+    def receive_batch_before(
+            self, deadline: float | None, timeout: float | None) -> None:
+        if not self.is_receive_timeout_kept(timeout):
+            self.set_receive_timeout(timeout)
+
+        while True:
+            try:
+                self.receive_batch()
+                return
+            except TimeoutError:
+                if deadline is None:
+                    raise
+                self.set_receive_timeout(time_left(deadline))
+
+    def is_receive_timeout_kept(self, timeout: float | None) -> bool:
+        if timeout is None or self.receive_timeout is None:
+            return timeout == self.receive_timeout
+        return self.receive_timeout <= timeout + RECEIVE_TIMEOUT_SLACK
+
+    # A timeout of 0 would block for good, as none does
+    def set_receive_timeout(self, timeout: float | None) -> None:
+        microseconds = 0
+        if timeout is not None:
+            microseconds = max(ceil(timeout * MICROSECONDS_PER_SECOND), 1)
+        self.socket.setsockopt(
+            SOL_SOCKET,
+            SO_RCVTIMEO,
+            TIMEVAL.pack(*divmod(microseconds, MICROSECONDS_PER_SECOND)))
+        self.receive_timeout = timeout
+
+    # Buffers of the ring are only taken for the datagrams that did arrive,
+    # so each of them lasts as long as with a call per datagram
+    def receive_batch(self) -> None:
+        first_index = self.receive_buffers.next_index
+        n_messages = self.call(
+            LIBC.recvmmsg,
+            self.receive_vector.message_addresses[first_index],
+            RECEIVE_BATCH_SIZE,
+            MSG_WAITFORONE,
+            None)
+
+        for index in range(first_index, first_index + n_messages):
+            header = self.receive_vector.headers[index]
+            self.received.append((
+                self.receive_buffers.next_buffer(),
+                header.msg_len,
+                self.address_from(index, header.msg_hdr)))
+
+    def address_from(self, index: int, header: MsgHdr):
+        # A shutdown socket gives an empty datagram from no address
+        if header.msg_namelen == 0:
+            header.msg_namelen = SOCKADDR_IN_SIZE
+            return None
+
+        name = self.receive_vector.name_views[index][:8].tobytes()
+        address_tuple = self.addresses.get(name)
+        if address_tuple is None:
+            port = int.from_bytes(name[2:4], INT_DESERIALIZATION_BYTEORDER)
+            address_tuple = (inet_ntoa(name[4:8]), port)
+            self.addresses[name] = address_tuple
+        return address_tuple
+
+    # Until flushed, datagrams are copied aside instead of being sent
+    def hold_sends(self) -> None:
+        self.is_holding = self.is_batched
+
+    def send(self, buffers: list, address_tuple: tuple[str, int]) -> None:
+        if self.checksums:
+            buffers = PacketParser.seal_buffers(buffers)
+
+        length = sum(len(buffer) for buffer in buffers)
+        if self.metrics is not None:
+            self.metrics.on_sent(length)
+        if not self.is_holding or length > FULL_BUFFER_SIZE:
+            self.send_held()
+            self.socket.sendmsg(buffers, [], 0, address_tuple)
+            return
+
+        position = self.held_sends * FULL_BUFFER_SIZE
+        for buffer in buffers:
+            self.send_arena[position:position + len(buffer)] = buffer
+            position += len(buffer)
+
+        self.send_vector.buffer_headers[self.held_sends].iov_len = length
+        if self.held_addresses[self.held_sends] != address_tuple:
+            memmove(
+                self.send_vector.name_addresses[self.held_sends],
+                self.name_of(address_tuple),
+                SOCKADDR_IN_SIZE)
+            self.held_addresses[self.held_sends] = address_tuple
+        self.held_sends += 1
+
+        if self.held_sends == SEND_BATCH_SIZE:
+            self.send_held()
+
+    def flush_sends(self) -> None:
+        self.is_holding = False
+        self.send_held()
+
+    def send_held(self) -> None:
+        sent = 0
+        try:
+            while sent < self.held_sends:
+                sent += self.call(
+                    LIBC.sendmmsg,
+                    self.send_vector.message_addresses[sent],
+                    self.held_sends - sent,
+                    0)
+        finally:
+            self.held_sends = 0
+
+    def name_of(self, address_tuple: tuple[str, int]) -> bytes:
+        name = self.send_names.get(address_tuple)
+        if name is None:
+            host, port = address_tuple
+            name = (
+                AF_INET.to_bytes(2, sys.byteorder)
+                + port.to_bytes(2, INT_DESERIALIZATION_BYTEORDER)
+                + inet_aton(gethostbyname(host))).ljust(
+                    SOCKADDR_IN_SIZE, b"\x00")
+            self.send_names[address_tuple] = name
+        return name
+
+    def call(self, function, *args) -> int:
+        while True:
+            result = function(self.socket.fileno(), *args)
+            if result >= 0:
+                return result
+
+            errno = get_errno()
+            if errno == EAGAIN:
+                raise TimeoutError(errno, strerror(errno))
+            if errno != EINTR:
+                raise OSError(errno, strerror(errno))
+
+
+def time_left(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+
+    timeout = deadline - monotonic()
+    if timeout <= 0:
+        raise TimeoutError("timed out")
+    return timeout
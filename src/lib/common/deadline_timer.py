@@ -0,0 +1,33 @@
+from time import monotonic
+
+
+# A deadline receptions give up at. Arming it again only moves the deadline,
+# so re-arming it for every packet costs no more than an assignment
+class Timer:
+    def __init__(self):
+        self.deadline: float | None = None
+
+    def arm(self, delay: float) -> None:
+        self.deadline = monotonic() + delay
+
+    def disarm(self) -> None:
+        self.deadline = None
+
+    @property
+    def expired(self) -> bool:
+        deadline = self.deadline
+        return deadline is not None and monotonic() >= deadline
+
+
+def deadline_in(delay: float) -> Timer:
+    timer = Timer()
+    timer.arm(delay)
+    return timer
+
+
+# Receivers block on their socket until the first of their timers expires,
+# none if no timer is armed
+def earliest_deadline(timers) -> float | None:
+    return min(
+        (timer.deadline for timer in timers if timer.deadline is not None),
+        default=None)
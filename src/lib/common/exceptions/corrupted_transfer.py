@@ -0,0 +1,9 @@
+class CorruptedTransfer(Exception):
+    def __init__(
+            self,
+            message="Transfer does not match the digest of the sender, "
+            "what arrived was discarded"):
+        self.message = message
+
+    def __repr__(self):
+        return f"CorruptedTransfer: {self.message})"
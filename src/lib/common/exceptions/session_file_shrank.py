@@ -0,0 +1,8 @@
+class SessionFileShrank(Exception):
+    def __init__(
+            self,
+            message="A file of the session shrank while it was being sent"):
+        self.message = message
+
+    def __repr__(self):
+        return f"SessionFileShrank: {self.message})"
@@ -0,0 +1,8 @@
+class UnexpectedSynMessage(Exception):
+    def __init__(
+            self,
+            message="A packet with SYN was received once connected"):
+        self.message = message
+
+    def __repr__(self):
+        return f"UnexpectedSynMessage: {self.message})"
@@ -0,0 +1,246 @@
+from struct import Struct
+from struct import error as StructError
+
+from lib.common.chunk_codec import available_codecs
+from lib.common.constants import (
+    FAST_OPEN_ACCEPTED,
+    FAST_OPEN_COMPRESSION_FIELD,
+    FAST_OPEN_DATAGRAM_SIZE_FIELD,
+    FAST_OPEN_FILENAME_FIELD,
+    FAST_OPEN_FILESIZE_FIELD,
+    FAST_OPEN_INTEGRITY_FIELD,
+    FAST_OPEN_OPERATION_FIELD,
+    FAST_OPEN_RESUME_OFFSET_FIELD,
+    FAST_OPEN_SESSION_FIELD,
+    FAST_OPEN_STATUS_FIELD,
+    FAST_OPEN_STREAM_FIELD,
+    FULL_BUFFER_SIZE,
+    INT_DESERIALIZATION_BYTEORDER,
+    OFFSET_SIZE,
+    STRING_ENCODING_FORMAT,
+)
+
+# ! -> byte order for network (= big-endian)
+# B -> field type (1 byte)
+# H -> length of the value (2 bytes)
+FIELD_HEADER = Struct("!BH")
+# I -> transfer id (4 bytes)
+# H -> stream of the transfer (2 bytes)
+# H -> number of streams (2 bytes)
+STREAM_VALUE = Struct("!IHH")
+OPERATION_SIZE = 2
+STATUS_SIZE = 1
+# Value of the integrity field: CRC32 checksums and SHA-256 digest
+INTEGRITY_CRC32_SHA256 = 1
+INTEGRITY_SIZE = 1
+DATAGRAM_SIZE_SIZE = 2
+
+
+def encode_fields(fields: dict[int, bytes]) -> bytes:
+    return b"".join(
+        FIELD_HEADER.pack(field_type, len(value)) + value
+        for field_type, value in fields.items())
+
+
+# Fields of unknown types are kept, so newer peers can add some of their own
+def decode_fields(data: bytes | memoryview) -> dict[int, bytes]:
+    fields = {}
+    position = 0
+
+    try:
+        while position < len(data):
+            field_type, length = FIELD_HEADER.unpack_from(data, position)
+            position += FIELD_HEADER.size
+            if position + length > len(data):
+                raise ValueError("Truncated fast open field")
+
+            fields[field_type] = bytes(data[position:position + length])
+            position += length
+    except StructError:
+        raise ValueError("Truncated fast open field header") from None
+
+    return fields
+
+
+# Values that do not fit in the size given take as many bytes as they need,
+# fields are decoded whatever their length
+def encode_int(value: int, size: int = OFFSET_SIZE) -> bytes:
+    size = max(size, (value.bit_length() + 7) // 8)
+    return value.to_bytes(size, byteorder=INT_DESERIALIZATION_BYTEORDER)
+
+
+def decode_int(fields: dict[int, bytes], field_type: int) -> int | None:
+    if field_type not in fields:
+        return None
+    return int.from_bytes(fields[field_type], INT_DESERIALIZATION_BYTEORDER)
+
+
+# Every codec is told by its id, in a byte of its own
+def encode_codecs(codecs: list[int]) -> bytes:
+    return bytes(codecs)
+
+
+def decode_codecs(fields: dict[int, bytes]) -> list[int]:
+    return list(fields.get(FAST_OPEN_COMPRESSION_FIELD, b""))
+
+
+# Operation, file name and, for uploads, filesize a client sends along with
+# its SYN. Clients wanting to resume add the offset to go on from. Sessions
+# tell how many files they upload, or download the files the name matches.
+# Streams of a striped transfer tell which of its ranges they move. Clients
+# ask for the integrity of the transfer to be checked and offer the codecs
+# they can compress chunks with, all of the installed ones unless told. The
+# largest datagram they receive bounds the chunks sent to them
+class FastOpenRequest:
+    def __init__(
+        self,
+        op_code: int,
+        filename: str,
+        filesize: int | None = None,
+        resume_offset: int | None = None,
+        session_files: int | None = None,
+        stream: tuple[int, int, int] | None = None,
+        integrity: bool = True,
+        codecs: list[int] | None = None,
+        datagram_size: int | None = FULL_BUFFER_SIZE,
+    ):
+        self.op_code: int = op_code
+        self.filename: str = filename
+        self.filesize: int | None = filesize
+        self.resume_offset: int | None = resume_offset
+        self.session_files: int | None = session_files
+        # Transfer id, stream index and number of streams
+        self.stream: tuple[int, int, int] | None = stream
+        self.integrity: bool = integrity
+        self.codecs: list[int] = (
+            available_codecs() if codecs is None else codecs)
+        self.datagram_size: int | None = datagram_size
+
+    @property
+    def is_session(self) -> bool:
+        return self.session_files is not None
+
+    @property
+    def is_stream(self) -> bool:
+        return self.stream is not None
+
+    def to_bytes(self) -> bytes:
+        fields = {
+            FAST_OPEN_OPERATION_FIELD: encode_int(
+                self.op_code, OPERATION_SIZE),
+            FAST_OPEN_FILENAME_FIELD: self.filename.encode(
+                STRING_ENCODING_FORMAT),
+        }
+        if self.filesize is not None:
+            fields[FAST_OPEN_FILESIZE_FIELD] = encode_int(self.filesize)
+        if self.resume_offset is not None:
+            fields[FAST_OPEN_RESUME_OFFSET_FIELD] = encode_int(
+                self.resume_offset)
+        if self.session_files is not None:
+            fields[FAST_OPEN_SESSION_FIELD] = encode_int(self.session_files)
+        if self.stream is not None:
+            fields[FAST_OPEN_STREAM_FIELD] = STREAM_VALUE.pack(*self.stream)
+        if self.integrity:
+            fields[FAST_OPEN_INTEGRITY_FIELD] = encode_int(
+                INTEGRITY_CRC32_SHA256, INTEGRITY_SIZE)
+        if self.codecs:
+            fields[FAST_OPEN_COMPRESSION_FIELD] = encode_codecs(self.codecs)
+        if self.datagram_size is not None:
+            fields[FAST_OPEN_DATAGRAM_SIZE_FIELD] = encode_int(
+                self.datagram_size, DATAGRAM_SIZE_SIZE)
+
+        return encode_fields(fields)
+
+    @staticmethod
+    def from_bytes(data: bytes | memoryview) -> "FastOpenRequest":
+        fields = decode_fields(data)
+        if (FAST_OPEN_OPERATION_FIELD not in fields
+                or FAST_OPEN_FILENAME_FIELD not in fields):
+            raise ValueError("Fast open request without operation or name")
+
+        try:
+            filename = str(
+                fields[FAST_OPEN_FILENAME_FIELD], STRING_ENCODING_FORMAT)
+        except UnicodeDecodeError:
+            raise ValueError("Fast open request with an invalid name") from None
+
+        stream = None
+        if FAST_OPEN_STREAM_FIELD in fields:
+            try:
+                stream = STREAM_VALUE.unpack(fields[FAST_OPEN_STREAM_FIELD])
+            except StructError:
+                raise ValueError("Fast open request with an invalid stream") from None
+
+        return FastOpenRequest(
+            decode_int(fields, FAST_OPEN_OPERATION_FIELD),
+            filename,
+            decode_int(fields, FAST_OPEN_FILESIZE_FIELD),
+            decode_int(fields, FAST_OPEN_RESUME_OFFSET_FIELD),
+            decode_int(fields, FAST_OPEN_SESSION_FIELD),
+            stream,
+            decode_int(fields, FAST_OPEN_INTEGRITY_FIELD)
+            == INTEGRITY_CRC32_SHA256,
+            decode_codecs(fields),
+            decode_int(fields, FAST_OPEN_DATAGRAM_SIZE_FIELD),
+        )
+
+
+# Whether the request was accepted and, for resumed uploads, how much of the
+# file the server already has. Streams of a download are told the size of
+# the file, which their range depends on. Servers confirm the integrity of
+# the transfer is checked, tell the codec they picked, if any, and the
+# largest datagram they receive
+class FastOpenAnswer:
+    def __init__(
+            self,
+            status: int = FAST_OPEN_ACCEPTED,
+            resume_offset: int | None = None,
+            filesize: int | None = None,
+            integrity: bool = False,
+            codec: int | None = None,
+            datagram_size: int | None = None):
+        self.status: int = status
+        self.resume_offset: int | None = resume_offset
+        self.filesize: int | None = filesize
+        self.integrity: bool = integrity
+        self.codec: int | None = codec
+        self.datagram_size: int | None = datagram_size
+
+    @property
+    def is_accepted(self) -> bool:
+        return self.status == FAST_OPEN_ACCEPTED
+
+    def to_bytes(self) -> bytes:
+        fields = {FAST_OPEN_STATUS_FIELD: encode_int(self.status, STATUS_SIZE)}
+        if self.resume_offset is not None:
+            fields[FAST_OPEN_RESUME_OFFSET_FIELD] = encode_int(
+                self.resume_offset)
+        if self.filesize is not None:
+            fields[FAST_OPEN_FILESIZE_FIELD] = encode_int(self.filesize)
+        if self.integrity:
+            fields[FAST_OPEN_INTEGRITY_FIELD] = encode_int(
+                INTEGRITY_CRC32_SHA256, INTEGRITY_SIZE)
+        if self.codec is not None:
+            fields[FAST_OPEN_COMPRESSION_FIELD] = encode_codecs([self.codec])
+        if self.datagram_size is not None:
+            fields[FAST_OPEN_DATAGRAM_SIZE_FIELD] = encode_int(
+                self.datagram_size, DATAGRAM_SIZE_SIZE)
+
+        return encode_fields(fields)
+
+    @staticmethod
+    def from_bytes(data: bytes | memoryview) -> "FastOpenAnswer":
+        fields = decode_fields(data)
+        if FAST_OPEN_STATUS_FIELD not in fields:
+            raise ValueError("Fast open answer without status")
+
+        return FastOpenAnswer(
+            decode_int(fields, FAST_OPEN_STATUS_FIELD),
+            decode_int(fields, FAST_OPEN_RESUME_OFFSET_FIELD),
+            decode_int(fields, FAST_OPEN_FILESIZE_FIELD),
+            decode_int(fields, FAST_OPEN_INTEGRITY_FIELD)
+            == INTEGRITY_CRC32_SHA256,
+            next(iter(decode_codecs(fields)), None),
+            decode_int(fields, FAST_OPEN_DATAGRAM_SIZE_FIELD),
+        )
+
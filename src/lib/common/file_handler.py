@@ -1,17 +1,32 @@
+from contextlib import contextmanager
+from fcntl import LOCK_EX, flock
+from fnmatch import fnmatchcase
 from math import ceil
-from os import path, stat, remove
+from mmap import ACCESS_READ, mmap
+from os import O_RDONLY, listdir, path, posix_fallocate, remove, stat
+from os import close as close_fd
+from os import open as open_fd
 from shutil import disk_usage
 
 from lib.common.constants import (
     FOPEN_BINARY_MODE,
     FOPEN_READ_MODE,
+    FOPEN_READ_WRITE_MODE,
     FOPEN_WRITE_TRUNCATE_MODE,
+    JOURNAL_FILE_SUFFIX,
 )
+from lib.common.exceptions.corrupted_transfer import CorruptedTransfer
+from lib.common.exceptions.invalid_filename import InvalidFilename
+from lib.common.file_range import RangeReader
 from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.packet.packet import Packet
+from lib.common.transfer_journal import (
+    JournaledFile,
+    RangeFile,
+    TransferJournal,
+)
 from lib.server.exceptions.invalid_directory import InvalidDirectory
-from lib.common.exceptions.invalid_filename import InvalidFilename
 
 MINIMUM_FREE_GAP = 104_857_600  # 100 MB
 FROM_CURRENT_POSITION = 1
@@ -43,7 +58,7 @@ class FileHandler:
             file = open(filepath, flags)
             return file
 
-        except IOError as e:
+        except OSError as e:
             self.logger.debug(f"I/O error occurred: {e}")
             raise InvalidFilename()
 
@@ -69,6 +84,121 @@ class FileHandler:
             is_write=False,
             is_binary=True)
 
+    # Partial files are only taken up again if their journal says how much
+    # of them was written, a file without one is never overwritten
+    def open_file_journaled_mode(
+            self,
+            filepath: str,
+            is_path_complete: bool,
+            resume: bool) -> JournaledFile:
+        final_filepath = self.get_filepath(filepath, is_path_complete)
+        journal = TransferJournal(final_filepath)
+        is_file_present = path.isfile(final_filepath)
+
+        if is_file_present and not journal.exists():
+            raise InvalidFilename()
+
+        try:
+            if resume and is_file_present and journal.load():
+                file = open(
+                    final_filepath,
+                    FOPEN_READ_WRITE_MODE + FOPEN_BINARY_MODE)
+                received_bytes = journal.received_bytes
+                file.truncate(received_bytes)
+                file.seek(received_bytes)
+                journal.ranges = [[0, received_bytes]]
+            else:
+                file = open(
+                    final_filepath,
+                    FOPEN_WRITE_TRUNCATE_MODE + FOPEN_BINARY_MODE)
+                journal.reset()
+
+            return JournaledFile(file, journal)
+
+        except OSError as e:
+            self.logger.debug(f"I/O error occurred: {e}")
+            raise InvalidFilename()
+
+    # Connections of every process take turns on the directory of a file to
+    # share its journal, closing the directory releases it
+    @contextmanager
+    def lock_directory_of(self, final_filepath: str):
+        directory = open_fd(
+            path.dirname(path.abspath(final_filepath)), O_RDONLY)
+        try:
+            flock(directory, LOCK_EX)
+            yield
+        finally:
+            close_fd(directory)
+
+    def preallocate(self, file, filesize: int) -> None:
+        try:
+            posix_fallocate(file.fileno(), 0, filesize)
+        except OSError:
+            file.truncate(filesize)
+
+    # Every stream of a striped transfer opens the file for its own range.
+    # The first one to come, or one finding what is left of another
+    # transfer, preallocates the file and starts its journal over
+    def open_file_range_mode(
+            self,
+            filepath: str,
+            is_path_complete: bool,
+            filesize: int,
+            transfer_id: int,
+            start: int) -> RangeFile:
+        final_filepath = self.get_filepath(filepath, is_path_complete)
+        journal = TransferJournal(final_filepath)
+
+        try:
+            with self.lock_directory_of(final_filepath):
+                is_file_present = path.isfile(final_filepath)
+                if is_file_present and not journal.exists():
+                    raise InvalidFilename()
+
+                if (is_file_present and journal.load()
+                        and journal.transfer_id == transfer_id
+                        and journal.filesize == filesize):
+                    file = open(
+                        final_filepath,
+                        FOPEN_READ_WRITE_MODE + FOPEN_BINARY_MODE)
+                else:
+                    file = open(
+                        final_filepath,
+                        FOPEN_WRITE_TRUNCATE_MODE + FOPEN_BINARY_MODE)
+                    self.preallocate(file, filesize)
+                    journal.reset(filesize, transfer_id)
+
+            file.seek(start)
+            return RangeFile(
+                file, journal, lambda: self.lock_directory_of(final_filepath))
+
+        except OSError as e:
+            self.logger.debug(f"I/O error occurred: {e}")
+            raise InvalidFilename()
+
+    def is_transfer_started(
+            self,
+            filepath: str,
+            is_path_complete: bool,
+            transfer_id: int) -> bool:
+        final_filepath = self.get_filepath(filepath, is_path_complete)
+        journal = TransferJournal(final_filepath)
+        return journal.load() and journal.transfer_id == transfer_id
+
+    def has_journal(self, filepath: str, is_path_complete: bool) -> bool:
+        final_filepath = self.get_filepath(filepath, is_path_complete)
+        return TransferJournal(final_filepath).exists()
+
+    # Files still being received, the ones with a journal, are left out
+    def list_files(self, pattern: str) -> list[str]:
+        return sorted(
+            name for name in listdir(self.dirpath)
+            if fnmatchcase(name, pattern)
+            and not name.endswith(JOURNAL_FILE_SUFFIX)
+            and path.isfile(path.join(self.dirpath, name))
+            and not self.has_journal(name, is_path_complete=False))
+
     def get_filesize(self, filepath: str, is_path_complete: bool):
         final_filepath = self.get_filepath(filepath, is_path_complete)
         stats = stat(final_filepath)
@@ -80,18 +210,79 @@ class FileHandler:
     def close(self, file):
         file.close()
 
+    # Journaled files drop their journal once every byte is in. What arrived
+    # is discarded instead if it does not match the digest the sender told
+    def complete(self, file):
+        if file.digest is not None and file.digest.is_corrupted:
+            file.discard()
+            raise CorruptedTransfer()
+
+        if isinstance(file, JournaledFile):
+            file.complete()
+        else:
+            file.close()
+
+    def seek(self, file, offset: int):
+        return file.seek(offset)
+
     def read(self, file, n_bytes: int):
         return file.read(n_bytes)
 
     def unwind(self, file, n_bytes: int):
         return file.seek(-n_bytes, FROM_CURRENT_POSITION)
 
+    def map_file(self, file) -> memoryview | None:
+        if isinstance(file, RangeReader):
+            mapped_file = self.map_file(file.file)
+            if mapped_file is None:
+                return None
+            return mapped_file[file.start:file.start + file.length]
+
+        try:
+            # The mapping is released once the last slice of it is dropped
+            return memoryview(mmap(file.fileno(), 0, access=ACCESS_READ))
+        except (ValueError, OSError) as e:
+            self.logger.debug(f"File could not be mapped to memory: {e}")
+            return None
+
+    def read_mapped(
+            self,
+            file,
+            mapped_file: memoryview | None,
+            n_bytes: int):
+        if mapped_file is None:
+            return self.read(file, n_bytes)
+
+        position = file.tell()
+        chunk = mapped_file[position:position + n_bytes]
+        file.seek(position + len(chunk))
+        return chunk
+
+    def tell(self, file) -> int:
+        return file.tell()
+
+    def read_at(self, file, offset: int, n_bytes: int):
+        file.seek(offset)
+        return file.read(n_bytes)
+
+    # Reads what comes next and leaves the file where it was
+    def peek(self, file, n_bytes: int):
+        position = file.tell()
+        data = self.read_at(file, position, n_bytes)
+        file.seek(position)
+        return data
+
     def can_file_fit(self, filesize: int) -> bool:
         _total_space, _used_space, free_space = disk_usage(self.dirpath)
         return (free_space - MINIMUM_FREE_GAP) > filesize
 
     def append_to_file(self, file, packet: Packet) -> None:
-        file.write(packet.data)
+        if packet.is_compressed:
+            file.write(file.codec.decompress(packet.data))
+        else:
+            file.write(packet.data)
+        if packet.digest is not None and file.digest is not None:
+            file.digest.expected = packet.digest
 
     def bytes_to_megabytes(self, bytes: int) -> str:
         megabytes = bytes / (1024 * 1024)
@@ -101,8 +292,9 @@ class FileHandler:
         megabytes = bytes / (1024)
         return "{0:.2f}".format(megabytes)
 
+    # Empty files are sent all the same, as a single empty last chunk
     def get_number_of_chunks(self, file_size: int, chunk_size: int) -> int:
-        return ceil(file_size / chunk_size)
+        return max(1, ceil(file_size / chunk_size))
 
     def remove_file_if_corrupted_or_incomplete(
         self,
@@ -118,8 +310,19 @@ class FileHandler:
                 return
 
             real_size = path.getsize(final_filepath)
+            journal = TransferJournal(final_filepath)
 
-            if filesize.value is None:
+            # Striped files are preallocated, only their journal tells
+            # whether every byte of them was written
+            if journal.exists() and (
+                    real_size != filesize.value
+                    or not journal.load()
+                    or journal.received_bytes < real_size):
+                self.logger.warn(
+                    f"File {final_filepath} is incomplete. Keeping {
+                        self.bytes_to_kilobytes(real_size)} kB of it to "
+                    "resume the transfer")
+            elif filesize.value is None:
                 self.logger.warn(
                     f"File {final_filepath} is corrupted or incomplete. Removing file")
                 remove(final_filepath)
@@ -134,6 +337,7 @@ class FileHandler:
                 remove(final_filepath)
             else:
                 self.logger.debug(f"File {final_filepath} is OK")
+                journal.remove()
 
         except Exception as e:
             self.logger.warn(
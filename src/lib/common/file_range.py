@@ -0,0 +1,59 @@
+from io import UnsupportedOperation
+
+from lib.common.constants import STREAM_MIN_RANGE_SIZE
+
+FROM_START = 0
+FROM_CURRENT_POSITION = 1
+
+
+# Streams a file of this size is striped across when asked for some, both
+# ends work it out on their own so they agree on the range of each stream
+def stream_count(filesize: int, streams: int) -> int:
+    return max(1, min(streams, filesize // STREAM_MIN_RANGE_SIZE))
+
+
+def stream_range(filesize: int, stream: int, streams: int) -> tuple[int, int]:
+    streams = stream_count(filesize, streams)
+    if stream >= streams:
+        return filesize, 0
+
+    start = filesize * stream // streams
+    end = filesize * (stream + 1) // streams
+    return start, end - start
+
+
+# Bytes of a file between two offsets, read as if they were a file on their
+# own
+class RangeReader:
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.start: int = start
+        self.length: int = length
+        self.file.seek(start)
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    # Mappings of the whole file are sliced to the range instead
+    def fileno(self) -> int:
+        raise UnsupportedOperation("A range is not a whole file")
+
+    def tell(self) -> int:
+        return self.file.tell() - self.start
+
+    def seek(self, offset: int, whence: int = FROM_START) -> int:
+        if whence == FROM_CURRENT_POSITION:
+            offset += self.tell()
+        offset = max(0, min(offset, self.length))
+        self.file.seek(self.start + offset)
+        return offset
+
+    def read(self, n_bytes: int = -1) -> bytes:
+        remaining_bytes = self.length - self.tell()
+        if n_bytes < 0 or n_bytes > remaining_bytes:
+            n_bytes = remaining_bytes
+        return self.file.read(max(n_bytes, 0))
+
+    def close(self) -> None:
+        self.file.close()
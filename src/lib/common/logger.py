@@ -1,4 +1,11 @@
-from datetime import datetime
+import atexit
+import sys
+from os import getpid
+from queue import Empty, SimpleQueue
+from threading import Event, Lock, Thread
+from time import localtime, strftime, time
+
+from lib.common.constants import LOG_BATCH_SIZE, LOG_FLUSH_TIMEOUT
 
 
 class Colors:
@@ -9,6 +16,89 @@ class Colors:
     RESET = "\033[0m"
 
 
+# Lines are written to stdout by a thread of their own, so logging never
+# waits on it. The thread writes every line queued meanwhile at once, with a
+# single flush. Processes start their own thread the first time they log
+class LogWriter:
+    def __init__(self) -> None:
+        self.queue: SimpleQueue = SimpleQueue()
+        self.pid: int | None = None
+        self.lock: Lock = Lock()
+        # Second of the last timestamp formatted, and how it was formatted
+        self.last_second: int = -1
+        self.last_timestamp: str = ""
+
+    def write(
+            self,
+            timestamp: float,
+            level: str,
+            prefix: str,
+            message: str) -> None:
+        self.start_if_needed()
+        self.queue.put((timestamp, level, prefix, message))
+
+    def start_if_needed(self) -> None:
+        if self.pid == getpid():
+            return
+
+        with self.lock:
+            if self.pid == getpid():
+                return
+            self.queue = SimpleQueue()
+            Thread(target=self.run, name="logger", daemon=True).start()
+            self.pid = getpid()
+
+    def run(self) -> None:
+        while True:
+            records = [self.queue.get()]
+            while len(records) < LOG_BATCH_SIZE:
+                try:
+                    records.append(self.queue.get_nowait())
+                except Empty:
+                    break
+
+            self.write_lines(
+                [self.format(record)
+                 for record in records if not isinstance(record, Event)])
+
+            for record in records:
+                if isinstance(record, Event):
+                    record.set()
+
+    def format(self, record: tuple[float, str, str, str]) -> str:
+        timestamp, level, prefix, message = record
+        second = int(timestamp)
+        if second != self.last_second:
+            self.last_second = second
+            self.last_timestamp = strftime("%H:%M:%S", localtime(second))
+
+        return f"[{self.last_timestamp}] [{level}]{prefix} {message}\n"
+
+    # Lines are lost along with stdout if it was closed
+    def write_lines(self, lines: list[str]) -> None:
+        if len(lines) == 0:
+            return
+
+        try:
+            sys.stdout.write("".join(lines))
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass
+
+    # Waits until every line logged before is written
+    def flush(self) -> None:
+        if self.pid != getpid():
+            return
+
+        written = Event()
+        self.queue.put(written)
+        written.wait(LOG_FLUSH_TIMEOUT)
+
+
+log_writer = LogWriter()
+atexit.register(log_writer.flush)
+
+
 class CoolLogger:
     DEBUG_LOG_LEVEL = 4  # debug + info + errors + warns
     WARN_LEVEL = 3.5
@@ -39,35 +129,40 @@ class CoolLogger:
         else:
             self.current_level = self.INFO_LOG_LEVEL
 
-    def _log(self, msg_level, message):
+    # Messages logged in the hot path take their arguments apart, they are
+    # only formatted into them, %-style, if the message is going to be shown
+    def _log(self, msg_level, message, args):
         if self.current_level >= msg_level:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            print(
-                f"[{timestamp}] [{self.PRINTABLE_LEVELS[msg_level]}]{self.prefix} {message}",
-                flush=True,
-            )
+            self._force_log(msg_level, message, args)
+
+    def _force_log(self, msg_level, message, args):
+        if args:
+            message = message % args
+        log_writer.write(
+            time(), self.PRINTABLE_LEVELS[msg_level], self.prefix, message)
+
+    @property
+    def is_debug_enabled(self) -> bool:
+        return self.current_level >= self.DEBUG_LOG_LEVEL
 
-    def _force_log(self, msg_level, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(
-            f"[{timestamp}] [{self.PRINTABLE_LEVELS[msg_level]}]{self.prefix} {message}",
-            flush=True,
-        )
+    def debug(self, message, *args):
+        if self.current_level >= self.DEBUG_LOG_LEVEL:
+            self._force_log(self.DEBUG_LOG_LEVEL, message, args)
 
-    def debug(self, message):
-        self._log(self.DEBUG_LOG_LEVEL, message)
+    def info(self, message, *args):
+        self._log(self.INFO_LOG_LEVEL, message, args)
 
-    def info(self, message):
-        self._log(self.INFO_LOG_LEVEL, message)
+    def force_info(self, message, *args):
+        self._force_log(self.INFO_LOG_LEVEL, message, args)
 
-    def force_info(self, message):
-        self._force_log(self.INFO_LOG_LEVEL, message)
+    def error(self, message, *args):
+        self._log(self.ERROR_LEVEL, message, args)
 
-    def error(self, message):
-        self._log(self.ERROR_LEVEL, message)
+    def warn(self, message, *args):
+        self._log(self.WARN_LEVEL, message, args)
 
-    def warn(self, message):
-        self._log(self.WARN_LEVEL, message)
+    def flush(self):
+        log_writer.flush()
 
     def set_prefix(self, prefix: str):
         self.prefix = " " + prefix.strip()
@@ -1,13 +1,108 @@
-import struct
+from struct import Struct
+from zlib import crc32
 
 from lib.common.constants import (
+    DIGEST_SIZE,
     GO_BACK_N_PROTOCOL_TYPE,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
     STOP_AND_WAIT_PROTOCOL_TYPE,
-    INT_DESERIALIZATION_BYTEORDER,
+)
+
+# Value of the 2-bit protocol field at the start of every header
+PROTOCOL_FLAG_FROM_TYPE = {
+    STOP_AND_WAIT_PROTOCOL_TYPE: 0b00,
+    GO_BACK_N_PROTOCOL_TYPE: 0b01,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE: 0b10,
+}
+
+PROTOCOL_TYPE_FROM_FLAG = {
+    flag: protocol for protocol, flag in PROTOCOL_FLAG_FROM_TYPE.items()
+}
+
+# ! -> byte order for network (= big-endian)
+# H -> unsigned short (2 bytes)
+# I -> unsigned int (4 bytes)
+SAW_HEADER = Struct("!HHH")
+GBN_HEADER = Struct("!HHIII")
+# I -> CRC32 of the whole datagram but itself (4 bytes), right after the
+# header of datagrams of connections that check them
+CHECKSUM = Struct("!I")
+# Port field, right after the flags in both headers
+PORT = Struct("!H")
+PORT_OFFSET = 2
+
+# The first byte of the 16 bits of flags is decoded with a lookup table:
+# SAW: protocol (2 bits), sequence number, ack, syn, fin, checksum, digest
+# GBN: protocol (2 bits), ack, syn, fin, checksum, digest, compressed
+# SAW tells whether the payload is compressed in the first bit of the second
+# byte. The digest of the file goes after the checksum, before the payload
+PROTOCOL_SHIFT = 14
+SAW_SEQUENCE_NUMBER_BIT = 1 << 13
+SAW_ACK_BIT = 1 << 12
+SAW_SYN_BIT = 1 << 11
+SAW_FIN_BIT = 1 << 10
+SAW_CHECKSUM_BIT = 1 << 9
+SAW_DIGEST_BIT = 1 << 8
+SAW_COMPRESSED_BIT = 1 << 7
+GBN_ACK_BIT = 1 << 13
+GBN_SYN_BIT = 1 << 12
+GBN_FIN_BIT = 1 << 11
+GBN_CHECKSUM_BIT = 1 << 10
+GBN_DIGEST_BIT = 1 << 9
+GBN_COMPRESSED_BIT = 1 << 8
+
+FLAGS_FIRST_BYTE_SHIFT = 8
+
+# Decoded flags for every possible value of the first byte of the header
+PROTOCOL_TYPE_FROM_FLAGS_BYTE = tuple(
+    PROTOCOL_TYPE_FROM_FLAG.get(
+        flags_byte >> 6, STOP_AND_WAIT_PROTOCOL_TYPE)
+    for flags_byte in range(256)
+)
+
+SAW_FLAGS_FROM_FLAGS_BYTE = tuple(
+    (
+        flags_byte >> 5 & 0b1,
+        flags_byte >> 4 & 0b1 == 0b1,
+        flags_byte >> 3 & 0b1 == 0b1,
+        flags_byte >> 2 & 0b1 == 0b1,
+    )
+    for flags_byte in range(256)
+)
+
+GBN_FLAGS_FROM_FLAGS_BYTE = tuple(
+    (
+        flags_byte >> 5 & 0b1 == 0b1,
+        flags_byte >> 4 & 0b1 == 0b1,
+        flags_byte >> 3 & 0b1 == 0b1,
+    )
+    for flags_byte in range(256)
+)
+
+# Header size and checksum bit of the first byte for every possible value
+# of it
+CHECKSUM_LAYOUT_FROM_FLAGS_BYTE = tuple(
+    (SAW_HEADER.size, SAW_CHECKSUM_BIT >> FLAGS_FIRST_BYTE_SHIFT)
+    if protocol == STOP_AND_WAIT_PROTOCOL_TYPE
+    else (GBN_HEADER.size, GBN_CHECKSUM_BIT >> FLAGS_FIRST_BYTE_SHIFT)
+    for protocol in PROTOCOL_TYPE_FROM_FLAGS_BYTE
 )
 
 
 class Packet:
+    __slots__ = (
+        "data",
+        "digest",
+        "is_ack",
+        "is_compressed",
+        "is_fin",
+        "is_syn",
+        "payload_length",
+        "port",
+        "protocol",
+        "sequence_number",
+    )
+
     def __init__(
         self,
         protocol: str,
@@ -17,7 +112,9 @@ class Packet:
         is_fin: bool,
         port: int,
         payload_length: int,
-        data: bytes,
+        data: bytes | memoryview,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ):
         self.protocol: str = protocol
         self.sequence_number: int = sequence_number
@@ -26,10 +123,16 @@ class Packet:
         self.is_fin: bool = is_fin
         self.port: int = port
         self.payload_length: int = payload_length
-        self.data: bytes = data
+        self.data: bytes | memoryview = data
+        # Digest of the whole file, only told along with its last chunk
+        self.digest: bytes | None = digest
+        # Compressed with the codec of the connection
+        self.is_compressed: bool = is_compressed
 
 
 class PacketSaw(Packet):
+    __slots__ = ()
+
     def __init__(
         self,
         protocol: str,
@@ -39,7 +142,9 @@ class PacketSaw(Packet):
         is_fin: bool,
         port: int,
         payload_length: int,
-        data: bytes,
+        data: bytes | memoryview,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ):
         super().__init__(
             protocol,
@@ -50,10 +155,15 @@ class PacketSaw(Packet):
             port,
             payload_length,
             data,
+            digest,
+            is_compressed,
         )
 
 
+# Also used by Selective Repeat, which shares the Go-Back-N header layout
 class PacketGbn(Packet):
+    __slots__ = ("ack_number",)
+
     def __init__(
         self,
         protocol: str,
@@ -64,7 +174,9 @@ class PacketGbn(Packet):
         is_fin: bool,
         port: int,
         payload_length: int,
-        data: bytes,
+        data: bytes | memoryview,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ):
         super().__init__(
             protocol,
@@ -75,6 +187,8 @@ class PacketGbn(Packet):
             port,
             payload_length,
             data,
+            digest,
+            is_compressed,
         )
         self.ack_number: int = ack_number
 
@@ -82,101 +196,80 @@ class PacketGbn(Packet):
 class PacketParser:
     @staticmethod
     def compose_packet_saw_for_net(packet: PacketSaw) -> bytes:
-        flags = 0b0000_0000_0000_0000
-
-        protocol_flag = 0b00
-
-        sequence_number = 0b1 if packet.sequence_number == 1 else 0b0
-        is_ack = 0b1 if packet.is_ack else 0b0
-        is_syn = 0b1 if packet.is_syn else 0b0
-        is_fin = 0b1 if packet.is_fin else 0b0
-
-        pos = 16
-        pos -= 2
-        flags |= protocol_flag << pos
-
-        pos -= 1
-        flags |= sequence_number << pos
+        return PacketParser.compose_packet_saw_header(packet) + packet.data
 
-        pos -= 1
-        flags |= is_ack << pos
-
-        pos -= 1
-        flags |= is_syn << pos
-
-        pos -= 1
-        flags |= is_fin << pos
-
-        # ! -> byte order for network (= big-endian)
-        # H -> unsigned short (2 bytes)
-        header = struct.pack(
-            "!HHH", flags, int(packet.port), int(packet.payload_length)
-        )
-
-        return header + packet.data
+    @staticmethod
+    def compose_packet_saw_header(packet: PacketSaw) -> bytes:
+        flags = PROTOCOL_FLAG_FROM_TYPE[STOP_AND_WAIT_PROTOCOL_TYPE] << (
+            PROTOCOL_SHIFT)
+
+        if packet.sequence_number == 1:
+            flags |= SAW_SEQUENCE_NUMBER_BIT
+        if packet.is_ack:
+            flags |= SAW_ACK_BIT
+        if packet.is_syn:
+            flags |= SAW_SYN_BIT
+        if packet.is_fin:
+            flags |= SAW_FIN_BIT
+        if packet.digest is not None:
+            flags |= SAW_DIGEST_BIT
+        if packet.is_compressed:
+            flags |= SAW_COMPRESSED_BIT
+
+        header = SAW_HEADER.pack(flags, packet.port, packet.payload_length)
+        if packet.digest is None:
+            return header
+        return header + packet.digest
 
     @staticmethod
     def compose_packet_gbn_for_net(packet: PacketGbn) -> bytes:
-        flags = 0b0000_0000_0000_0000
-
-        protocol_flag = 0b01
-
-        is_syn = 0b1 if packet.is_syn else 0b0
-        is_ack = 0b1 if packet.is_ack else 0b0
-        is_fin = 0b1 if packet.is_fin else 0b0
+        return PacketParser.compose_packet_gbn_header(packet) + packet.data
 
-        pos = 16
-        pos -= 2
-        flags |= protocol_flag << pos
-
-        pos -= 1
-        flags |= is_ack << pos
-
-        pos -= 1
-        flags |= is_syn << pos
-
-        pos -= 1
-        flags |= is_fin << pos
-
-        # ! -> byte order for network (= big-endian)
-        # H -> unsigned short (2 bytes)
-        # I -> unsigned int (4 bytes)
-        header = struct.pack(
-            "!HHIII",
+    @staticmethod
+    def compose_packet_gbn_header(packet: PacketGbn) -> bytes:
+        flags = PROTOCOL_FLAG_FROM_TYPE[packet.protocol] << PROTOCOL_SHIFT
+
+        if packet.is_ack:
+            flags |= GBN_ACK_BIT
+        if packet.is_syn:
+            flags |= GBN_SYN_BIT
+        if packet.is_fin:
+            flags |= GBN_FIN_BIT
+        if packet.digest is not None:
+            flags |= GBN_DIGEST_BIT
+        if packet.is_compressed:
+            flags |= GBN_COMPRESSED_BIT
+
+        header = GBN_HEADER.pack(
             flags,
-            int(packet.port),
-            int(packet.payload_length),
-            int(packet.sequence_number),
-            int(packet.ack_number),
+            packet.port,
+            packet.payload_length,
+            packet.sequence_number,
+            packet.ack_number,
         )
+        if packet.digest is None:
+            return header
+        return header + packet.digest
 
-        return header + packet.data
+    # Header and payload are kept apart so the payload is never copied
+    @staticmethod
+    def compose_packet_saw_buffers(packet: PacketSaw) -> list:
+        return [PacketParser.compose_packet_saw_header(packet), packet.data]
+
+    @staticmethod
+    def compose_packet_gbn_buffers(packet: PacketGbn) -> list:
+        return [PacketParser.compose_packet_gbn_header(packet), packet.data]
 
     @staticmethod
     def parse_packet_saw(
-        protocol: str, header: int, pos: int, packet: bytes
+        protocol: str, packet: bytes | memoryview
     ) -> PacketSaw:
-        pos -= 1
-        sequence_number = header >> pos & 0b1
-
-        pos -= 1
-        is_ack = header >> pos & 0b1
-        is_ack = True if is_ack == 0b1 else False
-
-        pos -= 1
-        is_syn = header >> pos & 0b1
-        is_syn = True if is_syn == 0b1 else False
-
-        pos -= 1
-        is_fin = header >> pos & 0b1
-        is_fin = True if is_fin == 0b1 else False
-
-        port = int.from_bytes(
-            packet[2:4], byteorder=INT_DESERIALIZATION_BYTEORDER)
-        payload_length = int.from_bytes(
-            packet[4:6], byteorder=INT_DESERIALIZATION_BYTEORDER
-        )
-        data = bytes(packet[6: 6 + payload_length])
+        flags, port, payload_length = SAW_HEADER.unpack_from(packet)
+        sequence_number, is_ack, is_syn, is_fin = SAW_FLAGS_FROM_FLAGS_BYTE[
+            flags >> FLAGS_FIRST_BYTE_SHIFT]
+        data_start, digest = PacketParser.skip_to_data(
+            packet, SAW_HEADER.size, flags & SAW_CHECKSUM_BIT,
+            flags & SAW_DIGEST_BIT)
 
         return PacketSaw(
             protocol,
@@ -186,37 +279,27 @@ class PacketParser:
             is_fin,
             port,
             payload_length,
-            data,
+            packet[data_start: data_start + payload_length],
+            digest,
+            flags & SAW_COMPRESSED_BIT != 0,
         )
 
     @staticmethod
     def parse_packet_gbn(
-        protocol: str, header: int, pos: int, packet: bytes
+        protocol: str, packet: bytes | memoryview
     ) -> PacketGbn:
-        pos -= 1
-        is_ack = header >> pos & 0b1
-        is_ack = True if is_ack == 0b1 else False
-
-        pos -= 1
-        is_syn = header >> pos & 0b1
-        is_syn = True if is_syn == 0b1 else False
-
-        pos -= 1
-        is_fin = header >> pos & 0b1
-        is_fin = True if is_fin == 0b1 else False
-
-        port = int.from_bytes(
-            packet[2:4], byteorder=INT_DESERIALIZATION_BYTEORDER)
-        payload_length = int.from_bytes(
-            packet[4:8], byteorder=INT_DESERIALIZATION_BYTEORDER
-        )
-        sequence_number = int.from_bytes(
-            packet[8:12], byteorder=INT_DESERIALIZATION_BYTEORDER
-        )
-        ack_number = int.from_bytes(
-            packet[12:16], byteorder=INT_DESERIALIZATION_BYTEORDER
-        )
-        data = bytes(packet[16: 16 + payload_length])
+        (
+            flags,
+            port,
+            payload_length,
+            sequence_number,
+            ack_number,
+        ) = GBN_HEADER.unpack_from(packet)
+        is_ack, is_syn, is_fin = GBN_FLAGS_FROM_FLAGS_BYTE[
+            flags >> FLAGS_FIRST_BYTE_SHIFT]
+        data_start, digest = PacketParser.skip_to_data(
+            packet, GBN_HEADER.size, flags & GBN_CHECKSUM_BIT,
+            flags & GBN_DIGEST_BIT)
 
         return PacketGbn(
             protocol,
@@ -227,28 +310,99 @@ class PacketParser:
             is_fin,
             port,
             payload_length,
-            data,
+            packet[data_start: data_start + payload_length],
+            digest,
+            flags & GBN_COMPRESSED_BIT != 0,
         )
 
+    # Start of the payload and digest of the file, if the packet tells it
+    @staticmethod
+    def skip_to_data(
+        packet: bytes | memoryview,
+        data_start: int,
+        has_checksum: int,
+        has_digest: int,
+    ) -> tuple[int, bytes | None]:
+        if has_checksum:
+            data_start += CHECKSUM.size
+        if not has_digest:
+            return data_start, None
+
+        digest_end = data_start + DIGEST_SIZE
+        return digest_end, bytes(packet[data_start:digest_end])
+
+    # The checksum covers the header, with its checksum bit set, and every
+    # byte after the checksum, so buffers are sealed without joining them
     @staticmethod
-    def get_packet_from_bytes(packet: bytes) -> tuple[Packet, str]:
-        header = int.from_bytes(
-            packet[0:2], byteorder=INT_DESERIALIZATION_BYTEORDER)
+    def seal_buffers(buffers: list) -> list:
+        first_buffer = memoryview(buffers[0])
+        header_size, checksum_bit = CHECKSUM_LAYOUT_FROM_FLAGS_BYTE[
+            first_buffer[0]]
+        header = bytearray(first_buffer[:header_size])
+        header[0] |= checksum_bit
 
-        pos = 16
-        pos -= 2
-        protocol = header >> pos & 0b11
+        rest = [first_buffer[header_size:], *buffers[1:]]
+        checksum = crc32(header)
+        for buffer in rest:
+            checksum = crc32(buffer, checksum)
 
-        if protocol == 0b01:
-            protocol = GO_BACK_N_PROTOCOL_TYPE
-        else:
-            protocol = STOP_AND_WAIT_PROTOCOL_TYPE
+        return [header + CHECKSUM.pack(checksum), *rest]
+
+    # Datagrams without a checksum are only intact if none is required
+    @staticmethod
+    def is_intact(
+            datagram: bytes | memoryview, is_checksum_required: bool) -> bool:
+        header_size, checksum_bit = CHECKSUM_LAYOUT_FROM_FLAGS_BYTE[
+            datagram[0]]
+        if not datagram[0] & checksum_bit:
+            return not is_checksum_required
+
+        checksum_end = header_size + CHECKSUM.size
+        if len(datagram) < checksum_end:
+            return False
+
+        (checksum,) = CHECKSUM.unpack_from(datagram, header_size)
+        return checksum == crc32(
+            datagram[checksum_end:], crc32(datagram[:header_size]))
+
+    # Read straight from the datagram, for those that relay it as it is
+    @staticmethod
+    def is_syn(datagram: bytes | memoryview) -> bool:
+        flags_byte = datagram[0]
+        if (PROTOCOL_TYPE_FROM_FLAGS_BYTE[flags_byte]
+                == STOP_AND_WAIT_PROTOCOL_TYPE):
+            return SAW_FLAGS_FROM_FLAGS_BYTE[flags_byte][2]
+        return GBN_FLAGS_FROM_FLAGS_BYTE[flags_byte][1]
+
+    @staticmethod
+    def port_of(datagram: bytes | memoryview) -> int:
+        return PORT.unpack_from(datagram, PORT_OFFSET)[0]
+
+    # Datagrams relayed on behalf of another port keep a valid checksum, if
+    # they had one
+    @staticmethod
+    def replace_port(datagram: bytes | memoryview, port: int) -> bytes:
+        header_size, checksum_bit = CHECKSUM_LAYOUT_FROM_FLAGS_BYTE[
+            datagram[0]]
+        header = bytearray(datagram[:header_size])
+        PORT.pack_into(header, PORT_OFFSET, port)
+
+        if not datagram[0] & checksum_bit:
+            return bytes(header) + datagram[header_size:]
+
+        rest = memoryview(datagram)[header_size + CHECKSUM.size:]
+        return b"".join(PacketParser.seal_buffers([header, rest]))
+
+    @staticmethod
+    def get_packet_from_bytes(
+            packet: bytes | memoryview) -> tuple[Packet, str]:
+        protocol = PROTOCOL_TYPE_FROM_FLAGS_BYTE[packet[0]]
 
         if protocol == STOP_AND_WAIT_PROTOCOL_TYPE:
             return PacketParser.parse_packet_saw(
-                protocol, header, pos, packet
+                protocol, packet
             ), STOP_AND_WAIT_PROTOCOL_TYPE
         else:
             return PacketParser.parse_packet_gbn(
-                protocol, header, pos, packet
-            ), GO_BACK_N_PROTOCOL_TYPE
+                protocol, packet
+            ), protocol
@@ -0,0 +1,153 @@
+import sys
+from errno import EMSGSIZE
+from socket import (
+    AF_INET,
+    IPPROTO_IP,
+    SO_RCVBUF,
+    SO_SNDBUF,
+    SOCK_DGRAM,
+    SOL_SOCKET,
+)
+from socket import socket as Socket
+from threading import Lock
+from time import monotonic
+
+from lib.common.constants import (
+    CHECKSUM_SIZE,
+    DIGEST_SIZE,
+    FILE_CHUNK_SIZE_GBN,
+    FILE_CHUNK_SIZE_SAW,
+    GBN_PROTOCOL_HEADER_SIZE,
+    HISTORICAL_MTU,
+    IP_MTU,
+    IP_MTU_DISCOVER,
+    IP_PMTUDISC_DO,
+    IPV4_HEADER_SIZE,
+    MAX_PATH_MTU,
+    MIN_PATH_MTU,
+    PATH_MTU_CACHE_DURATION,
+    PATH_MTU_PLATEAUS,
+    PATH_MTU_PROBE_ATTEMPTS,
+    PATH_MTU_PROBE_PORT,
+    PATH_MTU_PROBE_TIMEOUT,
+    SAW_PROTOCOL_HEADER_SIZE,
+    SOCKET_BUFFER_SIZE,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+    UDP_HEADER_SIZE,
+)
+
+# Host -> path MTU to it and when it was discovered. Connections to the same
+# host share it, so striped transfers and sessions probe the path only once
+discovered_path_mtus: dict[str, tuple[int, float]] = {}
+discovered_path_mtus_lock = Lock()
+
+
+def discover_path_mtu(host: str) -> int:
+    with discovered_path_mtus_lock:
+        discovered = discovered_path_mtus.get(host)
+    if (discovered is not None
+            and monotonic() - discovered[1] < PATH_MTU_CACHE_DURATION):
+        return discovered[0]
+
+    path_mtu = probe_path_mtu(host)
+    with discovered_path_mtus_lock:
+        discovered_path_mtus[host] = (path_mtu, monotonic())
+    return path_mtu
+
+
+# The kernel tells the MTU of the route to the host once connected to it,
+# already lowered by the ICMP fragmentation needed it got from that path
+# before. Routes no larger than Ethernet are taken as they are, silent paths
+# are never shrunk below it anyway. Larger ones are probed, with the DF bit
+# set so the links that can not carry them answer with an ICMP fragmentation
+# needed the kernel lowers the MTU of the route with. The host answers them
+# with a port unreachable, which tells they made it whole. Paths that drop
+# either ICMP are shrunk a plateau at a time while they stay silent, down to
+# the MTU of Ethernet
+def probe_path_mtu(host: str) -> int:
+    if not sys.platform.startswith("linux"):
+        return HISTORICAL_MTU
+
+    try:
+        with Socket(AF_INET, SOCK_DGRAM) as probe:
+            probe.setsockopt(IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+            probe.connect((host, PATH_MTU_PROBE_PORT))
+            path_mtu = route_mtu(probe)
+            if path_mtu <= HISTORICAL_MTU:
+                return path_mtu
+
+            probe.settimeout(PATH_MTU_PROBE_TIMEOUT)
+
+            for _ in range(PATH_MTU_PROBE_ATTEMPTS):
+                try:
+                    probe.send(bytes(
+                        path_mtu - IPV4_HEADER_SIZE - UDP_HEADER_SIZE))
+                    probe.recv(1)
+                    return path_mtu
+                except ConnectionRefusedError:
+                    return path_mtu
+                except TimeoutError:
+                    if path_mtu <= HISTORICAL_MTU:
+                        return path_mtu
+                    path_mtu = max(
+                        next_plateau(path_mtu), HISTORICAL_MTU)
+                except OSError as e:
+                    if e.errno != EMSGSIZE:
+                        raise
+                    path_mtu = min(
+                        route_mtu(probe), next_plateau(path_mtu))
+                    path_mtu = max(path_mtu, MIN_PATH_MTU)
+
+            return path_mtu
+    except OSError:
+        return HISTORICAL_MTU
+
+
+# Loopback routes go well past the largest datagram peers receive, those of
+# jumbo frames up to it
+def route_mtu(probe: Socket) -> int:
+    mtu = probe.getsockopt(IPPROTO_IP, IP_MTU)
+    return max(MIN_PATH_MTU, min(mtu, MAX_PATH_MTU))
+
+
+def next_plateau(path_mtu: int) -> int:
+    return next(
+        (plateau for plateau in PATH_MTU_PLATEAUS if plateau < path_mtu),
+        MIN_PATH_MTU)
+
+
+# Chunks fill the datagrams the path to the host carries whole, as long as
+# the peer receives them. Transfers checked for integrity leave room for the
+# checksum of every datagram and the digest of the file in the last chunk.
+# Peers that do not tell how large a datagram they receive get chunks of the
+# historical size
+def chunk_size_for(
+        protocol_version: str,
+        host: str,
+        datagram_size: int | None,
+        integrity: bool) -> int:
+    if protocol_version == STOP_AND_WAIT_PROTOCOL_TYPE:
+        historical_chunk_size = FILE_CHUNK_SIZE_SAW
+        header_size = SAW_PROTOCOL_HEADER_SIZE
+    else:
+        historical_chunk_size = FILE_CHUNK_SIZE_GBN
+        header_size = GBN_PROTOCOL_HEADER_SIZE
+
+    checksum_size = CHECKSUM_SIZE if integrity else 0
+    if datagram_size is None:
+        return historical_chunk_size - checksum_size
+
+    datagram_size = min(
+        datagram_size,
+        discover_path_mtu(host) - IPV4_HEADER_SIZE - UDP_HEADER_SIZE)
+    digest_size = DIGEST_SIZE if integrity else 0
+    return datagram_size - header_size - checksum_size - digest_size
+
+
+# A window of the largest chunks does not fit in the default socket buffers
+def reserve_socket_buffers(raw_socket: Socket) -> None:
+    try:
+        raw_socket.setsockopt(SOL_SOCKET, SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        raw_socket.setsockopt(SOL_SOCKET, SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    except OSError:
+        pass
@@ -1,11 +1,11 @@
 import functools
-from time import time
 
 from lib.client.exceptions.connection_refused import ConnectionRefused
 from lib.common.constants import (
     MAX_RETRANSMISSION_ATTEMPTS,
     SOCKET_CONNECTION_LOST_TIMEOUT,
 )
+from lib.common.deadline_timer import deadline_in
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
 from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
@@ -15,6 +15,7 @@ from lib.common.exceptions.message_not_fin_ack import MessageIsNotFinAck
 from lib.common.exceptions.message_not_fin_nor_ack import MessageNotFinNorAck
 from lib.common.exceptions.message_not_syn import MessageIsNotSyn
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.exceptions.unexpected_syn import UnexpectedSynMessage
 
 
 def configure_wanted_exceptions_to_catch(exceptions_to_let_through):
@@ -27,6 +28,7 @@ def configure_wanted_exceptions_to_catch(exceptions_to_let_through):
         MessageIsNotSyn,
         MessageNotFinNorAck,
         UnexpectedFinMessage,
+        UnexpectedSynMessage,
         MessageNotFinNorAck,
         ConnectionLost,
         ConnectionRefused,
@@ -59,17 +61,17 @@ def re_listen_if_failed(exceptions_to_let_through=None):
             listening_attempts = 0
             result = None
             exception_got = None
-            start_time = time()
-            time_of_accumulation = start_time
-            accumulated_time = 0
+            connection_lost_deadline = deadline_in(
+                SOCKET_CONNECTION_LOST_TIMEOUT)
 
             while (
                 listening_attempts < MAX_RETRANSMISSION_ATTEMPTS
-                and accumulated_time < SOCKET_CONNECTION_LOST_TIMEOUT
+                and not connection_lost_deadline.expired
             ):
                 try:
                     result = wrapped_function(self, *args, **kwargs)
-                    break
+                    self.socket.sample_rtt()
+                    return result
                 except want_to_catch as e:
                     exception_got = e
                     listening_attempts += 1
@@ -78,13 +80,10 @@ def re_listen_if_failed(exceptions_to_let_through=None):
                     self.logger.warn(
                         f"Re-listening attempt attempt number {listening_attempts}. Due to cause: {e.message}"
                     )
-                    current_time = time()
-                    accumulated_time += current_time - time_of_accumulation
-                    time_of_accumulation = current_time
 
             if (
                 listening_attempts >= MAX_RETRANSMISSION_ATTEMPTS
-                or accumulated_time >= SOCKET_CONNECTION_LOST_TIMEOUT
+                or connection_lost_deadline.expired
             ):
                 if listening_attempts >= MAX_RETRANSMISSION_ATTEMPTS:
                     self.logger.warn(
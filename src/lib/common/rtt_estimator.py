@@ -0,0 +1,64 @@
+from lib.common.constants import (
+    CLOCK_GRANULARITY,
+    INITIAL_RETRANSMISSION_TIMEOUT,
+    MAX_RETRANSMISSION_BACKOFF,
+    MAX_RETRANSMISSION_TIMEOUT,
+    MIN_RETRANSMISSION_TIMEOUT,
+    RTT_QUEUEING_MARGIN,
+    RTT_SMOOTHING_FACTOR,
+    RTT_VARIATION_SMOOTHING_FACTOR,
+    RTT_VARIATION_WEIGHT,
+)
+from lib.common.transfer_metrics import TransferMetrics
+
+
+# Jacobson/Karels estimation as described in RFC 6298. Samples must only be
+# taken from packets that were not retransmitted (Karn's algorithm), and a
+# backed off timeout is kept until one of them gives a new sample
+class RttEstimator:
+    def __init__(self) -> None:
+        self.smoothed_rtt: float | None = None
+        self.rtt_variation: float | None = None
+        self.base_timeout: float = INITIAL_RETRANSMISSION_TIMEOUT
+        self.backoff: int = 1
+        # Only set for connections the server measures
+        self.metrics: TransferMetrics | None = None
+
+    @property
+    def retransmission_timeout(self) -> float:
+        return min(
+            self.base_timeout * self.backoff, MAX_RETRANSMISSION_TIMEOUT)
+
+    def add_sample(self, rtt: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_rtt(rtt)
+
+        if self.smoothed_rtt is None:
+            self.smoothed_rtt = rtt
+            self.rtt_variation = rtt / 2
+        else:
+            self.rtt_variation = (
+                (1 - RTT_VARIATION_SMOOTHING_FACTOR) * self.rtt_variation
+                + RTT_VARIATION_SMOOTHING_FACTOR * abs(self.smoothed_rtt - rtt)
+            )
+            self.smoothed_rtt = (
+                (1 - RTT_SMOOTHING_FACTOR) * self.smoothed_rtt
+                + RTT_SMOOTHING_FACTOR * rtt
+            )
+
+        self.base_timeout = min(
+            max(
+                self.smoothed_rtt + max(
+                    CLOCK_GRANULARITY,
+                    RTT_VARIATION_WEIGHT * self.rtt_variation,
+                    RTT_QUEUEING_MARGIN * self.smoothed_rtt),
+                MIN_RETRANSMISSION_TIMEOUT,
+            ),
+            MAX_RETRANSMISSION_TIMEOUT,
+        )
+        self.backoff = 1
+
+    def back_off(self) -> None:
+        if (self.backoff < MAX_RETRANSMISSION_BACKOFF
+                and self.retransmission_timeout < MAX_RETRANSMISSION_TIMEOUT):
+            self.backoff *= 2
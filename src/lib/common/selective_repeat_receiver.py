@@ -0,0 +1,153 @@
+from abc import abstractmethod
+
+from lib.common.constants import (
+    RECEIVE_WINDOW_SIZE,
+    SHOULD_PRINT_CHUNK_HASH,
+    TRACE_ACK_SENT,
+    TRACE_CHUNK_OUT_OF_ORDER,
+    TRACE_CHUNK_RECEIVED,
+)
+from lib.common.file_handler import FileHandler
+from lib.common.hash_compute import compute_chunk_sha256
+from lib.common.logger import CoolLogger
+from lib.common.mutable_variable import MutableVariable
+from lib.common.packet.packet import PacketGbn
+from lib.common.sequence_number import SequenceNumber
+from lib.common.transfer_trace import TransferTrace
+
+
+# Receives a file chunk by chunk in any order within its window, buffering
+# those ahead of a gap and writing them once it is filled. The client and
+# the server only differ in how they wait and answer stale chunks
+class SelectiveRepeatReceiver:
+    # Number of the first chunk received with a window
+    first_chunk_number: int = 1
+    # Seconds without chunks until the connection is lost, None to wait
+    # forever
+    receive_timeout: float | None = None
+
+    def __init__(
+        self,
+        logger: CoolLogger,
+        protocol,
+        file_handler: FileHandler,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+    ) -> None:
+        self.logger: CoolLogger = logger
+        # ClientProtocolGbn or ServerProtocolGbn
+        self.protocol = protocol
+        # Sequence and ack numbers of the last chunk written to the file
+        self.sqn_number: SequenceNumber = sequence_number
+        self.ack_number: SequenceNumber = ack_number
+        self.first_chunk_sqn_number: int = sequence_number.value + 1
+        self.file_handler: FileHandler = file_handler
+
+        # Chunks received out of order, by sequence number
+        self.buffered_chunks: dict[int, PacketGbn] = {}
+        # Only kept when the connection is traced
+        self.trace: TransferTrace | None = protocol.socket.trace
+        self.protocol.socket.set_timeout(self.receive_timeout)
+
+    def chunk_number_of(self, packet: PacketGbn) -> int:
+        return (packet.sequence_number - self.first_chunk_sqn_number
+                + self.first_chunk_number)
+
+    def send_selective_ack(self, packet: PacketGbn) -> None:
+        if self.trace is not None:
+            self.trace.record(
+                TRACE_ACK_SENT,
+                self.chunk_number_of(packet),
+                packet.sequence_number)
+        self.protocol.send_ack(
+            SequenceNumber(packet.sequence_number,
+                           self.protocol.protocol_version),
+            self.ack_number,
+        )
+
+    def deliver_buffered_chunks(
+            self, file, should_continue_reception: MutableVariable):
+        next_sqn_number = self.sqn_number.value + 1
+
+        while next_sqn_number in self.buffered_chunks:
+            packet = self.buffered_chunks.pop(next_sqn_number)
+            if self.trace is not None:
+                self.trace.record(
+                    TRACE_CHUNK_RECEIVED,
+                    self.chunk_number_of(packet),
+                    packet.sequence_number,
+                    packet.payload_length)
+            self.file_handler.append_to_file(file, packet)
+            self.sqn_number.step()
+            self.ack_number.step()
+
+            if packet.is_fin:
+                should_continue_reception.value = False
+                return
+
+            next_sqn_number = self.sqn_number.value + 1
+
+    def receive_single_chunk(
+        self,
+        file,
+        last_transmitted_packet: bytes,
+        should_continue_reception: MutableVariable,
+    ) -> None:
+        packet = self.protocol.receive_file_chunk_in_any_order()
+        next_sqn_number = self.sqn_number.value + 1
+
+        if packet.sequence_number < self.first_chunk_sqn_number:
+            self.resend_last_answer(last_transmitted_packet)
+
+        elif packet.sequence_number < next_sqn_number:
+            self.logger.debug(
+                "Received duplicate of chunk %d", self.chunk_number_of(packet))
+            if not packet.is_fin:
+                self.send_selective_ack(packet)
+
+        elif packet.sequence_number < next_sqn_number + RECEIVE_WINDOW_SIZE:
+            if self.logger.is_debug_enabled:
+                msg = f"Received chunk {self.chunk_number_of(packet)}. "
+                if SHOULD_PRINT_CHUNK_HASH:
+                    msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
+                self.logger.debug(msg)
+
+            if packet.sequence_number != next_sqn_number:
+                if self.trace is not None:
+                    self.trace.record(
+                        TRACE_CHUNK_OUT_OF_ORDER,
+                        self.chunk_number_of(packet),
+                        packet.sequence_number,
+                        packet.payload_length)
+                # Chunks waiting for a gap to be filled outlive the receive
+                # buffer they arrived in
+                packet.data = bytes(packet.data)
+
+            self.buffered_chunks[packet.sequence_number] = packet
+            self.deliver_buffered_chunks(file, should_continue_reception)
+
+            if not packet.is_fin:
+                self.send_selective_ack(packet)
+
+        else:
+            self.logger.warn(
+                f"Discarding chunk {self.chunk_number_of(packet)}, "
+                "it is outside of the reception window")
+
+    def receive_file(
+        self, file, last_transmitted_packet
+    ) -> tuple[SequenceNumber, SequenceNumber]:
+        self.logger.debug("Beginning file reception in SR manner")
+        should_continue_reception = MutableVariable(True)
+
+        while should_continue_reception.value:
+            self.receive_single_chunk(
+                file, last_transmitted_packet, should_continue_reception)
+
+        return self.sqn_number, self.ack_number
+
+    # Chunks from before this phase mean the peer missed the last answer
+    # sent to it
+    @abstractmethod
+    def resend_last_answer(self, last_transmitted_packet: bytes) -> None:
+        pass
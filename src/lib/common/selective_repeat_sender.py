@@ -0,0 +1,329 @@
+from abc import abstractmethod
+from time import time
+
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.chunk_source import WindowedChunkSource
+from lib.common.congestion_control import CongestionController
+from lib.common.constants import (
+    FILE_CHUNK_SIZE_GBN,
+    SHOULD_PRINT_CHUNK_HASH,
+    SOCKET_CONNECTION_LOST_TIMEOUT,
+    TRACE_CHUNK_RETRANSMITTED,
+    TRACE_CHUNK_SENT,
+    TRACE_SELECTIVE_ACK_RECEIVED,
+    TRACE_TIMEOUT,
+)
+from lib.common.exceptions.connection_lost import ConnectionLost
+from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
+from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.file_handler import FileHandler
+from lib.common.hash_compute import compute_chunk_sha256
+from lib.common.logger import CoolLogger
+from lib.common.mutable_variable import MutableVariable
+from lib.common.sequence_number import SequenceNumber
+from lib.common.transfer_digest import TransferDigest
+from lib.common.transfer_trace import TransferTrace
+
+
+# Sends a file with a window of chunks acknowledged one by one, resending
+# only those whose own deadline expires. The client and the server only
+# differ in the chunk they start from and how they build the chunks
+class SelectiveRepeatSender:
+    # Index of the first chunk sent with a window
+    first_chunk_index: int = 0
+
+    def __init__(
+        self,
+        logger: CoolLogger,
+        protocol,
+        file_handler: FileHandler,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+        congestion_controller: CongestionController,
+        digest: TransferDigest | None = None,
+        codec: ChunkCodec | None = None,
+        chunk_size: int = FILE_CHUNK_SIZE_GBN,
+    ) -> None:
+        # Index of the oldest chunk that was not acknowledged yet
+        self.base: int = self.first_chunk_index
+        self.logger: CoolLogger = logger
+        # ClientProtocolGbn or ServerProtocolGbn
+        self.protocol = protocol
+        self.sqn_number: SequenceNumber = sequence_number
+        self.offset_initial_seq_number: SequenceNumber = sequence_number
+        self.ack_number: SequenceNumber = ack_number
+        self.next_seq_num: int = self.first_chunk_index
+        self.file_handler: FileHandler = file_handler
+        self.congestion_controller: CongestionController = (
+            congestion_controller)
+        # Told along with the last chunk, for the receiver to check
+        self.digest: TransferDigest | None = digest
+        # Compresses the chunks it is worth compressing
+        self.codec: ChunkCodec | None = codec
+        # Every chunk but the last one is this large
+        self.chunk_size: int = chunk_size
+        # Losses of chunks sent before this index were already reacted to
+        self.recovery_point: int = self.next_seq_num
+
+        # Chunk index -> time at which it has to be retransmitted
+        self.retransmission_deadlines: dict[int, float] = {}
+        self.acked_chunks: set[int] = set()
+        # Chunk index -> time of its first transmission, retransmitted chunks
+        # are left out of the RTT estimation (Karn's algorithm)
+        self.send_times: dict[int, float] = {}
+        self.last_progress: float = time()
+        # Only kept when the connection is traced
+        self.trace: TransferTrace | None = protocol.socket.trace
+
+        self.ack_number.step()
+
+        # A cumulative ack number N confirms every chunk up to the index
+        # N - ack_offset
+        self.ack_offset: int = (
+            self.ack_number.value - self.first_chunk_index)
+
+    def send_file(
+        self, file, filesize: int, filename: str
+    ) -> tuple[SequenceNumber, SequenceNumber, bytes, bool]:
+        self.logger.debug(
+            f"Sending file '{filename}' with selective repeat and an initial window size of {
+                self.congestion_controller.window} packets")
+
+        chunks = self.create_chunk_source(file, filesize)
+        total_chunks: int = len(chunks)
+        last_raw_packet = MutableVariable(None)
+        already_received_fin_back = MutableVariable(False)
+
+        while (self.base < total_chunks
+               and not already_received_fin_back.value):
+            self.send_packets_in_window(
+                total_chunks, chunks, last_raw_packet)
+            self.retransmit_expired_packets(total_chunks, chunks)
+
+            try:
+                self.await_ack_phase(total_chunks, already_received_fin_back)
+            except RetransmissionNeeded:
+                self.check_connection_is_alive()
+
+            chunks.release_up_to(self.base)
+
+        return (
+            SequenceNumber(
+                self.next_seq_num +
+                self.offset_initial_seq_number.value -
+                1,
+                self.protocol.protocol_version,
+            ),
+            SequenceNumber(
+                self.ack_number.value,
+                self.protocol.protocol_version),
+            last_raw_packet.value,
+            already_received_fin_back.value,
+        )
+
+    def send_chunk(
+            self,
+            chunk_index: int,
+            total_chunks: int,
+            chunks: WindowedChunkSource) -> bytes | list:
+        is_last_chunk = chunk_index == total_chunks - 1
+        chunk_to_send = chunks[chunk_index]
+        chunk_len = len(chunk_to_send)
+
+        seq_number_to_send = SequenceNumber(
+            chunk_index + self.offset_initial_seq_number.value,
+            self.protocol.protocol_version,
+        )
+
+        packet_bin = self.send_file_chunk(
+            seq_number_to_send,
+            chunk_to_send,
+            chunk_len,
+            is_last_chunk,
+            chunks.digest_for(chunk_index),
+            chunks.is_compressed(chunk_index),
+        )
+        if self.trace is not None:
+            self.trace.record(
+                TRACE_CHUNK_RETRANSMITTED
+                if chunk_index in self.retransmission_deadlines
+                else TRACE_CHUNK_SENT,
+                chunk_index,
+                seq_number_to_send.value,
+                chunk_len)
+        self.retransmission_deadlines[chunk_index] = (
+            time() + self.retransmission_timeout()
+        )
+        return packet_bin
+
+    def send_packets_in_window(
+            self,
+            total_chunks: int,
+            chunks: WindowedChunkSource,
+            last_raw_packet: MutableVariable) -> None:
+        # The whole burst leaves with a single call
+        self.protocol.socket.hold_sends()
+        try:
+            while (
+                self.next_seq_num
+                < self.base + self.congestion_controller.window
+                and self.next_seq_num < total_chunks
+            ):
+                chunk_len = len(chunks[self.next_seq_num])
+
+                if self.logger.is_debug_enabled:
+                    msg = f"Sending chunk {
+                        self.next_seq_num + 1}/{total_chunks} of size {
+                        self.file_handler.bytes_to_kilobytes(chunk_len)} KB. "
+
+                    if SHOULD_PRINT_CHUNK_HASH:
+                        msg += f"Hash is: {
+                            compute_chunk_sha256(chunks[self.next_seq_num])}"
+
+                    self.logger.debug(msg)
+
+                last_raw_packet.value = self.send_chunk(
+                    self.next_seq_num, total_chunks, chunks)
+                self.send_times[self.next_seq_num] = time()
+                self.next_seq_num += 1
+        finally:
+            self.protocol.socket.flush_sends()
+
+    def retransmit_expired_packets(
+            self,
+            total_chunks: int,
+            chunks: WindowedChunkSource) -> None:
+        now = time()
+        expired_chunks = [
+            chunk_index
+            for chunk_index in range(self.base, self.next_seq_num)
+            if chunk_index not in self.acked_chunks
+            and self.retransmission_deadlines[chunk_index] <= now
+        ]
+
+        if len(expired_chunks) > 0:
+            self.protocol.socket.rtt_estimator.back_off()
+        if self.trace is not None:
+            for chunk_index in expired_chunks:
+                self.trace.record(TRACE_TIMEOUT, chunk_index)
+
+        if any(chunk_index >= self.recovery_point
+               for chunk_index in expired_chunks):
+            self.congestion_controller.on_loss()
+            self.recovery_point = self.next_seq_num
+
+        self.protocol.socket.hold_sends()
+        try:
+            for chunk_index in expired_chunks:
+                self.logger.debug(
+                    "Retransmitting chunk %d/%d",
+                    chunk_index + 1,
+                    total_chunks)
+                self.send_times.pop(chunk_index, None)
+                self.send_chunk(chunk_index, total_chunks, chunks)
+        finally:
+            self.protocol.socket.flush_sends()
+
+    def time_until_next_retransmission(self) -> float:
+        pending_deadlines = [
+            deadline
+            for chunk_index, deadline in self.retransmission_deadlines.items()
+            if chunk_index not in self.acked_chunks
+        ]
+
+        if len(pending_deadlines) == 0:
+            return self.retransmission_timeout()
+
+        return min(pending_deadlines) - time()
+
+    def retransmission_timeout(self) -> float:
+        return self.protocol.socket.rtt_estimator.retransmission_timeout
+
+    def sample_rtt(self, chunk_index: int) -> None:
+        send_time = self.send_times.pop(chunk_index, None)
+        if send_time is not None:
+            self.protocol.socket.rtt_estimator.add_sample(time() - send_time)
+
+    def check_connection_is_alive(self) -> None:
+        if time() - self.last_progress >= SOCKET_CONNECTION_LOST_TIMEOUT:
+            self.logger.debug("No acknowledgements received in time")
+            raise ConnectionLost()
+
+    def mark_as_acked(self, chunk_index: int) -> bool:
+        if (not self.base <= chunk_index < self.next_seq_num
+                or chunk_index in self.acked_chunks):
+            return False
+
+        self.acked_chunks.add(chunk_index)
+        if self.trace is not None:
+            self.trace.record(TRACE_SELECTIVE_ACK_RECEIVED, chunk_index)
+        self.retransmission_deadlines.pop(chunk_index, None)
+        self.send_times.pop(chunk_index, None)
+        return True
+
+    def slide_window(self) -> None:
+        previous_base = self.base
+
+        while self.base in self.acked_chunks:
+            self.acked_chunks.remove(self.base)
+            self.base += 1
+
+        if self.base != previous_base:
+            self.logger.debug("Received ack of packet %d", self.base)
+            self.last_progress = time()
+
+    def await_ack_phase(
+        self, total_chunks: int, already_received_fin_back: MutableVariable
+    ) -> None:
+        remaining_until_retransmission = self.time_until_next_retransmission()
+        if remaining_until_retransmission <= 0:
+            raise RetransmissionNeeded()
+
+        self.protocol.socket.set_timeout(remaining_until_retransmission)
+
+        try:
+            packet = self.protocol.wait_for_selective_ack()
+        except UnexpectedFinMessage as e:
+            packet = e.packet
+            if not packet.is_ack and packet.is_fin:
+                already_received_fin_back.value = True
+            return
+
+        if not packet.is_ack:
+            return
+
+        selectively_acked_chunk = (
+            packet.sequence_number - self.offset_initial_seq_number.value
+        )
+        self.sample_rtt(selectively_acked_chunk)
+        newly_acked_chunks = 0
+
+        if packet.ack_number > self.ack_number.value:
+            acked_up_to = packet.ack_number - self.ack_offset
+
+            for chunk_index in range(self.base, min(
+                    acked_up_to + 1, self.next_seq_num)):
+                newly_acked_chunks += self.mark_as_acked(chunk_index)
+
+            self.ack_number = SequenceNumber(
+                packet.ack_number, self.protocol.protocol_version
+            )
+
+        newly_acked_chunks += self.mark_as_acked(selectively_acked_chunk)
+        self.congestion_controller.on_ack(newly_acked_chunks)
+        self.slide_window()
+
+    @abstractmethod
+    def send_file_chunk(
+            self,
+            sequence_number: SequenceNumber,
+            chunk: bytes | memoryview,
+            chunk_len: int,
+            is_last_chunk: bool,
+            digest: bytes | None,
+            is_compressed: bool) -> bytes | list:
+        pass
+
+    @abstractmethod
+    def create_chunk_source(self, file, filesize) -> WindowedChunkSource:
+        pass
@@ -1,43 +1,87 @@
 from socket import socket as Socket
-from socket import timeout as SocketTimeout
 
 from lib.common.address import Address
-from lib.common.constants import (
-    SOCKET_RETRANSMIT_WINDOW_TIMEOUT,
-)
+from lib.common.datagram_batch import DatagramBatcher
+from lib.common.deadline_timer import Timer
 from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.logger import CoolLogger
+from lib.common.rtt_estimator import RttEstimator
+from lib.common.transfer_trace import TransferTrace
 
 
 class SocketGbn:
-    def __init__(self, _socket: Socket, logger: CoolLogger):
+    def __init__(
+            self,
+            _socket: Socket,
+            logger: CoolLogger,
+            rtt_estimator: RttEstimator | None = None,
+            datagrams: DatagramBatcher | None = None,
+            trace: TransferTrace | None = None):
         self.socket = _socket
         self.logger = logger
-        self.timeout = SOCKET_RETRANSMIT_WINDOW_TIMEOUT
+        # Shared with the SocketSaw of the connection when there is one
+        self.rtt_estimator = rtt_estimator or RttEstimator()
+        self.timeout = self.rtt_estimator.retransmission_timeout
+        self.retransmission_timer = Timer()
+        self.socket.settimeout(None)
+        self.datagrams = datagrams or DatagramBatcher(self.socket)
+        self.trace: TransferTrace | None = trace
 
     def sendto(self, data: bytes, to_address: Address):
+        self.sendmsg([data], to_address)
+
+    def sendmsg(self, buffers: list, to_address: Address):
         try:
-            self.socket.sendto(data, to_address.to_tuple())
+            self.datagrams.send(buffers, to_address.to_tuple())
         except OSError:
             raise SocketShutdown()
 
-    def recvfrom(self, buffer_size: int):
+    # Packets sent until the flush leave together, with a single call
+    def hold_sends(self):
+        self.datagrams.hold_sends()
+
+    def flush_sends(self):
         try:
-            self.socket.settimeout(self.timeout)
-            raw_packet, server_address_tuple = self.socket.recvfrom(
-                buffer_size)
-            return raw_packet, server_address_tuple
+            self.datagrams.flush_sends()
+        except OSError:
+            raise SocketShutdown()
 
-        except SocketTimeout:
-            raise RetransmissionNeeded()
+    def recvfrom(self, buffer_size: int):
+        if self.timeout is not None:
+            self.retransmission_timer.arm(self.timeout)
 
+        try:
+            raw_packet, server_address_tuple = self.receive_before_expiry(
+                buffer_size)
         except OSError:
             raise SocketShutdown()
+        finally:
+            self.retransmission_timer.disarm()
+
+        if raw_packet is None:
+            raise RetransmissionNeeded()
+        return raw_packet, server_address_tuple
 
     def set_timeout(self, timeout):
         self.timeout = timeout
-        self.socket.settimeout(timeout)
+
+    # Gives None once the retransmission timer expired instead of a packet
+    def receive_before_expiry(self, buffer_size: int):
+        try:
+            return self.receive_into_buffer(
+                buffer_size, self.retransmission_timer.deadline)
+        except TimeoutError:
+            return None, None
+
+    def receive_into_buffer(
+            self,
+            buffer_size: int,
+            deadline: float | None = None):
+        return self.datagrams.receive(buffer_size, deadline)
+
+    def set_retransmission_timeout(self):
+        self.set_timeout(self.rtt_estimator.retransmission_timeout)
 
     def shutdown(self, shutdown_type):
         self.socket.shutdown(shutdown_type)
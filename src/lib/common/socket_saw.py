@@ -1,16 +1,20 @@
-from time import time
 from socket import socket as Socket
-from socket import timeout as SocketTimeout
+from time import time
 
 from lib.common.address import Address
 from lib.common.constants import (
-    MAX_RETRANSMISSION_ATTEMPTS,
-    SOCKET_RETRANSMISSION_TIMEOUT,
+    MAX_TIMEOUT_RETRANSMISSION_ATTEMPTS,
     SOCKET_CONNECTION_LOST_TIMEOUT,
+    TRACE_TIMEOUT,
 )
+from lib.common.datagram_batch import DatagramBatcher
+from lib.common.deadline_timer import Timer, earliest_deadline
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.logger import CoolLogger
+from lib.common.rtt_estimator import RttEstimator
+from lib.common.transfer_metrics import TransferMetrics
+from lib.common.transfer_trace import TransferTrace, create_transfer_trace
 
 
 class SocketSaw:
@@ -19,18 +23,53 @@ class SocketSaw:
         self.logger = logger
         self.last_raw_packet = None
         self.last_address = None
-
-    def save_state(self, data: bytes, to_address: Address):
+        self.rtt_estimator = RttEstimator()
+        # Only set while the last packet was transmitted a single time
+        self.last_sent_time: float | None = None
+        self.last_received_time: float | None = None
+        # Receptions block until the first of the deadlines armed expires
+        self.retransmission_timer = Timer()
+        self.connection_lost_timer = Timer()
+        self.socket.settimeout(None)
+        # Datagrams drained with the ones of a batch are kept here, it is
+        # handed to the SocketGbn of the connection so none of them is lost
+        self.datagrams = DatagramBatcher(self.socket)
+        # Events of the connection, handed to its SocketGbn too. Only kept
+        # when tracing
+        self.trace: TransferTrace | None = create_transfer_trace()
+
+    # Connections measured count their datagrams, RTT samples and events
+    def measure(self, metrics: TransferMetrics) -> None:
+        self.datagrams.metrics = metrics
+        self.rtt_estimator.metrics = metrics
+        if self.trace is None:
+            self.trace = create_transfer_trace(metrics)
+        else:
+            self.trace.metrics = metrics
+
+    def save_state(self, data: bytes | list, to_address: Address):
         self.last_raw_packet = data
         self.last_address = to_address
+        self.last_sent_time = time()
+        self.last_received_time = None
 
-    def sendto(self, data: bytes, to_address: Address):
-        self.save_state(data, to_address)
+    # Retransmissions go through the batcher too, so they get checksums
+    def transmit(self, data: bytes | list, to_address: Address):
         try:
-            self.socket.sendto(data, to_address.to_tuple())
+            self.datagrams.send(
+                data if isinstance(data, list) else [data],
+                to_address.to_tuple())
         except OSError:
             raise SocketShutdown()
 
+    def sendto(self, data: bytes, to_address: Address):
+        self.save_state(data, to_address)
+        self.transmit(data, to_address)
+
+    def sendmsg(self, buffers: list, to_address: Address):
+        self.save_state(buffers, to_address)
+        self.transmit(buffers, to_address)
+
     def retransmit_last_packet(self, attempt_number: int):
         if self.last_raw_packet is None:
             return
@@ -38,7 +77,10 @@ class SocketSaw:
         self.logger.warn(
             f"Retransmission from timeout attempt number {
                 attempt_number - 1}")
-        self.sendto(self.last_raw_packet, self.last_address)
+        self.last_sent_time = None
+        if self.trace is not None:
+            self.trace.record(TRACE_TIMEOUT, 0, attempt_number)
+        self.transmit(self.last_raw_packet, self.last_address)
 
     def retransmit_last_packet_for_re_listen(
             self, re_listen_attempmt: int):
@@ -48,60 +90,54 @@ class SocketSaw:
         self.logger.warn(
             f"Retransmission from re-listen attempt number {re_listen_attempmt - 1}"
         )
-        self.sendto(self.last_raw_packet, self.last_address)
+        self.last_sent_time = None
+        self.transmit(self.last_raw_packet, self.last_address)
 
     def recvfrom_with_retransmission(self, buffer_size: int):
         transmission_attempt = 1
-        raw_packet, server_address_tuple = None, None
-        connection_lost_deadline = time() + SOCKET_CONNECTION_LOST_TIMEOUT
-
-        did_not_exceed_max_retransmissions = (
-            transmission_attempt <= MAX_RETRANSMISSION_ATTEMPTS
-        )
-        connection_not_lost_yet = time() <= connection_lost_deadline
-        can_still_retransmit = (
-            did_not_exceed_max_retransmissions and connection_not_lost_yet
-        )
-        while can_still_retransmit:
-            retransmission_necessary_deadline = time() + SOCKET_RETRANSMISSION_TIMEOUT
+        self.connection_lost_timer.arm(SOCKET_CONNECTION_LOST_TIMEOUT)
 
+        try:
             while True:
-                remaining_until_retransmission = (
-                    retransmission_necessary_deadline - time()
-                )
-
-                if remaining_until_retransmission <= 0:
-                    transmission_attempt += 1
-
-                    did_not_exceed_max_retransmissions = (
-                        transmission_attempt <= MAX_RETRANSMISSION_ATTEMPTS
-                    )
-                    connection_not_lost_yet = time() <= connection_lost_deadline
-                    can_still_retransmit = (
-                        did_not_exceed_max_retransmissions and connection_not_lost_yet)
-
-                    if can_still_retransmit:
-                        self.retransmit_last_packet(transmission_attempt)
-                    else:
-                        self.logger.debug("Connection lost")
-                        raise ConnectionLost()
-                    break
-                else:
-                    try:
-                        self.socket.settimeout(
-                            remaining_until_retransmission)
-                        raw_packet, server_address_tuple = self.socket.recvfrom(
-                            buffer_size)
-                        self.socket.settimeout(
-                            SOCKET_CONNECTION_LOST_TIMEOUT)
-                        return raw_packet, server_address_tuple
-
-                    except SocketTimeout:
-                        continue
-
-                    except OSError:
-                        raise SocketShutdown()
-        return raw_packet, server_address_tuple
+                self.retransmission_timer.arm(
+                    self.rtt_estimator.retransmission_timeout)
+                raw_packet, server_address_tuple = self.receive_before_expiry(
+                    buffer_size,
+                    self.retransmission_timer,
+                    self.connection_lost_timer)
+
+                if raw_packet is not None:
+                    self.last_received_time = time()
+                    return raw_packet, server_address_tuple
+
+                transmission_attempt += 1
+                if (transmission_attempt > MAX_TIMEOUT_RETRANSMISSION_ATTEMPTS
+                        or self.connection_lost_timer.expired):
+                    self.logger.debug("Connection lost")
+                    raise ConnectionLost()
+
+                self.rtt_estimator.back_off()
+                self.retransmit_last_packet(transmission_attempt)
+
+        except OSError:
+            raise SocketShutdown()
+
+        finally:
+            self.retransmission_timer.disarm()
+            self.connection_lost_timer.disarm()
+
+    # Called once the received packet is known to answer the last one sent,
+    # a peer retransmission arriving in between must not be taken as a sample
+    def sample_rtt(self):
+        if self.last_received_time is None:
+            return
+
+        if self.last_sent_time is not None:
+            self.rtt_estimator.add_sample(
+                self.last_received_time - self.last_sent_time)
+
+        self.last_sent_time = None
+        self.last_received_time = None
 
     def recvfrom(
             self,
@@ -109,22 +145,42 @@ class SocketSaw:
             should_retransmit: bool,
             do_not_timeout: bool = False):
         if not should_retransmit or self.last_raw_packet is None:
+            if not do_not_timeout:
+                self.connection_lost_timer.arm(SOCKET_CONNECTION_LOST_TIMEOUT)
+
             try:
-                if do_not_timeout:
-                    self.socket.settimeout(None)
-                else:
-                    self.socket.settimeout(SOCKET_CONNECTION_LOST_TIMEOUT)
-
-                raw_packet, server_address_tuple = self.socket.recvfrom(
-                    buffer_size)
-                return raw_packet, server_address_tuple
+                raw_packet, server_address_tuple = self.receive_before_expiry(
+                    buffer_size, self.connection_lost_timer)
             except OSError:
                 raise ConnectionLost()
+            finally:
+                self.connection_lost_timer.disarm()
+
+            if raw_packet is None:
+                raise ConnectionLost()
+            return raw_packet, server_address_tuple
 
         raw_packet, server_address_tuple = self.recvfrom_with_retransmission(
             buffer_size)
         return raw_packet, server_address_tuple
 
+    # Gives None once any of the timers expired instead of a packet
+    def receive_before_expiry(self, buffer_size: int, *timers):
+        try:
+            return self.receive_into_buffer(
+                buffer_size, earliest_deadline(timers))
+        except TimeoutError:
+            return None, None
+
+    def receive_into_buffer(
+            self,
+            buffer_size: int,
+            deadline: float | None = None):
+        return self.datagrams.receive(buffer_size, deadline)
+
+    def put_back(self, raw_packet, address_tuple: tuple[str, int]):
+        self.datagrams.put_back(raw_packet, address_tuple)
+
     def shutdown(self, shutdown_type):
         self.socket.shutdown(shutdown_type)
 
@@ -134,3 +190,5 @@ class SocketSaw:
     def reset_state(self):
         self.last_address = None
         self.last_raw_packet = None
+        self.last_sent_time = None
+        self.last_received_time = None
@@ -0,0 +1,29 @@
+from hashlib import sha256
+
+
+# SHA-256 of the bytes moved by a transfer, fed with them as they are sent
+# or received so the file is never read again for it. Senders tell theirs
+# along with the last chunk, receivers compare it with their own
+class TransferDigest:
+    def __init__(self):
+        self.hasher = sha256()
+        # Only set once the sender told it
+        self.expected: bytes | None = None
+
+    def update(self, data) -> None:
+        self.hasher.update(data)
+
+    def digest(self) -> bytes:
+        return self.hasher.digest()
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+    @property
+    def is_verified(self) -> bool:
+        return self.expected is not None and self.expected == self.digest()
+
+    # Transfers cut short never got told the digest, they are not corrupted
+    @property
+    def is_corrupted(self) -> bool:
+        return self.expected is not None and self.expected != self.digest()
@@ -0,0 +1,185 @@
+import json
+from os import path, remove, replace
+
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.constants import JOURNAL_FILE_SUFFIX, JOURNAL_SAVE_INTERVAL
+from lib.common.transfer_digest import TransferDigest
+
+
+# Byte ranges of a partial file known to be written, kept next to it so an
+# interrupted transfer can go on from where it stopped
+class TransferJournal:
+    def __init__(self, filepath: str):
+        self.journal_path: str = filepath + JOURNAL_FILE_SUFFIX
+        self.filesize: int | None = None
+        self.ranges: list[list[int]] = []
+        # Only set for files striped across several connections
+        self.transfer_id: int | None = None
+
+    def exists(self) -> bool:
+        return path.isfile(self.journal_path)
+
+    def load(self) -> bool:
+        try:
+            with open(self.journal_path) as journal_file:
+                journal = json.load(journal_file)
+            self.filesize = journal["filesize"]
+            self.ranges = [
+                [int(start), int(end)] for start, end in journal["ranges"]]
+            self.transfer_id = journal.get("transfer_id")
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    # Bytes from the start of the file with no gap in between
+    @property
+    def received_bytes(self) -> int:
+        for start, end in self.ranges:
+            if start == 0:
+                return end
+        return 0
+
+    def record(self, start: int, end: int) -> None:
+        if start >= end:
+            return
+
+        merged = [start, end]
+        ranges = []
+        for other in self.ranges:
+            if other[1] < merged[0] or merged[1] < other[0]:
+                ranges.append(other)
+            else:
+                merged = [min(merged[0], other[0]), max(merged[1], other[1])]
+        ranges.append(merged)
+        self.ranges = sorted(ranges)
+
+    # Bytes of the range are written again by the next transfer
+    def forget(self, start: int, end: int) -> None:
+        ranges = []
+        for other_start, other_end in self.ranges:
+            if other_start < start:
+                ranges.append([other_start, min(other_end, start)])
+            if end < other_end:
+                ranges.append([max(other_start, end), other_end])
+        self.ranges = ranges
+
+    def reset(
+            self,
+            filesize: int | None = None,
+            transfer_id: int | None = None) -> None:
+        self.filesize = filesize
+        self.ranges = []
+        self.transfer_id = transfer_id
+        self.save()
+
+    # Written aside and moved over the old journal, a crash leaves either of
+    # them whole
+    def save(self) -> None:
+        temporary_path = self.journal_path + ".tmp"
+        with open(temporary_path, "w") as journal_file:
+            json.dump(
+                {
+                    "filesize": self.filesize,
+                    "ranges": self.ranges,
+                    "transfer_id": self.transfer_id,
+                },
+                journal_file)
+        replace(temporary_path, self.journal_path)
+
+    def remove(self) -> None:
+        try:
+            remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+
+
+# File written from start to end whose progress is saved to its journal every
+# JOURNAL_SAVE_INTERVAL bytes, the data is flushed before the journal claims
+# it
+class JournaledFile:
+    def __init__(self, file, journal: TransferJournal):
+        self.file = file
+        self.journal: TransferJournal = journal
+        self.offset: int = file.tell()
+        self.position: int = self.offset
+        self.saved_position: int = self.offset
+        # Only set when the sender tells the digest of what it sends
+        self.digest: TransferDigest | None = None
+        # Only set when the sender may compress what it sends
+        self.codec: ChunkCodec | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def write(self, data) -> None:
+        self.file.write(data)
+        self.position += len(data)
+        if self.digest is not None:
+            self.digest.update(data)
+
+        if self.position - self.saved_position >= JOURNAL_SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        self.file.flush()
+        self.journal.record(self.saved_position, self.position)
+        self.journal.save()
+        self.saved_position = self.position
+
+    # Drops what was received so far and starts over from the beginning
+    def restart(self, filesize: int | None) -> None:
+        self.file.seek(0)
+        self.file.truncate()
+        self.offset = self.position = self.saved_position = 0
+        self.journal.reset(filesize)
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+
+        self.save()
+        self.file.close()
+
+    def complete(self) -> None:
+        self.file.close()
+        self.journal.remove()
+
+    # What was written since it was opened can not be trusted, the journal
+    # is kept without it so a resumed transfer writes it again
+    def discard(self) -> None:
+        self.file.close()
+        self.journal.forget(self.offset, self.position)
+        self.journal.save()
+
+
+# Range of a file whose other ranges are written by other connections, each
+# at its own offset. They all share the journal, which is only read and
+# updated while holding the lock, and the one that finds every byte of the
+# file written drops it
+class RangeFile(JournaledFile):
+    def __init__(self, file, journal: TransferJournal, lock):
+        super().__init__(file, journal)
+        self.lock = lock
+
+    def save(self) -> None:
+        self.file.flush()
+        with self.lock():
+            self.journal.load()
+            self.journal.record(self.saved_position, self.position)
+            self.journal.save()
+        self.saved_position = self.position
+
+    def discard(self) -> None:
+        self.file.close()
+        with self.lock():
+            self.journal.load()
+            self.journal.forget(self.offset, self.position)
+            self.journal.save()
+
+    def complete(self) -> None:
+        self.close()
+        with self.lock():
+            if (self.journal.load()
+                    and self.journal.received_bytes >= self.journal.filesize):
+                self.journal.remove()
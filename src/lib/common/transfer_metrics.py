@@ -0,0 +1,69 @@
+from bisect import bisect_left
+from time import monotonic
+
+from lib.common.constants import (
+    RTT_HISTOGRAM_BUCKETS,
+    TRACE_CHUNK_RECEIVED,
+    TRACE_CHUNK_SENT,
+    TRACE_EVENTS,
+)
+
+
+# Counters of a connection, fed by its datagrams, its RTT samples and the
+# events of its trace. They are plain attributes only the thread running the
+# connection writes, so whoever reads them gets them as they are without
+# taking a lock
+class TransferMetrics:
+    def __init__(self) -> None:
+        self.started: float = monotonic()
+        self.datagrams_sent: int = 0
+        self.bytes_sent: int = 0
+        self.datagrams_received: int = 0
+        self.bytes_received: int = 0
+        # Events and the bytes of their chunks, by event
+        self.events: list[int] = [0] * TRACE_EVENTS
+        self.event_bytes: list[int] = [0] * TRACE_EVENTS
+        # Samples by bucket, the last one for those past every bound
+        self.rtt_buckets: list[int] = [0] * (len(RTT_HISTOGRAM_BUCKETS) + 1)
+        self.rtt_sum: float = 0
+
+    def on_sent(self, n_bytes: int) -> None:
+        self.datagrams_sent += 1
+        self.bytes_sent += n_bytes
+
+    def on_received(self, n_bytes: int) -> None:
+        self.datagrams_received += 1
+        self.bytes_received += n_bytes
+
+    def on_event(self, event: int, size: int) -> None:
+        self.events[event] += 1
+        self.event_bytes[event] += size
+
+    def observe_rtt(self, rtt: float) -> None:
+        self.rtt_buckets[bisect_left(RTT_HISTOGRAM_BUCKETS, rtt)] += 1
+        self.rtt_sum += rtt
+
+    # Chunks of the file sent for the first time or written once received
+    @property
+    def file_bytes(self) -> int:
+        return (self.event_bytes[TRACE_CHUNK_SENT]
+                + self.event_bytes[TRACE_CHUNK_RECEIVED])
+
+    @property
+    def goodput(self) -> float:
+        return self.file_bytes / max(monotonic() - self.started, 1e-9)
+
+    # Folds the counters of a finished connection into these
+    def add(self, other: "TransferMetrics") -> None:
+        self.datagrams_sent += other.datagrams_sent
+        self.bytes_sent += other.bytes_sent
+        self.datagrams_received += other.datagrams_received
+        self.bytes_received += other.bytes_received
+        self.rtt_sum += other.rtt_sum
+
+        for event in range(TRACE_EVENTS):
+            self.events[event] += other.events[event]
+            self.event_bytes[event] += other.event_bytes[event]
+
+        for bucket, samples in enumerate(other.rtt_buckets):
+            self.rtt_buckets[bucket] += samples
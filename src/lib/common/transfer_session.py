@@ -0,0 +1,316 @@
+from bisect import bisect_right
+from io import UnsupportedOperation
+from itertools import accumulate
+from os import path, remove
+from struct import Struct
+from struct import error as StructError
+
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.constants import JOURNAL_FILE_SUFFIX, STRING_ENCODING_FORMAT
+from lib.common.exceptions.invalid_filename import InvalidFilename
+from lib.common.exceptions.session_file_shrank import SessionFileShrank
+from lib.common.file_handler import FileHandler
+from lib.common.logger import CoolLogger
+from lib.common.transfer_digest import TransferDigest
+
+# ! -> byte order for network (= big-endian)
+# I -> length of the manifest (4 bytes)
+MANIFEST_HEADER = Struct("!I")
+# H -> length of the name (2 bytes)
+# Q -> filesize (8 bytes)
+ENTRY_HEADER = Struct("!HQ")
+GLOB_SPECIAL_CHARACTERS = "*?["
+FROM_START = 0
+FROM_CURRENT_POSITION = 1
+
+
+def is_glob_pattern(text: str) -> bool:
+    return any(character in text for character in GLOB_SPECIAL_CHARACTERS)
+
+
+# Files of a session are stored by their name alone, next to the others
+def is_valid_session_name(name: str) -> bool:
+    return (
+        name not in ("", ".", "..")
+        and path.basename(name) == name
+        and not name.endswith(JOURNAL_FILE_SUFFIX))
+
+
+def encode_manifest(entries: list[tuple[str, int]]) -> bytes:
+    manifest = b"".join(
+        ENTRY_HEADER.pack(len(encoded_name), filesize) + encoded_name
+        for encoded_name, filesize in (
+            (name.encode(STRING_ENCODING_FORMAT), filesize)
+            for name, filesize in entries))
+
+    return MANIFEST_HEADER.pack(len(manifest)) + manifest
+
+
+def decode_manifest(manifest: bytes | memoryview) -> list[tuple[str, int]]:
+    entries = []
+    position = 0
+
+    try:
+        while position < len(manifest):
+            length, filesize = ENTRY_HEADER.unpack_from(manifest, position)
+            position += ENTRY_HEADER.size
+            if position + length > len(manifest):
+                raise ValueError("Truncated session manifest entry")
+
+            name = str(
+                manifest[position:position + length], STRING_ENCODING_FORMAT)
+            entries.append((name, filesize))
+            position += length
+    except StructError:
+        raise ValueError("Truncated session manifest entry header") from None
+    except UnicodeDecodeError:
+        raise ValueError("Session manifest with an invalid name") from None
+
+    return entries
+
+
+# Many files read as a single one, a manifest with the name and size of each
+# of them followed by their bytes one after the other. Only the file being
+# read is kept open
+class SessionReader:
+    def __init__(
+        self,
+        file_handler: FileHandler,
+        entries: list[tuple[str, str]],
+        is_path_complete: bool,
+    ):
+        self.file_handler: FileHandler = file_handler
+        self.filepaths: list[str] = [filepath for filepath, _name in entries]
+        self.is_path_complete: bool = is_path_complete
+
+        filesizes = [
+            file_handler.get_filesize(filepath, is_path_complete)
+            for filepath in self.filepaths]
+        self.manifest: bytes = encode_manifest([
+            (name, filesize)
+            for (_filepath, name), filesize in zip(
+                entries, filesizes, strict=True)])
+
+        # Segment 0 is the manifest, every file is the segment after it
+        segment_sizes = [len(self.manifest), *filesizes]
+        self.segment_starts: list[int] = [0, *accumulate(segment_sizes)][:-1]
+        self.size: int = sum(segment_sizes)
+
+        self.position: int = 0
+        self.open_segment: int | None = None
+        self.file = None
+        self.closed: bool = False
+
+    def __len__(self) -> int:
+        return len(self.filepaths)
+
+    def fileno(self) -> int:
+        raise UnsupportedOperation("A session is not a single file")
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = FROM_START) -> int:
+        if whence == FROM_CURRENT_POSITION:
+            offset += self.position
+        self.position = max(0, min(offset, self.size))
+        return self.position
+
+    def read(self, n_bytes: int = -1) -> bytes:
+        if n_bytes < 0:
+            n_bytes = self.size - self.position
+
+        chunks = []
+        while n_bytes > 0 and self.position < self.size:
+            # Empty files share their start with the segment after them,
+            # so they are never the one found
+            segment = bisect_right(self.segment_starts, self.position) - 1
+            segment_end = (
+                self.segment_starts[segment + 1]
+                if segment + 1 < len(self.segment_starts) else self.size)
+            data = self.read_segment(
+                segment,
+                self.position - self.segment_starts[segment],
+                min(n_bytes, segment_end - self.position))
+
+            # The manifest already told the receiver the size it had, what
+            # is missing can not be sent
+            if not data:
+                raise SessionFileShrank(
+                    f"File {self.filepaths[segment - 1]} shrank while the "
+                    "session was being sent")
+
+            chunks.append(data)
+            self.position += len(data)
+            n_bytes -= len(data)
+
+        return b"".join(chunks)
+
+    def read_segment(self, segment: int, offset: int, n_bytes: int) -> bytes:
+        if segment == 0:
+            return self.manifest[offset:offset + n_bytes]
+
+        if self.open_segment != segment:
+            self.close_file()
+            self.file = self.file_handler.open_file_read_mode(
+                self.filepaths[segment - 1], self.is_path_complete)
+            self.open_segment = segment
+
+        if self.file.tell() != offset:
+            self.file.seek(offset)
+        return self.file.read(n_bytes)
+
+    def close_file(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.open_segment = None
+
+    def close(self) -> None:
+        self.close_file()
+        self.closed = True
+
+
+# Splits what a session reader sent back into its files. Files that can not
+# be stored, as they already exist or have an invalid name, are skipped and
+# their bytes dropped, the file being written when the session is cut short
+# is removed
+class SessionWriter:
+    def __init__(self, file_handler: FileHandler, logger: CoolLogger):
+        self.file_handler: FileHandler = file_handler
+        self.logger: CoolLogger = logger
+
+        self.manifest = bytearray()
+        self.entries: list[tuple[str, int]] | None = None
+        self.entry_index: int = -1
+        self.remaining_bytes: int = 0
+        self.file = None
+        self.received_files: int = 0
+        self.skipped_files: int = 0
+        self.stored_names: list[str] = []
+        self.closed: bool = False
+        # Only set when the sender tells the digest of what it sends
+        self.digest: TransferDigest | None = None
+        # Only set when the sender may compress what it sends
+        self.codec: ChunkCodec | None = None
+
+    @property
+    def is_complete(self) -> bool:
+        return (self.entries is not None
+                and self.entry_index >= len(self.entries))
+
+    def write(self, data) -> None:
+        if self.digest is not None:
+            self.digest.update(data)
+        view = memoryview(data)
+
+        while len(view) > 0 and not self.is_complete:
+            if self.entries is None:
+                view = self.write_manifest(view)
+                continue
+
+            n_bytes = min(self.remaining_bytes, len(view))
+            if self.file is not None:
+                self.file.write(view[:n_bytes])
+            self.remaining_bytes -= n_bytes
+            view = view[n_bytes:]
+
+            if self.remaining_bytes == 0:
+                self.next_entry()
+
+    # Until its header arrives the manifest is only known to be as long as it
+    def manifest_size(self) -> int:
+        if len(self.manifest) < MANIFEST_HEADER.size:
+            return MANIFEST_HEADER.size
+        return MANIFEST_HEADER.size + MANIFEST_HEADER.unpack_from(
+            self.manifest)[0]
+
+    def write_manifest(self, view: memoryview) -> memoryview:
+        n_bytes = min(self.manifest_size() - len(self.manifest), len(view))
+        self.manifest += view[:n_bytes]
+
+        if (len(self.manifest) >= MANIFEST_HEADER.size
+                and len(self.manifest) == self.manifest_size()):
+            self.entries = decode_manifest(
+                memoryview(self.manifest)[MANIFEST_HEADER.size:])
+            self.logger.debug(f"Receiving a session of {
+                len(self.entries)} files")
+            self.next_entry()
+
+        return view[n_bytes:]
+
+    def next_entry(self) -> None:
+        self.finish_file()
+
+        while True:
+            self.entry_index += 1
+            if self.is_complete:
+                self.logger.info(
+                    f"Session received: {self.received_files} files stored, "
+                    f"{self.skipped_files} skipped")
+                return
+
+            name, filesize = self.entries[self.entry_index]
+            self.file = self.open_entry(name)
+            self.remaining_bytes = filesize
+            if filesize > 0:
+                return
+
+            self.finish_file()
+
+    def open_entry(self, name: str):
+        if not is_valid_session_name(name):
+            self.logger.warn(f"Skipping file with invalid name '{name}'")
+            self.skipped_files += 1
+            return None
+
+        try:
+            return self.file_handler.open_file_write_mode(
+                name, is_path_complete=False)
+        except InvalidFilename:
+            self.logger.warn(f"Skipping file '{name}', it already exists")
+            self.skipped_files += 1
+            return None
+
+    def finish_file(self) -> None:
+        if self.file is None:
+            return
+
+        self.file.close()
+        self.file = None
+        self.received_files += 1
+        name, filesize = self.entries[self.entry_index]
+        self.stored_names.append(name)
+        self.logger.debug(f"Stored file {name} of {
+            self.file_handler.bytes_to_kilobytes(filesize)} kB")
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        self.closed = True
+        if self.file is None:
+            return
+
+        self.file.close()
+        self.file = None
+        name, _filesize = self.entries[self.entry_index]
+        self.logger.warn(f"Session cut short, removing incomplete file {name}")
+        try:
+            remove(self.file_handler.get_filepath(
+                name, is_path_complete=False))
+        except OSError as e:
+            self.logger.debug(f"Could not remove incomplete file: {e}")
+
+    # Which of the files stored got corrupted can not be told, none of them
+    # is kept
+    def discard(self) -> None:
+        self.close()
+        for name in self.stored_names:
+            self.logger.warn(f"Removing file {name} of a corrupted session")
+            try:
+                remove(self.file_handler.get_filepath(
+                    name, is_path_complete=False))
+            except OSError as e:
+                self.logger.debug(f"Could not remove corrupted file: {e}")
+        self.stored_names = []
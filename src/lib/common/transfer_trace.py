@@ -0,0 +1,117 @@
+from os import path
+from struct import Struct
+from time import monotonic, time
+
+from lib.common.constants import TRACE_CAPACITY, TRACE_FILE_EXTENSION
+from lib.common.transfer_metrics import TransferMetrics
+
+# < -> little-endian, without padding
+# 4s -> magic (4 bytes)
+# B -> version of the format (1 byte)
+# I -> events the ring holds (4 bytes)
+# Q -> events recorded, those past the capacity were dropped (8 bytes)
+TRACE_HEADER = Struct("<4sBIQ")
+TRACE_MAGIC = b"TRCE"
+TRACE_VERSION = 1
+# d -> monotonic time of the event (8 bytes)
+# B -> event (1 byte)
+# I -> chunk (4 bytes)
+# I -> sequence or ack number on the wire, if any (4 bytes)
+# I -> bytes of the chunk, if any (4 bytes)
+TRACE_EVENT = Struct("<dBIII")
+NUMBER_MASK = 0xFFFFFFFF
+
+# Directory the traces are written to, only set when tracing
+tracing_dirpath: str | None = None
+
+
+# Events of a connection, packed into a ring preallocated when it starts so
+# recording one costs a clock read and a pack. Connections measured by the
+# server feed their metrics with them too, without a ring if not tracing
+class TransferTrace:
+    def __init__(
+            self,
+            capacity: int = TRACE_CAPACITY,
+            metrics: TransferMetrics | None = None) -> None:
+        self.capacity: int = capacity
+        self.ring: bytearray = bytearray(capacity * TRACE_EVENT.size)
+        self.recorded: int = 0
+        self.metrics: TransferMetrics | None = metrics
+
+    def record(
+            self,
+            event: int,
+            chunk: int,
+            number: int = 0,
+            size: int = 0) -> None:
+        if self.metrics is not None:
+            self.metrics.on_event(event, size)
+        if self.capacity == 0:
+            return
+
+        TRACE_EVENT.pack_into(
+            self.ring,
+            self.recorded % self.capacity * TRACE_EVENT.size,
+            monotonic(),
+            event,
+            chunk & NUMBER_MASK,
+            number & NUMBER_MASK,
+            size & NUMBER_MASK)
+        self.recorded += 1
+
+    # Oldest event first
+    def to_bytes(self) -> bytes:
+        header = TRACE_HEADER.pack(
+            TRACE_MAGIC, TRACE_VERSION, self.capacity, self.recorded)
+        if self.recorded <= self.capacity:
+            return header + self.ring[:self.recorded * TRACE_EVENT.size]
+
+        split = self.recorded % self.capacity * TRACE_EVENT.size
+        return header + self.ring[split:] + self.ring[:split]
+
+    def dump(self, filepath: str) -> None:
+        with open(filepath, "wb") as trace_file:
+            trace_file.write(self.to_bytes())
+
+
+def load_transfer_trace(
+        filepath: str) -> list[tuple[float, int, int, int, int]]:
+    with open(filepath, "rb") as trace_file:
+        data = trace_file.read()
+
+    magic, version, _capacity, _recorded = TRACE_HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{filepath} is not a transfer trace")
+
+    return list(TRACE_EVENT.iter_unpack(data[TRACE_HEADER.size:]))
+
+
+def enable_tracing(dirpath: str | None) -> None:
+    global tracing_dirpath
+    tracing_dirpath = dirpath
+
+
+# Connections are traced only when tracing was enabled, the events of those
+# measured are recorded all the same
+def create_transfer_trace(
+        metrics: TransferMetrics | None = None) -> TransferTrace | None:
+    if tracing_dirpath is not None:
+        return TransferTrace(metrics=metrics)
+    if metrics is not None:
+        return TransferTrace(0, metrics)
+    return None
+
+
+# Written once the connection is over, named after it and when it ended.
+# Gives where it was written, if it was
+def dump_transfer_trace(trace: TransferTrace | None, name: str) -> str | None:
+    if trace is None or tracing_dirpath is None or trace.recorded == 0:
+        return None
+
+    filepath = path.join(
+        tracing_dirpath, f"{name}-{int(time())}{TRACE_FILE_EXTENSION}")
+    try:
+        trace.dump(filepath)
+    except OSError:
+        return None
+    return filepath
@@ -0,0 +1,136 @@
+from random import Random
+
+from lib.common.constants import (
+    NORMAL_DELAY_DISTRIBUTION,
+    PARETO_DELAY_DISTRIBUTION,
+    PARETO_DELAY_SHAPE,
+    UNIFORM_DELAY_DISTRIBUTION,
+)
+
+
+# What a link does to the datagrams that cross it in one direction. Loss,
+# reordering, duplication and the burst transitions are probabilities,
+# delays are in seconds, the rate in bytes per second and the bucket and
+# MTU in bytes. A rate or an MTU of 0 leaves datagrams as they are
+class LinkImpairments:
+    def __init__(
+            self,
+            loss: float = 0,
+            burst_loss: float = 0,
+            burst_start: float = 0,
+            burst_end: float = 1,
+            delay: float = 0,
+            jitter: float = 0,
+            distribution: str = UNIFORM_DELAY_DISTRIBUTION,
+            reorder: float = 0,
+            duplicate: float = 0,
+            mtu: int = 0,
+            rate: float = 0,
+            bucket: int = 0):
+        self.loss: float = loss
+        self.burst_loss: float = burst_loss
+        self.burst_start: float = burst_start
+        self.burst_end: float = burst_end
+        self.delay: float = delay
+        self.jitter: float = jitter
+        self.distribution: str = distribution
+        self.reorder: float = reorder
+        self.duplicate: float = duplicate
+        self.mtu: int = mtu
+        self.rate: float = rate
+        self.bucket: int = bucket
+
+
+# One direction of the link. Losses follow the Gilbert-Elliott model: the
+# link switches between a good state and a bursting one, each losing
+# datagrams at a rate of its own. Datagrams leave as the token bucket of
+# the rate allows them to, queueing behind each other once it is empty,
+# and arrive after their delay. Those held back to reorder them wait on
+# top of it
+class ImpairedLink:
+    def __init__(
+            self,
+            impairments: LinkImpairments,
+            seed: int,
+            reorder_delay: float):
+        self.impairments: LinkImpairments = impairments
+        self.random: Random = Random(seed)
+        self.reorder_delay: float = reorder_delay
+        self.is_bursting: bool = False
+        # Bytes that can leave right away as of tokens_at, negative while
+        # datagrams queue
+        self.tokens: float = impairments.bucket
+        self.tokens_at: float = 0
+
+        self.datagrams: int = 0
+        self.lost: int = 0
+        self.duplicated: int = 0
+        self.reordered: int = 0
+        self.truncated: int = 0
+
+    # Gives when each copy of the datagram that gets through arrives,
+    # none if it is lost
+    def arrivals(self, size: int, now: float) -> list[float]:
+        self.datagrams += 1
+        if self.is_lost():
+            self.lost += 1
+            return []
+
+        arrivals = [self.arrival(size, now)]
+        if self.random.random() < self.impairments.duplicate:
+            self.duplicated += 1
+            arrivals.append(self.arrival(size, now))
+        return arrivals
+
+    # Links without bursts draw nothing for them, so they lose the same
+    # datagrams they did before bursts were modeled
+    def is_lost(self) -> bool:
+        if self.impairments.burst_start > 0:
+            if self.is_bursting:
+                self.is_bursting = (
+                    self.random.random() >= self.impairments.burst_end)
+            else:
+                self.is_bursting = (
+                    self.random.random() < self.impairments.burst_start)
+
+        loss = (
+            self.impairments.burst_loss
+            if self.is_bursting else self.impairments.loss)
+        return self.random.random() < loss
+
+    def truncate(self, data: bytes) -> bytes:
+        if 0 < self.impairments.mtu < len(data):
+            self.truncated += 1
+            return data[:self.impairments.mtu]
+        return data
+
+    def arrival(self, size: int, now: float) -> float:
+        delay = self.impairments.delay
+        if self.impairments.jitter > 0:
+            delay = max(delay + self.jitter(), 0)
+        if self.random.random() < self.impairments.reorder:
+            self.reordered += 1
+            delay += self.reorder_delay
+
+        return self.departure(size, now) + delay
+
+    def departure(self, size: int, now: float) -> float:
+        rate = self.impairments.rate
+        if rate <= 0:
+            return now
+
+        self.tokens = min(
+            self.tokens + (now - self.tokens_at) * rate,
+            self.impairments.bucket) - size
+        self.tokens_at = now
+        if self.tokens >= 0:
+            return now
+        return now - self.tokens / rate
+
+    def jitter(self) -> float:
+        jitter = self.impairments.jitter
+        if self.impairments.distribution == NORMAL_DELAY_DISTRIBUTION:
+            return self.random.gauss(0, jitter)
+        if self.impairments.distribution == PARETO_DELAY_DISTRIBUTION:
+            return jitter * (self.random.paretovariate(PARETO_DELAY_SHAPE) - 1)
+        return self.random.uniform(-jitter, jitter)
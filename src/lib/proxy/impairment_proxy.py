@@ -0,0 +1,218 @@
+from asyncio import AbstractEventLoop, Event, TimerHandle, get_running_loop
+from socket import AF_INET, SOCK_DGRAM
+from socket import socket as Socket
+
+from lib.common.address import Address
+from lib.common.constants import (
+    FULL_BUFFER_SIZE,
+    PROXY_REORDER_DELAY,
+    PROXY_SEED,
+    SAW_PROTOCOL_HEADER_SIZE,
+    SOCKET_CONNECTION_LOST_TIMEOUT,
+    USE_ANY_AVAILABLE_PORT,
+)
+from lib.common.logger import CoolLogger
+from lib.common.packet.packet import PacketParser
+from lib.proxy.impaired_link import ImpairedLink, LinkImpairments
+
+
+# Sockets the proxy relays the datagrams of a client through, one toward
+# the server and one facing the client for every port of the server it
+# talks to
+class ProxiedClient:
+    def __init__(
+            self,
+            address: tuple[str, int],
+            upstream: Socket,
+            now: float):
+        self.address: tuple[str, int] = address
+        self.upstream: Socket = upstream
+        # by port of the server
+        self.fronts: dict[int, Socket] = {}
+        # Event loop time of the last datagram relayed either way
+        self.last_active: float = now
+
+
+# Relays datagrams between clients and a server through a link that loses,
+# delays, reorders, duplicates, truncates and rate limits them. The server
+# tells clients the port of their connection in its SYN answers, the proxy
+# puts one of its own there so the rest of the connection goes through it
+# too. Clients that stay quiet as long as a lost connection is waited for
+# are forgotten, along with their sockets
+class ImpairmentProxy:
+    def __init__(
+            self,
+            listen_address: Address,
+            server_address: Address,
+            uplink: LinkImpairments,
+            downlink: LinkImpairments,
+            logger: CoolLogger,
+            seed: int = PROXY_SEED,
+            idle_timeout: float = SOCKET_CONNECTION_LOST_TIMEOUT):
+        self.listen_address: Address = listen_address
+        self.logger: CoolLogger = logger
+        self.server_address: Address = server_address
+        # Each direction draws from a random generator of its own, so one
+        # of them does not change what happens to the other
+        self.uplink: ImpairedLink = ImpairedLink(
+            uplink, 2 * seed, PROXY_REORDER_DELAY)
+        self.downlink: ImpairedLink = ImpairedLink(
+            downlink, 2 * seed + 1, PROXY_REORDER_DELAY)
+        self.clients: dict[tuple[str, int], ProxiedClient] = {}
+        self.sockets: list[Socket] = []
+        self.loop: AbstractEventLoop | None = None
+        self.listening_socket: Socket | None = None
+        self.idle_timeout: float = idle_timeout
+        self.expiry: TimerHandle | None = None
+
+    @property
+    def port(self) -> int:
+        return self.listening_socket.getsockname()[1]
+
+    def start(self, loop: AbstractEventLoop) -> None:
+        self.loop = loop
+        self.listening_socket = self.bind(self.listen_address.to_tuple())
+        self.loop.add_reader(
+            self.listening_socket,
+            self.on_client_datagrams,
+            self.listening_socket,
+            self.server_address.port)
+        self.expiry = self.loop.call_later(
+            self.idle_timeout, self.expire_idle_clients)
+
+    async def serve(self, should_stop: Event) -> None:
+        self.start(get_running_loop())
+        try:
+            await should_stop.wait()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.expiry is not None:
+            self.expiry.cancel()
+        for _socket in self.sockets:
+            self.loop.remove_reader(_socket)
+            _socket.close()
+        self.sockets.clear()
+
+    def bind(self, address_tuple: tuple[str, int]) -> Socket:
+        _socket = Socket(AF_INET, SOCK_DGRAM)
+        _socket.setblocking(False)
+        _socket.bind(address_tuple)
+        self.sockets.append(_socket)
+        return _socket
+
+    def add_client(self, address: tuple[str, int]) -> ProxiedClient:
+        upstream = self.bind(
+            (self.listen_address.host, USE_ANY_AVAILABLE_PORT))
+        client = ProxiedClient(address, upstream, self.loop.time())
+        client.fronts[self.server_address.port] = self.listening_socket
+        self.clients[address] = client
+        self.logger.debug(
+            f"Relaying {address[0]}:{address[1]} through port {
+                upstream.getsockname()[1]}")
+        self.loop.add_reader(upstream, self.on_server_datagrams, client)
+        return client
+
+    def front_for(self, client: ProxiedClient, server_port: int) -> Socket:
+        front = client.fronts.get(server_port)
+        if front is None:
+            front = self.bind(
+                (self.listen_address.host, USE_ANY_AVAILABLE_PORT))
+            client.fronts[server_port] = front
+            self.loop.add_reader(
+                front, self.on_client_datagrams, front, server_port)
+        return front
+
+    def on_client_datagrams(self, front: Socket, server_port: int) -> None:
+        for data, address in self.drain(front):
+            client = self.clients.get(address) or self.add_client(address)
+            client.last_active = self.loop.time()
+            self.relay(
+                self.uplink,
+                client.upstream,
+                data,
+                (self.server_address.host, server_port))
+
+    def on_server_datagrams(self, client: ProxiedClient) -> None:
+        for data, address in self.drain(client.upstream):
+            client.last_active = self.loop.time()
+            if (len(data) >= SAW_PROTOCOL_HEADER_SIZE
+                    and PacketParser.is_syn(data)):
+                front = self.front_for(client, PacketParser.port_of(data))
+                data = PacketParser.replace_port(
+                    data, front.getsockname()[1])
+
+            front = client.fronts.get(address[1], self.listening_socket)
+            self.relay(self.downlink, front, data, client.address)
+
+    def expire_idle_clients(self) -> None:
+        now = self.loop.time()
+        idle_clients = [
+            client for client in self.clients.values()
+            if now - client.last_active >= self.idle_timeout]
+        for client in idle_clients:
+            self.remove_client(client)
+
+        self.expiry = self.loop.call_later(
+            self.idle_timeout, self.expire_idle_clients)
+
+    # The listening socket is shared by every client, it is left open
+    def remove_client(self, client: ProxiedClient) -> None:
+        self.logger.debug(
+            f"Forgetting {client.address[0]}:{client.address[1]} after {
+                self.idle_timeout:g}s idle")
+        for _socket in [client.upstream, *client.fronts.values()]:
+            if _socket is self.listening_socket:
+                continue
+            self.loop.remove_reader(_socket)
+            self.sockets.remove(_socket)
+            _socket.close()
+        del self.clients[client.address]
+
+    def drain(self, _socket: Socket):
+        while True:
+            try:
+                yield _socket.recvfrom(FULL_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Datagrams sent to a closed port come back as an error
+                continue
+
+    def relay(
+            self,
+            link: ImpairedLink,
+            _socket: Socket,
+            data: bytes,
+            address: tuple[str, int]) -> None:
+        now = self.loop.time()
+        data = link.truncate(data)
+        for arrival in link.arrivals(len(data), now):
+            if arrival <= now:
+                self.send(_socket, data, address)
+            else:
+                self.loop.call_at(arrival, self.send, _socket, data, address)
+
+    # A full socket buffer drops the datagram, as a full queue would
+    @staticmethod
+    def send(
+            _socket: Socket,
+            data: bytes,
+            address: tuple[str, int]) -> None:
+        try:
+            _socket.sendto(data, address)
+        except OSError:
+            pass
+
+    def summary(self) -> str:
+        return (
+            f"To the server: {describe_link(self.uplink)}. "
+            f"To the clients: {describe_link(self.downlink)}")
+
+
+def describe_link(link: ImpairedLink) -> str:
+    return (
+        f"{link.datagrams} datagrams, {link.lost} lost, {
+            link.duplicated} duplicated, {link.reordered} reordered, {
+            link.truncated} truncated")
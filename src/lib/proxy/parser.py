@@ -0,0 +1,209 @@
+import argparse
+
+from lib.common.constants import (
+    DEFAULT_PORT,
+    IPV4_LOCALHOST,
+    NORMAL_DELAY_DISTRIBUTION,
+    PARETO_DELAY_DISTRIBUTION,
+    PROXY_DEFAULT_PORT,
+    PROXY_SEED,
+    UNIFORM_DELAY_DISTRIBUTION,
+)
+
+
+class ProxyArgParser:
+    def __init__(self):
+        self.internal_parser = argparse.ArgumentParser(
+            description="Relays clients to the server through a link that "
+            "loses, delays, reorders, duplicates, truncates and rate limits "
+            "datagrams, the same way both ways")
+
+    def parse(self) -> argparse.Namespace:
+        verbosity_group = self.internal_parser.add_mutually_exclusive_group(
+            required=False)
+
+        verbosity_group.add_argument(
+            "-v",
+            "--verbose",
+            action="store_true",
+            help="increase output verbosity",
+        )
+
+        verbosity_group.add_argument(
+            "-q",
+            "--quiet",
+            action="store_true",
+            help="decrease output verbosity",
+        )
+
+        self.internal_parser.add_argument(
+            "-H",
+            "--host",
+            required=False,
+            type=str,
+            default=IPV4_LOCALHOST,
+            metavar="ADDR",
+            help="IP address clients reach the proxy at",
+        )
+
+        self.internal_parser.add_argument(
+            "-p",
+            "--port",
+            required=False,
+            default=PROXY_DEFAULT_PORT,
+            type=int,
+            metavar="PORT",
+            help="port clients reach the proxy at",
+        )
+
+        self.internal_parser.add_argument(
+            "-S",
+            "--server-host",
+            required=False,
+            type=str,
+            default=IPV4_LOCALHOST,
+            metavar="ADDR",
+            help="server IP address",
+        )
+
+        self.internal_parser.add_argument(
+            "-P",
+            "--server-port",
+            required=False,
+            default=DEFAULT_PORT,
+            type=int,
+            metavar="PORT",
+            help="server port",
+        )
+
+        self.internal_parser.add_argument(
+            "-l",
+            "--loss",
+            required=False,
+            default=0,
+            type=float,
+            metavar="PERCENT",
+            help="datagrams lost",
+        )
+
+        self.internal_parser.add_argument(
+            "--burst-loss",
+            required=False,
+            default=0,
+            type=float,
+            metavar="PERCENT",
+            help="datagrams lost during a burst",
+        )
+
+        self.internal_parser.add_argument(
+            "--burst-start",
+            required=False,
+            default=0,
+            type=float,
+            metavar="PERCENT",
+            help="chance a burst starts at each datagram",
+        )
+
+        self.internal_parser.add_argument(
+            "--burst-end",
+            required=False,
+            default=100,
+            type=float,
+            metavar="PERCENT",
+            help="chance a burst ends at each datagram",
+        )
+
+        self.internal_parser.add_argument(
+            "-d",
+            "--delay",
+            required=False,
+            default=0,
+            type=float,
+            metavar="MS",
+            help="one way delay",
+        )
+
+        self.internal_parser.add_argument(
+            "-j",
+            "--jitter",
+            required=False,
+            default=0,
+            type=float,
+            metavar="MS",
+            help="delay variation",
+        )
+
+        self.internal_parser.add_argument(
+            "-D",
+            "--distribution",
+            required=False,
+            choices=[
+                UNIFORM_DELAY_DISTRIBUTION,
+                NORMAL_DELAY_DISTRIBUTION,
+                PARETO_DELAY_DISTRIBUTION,
+            ],
+            default=UNIFORM_DELAY_DISTRIBUTION,
+            metavar="DISTRIBUTION",
+            help="how the delay varies within the jitter",
+        )
+
+        self.internal_parser.add_argument(
+            "-o",
+            "--reorder",
+            required=False,
+            default=0,
+            type=float,
+            metavar="PERCENT",
+            help="datagrams held back behind the next ones",
+        )
+
+        self.internal_parser.add_argument(
+            "-u",
+            "--duplicate",
+            required=False,
+            default=0,
+            type=float,
+            metavar="PERCENT",
+            help="datagrams delivered twice",
+        )
+
+        self.internal_parser.add_argument(
+            "-m",
+            "--mtu",
+            required=False,
+            default=0,
+            type=int,
+            metavar="BYTES",
+            help="size larger datagrams are cut to, none if 0",
+        )
+
+        self.internal_parser.add_argument(
+            "-r",
+            "--rate",
+            required=False,
+            default=0,
+            type=float,
+            metavar="KBPS",
+            help="bandwidth cap in kB/s, none if 0",
+        )
+
+        self.internal_parser.add_argument(
+            "-b",
+            "--bucket",
+            required=False,
+            default=0,
+            type=int,
+            metavar="BYTES",
+            help="bytes let through at once above the rate after idling",
+        )
+
+        self.internal_parser.add_argument(
+            "--seed",
+            required=False,
+            default=PROXY_SEED,
+            type=int,
+            metavar="SEED",
+            help="seed of the random choices, the same one repeats a run",
+        )
+
+        return self.internal_parser.parse_args()
@@ -1,15 +1,18 @@
-from threading import Thread
+from socket import AF_INET, SHUT_RDWR, SO_REUSEPORT, SOCK_DGRAM, SOL_SOCKET
 from socket import socket as Socket
-from socket import AF_INET, SOCK_DGRAM, SHUT_RDWR
 from socket import timeout as SocketTimeout
+from threading import Thread
 
 from lib.common.address import Address
-from lib.common.constants import USE_ANY_AVAILABLE_PORT, GO_BACK_N_PROTOCOL_TYPE
+from lib.common.constants import USE_ANY_AVAILABLE_PORT, WINDOWED_PROTOCOL_TYPES
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_syn import MessageIsNotSyn
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
 from lib.common.logger import CoolLogger
 from lib.common.packet.packet import Packet
+from lib.common.path_mtu import reserve_socket_buffers
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_saw import SocketSaw
 from lib.server.accepter_protocol import AccepterProtocol
@@ -18,11 +21,13 @@ from lib.server.client_pool import ClientPool
 from lib.server.exceptions.cannot_bind_socket import CannotBindSocket
 from lib.server.exceptions.client_already_connected import ClientAlreadyConnected
 from lib.server.exceptions.protocol_mismatch import ProtocolMismatch
-from lib.common.file_handler import FileHandler
+from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 from lib.server.protocol import (
     MissingClientAddress,
     SocketShutdown,
 )
+from lib.server.server_metrics import ServerMetrics
+from lib.server.server_stats import ServerStats
 
 
 class Accepter:
@@ -31,7 +36,13 @@ class Accepter:
             adress: Address,
             protocol: str,
             logger,
-            file_handler: FileHandler):
+            file_handler: FileHandler,
+            congestion: str,
+            ack_every: int,
+            stats: ServerStats,
+            reuse_port: bool = False,
+            metrics: ServerMetrics | None = None,
+            integrity: bool = True):
         self.host: str = adress.host
         self.port: int = adress.port
         self.adress: Address = adress
@@ -43,12 +54,26 @@ class Accepter:
         self.is_alive: bool = True
         self.thread_context: Thread = Thread(target=self.run)
 
+        self.stats: ServerStats = stats
+        self.metrics: ServerMetrics | None = metrics
+        self.integrity: bool = integrity
         self.clients: ClientPool = ClientPool()
         self.client_manager: ClientManager = ClientManager(
-            self.logger, protocol, self.clients
-        )
+            self.logger,
+            protocol,
+            self.clients,
+            congestion,
+            ack_every,
+            self.stats,
+            metrics=self.metrics,
+            integrity=self.integrity)
 
         welcoming_socket: Socket = Socket(AF_INET, SOCK_DGRAM)
+        if reuse_port:
+            # Every worker process binds the port, the kernel spreads the
+            # clients among them
+            welcoming_socket.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+        reserve_socket_buffers(welcoming_socket)
 
         try:
             welcoming_socket.bind(self.adress.to_tuple())
@@ -81,15 +106,18 @@ class Accepter:
             self.welcoming_socket.reset_state()
             packet, packet_type, client_address = self.protocol.accept_connection()
 
-            packet, connection_socket, connection_address = self.handshake(
-                packet, client_address
-            )
+            (packet, fast_open_request, connection_socket,
+             connection_address) = self.handshake(packet, client_address)
+            # The connection reads the request once it runs, by then the
+            # welcoming socket may have reused the buffer it arrived in
+            packet.data = bytes(packet.data)
             self.client_manager.add_client(
                 connection_socket,
                 connection_address,
                 client_address,
                 self.file_handler,
                 packet,
+                fast_open_request,
             )
             self.logger.set_prefix("[ACCEP]")
 
@@ -102,6 +130,10 @@ class Accepter:
                 "Client is already connect, should not be talking to the welcomming socket"
             )
 
+        except UnexpectedOperation:
+            self.logger.info(
+                f"Rejecting client {client_address} due to an invalid request")
+
         except ProtocolMismatch:
             self.logger.info(
                 f"Rejecting client {client_address} due to protocol mismatch, expected {
@@ -116,7 +148,7 @@ class Accepter:
 
     def handshake(
         self, packet: Packet, client_address: Address
-    ) -> tuple[Packet, SocketSaw, Address]:
+    ) -> tuple[Packet, FastOpenRequest | None, SocketSaw, Address]:
         if self.clients.is_client_connected(client_address):
             raise ClientAlreadyConnected()
 
@@ -124,8 +156,18 @@ class Accepter:
             self.protocol.reject_connection(packet, client_address)
             raise ProtocolMismatch()
 
+        # Decoded before the welcoming socket receives into the buffer the
+        # request arrived in again
+        fast_open_request = None
+        if packet.payload_length > 0:
+            try:
+                fast_open_request = FastOpenRequest.from_bytes(packet.data)
+            except ValueError:
+                raise UnexpectedOperation() from None
+
         connection_socket_raw: Socket = Socket(AF_INET, SOCK_DGRAM)
         connection_socket_raw.bind((self.host, USE_ANY_AVAILABLE_PORT))
+        reserve_socket_buffers(connection_socket_raw)
         connection_sockname: tuple[str,
                                    int] = connection_socket_raw.getsockname()
         connection_address: Address = Address(
@@ -136,11 +178,22 @@ class Accepter:
 
         self.logger.debug(f"Accepting connection for {client_address}")
 
+        # A SYN carrying the request of the client is answered by the
+        # connection itself, once it validated the request
+        if fast_open_request is not None:
+            self.logger.debug(f"Fast open transferred to {connection_address}")
+            return (
+                packet,
+                fast_open_request,
+                connection_socket,
+                connection_address,
+            )
+
         sequence_number = SequenceNumber(
             packet.sequence_number, packet.protocol)
         ack_number = (
             SequenceNumber(packet.ack_number, self.protocol.protocol_version)
-            if packet.protocol == GO_BACK_N_PROTOCOL_TYPE
+            if packet.protocol in WINDOWED_PROTOCOL_TYPES
             else None
         )
 
@@ -158,6 +211,7 @@ class Accepter:
 
         return (
             packet,
+            None,
             connection_socket,
             connection_address,
         )
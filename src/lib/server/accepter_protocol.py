@@ -1,32 +1,31 @@
 from lib.common.address import Address
 from lib.common.constants import (
-    UPLOAD_OPERATION,
-    DOWNLOAD_OPERATION,
-    STRING_ENCODING_FORMAT,
     COMMS_BUFFER_SIZE,
+    DOWNLOAD_OPERATION,
     FULL_BUFFER_SIZE,
-    ZERO_BYTES,
     INT_DESERIALIZATION_BYTEORDER,
     STOP_AND_WAIT_PROTOCOL_TYPE,
-    GO_BACK_N_PROTOCOL_TYPE,
+    STRING_ENCODING_FORMAT,
+    UPLOAD_OPERATION,
+    WINDOWED_PROTOCOL_TYPES,
+    ZERO_BYTES,
 )
+from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
+from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
+from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_syn import MessageIsNotSyn
+from lib.common.exceptions.socket_shutdown import SocketShutdown
+from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
 from lib.common.logger import CoolLogger
-from lib.common.packet.packet import Packet, PacketParser, PacketSaw, PacketGbn
+from lib.common.packet.packet import Packet, PacketGbn, PacketParser, PacketSaw
 from lib.common.re_listen_decorator import re_listen_if_failed
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_saw import SocketSaw
 from lib.server.client_pool import ClientPool
-
-from lib.common.exceptions.connection_lost import ConnectionLost
-from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
-from lib.common.exceptions.message_not_ack import MessageIsNotAck
-from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
-from lib.common.exceptions.socket_shutdown import SocketShutdown
-from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 from lib.server.exceptions.client_already_connected import ClientAlreadyConnected
 from lib.server.exceptions.missing_client_address import MissingClientAddress
+from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 
 
 class AccepterProtocol:
@@ -146,7 +145,7 @@ class AccepterProtocol:
         if not packet.is_ack:
             raise MessageIsNotAck()
 
-        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
             self.validate_ack_number(packet, ack_number)
 
         if packet.is_fin:
@@ -191,7 +190,7 @@ class AccepterProtocol:
             sequence_number=SequenceNumber(
                 packet.sequence_number, packet.protocol),
             ack_number=SequenceNumber(packet.ack_number, packet.protocol)
-            if packet.protocol == GO_BACK_N_PROTOCOL_TYPE
+            if packet.protocol in WINDOWED_PROTOCOL_TYPES
             else None,
             data=ZERO_BYTES,
         )
@@ -304,7 +303,7 @@ class AccepterProtocol:
         packet, packet_type, client_address = self.validate_inbound_packet(
             raw_packet, client_address_tuple
         )
-        filename: str = packet.data.decode(STRING_ENCODING_FORMAT)
+        filename: str = str(packet.data, STRING_ENCODING_FORMAT)
 
         self.validate_sequence_number(packet, sequence_number)
         return SequenceNumber(packet.sequence_number,
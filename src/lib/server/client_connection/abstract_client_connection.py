@@ -2,31 +2,53 @@ from abc import abstractmethod
 from threading import Thread
 
 from lib.common.address import Address
+from lib.common.chunk_codec import (
+    ChunkCodec,
+    choose_codec,
+    create_chunk_codec,
+)
+from lib.common.congestion_control import CongestionController
 from lib.common.constants import (
-    UPLOAD_OPERATION,
+    COMPRESSION_SAMPLE_SIZE,
     DOWNLOAD_OPERATION,
+    FAST_OPEN_FILE_EXISTS,
+    FAST_OPEN_FILE_NOT_FOUND,
+    FAST_OPEN_FILE_TOO_BIG,
+    FAST_OPEN_RESUME_PAST_END,
+    FULL_BUFFER_SIZE,
+    INT_DESERIALIZATION_BYTEORDER,
+    OFFSET_SIZE,
     OPERATION_STRING_FROM_CODE,
-    GO_BACK_N_PROTOCOL_TYPE,
+    UPLOAD_OPERATION,
+    WINDOWED_PROTOCOL_TYPES,
+    ZERO_BYTES,
 )
 from lib.common.exceptions.connection_lost import ConnectionLost
+from lib.common.exceptions.corrupted_transfer import CorruptedTransfer
+from lib.common.exceptions.invalid_filename import InvalidFilename
 from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
 from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_fin_ack import MessageIsNotFinAck
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.fast_open import FastOpenAnswer, FastOpenRequest
+from lib.common.file_handler import FileHandler
+from lib.common.file_range import RangeReader, stream_range
 from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.packet.packet import Packet, PacketGbn
+from lib.common.path_mtu import chunk_size_for
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_saw import SocketSaw
+from lib.common.transfer_digest import TransferDigest
+from lib.common.transfer_metrics import TransferMetrics
+from lib.common.transfer_session import SessionReader, SessionWriter
+from lib.common.transfer_trace import dump_transfer_trace
 from lib.server.client_pool import ClientPool
 from lib.server.connection_state import ConnectionState
-from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 from lib.server.exceptions.client_already_connected import ClientAlreadyConnected
-from lib.common.exceptions.invalid_filename import InvalidFilename
 from lib.server.exceptions.missing_client_address import MissingClientAddress
-from lib.common.file_handler import FileHandler
-
+from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 from lib.server.protocol import ServerProtocol
 
 
@@ -35,10 +57,13 @@ class ConnectionClosingNeeded(Exception):
             self,
             message="Client is already connect",
             sequence_number=None,
-            ack_number=None):
+            ack_number=None,
+            data=ZERO_BYTES):
         self.message = message
         self.sequence_number = sequence_number
         self.ack_number = ack_number
+        # Sent along with the connection finalization
+        self.data = data
 
     def __repr__(self):
         return f"ClientAlreadyConnected: {self.message})"
@@ -54,6 +79,8 @@ class ClientConnection:
         logger: CoolLogger,
         file_handler: FileHandler,
         packet: Packet,
+        fast_open_request: FastOpenRequest | None,
+        integrity: bool = True,
     ):
         self.socket: SocketSaw = connection_socket
         self.address: Address = connection_address
@@ -65,6 +92,14 @@ class ClientConnection:
             packet.sequence_number, protocol
         )
         self.initial_packet = packet
+        # Only set when the request came along with the SYN, the accepter
+        # decodes it
+        self.fast_open_request: FastOpenRequest | None = fast_open_request
+        self.is_upload_corrupted: bool = False
+        # Whether the server checks the integrity clients ask it to
+        self.integrity: bool = integrity
+        # Only set when the client offered a codec the server has too
+        self.codec: ChunkCodec | None = None
 
         self.file_handler: FileHandler = file_handler
 
@@ -74,18 +109,32 @@ class ClientConnection:
         self.state: ConnectionState = ConnectionState.HANDHSAKE_FINISHED
         self.run_thread = Thread(target=self.run)
         self.file = None
+        self.mapped_file: memoryview | None = None
         self.killed = False
+        # Only set when the server serves its metrics
+        self.metrics: TransferMetrics | None = None
+        # Only set while sending a file with a window
+        self.congestion_controller: CongestionController | None = None
+
+    # Called before the connection starts, it counts from then on
+    def measure(self, metrics: TransferMetrics) -> None:
+        self.metrics = metrics
+        self.socket.measure(metrics)
 
     def process_operation_intention(
         self, sequence_number: MutableVariable, ack_number: MutableVariable
     ) -> int:
         self.logger.debug("Processing operation intention")
         try:
-            op_code, _seq, _ack = self.protocol.process_operation_intention(
-                self.initial_packet)
+            if self.fast_open_request is not None:
+                op_code, _seq, _ack = self.process_fast_open_request()
+            else:
+                op_code, _seq, _ack = (
+                    self.protocol.process_operation_intention(
+                        self.initial_packet))
             sequence_number.value = _seq
 
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
                 ack_number.value = _ack
 
             if op_code == UPLOAD_OPERATION:
@@ -98,13 +147,14 @@ class ClientConnection:
 
             self.logger.debug(
                 f"Operation is: {OPERATION_STRING_FROM_CODE[op_code]}")
-            self.logger.debug("Confirming operation")
-            self.protocol.send_ack(
-                sequence_number.value,
-                ack_number.value,
-                self.client_address,
-                self.address,
-            )
+            if self.fast_open_request is None:
+                self.logger.debug("Confirming operation")
+                self.protocol.send_ack(
+                    sequence_number.value,
+                    ack_number.value,
+                    self.client_address,
+                    self.address,
+                )
 
             return op_code
 
@@ -112,10 +162,136 @@ class ClientConnection:
             self.state = ConnectionState.UNRECOVERABLE_BAD_STATE
             raise e
 
-    def is_filename_valid_for_upload(self, filename: str) -> bool:
+    # Numbered as if the operation intention had been sent on its own, so
+    # the rest of the connection goes on as after the classic exchange
+    def process_fast_open_request(
+        self,
+    ) -> tuple[int, SequenceNumber, SequenceNumber]:
+        self.logger.debug("Request came along with the SYN")
+        _seq, _ack = self.protocol.process_fast_open_request(
+            self.initial_packet, self.fast_open_request)
+
+        _seq.step()
+        if _ack is not None:
+            _ack.step()
+
+        return self.fast_open_request.op_code, _seq, _ack
+
+    # Only set for clients that asked for it along with the SYN, unless the
+    # server was told not to check it
+    @property
+    def is_integrity_checked(self) -> bool:
+        return (self.integrity
+                and self.fast_open_request is not None
+                and self.fast_open_request.integrity)
+
+    def start_digest(self) -> TransferDigest | None:
+        if not self.is_integrity_checked:
+            return None
+        return TransferDigest()
+
+    # Files that do not compress are sent as they are, as a sample of their
+    # next bytes tells
+    def codec_for_sending(self, chunk_size: int) -> ChunkCodec | None:
+        if self.codec is None:
+            return None
+
+        sample = self.file_handler.peek(self.file, COMPRESSION_SAMPLE_SIZE)
+        if not self.codec.is_worth_it(sample, chunk_size):
+            self.logger.info("File does not compress, sending it as is")
+            return None
+        return self.codec
+
+    # Clients that told the largest datagram they receive are sent chunks as
+    # large as the path to them carries whole
+    def chunk_size_for_sending(self) -> int:
+        datagram_size = None
+        if self.fast_open_request is not None:
+            datagram_size = self.fast_open_request.datagram_size
+
+        chunk_size = chunk_size_for(
+            self.protocol.protocol_version,
+            self.client_address.host,
+            datagram_size,
+            self.is_integrity_checked)
+        self.logger.debug(f"Sending chunks of up to {chunk_size} bytes")
+        return chunk_size
+
+    # Uploads that do not match the digest the client told keep nothing of
+    # what arrived, the connection is closed as usual all the same
+    def complete_upload(self) -> None:
         try:
-            self.file = self.file_handler.open_file_write_mode(
-                filename, is_path_complete=False
+            self.file_handler.complete(self.file)
+        except CorruptedTransfer as e:
+            self.is_upload_corrupted = True
+            self.logger.error(e.message)
+            return
+
+        if self.file.digest is not None and self.file.digest.is_verified:
+            self.logger.info(
+                f"Upload verified, SHA-256 {self.file.digest.hexdigest()}")
+
+    def step_numbers(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> None:
+        sequence_number.value.step()
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
+            ack_number.value.step()
+
+    def answer_fast_open(
+        self,
+        answer: FastOpenAnswer,
+        sequence_number: MutableVariable,
+        ack_number: MutableVariable,
+    ) -> None:
+        # Datagrams the client sends from now on carry their checksum
+        if self.is_integrity_checked:
+            answer.integrity = True
+            self.socket.datagrams.checksums = True
+
+        # Chunks either end sends may be compressed with the codec picked
+        answer.codec = choose_codec(self.fast_open_request.codecs)
+        self.codec = create_chunk_codec(answer.codec)
+        answer.datagram_size = FULL_BUFFER_SIZE
+
+        self.protocol.send_fast_open_answer(
+            sequence_number.value,
+            ack_number.value,
+            self.client_address,
+            self.address,
+            answer.to_bytes(),
+        )
+
+    def log_rejection(self, reason: str) -> None:
+        self.logger.error(
+            f"Client {self.client_address.to_combined()} shutdowned due to {
+                reason}")
+
+    # The finalization that follows tells the client why it was rejected
+    def reject_fast_open(
+        self,
+        status: int,
+        sequence_number: MutableVariable,
+        ack_number: MutableVariable,
+    ) -> None:
+        raise ConnectionClosingNeeded(
+            sequence_number=sequence_number,
+            ack_number=ack_number,
+            data=FastOpenAnswer(status).to_bytes(),
+        )
+
+    # Whatever the client sends first once it got the answer is left for
+    # the receiver of the transfer
+    def await_fast_open_confirmation(self) -> None:
+        raw_packet, client_address_tuple = (
+            self.protocol.wait_for_fast_open_confirmation())
+        self.socket.put_back(raw_packet, client_address_tuple)
+
+    def is_filename_valid_for_upload(
+            self, filename: str, resume: bool) -> bool:
+        try:
+            self.file = self.file_handler.open_file_journaled_mode(
+                filename, is_path_complete=False, resume=resume
             )
             return True
         except InvalidFilename:
@@ -124,20 +300,154 @@ class ClientConnection:
     def is_filesize_valid_for_upload(self, filesize: int) -> bool:
         return self.file_handler.can_file_fit(filesize)
 
+    # What was received of a file of another size is of no use, it is
+    # received again from the start
+    def offset_for_upload(self, filename: str, filesize: int) -> int:
+        journal = self.file.journal
+        if journal.filesize != filesize or self.file.offset >= filesize:
+            self.file.restart(filesize)
+        elif self.file.offset > 0:
+            self.logger.info(
+                f"Resuming upload of {filename} from {
+                    self.file_handler.bytes_to_megabytes(
+                        self.file.offset)} MB")
+
+        return self.file.offset
+
+    # Files of the session are named in the manifest it starts with, so
+    # only their total size can be validated up front
+    def accept_upload_session(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[None, int]:
+        filesize = self.fast_open_request.filesize
+
+        self.logger.debug("Validating session size")
+        if filesize is None or not self.is_filesize_valid_for_upload(
+                filesize):
+            self.logger.warn("Session size received invalid")
+            self.log_rejection("session being too big")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_TOO_BIG, sequence_number, ack_number)
+
+        self.file = SessionWriter(self.file_handler, self.logger)
+        self.answer_fast_open(FastOpenAnswer(), sequence_number, ack_number)
+        self.logger.info(
+            f"Receiving session of {
+                self.fast_open_request.session_files} files from {
+                self.client_address.to_combined()}")
+
+        self.step_numbers(sequence_number, ack_number)
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+
+        # No single file is left to check for corruption if it fails
+        return None, filesize
+
+    # Each stream of a striped upload receives its own range into the file
+    # all of them share. Its size was only validated by the first stream
+    def accept_stream_upload(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[str, int]:
+        filename = self.fast_open_request.filename
+        filesize = self.fast_open_request.filesize
+        transfer_id, stream, streams = self.fast_open_request.stream
+
+        self.logger.debug("Validating filesize")
+        if filesize is None or (
+                not self.file_handler.is_transfer_started(
+                    filename, False, transfer_id)
+                and not self.is_filesize_valid_for_upload(filesize)):
+            self.logger.warn("Filesize received invalid")
+            self.log_rejection("file being too big")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_TOO_BIG, sequence_number, ack_number)
+
+        start, length = stream_range(filesize, stream, streams)
+        self.logger.debug("Validating filename")
+        try:
+            self.file = self.file_handler.open_file_range_mode(
+                filename, False, filesize, transfer_id, start)
+        except InvalidFilename:
+            self.logger.warn("Filename received invalid")
+            self.log_rejection(
+                f"file '{filename}' already existing in the server")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_EXISTS, sequence_number, ack_number)
+
+        self.answer_fast_open(FastOpenAnswer(), sequence_number, ack_number)
+        self.logger.info(
+            f"Receiving stream {stream + 1}/{streams} of {filename}, {
+                self.file_handler.bytes_to_megabytes(length)} MB from offset {start}")
+
+        self.step_numbers(sequence_number, ack_number)
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+
+        return filename, filesize
+
+    def accept_fast_open_upload(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[str, int]:
+        if self.fast_open_request.is_session:
+            return self.accept_upload_session(sequence_number, ack_number)
+        if self.fast_open_request.is_stream:
+            return self.accept_stream_upload(sequence_number, ack_number)
+
+        filename = self.fast_open_request.filename
+        filesize = self.fast_open_request.filesize
+        resume = self.fast_open_request.resume_offset is not None
+
+        self.logger.debug("Validating filesize")
+        if filesize is None or not self.is_filesize_valid_for_upload(
+                filesize):
+            self.logger.warn("Filesize received invalid")
+            self.log_rejection("file being too big")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_TOO_BIG, sequence_number, ack_number)
+
+        self.logger.debug("Validating filename")
+        if not self.is_filename_valid_for_upload(filename, resume):
+            self.logger.warn("Filename received invalid")
+            self.log_rejection(
+                f"file '{filename}' already existing in the server")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_EXISTS, sequence_number, ack_number)
+
+        offset = self.offset_for_upload(filename, filesize)
+        self.answer_fast_open(
+            FastOpenAnswer(resume_offset=offset if resume else None),
+            sequence_number,
+            ack_number,
+        )
+        self.logger.debug(
+            f"Fast open request valid: {filename} of {filesize} bytes")
+
+        # The answer stands for the confirmations of the name and the
+        # filesize
+        self.step_numbers(sequence_number, ack_number)
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+
+        return filename, filesize
+
     def receive_file_info_for_upload(
         self, sequence_number: MutableVariable, ack_number: MutableVariable
     ) -> tuple[str, int]:
+        if self.fast_open_request is not None:
+            return self.accept_fast_open_upload(sequence_number, ack_number)
+
         self.logger.debug("Validating filename")
         sequence_number.value.step()
 
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             ack_number.value.step()
 
-        _seq, filename = self.protocol.receive_filename(
+        _seq, filename, resume_offset = self.protocol.receive_filename(
             sequence_number.value)
         sequence_number.value = _seq
+        resume = resume_offset is not None
 
-        if self.is_filename_valid_for_upload(filename):
+        if self.is_filename_valid_for_upload(filename, resume):
             self.protocol.send_ack(
                 sequence_number.value,
                 ack_number.value,
@@ -147,10 +457,8 @@ class ClientConnection:
             self.logger.debug(f"Filename received valid: {filename}")
         else:
             self.logger.warn("Filename received invalid")
-            self.logger.error(
-                f"Client {
-                    self.client_address.to_combined()} shutting down due to file '{filename}' already existing in the server")
-            self.state = ConnectionState.UNRECOVERABLE_BAD_STATE
+            self.log_rejection(
+                f"file '{filename}' already existing in the server")
             raise ConnectionClosingNeeded(
                 sequence_number=sequence_number, ack_number=ack_number
             )
@@ -161,23 +469,28 @@ class ClientConnection:
             sequence_number.value)
         sequence_number.value = _seq
 
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             ack_number.value.step()
 
         if self.is_filesize_valid_for_upload(filesize):
+            offset = self.offset_for_upload(filename, filesize)
+            # Clients that asked to resume are told where to go on from
+            offset_data = ZERO_BYTES
+            if resume:
+                offset_data = offset.to_bytes(
+                    OFFSET_SIZE, byteorder=INT_DESERIALIZATION_BYTEORDER)
+
             self.protocol.send_ack(
                 sequence_number.value,
                 ack_number.value,
                 self.client_address,
                 self.address,
+                offset_data,
             )
             self.logger.debug(f"Filesize received valid: {filesize} bytes")
         else:
             self.logger.warn("Filesize received invalid")
-            self.logger.error(
-                f"Client {
-                    self.client_address.to_combined()} shutdowned due to file being too big")
-            self.state = ConnectionState.UNRECOVERABLE_BAD_STATE
+            self.log_rejection("file being too big")
             raise ConnectionClosingNeeded(
                 sequence_number=sequence_number, ack_number=ack_number
             )
@@ -189,20 +502,141 @@ class ClientConnection:
             self.file = self.file_handler.open_file_read_mode(
                 filename, is_path_complete=False
             )
+            self.mapped_file = self.file_handler.map_file(self.file)
             return True
         except InvalidFilename:
             return False
 
+    def resume_download(
+            self, filename: str, filesize: int, resume_offset: int) -> int:
+        self.file_handler.seek(self.file, resume_offset)
+        self.logger.info(
+            f"Resuming download of {filename} from {
+                self.file_handler.bytes_to_megabytes(resume_offset)} MB")
+        return filesize - resume_offset
+
+    # Sessions send every complete file whose name matches the one asked for
+    def accept_download_session(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[str, int]:
+        pattern = self.fast_open_request.filename
+
+        self.logger.debug("Looking for files of the session")
+        names = self.file_handler.list_files(pattern)
+        if not names:
+            self.log_rejection(f"no file matching '{pattern}' for download")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_NOT_FOUND, sequence_number, ack_number)
+
+        self.file = SessionReader(
+            self.file_handler,
+            [(name, name) for name in names],
+            is_path_complete=False,
+        )
+        self.answer_fast_open(FastOpenAnswer(), sequence_number, ack_number)
+        self.logger.info(
+            f"Sending session of {len(names)} files to {
+                self.client_address.to_combined()}")
+
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+        _seq, _filename, _offset = self.protocol.receive_filename(
+            sequence_number.value)
+        sequence_number.value = _seq
+
+        return f"{pattern} ({len(names)} files)", self.file.size
+
+    # Streams of a download are told the size of the file, so they can work
+    # out the range they get on their own
+    def accept_stream_download(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[str, int]:
+        filename = self.fast_open_request.filename
+        _transfer_id, stream, streams = self.fast_open_request.stream
+
+        self.logger.debug("Validating filename")
+        if not self.is_filename_valid_for_download(filename):
+            self.logger.warn("Filename received invalid")
+            self.log_rejection(
+                f"file '{filename}' not existing in server for download")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_NOT_FOUND, sequence_number, ack_number)
+
+        filesize = self.file_handler.get_filesize(
+            filename, is_path_complete=False)
+        start, length = stream_range(filesize, stream, streams)
+        self.file = RangeReader(self.file, start, length)
+        self.mapped_file = self.file_handler.map_file(self.file)
+
+        self.answer_fast_open(
+            FastOpenAnswer(filesize=filesize), sequence_number, ack_number)
+        self.logger.info(
+            f"Sending stream {stream + 1}/{streams} of {filename}, {
+                self.file_handler.bytes_to_megabytes(length)} MB from offset {start}")
+
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+        _seq, _filename, _offset = self.protocol.receive_filename(
+            sequence_number.value)
+        sequence_number.value = _seq
+
+        return filename, length
+
+    def accept_fast_open_download(
+        self, sequence_number: MutableVariable, ack_number: MutableVariable
+    ) -> tuple[str, int]:
+        if self.fast_open_request.is_session:
+            return self.accept_download_session(sequence_number, ack_number)
+        if self.fast_open_request.is_stream:
+            return self.accept_stream_download(sequence_number, ack_number)
+
+        filename = self.fast_open_request.filename
+        resume_offset = self.fast_open_request.resume_offset
+
+        self.logger.debug("Validating filename")
+        if not self.is_filename_valid_for_download(filename):
+            self.logger.warn("Filename received invalid")
+            self.log_rejection(
+                f"file '{filename}' not existing in server for download")
+            self.reject_fast_open(
+                FAST_OPEN_FILE_NOT_FOUND, sequence_number, ack_number)
+
+        filesize = self.file_handler.get_filesize(
+            filename, is_path_complete=False)
+        if resume_offset and resume_offset >= filesize:
+            self.log_rejection(f"asking to resume '{filename}' past its end")
+            self.reject_fast_open(
+                FAST_OPEN_RESUME_PAST_END, sequence_number, ack_number)
+
+        self.answer_fast_open(FastOpenAnswer(), sequence_number, ack_number)
+        self.logger.debug("Filename received valid")
+
+        # Clients go on by sending the name, as in the classic exchange,
+        # which the first chunk answers
+        self.step_numbers(sequence_number, ack_number)
+        self.await_fast_open_confirmation()
+        _seq, _filename, _offset = self.protocol.receive_filename(
+            sequence_number.value)
+        sequence_number.value = _seq
+
+        if resume_offset:
+            filesize = self.resume_download(filename, filesize, resume_offset)
+
+        return filename, filesize
+
     def receive_file_info_for_download(
         self, sequence_number: MutableVariable, ack_number: MutableVariable
     ) -> tuple[str, int]:
+        if self.fast_open_request is not None:
+            return self.accept_fast_open_download(sequence_number, ack_number)
+
         self.logger.debug("Validating filename")
         sequence_number.value.step()
-        _seq, filename = self.protocol.receive_filename(
+        _seq, filename, resume_offset = self.protocol.receive_filename(
             sequence_number.value)
         sequence_number.value = _seq
 
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             ack_number.value.step()
 
         if self.is_filename_valid_for_download(filename):
@@ -215,10 +649,8 @@ class ClientConnection:
                 self.address,
             )
             self.logger.warn("Filename received invalid")
-            self.logger.error(
-                f"Client {
-                    self.client_address.to_combined()} shutdowned due to file '{filename}' not existing in server for download")
-            self.state = ConnectionState.UNRECOVERABLE_BAD_STATE
+            self.log_rejection(
+                f"file '{filename}' not existing in server for download")
             raise ConnectionClosingNeeded(
                 sequence_number=sequence_number, ack_number=ack_number
             )
@@ -226,12 +658,28 @@ class ClientConnection:
         filesize = self.file_handler.get_filesize(
             filename, is_path_complete=False)
 
+        if resume_offset:
+            if resume_offset >= filesize:
+                self.protocol.send_fin(
+                    sequence_number.value,
+                    ack_number.value,
+                    self.client_address,
+                    self.address,
+                )
+                self.log_rejection(
+                    f"asking to resume '{filename}' past its end")
+                raise ConnectionClosingNeeded(
+                    sequence_number=sequence_number, ack_number=ack_number
+                )
+
+            filesize = self.resume_download(filename, filesize, resume_offset)
+
         return filename, filesize
 
     def file_cleanup_after_error(self,
                                  filename_for_upload: MutableVariable,
                                  filesize_for_upload: MutableVariable):
-        if self.file is not None and self.file_handler.is_closed(
+        if self.file is not None and not self.file_handler.is_closed(
                 self.file):
             self.file_handler.close(self.file)
 
@@ -240,13 +688,16 @@ class ClientConnection:
                 filename_for_upload, filesize_for_upload, is_path_complete=False)
 
     def initiate_close_connection(
-        self, sequence_number: MutableVariable, ack_number: MutableVariable
+        self,
+        sequence_number: MutableVariable,
+        ack_number: MutableVariable,
+        data: bytes = ZERO_BYTES,
     ):
         try:
             self.logger.debug("Initiating connection close")
             sequence_number.value.step()
 
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+            if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
                 ack_number.value.step()
 
             self.protocol.send_fin(
@@ -254,6 +705,7 @@ class ClientConnection:
                 ack_number.value,
                 self.client_address,
                 self.address,
+                data,
             )
 
             # sequence_number.value.step()
@@ -265,11 +717,10 @@ class ClientConnection:
             self.logger.debug(
                 "Received connection finalization from client")
 
+            # Clients only step their sequence number after their own
+            # finalization, as at the end of a download
             sequence_number.value.step()
 
-            if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
-                ack_number.value.step()
-
             self.protocol.send_ack(
                 sequence_number.value,
                 ack_number.value,
@@ -310,7 +761,7 @@ class ClientConnection:
                 self.protocol.protocol_version))
 
         ack_number = MutableVariable(None)
-        if self.protocol.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol.protocol_version in WINDOWED_PROTOCOL_TYPES:
             packet: PacketGbn = self.initial_packet
             ack_number = MutableVariable(
                 SequenceNumber(packet.ack_number,
@@ -328,9 +779,10 @@ class ClientConnection:
                     filename_for_upload,
                     filesize_for_upload,
                 )
-                self.logger.force_info(
-                    f"Upload completed from client {
-                        self.client_address.to_combined()}")
+                if not self.is_upload_corrupted:
+                    self.logger.force_info(
+                        f"Upload completed from client {
+                            self.client_address.to_combined()}")
             elif op_code == DOWNLOAD_OPERATION:
                 self.perform_download(
                     sequence_number, ack_number, filename_for_download
@@ -347,7 +799,10 @@ class ClientConnection:
                 filename_for_upload, filesize_for_upload)
             self.kill()
         except ConnectionClosingNeeded as e:
-            self.initiate_close_connection(e.sequence_number, e.ack_number)
+            self.initiate_close_connection(
+                e.sequence_number, e.ack_number, e.data)
+            # Collecting it any earlier cuts the closing short
+            self.state = ConnectionState.UNRECOVERABLE_BAD_STATE
         except (
             MissingClientAddress,
             UnexpectedOperation,
@@ -368,6 +823,15 @@ class ClientConnection:
             self.file_cleanup_after_error(
                 filename_for_upload, filesize_for_upload)
             self.kill()
+        finally:
+            self.dump_trace()
+
+    def dump_trace(self) -> None:
+        trace_path = dump_transfer_trace(
+            self.socket.trace,
+            f"server-{self.address.port}-{self.client_address.port}")
+        if trace_path is not None:
+            self.logger.info(f"Trace written to {trace_path}")
 
     def start(self):
         self.run_thread.start()
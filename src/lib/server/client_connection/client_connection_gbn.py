@@ -1,19 +1,25 @@
 from _socket import SHUT_RDWR
+from hashlib import sha256
 
+from lib.common.ack_policy import AckPolicy
 from lib.common.address import Address
-from lib.common.constants import FILE_CHUNK_SIZE_GBN, SHOULD_PRINT_CHUNK_HASH
+from lib.common.chunk_codec import ChunkCodec
+from lib.common.congestion_control import create_congestion_controller
+from lib.common.constants import SHOULD_PRINT_CHUNK_HASH
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
 from lib.common.exceptions.socket_shutdown import SocketShutdown
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
 from lib.common.hash_compute import compute_chunk_sha256
 from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.packet.packet import Packet
+from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_gbn import SocketGbn
 from lib.common.socket_saw import SocketSaw
 from lib.server.client_connection.abstract_client_connection import ClientConnection
-from lib.common.file_handler import FileHandler
 from lib.server.connection_state import ConnectionState
 from lib.server.go_back_n_receiver_server import GoBackNReceiver
 from lib.server.go_back_n_sender_server import GoBackNSender
@@ -21,6 +27,8 @@ from lib.server.protocol_gbn import ServerProtocolGbn
 
 
 class ClientConnectionGbn(ClientConnection):
+    sender_class: type = GoBackNSender
+
     def __init__(
         self,
         connection_socket: SocketSaw,
@@ -30,6 +38,10 @@ class ClientConnectionGbn(ClientConnection):
         logger: CoolLogger,
         file_handler: FileHandler,
         packet: Packet,
+        fast_open_request: FastOpenRequest | None,
+        congestion: str,
+        ack_every: int,
+        integrity: bool = True,
     ):
         super().__init__(
             connection_socket,
@@ -39,8 +51,12 @@ class ClientConnectionGbn(ClientConnection):
             logger,
             file_handler,
             packet,
+            fast_open_request,
+            integrity,
         )
         self.socket_gbn = None
+        self.congestion: str = congestion
+        self.ack_every: int = ack_every
 
     def receive_file(
         self,
@@ -56,11 +72,18 @@ class ClientConnectionGbn(ClientConnection):
         filesize.value = _filesize
 
         self.logger.debug(f"Ready to receive from {self.client_address}")
+        self.file.digest = self.start_digest()
+        self.file.codec = self.codec
 
         last_transmitted_packet = self.socket.last_raw_packet
 
         self.socket.reset_state()
-        self.socket_gbn = SocketGbn(self.socket.socket, self.logger)
+        self.socket_gbn = SocketGbn(
+            self.socket.socket,
+            self.logger,
+            self.socket.rtt_estimator,
+            self.socket.datagrams,
+            self.socket.trace)
         gbn_protocol = ServerProtocolGbn(
             self.logger,
             self.socket_gbn,
@@ -70,13 +93,8 @@ class ClientConnectionGbn(ClientConnection):
             self.protocol.clients,
         )
 
-        gbn_receiver = GoBackNReceiver(
-            self.logger,
-            gbn_protocol,
-            self.file_handler,
-            sequence_number.value,
-            ack_number.value,
-        )
+        gbn_receiver = self.create_receiver(
+            gbn_protocol, sequence_number.value, ack_number.value)
         try:
             _seq, _ack = gbn_receiver.receive_file(
                 self.file, last_transmitted_packet)
@@ -86,7 +104,22 @@ class ClientConnectionGbn(ClientConnection):
             raise ConnectionLost()
 
         self.logger.debug("Finished receiving file")
-        self.file_handler.close(self.file)
+        self.complete_upload()
+
+    def create_receiver(
+        self,
+        gbn_protocol: ServerProtocolGbn,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+    ) -> GoBackNReceiver:
+        return GoBackNReceiver(
+            self.logger,
+            gbn_protocol,
+            self.file_handler,
+            sequence_number,
+            ack_number,
+            AckPolicy(self.ack_every),
+        )
 
     def perform_upload(
         self,
@@ -108,10 +141,12 @@ class ClientConnectionGbn(ClientConnection):
         ack_number: MutableVariable,
         filename: str,
         filesize: int,
+        codec: ChunkCodec | None,
+        chunk_size: int,
     ) -> bool:
         chunk_number: int = 1
         total_chunks: int = self.file_handler.get_number_of_chunks(
-            filesize, FILE_CHUNK_SIZE_GBN
+            filesize, chunk_size
         )
         is_last_chunk: bool = False
         is_first_chunk: bool = True
@@ -120,7 +155,8 @@ class ClientConnectionGbn(ClientConnection):
             f"Sending file {filename} of {
                 self.file_handler.bytes_to_megabytes(filesize)} MB")
 
-        chunk = self.file_handler.read(self.file, FILE_CHUNK_SIZE_GBN)
+        chunk = self.file_handler.read_mapped(
+            self.file, self.mapped_file, chunk_size)
         chunk_len = len(chunk)
 
         msg = f"Sending chunk {chunk_number}/{total_chunks} of size {
@@ -136,14 +172,26 @@ class ClientConnectionGbn(ClientConnection):
         if not is_first_chunk:
             sequence_number.value.step()
 
+        # Files of a single chunk are done with it, the sender digests the
+        # first chunk of any other along with the rest
+        digest = None
+        if is_last_chunk and self.is_integrity_checked:
+            digest = sha256(chunk).digest()
+
+        is_compressed = False
+        if codec is not None:
+            chunk, is_compressed = codec.encode(chunk)
+
         self.protocol.send_file_chunk(
             sequence_number.value,
             ack_number.value,
             chunk,
-            chunk_len,
+            len(chunk),
             is_last_chunk,
             is_first_chunk,
             self.client_address,
+            digest,
+            is_compressed,
         )
 
         self.logger.debug(f"Waiting confirmation for chunk {chunk_number}")
@@ -163,15 +211,27 @@ class ClientConnectionGbn(ClientConnection):
             sequence_number, ack_number
         )
         filename_for_download.value = _filename
+        chunk_size = self.chunk_size_for_sending()
+        codec = self.codec_for_sending(chunk_size)
 
         is_last_chunk = self.send_first_packet(
-            sequence_number, ack_number, filename_for_download.value, filesize)
+            sequence_number,
+            ack_number,
+            filename_for_download.value,
+            filesize,
+            codec,
+            chunk_size)
 
         if is_last_chunk:
             return False
 
         self.socket.reset_state()
-        socket_gbn = SocketGbn(self.socket.socket, self.logger)
+        socket_gbn = SocketGbn(
+            self.socket.socket,
+            self.logger,
+            self.socket.rtt_estimator,
+            self.socket.datagrams,
+            self.socket.trace)
 
         gbn_protocol = ServerProtocolGbn(
             self.logger,
@@ -182,12 +242,18 @@ class ClientConnectionGbn(ClientConnection):
             self.protocol.clients,
         )
 
-        gbn_sender = GoBackNSender(
+        self.congestion_controller = create_congestion_controller(
+            self.congestion, self.socket.rtt_estimator)
+        gbn_sender = self.sender_class(
             self.logger,
             gbn_protocol,
             self.file_handler,
             sequence_number.value,
             ack_number.value,
+            self.congestion_controller,
+            self.start_digest(),
+            codec,
+            chunk_size,
         )
 
         _seq, _ack, last_raw_packet, already_received_fin_back = gbn_sender.send_file(
@@ -2,17 +2,20 @@ from _socket import SHUT_RDWR
 
 from lib.common.address import Address
 from lib.common.constants import (
-    FILE_CHUNK_SIZE_SAW,
+    TRACE_ACK_RECEIVED,
+    TRACE_CHUNK_RECEIVED,
+    TRACE_CHUNK_SENT,
 )
 from lib.common.exceptions.connection_lost import ConnectionLost
 from lib.common.exceptions.socket_shutdown import SocketShutdown
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
 from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.packet.packet import Packet
 from lib.common.socket_saw import SocketSaw
 from lib.server.client_connection.abstract_client_connection import ClientConnection
 from lib.server.connection_state import ConnectionState
-from lib.common.file_handler import FileHandler
 
 NO_ACK_NUMBER = MutableVariable(None)
 
@@ -27,6 +30,8 @@ class ClientConnectionSaw(ClientConnection):
         logger: CoolLogger,
         file_handler: FileHandler,
         packet: Packet,
+        fast_open_request: FastOpenRequest | None,
+        integrity: bool = True,
     ):
         super().__init__(
             connection_socket,
@@ -36,6 +41,8 @@ class ClientConnectionSaw(ClientConnection):
             logger,
             file_handler,
             packet,
+            fast_open_request,
+            integrity,
         )
 
         self.socket.reset_state()
@@ -46,6 +53,12 @@ class ClientConnectionSaw(ClientConnection):
         _seq, packet = self.protocol.receive_file_chunk(
             sequence_number.value)
         sequence_number.value = _seq
+        if self.socket.trace is not None:
+            self.socket.trace.record(
+                TRACE_CHUNK_RECEIVED,
+                chunk_number - 1,
+                packet.sequence_number,
+                packet.payload_length)
 
         if not packet.is_fin:
             self.protocol.send_ack(
@@ -55,7 +68,7 @@ class ClientConnectionSaw(ClientConnection):
                 self.address,
             )
 
-        self.logger.debug(f"Received chunk {chunk_number}")
+        self.logger.debug("Received chunk %d", chunk_number)
         self.file_handler.append_to_file(self.file, packet)
 
         return packet
@@ -73,6 +86,8 @@ class ClientConnectionSaw(ClientConnection):
         filesize.value = _filesize
 
         self.logger.debug(f"Ready to receive from {self.client_address}")
+        self.file.digest = self.start_digest()
+        self.file.codec = self.codec
 
         chunk_number: int = 1
 
@@ -86,7 +101,7 @@ class ClientConnectionSaw(ClientConnection):
                 sequence_number, chunk_number)
 
         self.logger.debug("Finished receiving file")
-        self.file_handler.close(self.file)
+        self.complete_upload()
 
     def transmit_file(
         self, sequence_number: MutableVariable, filename: MutableVariable
@@ -99,23 +114,29 @@ class ClientConnectionSaw(ClientConnection):
         self.logger.debug(f"Ready to transmit to {self.client_address}")
 
         chunk_number: int = 1
+        chunk_size = self.chunk_size_for_sending()
         total_chunks: int = self.file_handler.get_number_of_chunks(
-            filesize, FILE_CHUNK_SIZE_SAW
+            filesize, chunk_size
         )
         is_last_chunk: bool = False
         is_first_chunk: bool = True
+        transfer_digest = self.start_digest()
+        codec = self.codec_for_sending(chunk_size)
 
         self.logger.info(
             f"Sending file {
                 filename.value} of {
                 self.file_handler.bytes_to_megabytes(filesize)} MB")
 
-        while chunk := self.file_handler.read(
-                self.file, FILE_CHUNK_SIZE_SAW):
+        while chunk_number <= total_chunks:
+            chunk = self.file_handler.read_mapped(
+                self.file, self.mapped_file, chunk_size)
             chunk_len = len(chunk)
             self.logger.debug(
-                f"Sending chunk {chunk_number}/{total_chunks} of size {
-                    self.file_handler.bytes_to_kilobytes(chunk_len)} KB")
+                "Sending chunk %d/%d of size %.2f KB",
+                chunk_number,
+                total_chunks,
+                chunk_len / 1024)
 
             if chunk_number == total_chunks:
                 is_last_chunk = True
@@ -123,20 +144,43 @@ class ClientConnectionSaw(ClientConnection):
             if not is_first_chunk:
                 sequence_number.value.step()
 
+            digest = None
+            if transfer_digest is not None:
+                transfer_digest.update(chunk)
+                if is_last_chunk:
+                    digest = transfer_digest.digest()
+
+            is_compressed = False
+            if codec is not None:
+                chunk, is_compressed = codec.encode(chunk)
+
             self.protocol.send_file_chunk(
                 sequence_number.value,
                 None,
                 chunk,
-                chunk_len,
+                len(chunk),
                 is_last_chunk,
                 is_first_chunk,
                 self.client_address,
+                digest,
+                is_compressed,
             )
+            if self.socket.trace is not None:
+                self.socket.trace.record(
+                    TRACE_CHUNK_SENT,
+                    chunk_number - 1,
+                    sequence_number.value.value,
+                    len(chunk))
 
             if not is_last_chunk:
                 self.logger.debug(
-                    f"Waiting confirmation for chunk {chunk_number}")
+                    "Waiting confirmation for chunk %d", chunk_number)
                 self.protocol.wait_for_ack(sequence_number.value)
+                if self.socket.trace is not None:
+                    self.socket.trace.record(
+                        TRACE_ACK_RECEIVED,
+                        chunk_number - 1,
+                        sequence_number.value.value)
 
             chunk_number += 1
             is_first_chunk = False
@@ -0,0 +1,29 @@
+from lib.common.sequence_number import SequenceNumber
+from lib.server.client_connection.client_connection_gbn import ClientConnectionGbn
+from lib.server.protocol_gbn import ServerProtocolGbn
+from lib.server.selective_repeat_receiver_server import (
+    SelectiveRepeatReceiverServer,
+)
+from lib.server.selective_repeat_sender_server import (
+    SelectiveRepeatSenderServer,
+)
+
+
+# Shares the control flow of Go-Back-N, only the file transfer differs
+class ClientConnectionSr(ClientConnectionGbn):
+    sender_class: type = SelectiveRepeatSenderServer
+
+    # Selective acks tell of a single chunk each, none of them is delayed
+    def create_receiver(
+        self,
+        gbn_protocol: ServerProtocolGbn,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+    ) -> SelectiveRepeatReceiverServer:
+        return SelectiveRepeatReceiverServer(
+            self.logger,
+            gbn_protocol,
+            self.file_handler,
+            sequence_number,
+            ack_number,
+        )
@@ -1,13 +1,20 @@
 from lib.common.address import Address
-from lib.common.constants import STOP_AND_WAIT_PROTOCOL_TYPE
+from lib.common.constants import (
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+)
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
 from lib.common.logger import CoolLogger
 from lib.common.packet.packet import Packet
 from lib.common.socket_saw import SocketSaw
 from lib.server.client_connection.abstract_client_connection import ClientConnection
 from lib.server.client_connection.client_connection_gbn import ClientConnectionGbn
 from lib.server.client_connection.client_connection_saw import ClientConnectionSaw
+from lib.server.client_connection.client_connection_sr import ClientConnectionSr
 from lib.server.client_pool import ClientPool
-from lib.common.file_handler import FileHandler
+from lib.server.server_metrics import ServerMetrics
+from lib.server.server_stats import ServerStats
 
 
 class ClientManager:
@@ -15,10 +22,22 @@ class ClientManager:
             self,
             logger: CoolLogger,
             protocol: str,
-            client_pool: ClientPool):
+            client_pool: ClientPool,
+            congestion: str,
+            ack_every: int,
+            stats: ServerStats,
+            metrics: ServerMetrics | None = None,
+            integrity: bool = True):
         self.clients: ClientPool = client_pool
         self.logger: CoolLogger = logger
         self.protocol: str = protocol
+        self.congestion: str = congestion
+        self.ack_every: int = ack_every
+        self.stats: ServerStats = stats
+        # Only set when the server serves its metrics
+        self.metrics: ServerMetrics | None = metrics
+        # Whether connections check the integrity clients ask them to
+        self.integrity: bool = integrity
 
     def add_client(
         self,
@@ -27,6 +46,7 @@ class ClientManager:
         client_address: Address,
         file_handler: FileHandler,
         packet: Packet,
+        fast_open_request: FastOpenRequest | None,
     ) -> None:
         self.rip_finished_clients()
 
@@ -36,9 +56,13 @@ class ClientManager:
             client_address,
             file_handler,
             packet,
+            fast_open_request,
         )
-        self.clients.add(key=connection_address.to_combined(),
+        self.clients.add(key=client_address.to_combined(),
                          value=client_connection)
+        self.stats.record_accepted()
+        if self.metrics is not None:
+            self.metrics.add(client_connection)
         client_connection.start()
 
     def rip_finished_clients(self):
@@ -47,7 +71,10 @@ class ClientManager:
         for connection in self.clients.values():
             if connection.is_ready_to_die():
                 connection.kill()
-                killed_clients.append(connection.address)
+                self.stats.record_finished(connection.state)
+                if self.metrics is not None:
+                    self.metrics.remove(connection)
+                killed_clients.append(connection.client_address)
 
         for killed_client in killed_clients:
             self.logger.debug(
@@ -59,6 +86,11 @@ class ClientManager:
         for connection in self.clients.values():
             connection.kill()
 
+        for connection in self.clients.values():
+            self.stats.record_finished(connection.state)
+            if self.metrics is not None:
+                self.metrics.remove(connection)
+
     def create_connection(
         self,
         connection_socket: SocketSaw,
@@ -66,6 +98,7 @@ class ClientManager:
         client_address: Address,
         file_handler: FileHandler,
         packet: Packet,
+        fast_open_request: FastOpenRequest | None,
     ) -> ClientConnection:
         new_logger = CoolLogger(self.logger.current_level)
         new_logger.set_prefix("")
@@ -78,6 +111,22 @@ class ClientManager:
                 new_logger,
                 file_handler,
                 packet,
+                fast_open_request,
+                integrity=self.integrity,
+            )
+        elif self.protocol == SELECTIVE_REPEAT_PROTOCOL_TYPE:
+            new_connection: ClientConnectionSr = ClientConnectionSr(
+                connection_socket,
+                connection_address,
+                client_address,
+                self.protocol,
+                new_logger,
+                file_handler,
+                packet,
+                fast_open_request,
+                self.congestion,
+                self.ack_every,
+                self.integrity,
             )
         else:  # if self.protocol == GO_BACK_N_PROTOCOL_TYPE:
             new_connection: ClientConnectionGbn = ClientConnectionGbn(
@@ -88,6 +137,10 @@ class ClientManager:
                 new_logger,
                 file_handler,
                 packet,
+                fast_open_request,
+                self.congestion,
+                self.ack_every,
+                self.integrity,
             )
 
         return new_connection
@@ -1,10 +1,19 @@
-from lib.common.constants import SOCKET_CONNECTION_LOST_TIMEOUT, SHOULD_PRINT_CHUNK_HASH
+from lib.common.ack_policy import AckPolicy
+from lib.common.constants import (
+    SHOULD_PRINT_CHUNK_HASH,
+    SOCKET_CONNECTION_LOST_TIMEOUT,
+    TRACE_ACK_SENT,
+    TRACE_CHUNK_OUT_OF_ORDER,
+    TRACE_CHUNK_RECEIVED,
+)
 from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
+from lib.common.exceptions.retransmission_needed import RetransmissionNeeded
 from lib.common.file_handler import FileHandler
 from lib.common.hash_compute import compute_chunk_sha256
 from lib.common.logger import CoolLogger
 from lib.common.mutable_variable import MutableVariable
 from lib.common.sequence_number import SequenceNumber
+from lib.common.transfer_trace import TransferTrace
 from lib.server.protocol_gbn import ServerProtocolGbn
 
 
@@ -16,6 +25,7 @@ class GoBackNReceiver:
         file_handler: FileHandler,
         sequence_number: SequenceNumber,
         ack_number: SequenceNumber,
+        ack_policy: AckPolicy | None = None,
     ) -> None:
         self.base: int = 0
         self.logger: CoolLogger = logger
@@ -25,19 +35,62 @@ class GoBackNReceiver:
         self.ack_number: SequenceNumber = ack_number
         self.next_seq_num: int = 0
         self.file_handler: FileHandler = file_handler
-        self.protocol.socket.set_timeout(SOCKET_CONNECTION_LOST_TIMEOUT)
+        self.ack_policy: AckPolicy = ack_policy or AckPolicy()
+        # Numbers the ack of the last chunk in order would have been sent
+        # with, kept while it is delayed
+        self.pending_ack: tuple[SequenceNumber, SequenceNumber] | None = None
+        self.idle_timeout: float | None = SOCKET_CONNECTION_LOST_TIMEOUT
+        self.protocol.socket.set_timeout(self.idle_timeout)
+        # Only kept when the connection is traced
+        self.trace: TransferTrace | None = protocol.socket.trace
+
+    def send_ack(
+            self,
+            sequence_number: SequenceNumber,
+            ack_number: SequenceNumber) -> None:
+        self.protocol.send_ack(sequence_number, ack_number)
+        self.ack_policy.on_ack_sent()
+        if self.trace is not None:
+            self.trace.record(TRACE_ACK_SENT, 0, ack_number.value)
+        self.pending_ack = None
+
+    # A delayed ack is sent once it is due, whether more chunks arrived
+    # meanwhile or not
+    def receive_chunk(self):
+        while True:
+            if self.pending_ack is not None:
+                timeout = self.ack_policy.ack_timeout()
+                if timeout == 0:
+                    self.send_ack(*self.pending_ack)
+                    continue
+                self.protocol.socket.set_timeout(timeout)
 
-    def receive_single_chunk(self, chunk_number: int):
-        packet = self.protocol.receive_file_chunk(self.sqn_number)
+            try:
+                return self.protocol.receive_file_chunk(self.sqn_number)
+            except RetransmissionNeeded:
+                if self.pending_ack is None:
+                    raise
+                self.send_ack(*self.pending_ack)
+            finally:
+                self.protocol.socket.set_timeout(self.idle_timeout)
+
+    def receive_single_chunk(
+            self, chunk_number: int, is_ack_delayed: bool = True):
+        packet = self.receive_chunk()
 
         if not packet.is_fin:
-            self.protocol.send_ack(self.sqn_number, self.ack_number)
+            if self.ack_policy.should_ack(at_once=not is_ack_delayed):
+                self.send_ack(self.sqn_number, self.ack_number)
+            else:
+                self.pending_ack = (
+                    self.sqn_number.clone(), self.ack_number.clone())
 
         if chunk_number > 0:
-            msg = f"Received chunk {chunk_number}. "
-            if SHOULD_PRINT_CHUNK_HASH:
-                msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
-            self.logger.debug(msg)
+            if self.logger.is_debug_enabled:
+                msg = f"Received chunk {chunk_number}. "
+                if SHOULD_PRINT_CHUNK_HASH:
+                    msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
+                self.logger.debug(msg)
 
         return packet
 
@@ -55,8 +108,8 @@ class GoBackNReceiver:
             packet_storage.value = packet
         else:
             self.logger.warn(
-                f"Found invalid sequence number, expected seq {
-                    self.sqn_number.value}")
+                "Found invalid sequence number, expected seq %d",
+                self.sqn_number.value)
             self.logger.debug("Resending filesize status")
             self.protocol.socket.sendto(
                 last_transmitted_packet, self.protocol.client_address
@@ -72,7 +125,8 @@ class GoBackNReceiver:
 
         while not first_chunk_received.value:
             try:
-                packet.value = self.receive_single_chunk(chunk_number)
+                packet.value = self.receive_single_chunk(
+                    chunk_number, is_ack_delayed=False)
                 self.validate_first_packet_and_resend(
                     packet.value,
                     first_chunk_received,
@@ -106,11 +160,12 @@ class GoBackNReceiver:
         chunk_number: int = 0
 
         if not should_continue_reception.value and packet.payload_length > 0:
-            msg = f"Received chunk {chunk_number + 1}. "
-            if SHOULD_PRINT_CHUNK_HASH:
-                msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
+            if self.logger.is_debug_enabled:
+                msg = f"Received chunk {chunk_number + 1}. "
+                if SHOULD_PRINT_CHUNK_HASH:
+                    msg += f"Hash is: {compute_chunk_sha256(packet.data)}"
 
-            self.logger.debug(msg)
+                self.logger.debug(msg)
             self.file_handler.append_to_file(file, packet)
 
         while should_continue_reception.value:
@@ -118,17 +173,34 @@ class GoBackNReceiver:
 
             try:
                 packet = self.receive_single_chunk(chunk_number)
+                if self.trace is not None:
+                    self.trace.record(
+                        TRACE_CHUNK_RECEIVED,
+                        chunk_number,
+                        packet.sequence_number,
+                        packet.payload_length)
                 self.file_handler.append_to_file(file, packet)
 
                 should_continue_reception.value = not packet.is_fin
                 if should_continue_reception.value:
                     self.sqn_number.step()
                     self.ack_number.step()
-            except InvalidSequenceNumber:
+            except InvalidSequenceNumber as e:
+                if self.trace is not None:
+                    self.trace.record(
+                        TRACE_CHUNK_OUT_OF_ORDER,
+                        chunk_number,
+                        e.packet.sequence_number,
+                        e.packet.payload_length)
                 chunk_number -= 1
                 self.logger.warn(
-                    f"Found invalid sequence number, expected seq {
-                        self.sqn_number.value}")
-                self.protocol.send_ack(self.sqn_number, self.ack_number)
-
+                    "Found invalid sequence number, expected seq %d",
+                    self.sqn_number.value)
+                self.ack_policy.on_out_of_order()
+                self.send_ack(self.sqn_number, self.ack_number)
+
+        self.logger.info(
+            f"Acked {self.ack_policy.chunks_received} chunks with {
+                self.ack_policy.acks_sent} ACKs, {
+                self.ack_policy.ack_reduction:.0%} fewer")
         return self.sqn_number, self.ack_number
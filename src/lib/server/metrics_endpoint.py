@@ -0,0 +1,113 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path, remove, stat
+from socketserver import ThreadingMixIn, UnixStreamServer
+from stat import S_ISSOCK
+from threading import Thread
+
+from lib.common.constants import (
+    IPV4_LOCALHOST,
+    METRICS_CONTENT_TYPE,
+    METRICS_PATH,
+)
+from lib.common.logger import CoolLogger
+from lib.server.exceptions.cannot_bind_socket import CannotBindSocket
+from lib.server.server_metrics import ServerMetrics
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+# Answers GET /metrics with the metrics of the server, anything else is
+# not found
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in (METRICS_PATH, "/"):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Unix sockets give no client address to log, and requests are not
+    # worth a line each
+    def log_message(self, format, *args):
+        pass
+
+
+# Addresses with a slash are paths of Unix sockets, the rest are a port to
+# listen on locally or a host and a port
+def is_unix_socket_address(address: str) -> bool:
+    return "/" in address
+
+
+def parse_tcp_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    try:
+        return host or IPV4_LOCALHOST, int(port)
+    except ValueError:
+        raise CannotBindSocket(
+            f"Invalid metrics address {address}") from None
+
+
+# Workers of the same server get an endpoint each, the next port or a path
+# of their own
+def metrics_address_for_worker(address: str, worker_id: int) -> str:
+    if is_unix_socket_address(address):
+        return f"{address}.{worker_id}"
+
+    host, port = parse_tcp_address(address)
+    return f"{host}:{port + worker_id}"
+
+
+# Serves the metrics over HTTP from a thread of its own, on a TCP port or a
+# Unix socket
+class MetricsEndpoint:
+    def __init__(
+            self,
+            address: str,
+            metrics: ServerMetrics,
+            logger: CoolLogger):
+        self.address: str = address
+        self.logger: CoolLogger = logger
+
+        try:
+            self.http_server = self.bind()
+        except OSError as e:
+            raise CannotBindSocket(
+                f"Cannot bind metrics endpoint to {address}. {e}") from e
+
+        self.http_server.metrics = metrics
+        self.thread: Thread = Thread(
+            target=self.http_server.serve_forever, daemon=True)
+
+    def bind(self):
+        if not is_unix_socket_address(self.address):
+            return ThreadingHTTPServer(
+                parse_tcp_address(self.address), MetricsRequestHandler)
+
+        # Only a socket left behind by a server that did not stop is taken
+        # over, never any other file
+        if path.exists(self.address) and S_ISSOCK(
+                stat(self.address).st_mode):
+            remove(self.address)
+        return UnixHTTPServer(self.address, MetricsRequestHandler)
+
+    def start(self) -> None:
+        self.thread.start()
+        self.logger.info(f"Serving metrics on {self.address}")
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.thread.join()
+
+        if is_unix_socket_address(self.address):
+            try:
+                remove(self.address)
+            except OSError:
+                pass
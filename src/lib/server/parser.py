@@ -1,10 +1,15 @@
 import argparse
 
 from lib.common.constants import (
+    ACK_EVERY,
+    AIMD_CONGESTION_CONTROL,
+    CUBIC_CONGESTION_CONTROL,
     DEFAULT_PORT,
+    FIXED_CONGESTION_CONTROL,
     GO_BACK_N_PROTOCOL_TYPE,
-    STOP_AND_WAIT_PROTOCOL_TYPE,
     IPV4_LOCALHOST,
+    SELECTIVE_REPEAT_PROTOCOL_TYPE,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
 )
 
 
@@ -64,10 +69,74 @@ class ServerArgParser:
             "-r",
             "--protocol",
             required=False,
-            choices=[STOP_AND_WAIT_PROTOCOL_TYPE, GO_BACK_N_PROTOCOL_TYPE],
+            choices=[
+                STOP_AND_WAIT_PROTOCOL_TYPE,
+                GO_BACK_N_PROTOCOL_TYPE,
+                SELECTIVE_REPEAT_PROTOCOL_TYPE,
+            ],
             default=GO_BACK_N_PROTOCOL_TYPE,
             metavar="PROTOCOL",
             help="error recovery protocol",
         )
 
+        self.internal_parser.add_argument(
+            "-c",
+            "--congestion",
+            required=False,
+            choices=[
+                FIXED_CONGESTION_CONTROL,
+                AIMD_CONGESTION_CONTROL,
+                CUBIC_CONGESTION_CONTROL,
+            ],
+            default=FIXED_CONGESTION_CONTROL,
+            metavar="ALGORITHM",
+            help="congestion control of the sending window",
+        )
+
+        self.internal_parser.add_argument(
+            "-a",
+            "--ack-every",
+            required=False,
+            default=ACK_EVERY,
+            type=int,
+            metavar="CHUNKS",
+            help="chunks acked at once when receiving with Go-Back-N",
+        )
+
+        self.internal_parser.add_argument(
+            "-w",
+            "--workers",
+            required=False,
+            default=1,
+            type=int,
+            metavar="WORKERS",
+            help="server processes sharing the service port",
+        )
+
+        self.internal_parser.add_argument(
+            "-T",
+            "--trace",
+            required=False,
+            default=None,
+            metavar="DIRPATH",
+            help="dir the event trace of every connection is written to",
+        )
+
+        self.internal_parser.add_argument(
+            "-M",
+            "--metrics",
+            required=False,
+            default=None,
+            type=str,
+            metavar="ADDR",
+            help="port, host:port or Unix socket path metrics are served on",
+        )
+
+        self.internal_parser.add_argument(
+            "--no-checksum",
+            dest="integrity",
+            action="store_false",
+            help="check neither the datagrams nor the file once moved",
+        )
+
         return self.internal_parser.parse_args()
@@ -1,30 +1,31 @@
 from lib.common.address import Address
 from lib.common.constants import (
-    UPLOAD_OPERATION,
     DOWNLOAD_OPERATION,
-    STRING_ENCODING_FORMAT,
-    COMMS_BUFFER_SIZE,
     FULL_BUFFER_SIZE,
-    ZERO_BYTES,
     INT_DESERIALIZATION_BYTEORDER,
-    GO_BACK_N_PROTOCOL_TYPE,
+    RESUME_OFFSET_SEPARATOR,
     STOP_AND_WAIT_PROTOCOL_TYPE,
+    STRING_ENCODING_FORMAT,
+    UPLOAD_OPERATION,
+    WINDOWED_PROTOCOL_TYPES,
+    ZERO_BYTES,
 )
+from lib.common.exceptions.connection_lost import ConnectionLost
+from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
+from lib.common.exceptions.message_not_ack import MessageIsNotAck
 from lib.common.exceptions.message_not_fin_nor_ack import MessageNotFinNorAck
+from lib.common.exceptions.socket_shutdown import SocketShutdown
+from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
+from lib.common.exceptions.unexpected_syn import UnexpectedSynMessage
+from lib.common.fast_open import FastOpenRequest
 from lib.common.logger import CoolLogger
-from lib.common.packet.packet import Packet, PacketParser, PacketGbn, PacketSaw
+from lib.common.packet.packet import Packet, PacketGbn, PacketParser, PacketSaw
 from lib.common.re_listen_decorator import re_listen_if_failed
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_saw import SocketSaw
 from lib.server.client_pool import ClientPool
-
-from lib.common.exceptions.connection_lost import ConnectionLost
-from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
-from lib.common.exceptions.message_not_ack import MessageIsNotAck
-from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
-from lib.common.exceptions.socket_shutdown import SocketShutdown
-from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 from lib.server.exceptions.missing_client_address import MissingClientAddress
+from lib.server.exceptions.unexpected_operation import UnexpectedOperation
 
 
 class ServerProtocol:
@@ -67,6 +68,19 @@ class ServerProtocol:
 
         self.socket.sendto(packet_bin, client_address)
 
+    def socket_send_buffers_to(
+            self,
+            packet_to_send: Packet,
+            client_address: Address):
+        if self.protocol_version == STOP_AND_WAIT_PROTOCOL_TYPE:
+            buffers: list = PacketParser.compose_packet_saw_buffers(
+                packet_to_send)
+        else:
+            buffers: list = PacketParser.compose_packet_gbn_buffers(
+                packet_to_send)
+
+        self.socket.sendmsg(buffers, client_address)
+
     def validate_inbound_packet(
         self, raw_packet, client_address_tuple
     ) -> tuple[Packet, Address]:
@@ -120,6 +134,8 @@ class ServerProtocol:
         port: int,
         payload_length: int,
         data: bytes,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ) -> Packet:
         if protocol == STOP_AND_WAIT_PROTOCOL_TYPE:
             return PacketSaw(
@@ -131,6 +147,8 @@ class ServerProtocol:
                 payload_length=payload_length,
                 sequence_number=sequence_number.value,
                 data=data,
+                digest=digest,
+                is_compressed=is_compressed,
             )
         else:  # if protocol == GO_BACK_N_PROTOCOL_TYPE
             return PacketGbn(
@@ -143,12 +161,14 @@ class ServerProtocol:
                 sequence_number=sequence_number.value,
                 ack_number=ack_number.value,
                 data=data,
+                digest=digest,
+                is_compressed=is_compressed,
             )
 
     @re_listen_if_failed()
     def expect_handshake_completion(self) -> tuple[Packet, Address]:
         raw_packet, client_address_tuple = self.socket_receive_from(
-            COMMS_BUFFER_SIZE, should_retransmit=True
+            FULL_BUFFER_SIZE, should_retransmit=True
         )
 
         packet, client_address = self.validate_inbound_ack(
@@ -167,7 +187,7 @@ class ServerProtocol:
             raise UnexpectedOperation()
 
         ack_number = None
-        if self.protocol_version == GO_BACK_N_PROTOCOL_TYPE:
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
             _packet: PacketGbn = packet
             ack_number = SequenceNumber(
                 _packet.ack_number, self.protocol_version)
@@ -178,12 +198,69 @@ class ServerProtocol:
             ack_number,
         )
 
+    def process_fast_open_request(
+        self, packet: Packet, request: FastOpenRequest
+    ) -> tuple[SequenceNumber, SequenceNumber]:
+        if (request.op_code != UPLOAD_OPERATION
+                and request.op_code != DOWNLOAD_OPERATION):
+            raise UnexpectedOperation()
+
+        ack_number = None
+        if self.protocol_version in WINDOWED_PROTOCOL_TYPES:
+            _packet: PacketGbn = packet
+            ack_number = SequenceNumber(
+                _packet.ack_number, self.protocol_version)
+
+        return (
+            SequenceNumber(packet.sequence_number, self.protocol_version),
+            ack_number,
+        )
+
+    def send_fast_open_answer(
+        self,
+        sequence_number: SequenceNumber,
+        ack_number: SequenceNumber,
+        client_address: Address,
+        connection_address: Address,
+        data: bytes,
+    ) -> None:
+        packet_to_send: Packet = self.build_packet(
+            protocol=self.protocol_version,
+            is_ack=True,
+            is_syn=True,
+            is_fin=False,
+            port=connection_address.port,
+            payload_length=len(data),
+            sequence_number=sequence_number,
+            ack_number=ack_number,
+            data=data,
+        )
+
+        self.socket_send_to(packet_to_send, client_address)
+
+    # Clients that missed the answer send their SYN again, the answer is
+    # sent again until anything else comes from them
+    @re_listen_if_failed()
+    def wait_for_fast_open_confirmation(self) -> tuple[bytes, tuple]:
+        raw_packet, client_address_tuple = self.socket_receive_from(
+            FULL_BUFFER_SIZE, should_retransmit=True
+        )
+        packet, client_address = self.validate_inbound_packet(
+            raw_packet, client_address_tuple
+        )
+
+        if packet.is_syn:
+            raise UnexpectedSynMessage()
+
+        return raw_packet, client_address_tuple
+
     def send_ack(
         self,
         sequence_number: SequenceNumber,
         ack_number: SequenceNumber,
         client_address: Address,
         connection_address: Address,
+        data: bytes = ZERO_BYTES,
     ) -> None:
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -191,10 +268,10 @@ class ServerProtocol:
             is_syn=False,
             is_fin=False,
             port=connection_address.port,
-            payload_length=0,
+            payload_length=len(data),
             sequence_number=sequence_number,
             ack_number=ack_number,
-            data=ZERO_BYTES,
+            data=data,
         )
 
         self.socket_send_to(packet_to_send, client_address)
@@ -205,6 +282,7 @@ class ServerProtocol:
         ack_number: SequenceNumber,
         client_address: Address,
         connection_address: Address,
+        data: bytes = ZERO_BYTES,
     ) -> None:
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -212,10 +290,10 @@ class ServerProtocol:
             is_syn=False,
             is_fin=True,
             port=connection_address.port,
-            payload_length=0,
+            payload_length=len(data),
             sequence_number=sequence_number,
             ack_number=ack_number,
-            data=ZERO_BYTES,
+            data=data,
         )
 
         self.socket_send_to(packet_to_send, client_address)
@@ -223,25 +301,33 @@ class ServerProtocol:
     @re_listen_if_failed()
     def receive_filename(
         self, sequence_number: SequenceNumber
-    ) -> tuple[SequenceNumber, str]:
+    ) -> tuple[SequenceNumber, str, int | None]:
         raw_packet, client_address_tuple = self.socket_receive_from(
             FULL_BUFFER_SIZE, should_retransmit=True
         )
         packet, client_address = self.validate_inbound_packet(
             raw_packet, client_address_tuple
         )
-        filename: str = packet.data.decode(STRING_ENCODING_FORMAT)
+        # Clients resuming a transfer add the offset to go on from after
+        # the name
+        raw_filename, separator, raw_offset = bytes(packet.data).partition(
+            RESUME_OFFSET_SEPARATOR)
+        filename: str = str(raw_filename, STRING_ENCODING_FORMAT)
+        resume_offset: int | None = None
+        if separator:
+            resume_offset = int.from_bytes(
+                raw_offset, INT_DESERIALIZATION_BYTEORDER)
 
         self.validate_sequence_number(packet, sequence_number)
         return SequenceNumber(packet.sequence_number,
-                              self.protocol_version), filename
+                              self.protocol_version), filename, resume_offset
 
     @re_listen_if_failed()
     def receive_filesize(
         self, sequence_number: SequenceNumber
     ) -> tuple[SequenceNumber, int]:
         raw_packet, client_address_tuple = self.socket_receive_from(
-            COMMS_BUFFER_SIZE, should_retransmit=True
+            FULL_BUFFER_SIZE, should_retransmit=True
         )
         packet, client_address = self.validate_inbound_packet(
             raw_packet, client_address_tuple
@@ -272,7 +358,7 @@ class ServerProtocol:
     def wait_for_ack(self, sequence_number: SequenceNumber) -> None:
         try:
             raw_packet, client_address_tuple = self.socket_receive_from(
-                COMMS_BUFFER_SIZE, should_retransmit=True
+                FULL_BUFFER_SIZE, should_retransmit=True
             )
         except OSError:
             raise ConnectionLost()
@@ -286,7 +372,7 @@ class ServerProtocol:
     def wait_for_fin_or_ack(self, sequence_number: SequenceNumber) -> None:
         try:
             raw_packet, client_address_tuple = self.socket_receive_from(
-                COMMS_BUFFER_SIZE, should_retransmit=True
+                FULL_BUFFER_SIZE, should_retransmit=True
             )
         except OSError:
             raise ConnectionLost()
@@ -303,11 +389,13 @@ class ServerProtocol:
         self,
         sequence_number: SequenceNumber,
         ack_number: SequenceNumber,
-        chunk: bytes,
+        chunk: bytes | memoryview,
         chunk_len: int,
         is_last_chunk: bool,
         is_first_chunk: bool,
         client_address: Address,
+        digest: bytes | None = None,
+        is_compressed: bool = False,
     ) -> None:
         packet_to_send: Packet = self.build_packet(
             protocol=self.protocol_version,
@@ -319,6 +407,8 @@ class ServerProtocol:
             sequence_number=sequence_number,
             ack_number=ack_number,
             data=chunk,
+            digest=digest,
+            is_compressed=is_compressed,
         )
 
-        self.socket_send_to(packet_to_send, client_address)
+        self.socket_send_buffers_to(packet_to_send, client_address)
@@ -1,5 +1,5 @@
 from lib.common.address import Address
-from lib.common.constants import FULL_BUFFER_SIZE, ZERO_BYTES, COMMS_BUFFER_SIZE
+from lib.common.constants import FULL_BUFFER_SIZE, ZERO_BYTES
 from lib.common.exceptions.invalid_ack_number import InvalidAckNumber
 from lib.common.exceptions.invalid_sequence_number import InvalidSequenceNumber
 from lib.common.exceptions.message_not_ack import MessageIsNotAck
@@ -7,7 +7,7 @@ from lib.common.exceptions.message_not_fin import MessageIsNotFin
 from lib.common.exceptions.socket_shutdown import SocketShutdown
 from lib.common.exceptions.unexpected_fin import UnexpectedFinMessage
 from lib.common.logger import CoolLogger
-from lib.common.packet.packet import PacketGbn, Packet, PacketParser
+from lib.common.packet.packet import Packet, PacketGbn, PacketParser
 from lib.common.sequence_number import SequenceNumber
 from lib.common.socket_gbn import SocketGbn
 from lib.server.client_pool import ClientPool
@@ -46,6 +46,15 @@ class ServerProtocolGbn:
             packet_to_send)
         self.socket.sendto(packet_bin, client_address)
 
+    def socket_send_buffers_to(
+            self,
+            packet_to_send: PacketGbn,
+            client_address: Address) -> list:
+        buffers: list = PacketParser.compose_packet_gbn_buffers(
+            packet_to_send)
+        self.socket.sendmsg(buffers, client_address)
+        return buffers
+
     def validate_inbound_packet(
         self, raw_packet, client_address_tuple
     ) -> tuple[PacketGbn, Address]:
@@ -111,6 +120,15 @@ class ServerProtocolGbn:
         self.validate_sequence_number(packet, sequence_number)
         return packet
 
+    def receive_file_chunk_in_any_order(self) -> PacketGbn:
+        raw_packet, client_address_tuple = self.socket_receive_from(
+            FULL_BUFFER_SIZE)
+
+        packet, client_address = self.validate_inbound_packet(
+            raw_packet, client_address_tuple
+        )
+        return packet
+
     def send_ack(
         self,
         sequence_number: SequenceNumber,
@@ -133,11 +151,13 @@ class ServerProtocolGbn:
         self,
         sequence_number: SequenceNumber,
         ack_number: SequenceNumber,
-        chunk: bytes,
+        chunk: bytes | memoryview,
         chunk_len: int,
         is_last_chunk: bool,
         is_first_chunk: bool,
-    ) -> bytes:
+        digest: bytes | None = None,
+        is_compressed: bool = False,
+    ) -> list:
         packet_to_send: PacketGbn = PacketGbn(
             protocol=self.protocol_version,
             is_ack=is_first_chunk,
@@ -148,18 +168,18 @@ class ServerProtocolGbn:
             sequence_number=sequence_number.value,
             ack_number=ack_number.value,
             data=chunk,
+            digest=digest,
+            is_compressed=is_compressed,
         )
 
-        self.socket_send_to(packet_to_send, self.client_address)
-        packet_bin: bytes = PacketParser.compose_packet_gbn_for_net(
-            packet_to_send)
-        return packet_bin
+        return self.socket_send_buffers_to(
+            packet_to_send, self.client_address)
 
     def wait_for_ack(
         self, _sequence_number: SequenceNumber, ack_number: SequenceNumber
     ) -> PacketGbn:
         raw_packet, server_address_tuple = self.socket_receive_from(
-            COMMS_BUFFER_SIZE)
+            FULL_BUFFER_SIZE)
 
         try:
             packet, server_address = self.validate_inbound_ack(
@@ -174,3 +194,13 @@ class ServerProtocolGbn:
                 raise UnexpectedFinMessage(packet=packet)
             else:
                 raise e
+
+    def wait_for_selective_ack(self) -> PacketGbn:
+        raw_packet, client_address_tuple = self.socket_receive_from(
+            FULL_BUFFER_SIZE)
+
+        packet, client_address = self.validate_inbound_packet(
+            raw_packet, client_address_tuple
+        )
+        self.validate_not_fin(packet)
+        return packet
@@ -0,0 +1,14 @@
+from lib.common.constants import SOCKET_CONNECTION_LOST_TIMEOUT
+from lib.common.selective_repeat_receiver import SelectiveRepeatReceiver
+from lib.server.protocol_gbn import ServerProtocolGbn
+
+
+class SelectiveRepeatReceiverServer(SelectiveRepeatReceiver):
+    receive_timeout: float | None = SOCKET_CONNECTION_LOST_TIMEOUT
+    protocol: ServerProtocolGbn
+
+    def resend_last_answer(self, last_transmitted_packet: bytes) -> None:
+        self.logger.debug("Resending filesize status")
+        self.protocol.socket.sendto(
+            last_transmitted_packet, self.protocol.client_address
+        )
@@ -0,0 +1,48 @@
+from lib.common.chunk_source import WindowedChunkSource
+from lib.common.selective_repeat_sender import SelectiveRepeatSender
+from lib.common.sequence_number import SequenceNumber
+from lib.server.protocol_gbn import ServerProtocolGbn
+
+
+# The first chunk was already sent and acknowledged in a stop and wait
+# manner, along with the answer to the name
+class SelectiveRepeatSenderServer(SelectiveRepeatSender):
+    first_chunk_index: int = 1
+    protocol: ServerProtocolGbn
+
+    def send_file_chunk(
+            self,
+            sequence_number: SequenceNumber,
+            chunk: bytes | memoryview,
+            chunk_len: int,
+            is_last_chunk: bool,
+            digest: bytes | None,
+            is_compressed: bool) -> list:
+        return self.protocol.send_file_chunk(
+            sequence_number,
+            self.ack_number,
+            chunk,
+            chunk_len,
+            is_last_chunk,
+            False,
+            digest,
+            is_compressed,
+        )
+
+    def create_chunk_source(self, file, filesize) -> WindowedChunkSource:
+        amount_to_unwind = (filesize if filesize <
+                            self.chunk_size else self.chunk_size)
+        self.file_handler.unwind(file, amount_to_unwind)
+
+        chunks = WindowedChunkSource(
+            self.file_handler,
+            file,
+            filesize,
+            self.chunk_size,
+            self.file_handler.map_file(file),
+            self.digest,
+            self.codec,
+        )
+        # The first chunk went along with the answer to the name
+        chunks.digest_through(0)
+        return chunks
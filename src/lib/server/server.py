@@ -1,19 +1,23 @@
 import sys
 import threading
-from os import getcwd
 from ctypes import c_bool
 from io import StringIO
 from multiprocessing import Value
+from os import getcwd
 from threading import Thread
 
 from lib.common.address import Address
 from lib.common.constants import ERROR_EXIT_CODE
+from lib.common.file_handler import FileHandler
 from lib.common.logger import CoolLogger
+from lib.common.transfer_trace import enable_tracing
 from lib.common.wait_for_quit import wait_for_quit
 from lib.server.accepter import Accepter
 from lib.server.exceptions.cannot_bind_socket import CannotBindSocket
-from lib.common.file_handler import FileHandler
 from lib.server.exceptions.invalid_directory import InvalidDirectory
+from lib.server.metrics_endpoint import MetricsEndpoint
+from lib.server.server_metrics import ServerMetrics
+from lib.server.server_stats import ServerStats
 
 
 class Server:
@@ -23,12 +27,26 @@ class Server:
             host: str,
             port: int,
             storage: str,
-            protocol: str):
+            protocol: str,
+            congestion: str,
+            ack_every: int,
+            trace: str | None = None,
+            metrics: str | None = None,
+            stats: ServerStats | None = None,
+            reuse_port: bool = False,
+            integrity: bool = True):
         self.logger: CoolLogger = logger
         self.host: str = host
         self.port: int = port
         self.storage: str = storage
         self.protocol: str = protocol
+        self.congestion: str = congestion
+        self.ack_every: int = ack_every
+        self.stats: ServerStats = stats or ServerStats()
+        self.reuse_port: bool = reuse_port
+        self.integrity: bool = integrity
+        # Workers run in processes of their own, each enables it for itself
+        enable_tracing(trace)
         self.address: Address = Address(self.host, self.port)
 
         if self.storage is None or self.storage == "":
@@ -46,12 +64,30 @@ class Server:
             self.logger.error(f"Error opening storage directory: {e}")
             sys.exit(ERROR_EXIT_CODE)
 
+        # Only set when the metrics are served, on a port or a Unix socket
+        self.metrics: ServerMetrics | None = None
+        self.metrics_endpoint: MetricsEndpoint | None = None
+        if metrics is not None:
+            self.metrics = ServerMetrics(self.stats)
+            try:
+                self.metrics_endpoint = MetricsEndpoint(
+                    metrics, self.metrics, self.logger)
+            except CannotBindSocket as e:
+                self.logger.error(e.message)
+                sys.exit(ERROR_EXIT_CODE)
+
         try:
             self.accepter: Accepter = Accepter(
                 self.address,
                 self.protocol,
                 self.logger.clone(),
-                self.file_handler)
+                self.file_handler,
+                self.congestion,
+                self.ack_every,
+                self.stats,
+                self.reuse_port,
+                self.metrics,
+                self.integrity)
         except CannotBindSocket:
             self.logger.error("Shutdown server")
             sys.exit(ERROR_EXIT_CODE)
@@ -86,6 +122,13 @@ class Server:
         )
         wait_for_quit_thread.start()
 
+        self.serve(should_stop_event)
+        self.stop(wait_for_quit_thread, quited)
+
+    # Accepts clients until the event is set, the accepter is left running
+    def serve(self, should_stop_event) -> None:
+        if self.metrics_endpoint is not None:
+            self.metrics_endpoint.start()
         self.accepter.start()
 
         try:
@@ -95,4 +138,5 @@ class Server:
                 "KeyboardInterrupt received, shutting down...")
             should_stop_event.set()
 
-        self.stop(wait_for_quit_thread, quited)
+        if self.metrics_endpoint is not None:
+            self.metrics_endpoint.stop()
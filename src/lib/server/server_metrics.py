@@ -0,0 +1,145 @@
+from threading import Lock
+
+from lib.common.constants import (
+    RTT_HISTOGRAM_BUCKETS,
+    TRACE_CHUNK_RETRANSMITTED,
+    TRACE_DUPLICATE_ACK_RECEIVED,
+    TRACE_FAST_RETRANSMIT,
+    TRACE_TIMEOUT,
+)
+from lib.common.transfer_metrics import TransferMetrics
+from lib.server.connection_state import ConnectionState
+from lib.server.server_stats import ServerStats
+
+METRIC_PREFIX = "transfer"
+
+
+# Metrics of every connection of the server in the Prometheus text format.
+# Connections count on their own and are only read when the metrics are
+# asked for, the counters of the finished ones are folded into the totals
+class ServerMetrics:
+    def __init__(self, stats: ServerStats):
+        self.stats: ServerStats = stats
+        self.lock: Lock = Lock()
+        # value: ClientConnection
+        self.connections: set = set()
+        self.finished: TransferMetrics = TransferMetrics()
+
+    def add(self, connection) -> None:
+        connection.measure(TransferMetrics())
+        with self.lock:
+            self.connections.add(connection)
+
+    def remove(self, connection) -> None:
+        with self.lock:
+            if connection not in self.connections:
+                return
+            self.connections.remove(connection)
+            self.finished.add(connection.metrics)
+
+    def render(self) -> str:
+        with self.lock:
+            connections = list(self.connections)
+            totals = TransferMetrics()
+            totals.add(self.finished)
+
+        for connection in connections:
+            totals.add(connection.metrics)
+
+        lines: list[str] = []
+        self.render_connections(lines, connections)
+        self.render_totals(lines, totals)
+        self.render_rtt(lines, totals)
+        self.render_live(lines, connections)
+        return "\n".join(lines) + "\n"
+
+    def render_connections(self, lines: list[str], connections: list) -> None:
+        accepted, completed, failed = ServerStats.total([self.stats])
+        add_metric(
+            lines, "connections_accepted_total", "counter",
+            "Clients accepted", [("", accepted)])
+        add_metric(
+            lines, "connections_finished_total", "counter",
+            "Connections collected, by how they ended",
+            [('{result="completed"}', completed),
+             ('{result="failed"}', failed)])
+
+        by_state = {state: 0 for state in ConnectionState}
+        for connection in connections:
+            by_state[connection.state] += 1
+        add_metric(
+            lines, "connections", "gauge", "Live connections, by state",
+            [(f'{{state="{state.name.lower()}"}}', count)
+             for state, count in by_state.items()])
+
+    def render_totals(self, lines: list[str], totals: TransferMetrics) -> None:
+        for name, description, value in (
+            ("datagrams_sent_total", "Datagrams sent",
+             totals.datagrams_sent),
+            ("datagrams_received_total", "Intact datagrams received",
+             totals.datagrams_received),
+            ("bytes_sent_total", "Bytes of the datagrams sent",
+             totals.bytes_sent),
+            ("bytes_received_total", "Bytes of the datagrams received",
+             totals.bytes_received),
+            ("file_bytes_total", "Bytes of file chunks sent or written",
+             totals.file_bytes),
+            ("retransmissions_total", "Chunks sent again",
+             totals.events[TRACE_CHUNK_RETRANSMITTED]),
+            ("timeouts_total", "Retransmission timeouts",
+             totals.events[TRACE_TIMEOUT]),
+            ("fast_retransmits_total", "Go-Back-N fast retransmits",
+             totals.events[TRACE_FAST_RETRANSMIT]),
+            ("duplicate_acks_total", "Go-Back-N duplicate acks received",
+             totals.events[TRACE_DUPLICATE_ACK_RECEIVED]),
+        ):
+            add_metric(lines, name, "counter", description, [("", value)])
+
+    def render_rtt(self, lines: list[str], totals: TransferMetrics) -> None:
+        samples = []
+        count = 0
+        # The last bucket has no bound, it is the +Inf one added below
+        for bound, bucket_samples in zip(
+                RTT_HISTOGRAM_BUCKETS, totals.rtt_buckets, strict=False):
+            count += bucket_samples
+            samples.append((f'_bucket{{le="{bound}"}}', count))
+        count += totals.rtt_buckets[-1]
+        samples.append(('_bucket{le="+Inf"}', count))
+        samples.append(("_sum", totals.rtt_sum))
+        samples.append(("_count", count))
+
+        add_metric(
+            lines, "rtt_seconds", "histogram",
+            "RTT samples of chunks sent once", samples)
+
+    # Connections are told by the address of their client
+    def render_live(self, lines: list[str], connections: list) -> None:
+        goodputs = []
+        windows = []
+        for connection in connections:
+            label = f'{{client="{connection.client_address.to_combined()}"}}'
+            goodputs.append((label, connection.metrics.goodput))
+            if connection.congestion_controller is not None:
+                windows.append(
+                    (label, connection.congestion_controller.window))
+
+        add_metric(
+            lines, "connection_goodput_bytes_per_second", "gauge",
+            "File bytes moved by each connection since it started",
+            goodputs)
+        add_metric(
+            lines, "connection_window_chunks", "gauge",
+            "Sending window of each connection sending a file", windows)
+
+
+def add_metric(
+        lines: list[str],
+        name: str,
+        kind: str,
+        description: str,
+        samples: list[tuple[str, float]]) -> None:
+    full_name = f"{METRIC_PREFIX}_{name}"
+    lines.append(f"# HELP {full_name} {description}")
+    lines.append(f"# TYPE {full_name} {kind}")
+    for suffix, value in samples:
+        lines.append(f"{full_name}{suffix} {value}")
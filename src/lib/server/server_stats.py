@@ -0,0 +1,33 @@
+import multiprocessing
+from ctypes import c_int
+
+from lib.server.connection_state import ConnectionState
+
+
+# Counters live in shared memory so a supervisor can add up the ones of
+# every worker process, they have to come from the context that starts them
+class ServerStats:
+    def __init__(self, context=multiprocessing):
+        self.accepted = context.Value(c_int, 0)
+        self.completed = context.Value(c_int, 0)
+        self.failed = context.Value(c_int, 0)
+
+    def record_accepted(self) -> None:
+        with self.accepted.get_lock():
+            self.accepted.value += 1
+
+    # Connections killed before getting done, like on shutdown, count as
+    # failed
+    def record_finished(self, state: ConnectionState) -> None:
+        counter = (self.completed if state == ConnectionState.DONE_READY_TO_DIE
+                   else self.failed)
+        with counter.get_lock():
+            counter.value += 1
+
+    @staticmethod
+    def total(stats: list["ServerStats"]) -> tuple[int, int, int]:
+        return (
+            sum(worker_stats.accepted.value for worker_stats in stats),
+            sum(worker_stats.completed.value for worker_stats in stats),
+            sum(worker_stats.failed.value for worker_stats in stats),
+        )
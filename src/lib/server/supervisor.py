@@ -0,0 +1,150 @@
+import signal
+import sys
+import threading
+from ctypes import c_bool
+from io import StringIO
+from multiprocessing import Value, get_context
+from threading import Thread
+
+from lib.common.constants import ERROR_EXIT_CODE, WORKER_SUPERVISION_INTERVAL
+from lib.common.logger import CoolLogger
+from lib.common.wait_for_quit import wait_for_quit
+from lib.server.metrics_endpoint import metrics_address_for_worker
+from lib.server.server import Server
+from lib.server.server_stats import ServerStats
+
+# Workers are restarted while the quit thread is reading stdin, forking the
+# supervisor then would copy the lock of stdin held by that thread
+WORKERS_CONTEXT = get_context("forkserver")
+
+
+def run_worker(
+        worker_id: int,
+        log_level: int,
+        server_args: dict,
+        stats: ServerStats) -> None:
+    logger = CoolLogger(log_level)
+    logger.set_prefix(f"[worker {worker_id}]")
+
+    # The supervisor terminates workers instead of sharing an event with
+    # them, setting it would wait forever on a worker that was killed
+    should_stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: should_stop.set())
+
+    if server_args["metrics"] is not None:
+        server_args = {
+            **server_args,
+            "metrics": metrics_address_for_worker(
+                server_args["metrics"], worker_id),
+        }
+
+    server = Server(logger, **server_args, stats=stats, reuse_port=True)
+    server.serve(should_stop)
+    server.accepter.join()
+    logger.debug("Worker stopped")
+    # Workers leave without running the exit handlers of the interpreter
+    logger.flush()
+
+
+# Runs several server processes bound to the same service port, the kernel
+# spreads the clients among them by their address. Dead workers are started
+# again until the supervisor is told to quit
+class Supervisor:
+    def __init__(
+            self,
+            logger: CoolLogger,
+            workers: int,
+            **server_args):
+        self.logger: CoolLogger = logger
+        self.workers: int = workers
+        self.server_args: dict = server_args
+        self.stats: list[ServerStats] = [
+            ServerStats(WORKERS_CONTEXT) for _ in range(workers)]
+        self.should_stop: threading.Event = threading.Event()
+        self.processes: list = [None] * workers
+        self.restarts: int = 0
+
+    def start_worker(self, worker_id: int) -> None:
+        process = WORKERS_CONTEXT.Process(
+            target=run_worker,
+            args=(
+                worker_id,
+                self.logger.current_level,
+                self.server_args,
+                self.stats[worker_id]),
+            name=f"worker-{worker_id}",
+        )
+        process.start()
+        self.processes[worker_id] = process
+
+    def supervise(self) -> None:
+        while not self.should_stop.wait(WORKER_SUPERVISION_INTERVAL):
+            for worker_id, process in enumerate(self.processes):
+                if process is None or process.is_alive():
+                    continue
+
+                # Workers exiting with an error could not even start, like
+                # when the port is taken, so they would fail again
+                if process.exitcode == ERROR_EXIT_CODE:
+                    self.logger.error(
+                        f"Worker {worker_id} failed to start")
+                    self.processes[worker_id] = None
+                    continue
+
+                self.logger.warn(
+                    f"Worker {worker_id} died with exit code {
+                        process.exitcode}, restarting it")
+                self.start_worker(worker_id)
+                self.restarts += 1
+
+            if all(process is None for process in self.processes):
+                self.logger.error("Every worker failed")
+                self.should_stop.set()
+
+    def stop(self, wait_for_quit_thread: Thread, quited: Value) -> None:
+        self.logger.info("Stopping")
+        self.should_stop.set()
+
+        for process in self.processes:
+            if process is not None:
+                process.terminate()
+                process.join()
+
+        accepted, completed, failed = ServerStats.total(self.stats)
+        self.logger.info(
+            f"Served {accepted} clients, {completed} completed and {
+                failed} failed across {self.workers} workers, {
+                self.restarts} restarts")
+
+        if not quited.value:
+            sys.stdin = StringIO("q\n")
+            sys.stdin.flush()
+            self.logger.info("Press Enter to finish")
+
+        wait_for_quit_thread.join()
+        self.logger.info("Server shutdown")
+
+    def run(self) -> None:
+        self.logger.info("Server started")
+        self.logger.debug(f"Running {self.workers} workers")
+
+        for worker_id in range(self.workers):
+            self.start_worker(worker_id)
+
+        quited = Value(c_bool, False)
+
+        wait_for_quit_thread = Thread(
+            target=wait_for_quit, args=(self.should_stop, quited)
+        )
+        wait_for_quit_thread.start()
+
+        try:
+            self.supervise()
+        except KeyboardInterrupt:
+            self.logger.info(
+                "KeyboardInterrupt received, shutting down...")
+
+        self.stop(wait_for_quit_thread, quited)
+
+        if all(process is None for process in self.processes):
+            sys.exit(ERROR_EXIT_CODE)
@@ -2,6 +2,7 @@
 from lib.common.logger import get_logger
 from lib.server.parser import ServerArgParser
 from lib.server.server import Server
+from lib.server.supervisor import Supervisor
 
 
 def start_server():
@@ -13,6 +14,12 @@ def start_server():
     args_dict = vars(args)
     args_dict.pop("verbose")
     args_dict.pop("quiet")
+    workers = args_dict.pop("workers")
+
+    if workers > 1:
+        supervisor: Supervisor = Supervisor(logger, workers, **args_dict)
+        supervisor.run()
+        return
 
     server: Server = Server(logger, **args_dict)
     server.run()
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
+from os import path
+
 from lib.client.client_upload import UploadClient
+from lib.client.client_upload_session import UploadSessionClient
+from lib.client.client_upload_striped import StripedUploadClient
 from lib.client.parser_upload import ClientUploadArgParser
 from lib.common.logger import get_logger
+from lib.common.transfer_session import is_glob_pattern
+from lib.common.transfer_trace import enable_tracing
 
 
 def upload():
@@ -13,8 +19,22 @@ def upload():
     args_dict = vars(args)
     args_dict.pop("verbose")
     args_dict.pop("quiet")
+    streams = args_dict.pop("streams")
+    enable_tracing(args_dict.pop("trace"))
+
+    # Directories and glob patterns are uploaded as a session of files
+    is_session = path.isdir(args.src) or is_glob_pattern(args.src)
+    if streams > 1 and (is_session or args.resume):
+        logger.warn("Only new single files are striped, using one stream")
+        streams = 1
 
-    client: UploadClient = UploadClient(logger, **args_dict)
+    if streams > 1:
+        args_dict.pop("resume")
+        client = StripedUploadClient(logger, streams=streams, **args_dict)
+    elif is_session:
+        client = UploadSessionClient(logger, **args_dict)
+    else:
+        client = UploadClient(logger, **args_dict)
     client.run()
 
 
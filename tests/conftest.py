@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The sources import each other from src, as the scripts run from there
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "src"))
@@ -0,0 +1,104 @@
+import socket
+
+import pytest
+
+from lib.common.address import Address
+from lib.common.constants import (
+    ACK_EVERY,
+    COMMS_BUFFER_SIZE,
+    FIXED_CONGESTION_CONTROL,
+    IPV4_LOCALHOST,
+    RECEIVE_BUFFER_RING_SIZE,
+    STOP_AND_WAIT_PROTOCOL_TYPE,
+    UPLOAD_OPERATION,
+    USE_ANY_AVAILABLE_PORT,
+)
+from lib.common.fast_open import FastOpenRequest
+from lib.common.file_handler import FileHandler
+from lib.common.logger import get_logger
+from lib.common.packet.packet import PacketParser, PacketSaw
+from lib.server.accepter import Accepter
+from lib.server.server_stats import ServerStats
+
+
+@pytest.fixture
+def accepter(tmp_path, monkeypatch):
+    logger = get_logger(verbose=False, quiet=True)
+    _accepter = Accepter(
+        Address(IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT),
+        STOP_AND_WAIT_PROTOCOL_TYPE,
+        logger,
+        FileHandler(str(tmp_path), logger),
+        FIXED_CONGESTION_CONTROL,
+        ACK_EVERY,
+        ServerStats())
+    # Connections are recorded instead of started
+    added_clients = []
+    monkeypatch.setattr(
+        _accepter.client_manager,
+        "add_client",
+        lambda *arguments: added_clients.append(arguments))
+
+    yield _accepter, added_clients
+
+    for arguments in added_clients:
+        arguments[0].socket.close()
+    _accepter.welcoming_socket.socket.close()
+
+
+@pytest.fixture
+def client():
+    _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    _socket.bind((IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT))
+    yield _socket
+    _socket.close()
+
+
+def fast_open_syn(client_port: int, filename: str) -> bytes:
+    request = FastOpenRequest(
+        UPLOAD_OPERATION, filename, filesize=10).to_bytes()
+    return PacketParser.compose_packet_saw_for_net(PacketSaw(
+        protocol=STOP_AND_WAIT_PROTOCOL_TYPE,
+        is_ack=False,
+        is_syn=True,
+        is_fin=False,
+        port=client_port,
+        payload_length=len(request),
+        sequence_number=0,
+        data=request,
+    ))
+
+
+# Connections read their request once they run, after the welcoming socket
+# kept receiving into the ring the request arrived in
+def test_request_outlives_the_buffer_it_arrived_in(accepter, client):
+    _accepter, added_clients = accepter
+    welcoming_address = _accepter.welcoming_socket.socket.getsockname()
+    client_port = client.getsockname()[1]
+
+    client.sendto(fast_open_syn(client_port, "first.bin"), welcoming_address)
+    _accepter.accept()
+    assert len(added_clients) == 1
+
+    for index in range(RECEIVE_BUFFER_RING_SIZE + 1):
+        client.sendto(
+            fast_open_syn(client_port, f"later-{index}.bin"),
+            welcoming_address)
+        _accepter.welcoming_socket.recvfrom(
+            COMMS_BUFFER_SIZE, should_retransmit=False, do_not_timeout=True)
+
+    packet, request = added_clients[0][-2:]
+    assert request.filename == "first.bin"
+    assert FastOpenRequest.from_bytes(packet.data).filename == "first.bin"
+
+
+def test_invalid_request_is_not_handed_to_a_connection(accepter, client):
+    _accepter, added_clients = accepter
+    welcoming_address = _accepter.welcoming_socket.socket.getsockname()
+    syn = fast_open_syn(client.getsockname()[1], "name")
+
+    client.sendto(
+        syn.replace(b"name", b"\xff\xfe\xfd\xfc"), welcoming_address)
+    _accepter.accept()
+
+    assert added_clients == []
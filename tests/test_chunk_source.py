@@ -0,0 +1,71 @@
+import hashlib
+import random
+
+import pytest
+
+from lib.common.chunk_source import WindowedChunkSource
+from lib.common.file_handler import FileHandler
+from lib.common.logger import get_logger
+from lib.common.transfer_digest import TransferDigest
+
+CHUNK_SIZE = 1000
+FILE_SIZE = 10 * CHUNK_SIZE + 123
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    data = random.Random(0).randbytes(FILE_SIZE)
+    filepath = tmp_path / "source.bin"
+    filepath.write_bytes(data)
+    file_handler = FileHandler(str(tmp_path), get_logger(False, True))
+    with open(filepath, "rb") as file:
+        yield file_handler, file, data
+
+
+@pytest.mark.parametrize("is_mapped", [False, True])
+def test_digest_through_covers_chunks_sent_before(source_file, is_mapped):
+    file_handler, file, data = source_file
+    # The first chunk was read and sent along with the answer to the name
+    file_handler.read(file, CHUNK_SIZE)
+    file_handler.unwind(file, CHUNK_SIZE)
+    digest = TransferDigest()
+    chunks = WindowedChunkSource(
+        file_handler,
+        file,
+        FILE_SIZE,
+        CHUNK_SIZE,
+        file_handler.map_file(file) if is_mapped else None,
+        digest,
+    )
+
+    chunks.digest_through(0)
+    chunks.digest_through(0)
+    sent = b"".join(bytes(chunks[i]) for i in range(1, len(chunks)))
+
+    assert sent == data[CHUNK_SIZE:]
+    assert chunks.digest_for(len(chunks) - 1) == hashlib.sha256(
+        data).digest()
+
+
+def test_digest_through_without_digest_reads_nothing(source_file):
+    file_handler, file, _data = source_file
+    chunks = WindowedChunkSource(file_handler, file, FILE_SIZE, CHUNK_SIZE)
+
+    chunks.digest_through(5)
+
+    assert chunks.cached_chunks == {}
+    assert chunks.digest_for(len(chunks) - 1) is None
+
+
+# Empty files still go out as a last chunk, the one telling the digest
+def test_empty_file_is_a_single_empty_last_chunk(tmp_path):
+    filepath = tmp_path / "empty.bin"
+    filepath.write_bytes(b"")
+    file_handler = FileHandler(str(tmp_path), get_logger(False, True))
+    with open(filepath, "rb") as file:
+        chunks = WindowedChunkSource(
+            file_handler, file, 0, CHUNK_SIZE, digest=TransferDigest())
+
+        assert len(chunks) == 1
+        assert bytes(chunks[0]) == b""
+        assert chunks.digest_for(0) == hashlib.sha256(b"").digest()
@@ -0,0 +1,169 @@
+import socket
+from time import monotonic
+
+import pytest
+
+from lib.common import datagram_batch as datagram_batch_module
+from lib.common.constants import (
+    FULL_BUFFER_SIZE,
+    IPV4_LOCALHOST,
+    RECEIVE_BUFFER_RING_SIZE,
+    USE_ANY_AVAILABLE_PORT,
+)
+from lib.common.datagram_batch import DatagramBatcher
+
+SHORT_WAIT = 0.05  # seconds
+RECEIVE_WAIT = 2  # seconds
+DATAGRAMS = 5
+
+needs_batching = pytest.mark.skipif(
+    datagram_batch_module.LIBC is None,
+    reason="sendmmsg and recvmmsg are not available")
+
+
+def bound_socket():
+    _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    _socket.bind((IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT))
+    return _socket
+
+
+@pytest.fixture
+def sockets():
+    sender, receiver = bound_socket(), bound_socket()
+    yield sender, receiver
+    sender.close()
+    receiver.close()
+
+
+@pytest.fixture
+def per_datagram(monkeypatch):
+    monkeypatch.setattr(datagram_batch_module, "LIBC", None)
+
+
+# Flags of a packet without a checksum, followed by bytes telling it apart
+def payload(index):
+    return bytes(1) + bytes([index + 1]) * (100 + index)
+
+
+def send_all(batcher, address_tuple):
+    batcher.hold_sends()
+    for index in range(DATAGRAMS):
+        batcher.send([payload(index)], address_tuple)
+    batcher.flush_sends()
+
+
+def test_sockets_that_can_not_be_batched_get_a_call_per_datagram():
+    ends = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        batcher = DatagramBatcher(ends[1])
+        assert not batcher.is_batched
+
+        batcher.hold_sends()
+        assert not batcher.is_holding
+
+        ends[0].send(b"datagram")
+        data, _address = batcher.receive_unchecked(FULL_BUFFER_SIZE)
+        assert bytes(data) == b"datagram"
+    finally:
+        for end in ends:
+            end.close()
+
+
+def test_a_call_per_datagram_moves_them_all(per_datagram, sockets):
+    sender_socket, receiver_socket = sockets
+    sender = DatagramBatcher(sender_socket)
+    receiver = DatagramBatcher(receiver_socket)
+    assert not sender.is_batched and not receiver.is_batched
+
+    send_all(sender, receiver_socket.getsockname())
+    for index in range(DATAGRAMS):
+        data, address = receiver.receive(
+            FULL_BUFFER_SIZE, monotonic() + RECEIVE_WAIT)
+        assert bytes(data) == payload(index)
+        assert address == sender_socket.getsockname()
+
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() + SHORT_WAIT)
+
+
+@needs_batching
+def test_batches_wrap_around_the_end_of_the_ring(sockets):
+    sender_socket, receiver_socket = sockets
+    sender = DatagramBatcher(sender_socket)
+    receiver = DatagramBatcher(receiver_socket)
+    assert sender.is_batched and receiver.is_batched
+
+    ring = receiver.receive_buffers
+    ring.next_index = RECEIVE_BUFFER_RING_SIZE - 2
+    send_all(sender, receiver_socket.getsockname())
+
+    received = [
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() + RECEIVE_WAIT)]
+    # A single batch drained them all, past the end of the ring
+    assert len(receiver.received) == DATAGRAMS - 1
+    received += [
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() + RECEIVE_WAIT)
+        for _ in range(DATAGRAMS - 1)]
+
+    assert ring.next_index == DATAGRAMS - 2
+    for index, (data, address) in enumerate(received):
+        assert bytes(data) == payload(index)
+        assert address == sender_socket.getsockname()
+    # The third datagram landed at the start of the ring
+    assert received[2][0].obj is ring.buffers[0].obj
+
+
+@needs_batching
+def test_batched_receptions_give_up_at_their_deadline(sockets):
+    _sender_socket, receiver_socket = sockets
+    receiver = DatagramBatcher(receiver_socket)
+
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() - SHORT_WAIT)
+
+    start = monotonic()
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, start + SHORT_WAIT)
+    assert monotonic() - start >= SHORT_WAIT
+
+
+@needs_batching
+def test_receive_timeout_is_only_set_again_for_an_earlier_deadline(
+        sockets, monkeypatch):
+    sender_socket, receiver_socket = sockets
+    receiver = DatagramBatcher(receiver_socket)
+    timeouts_set = []
+    set_receive_timeout = receiver.set_receive_timeout
+
+    def record_timeout(timeout):
+        timeouts_set.append(timeout)
+        set_receive_timeout(timeout)
+
+    monkeypatch.setattr(receiver, "set_receive_timeout", record_timeout)
+
+    for index in range(DATAGRAMS):
+        sender_socket.sendto(payload(index), receiver_socket.getsockname())
+        data, _address_tuple = receiver.receive(
+            FULL_BUFFER_SIZE, monotonic() + RECEIVE_WAIT)
+        assert bytes(data) == payload(index)
+    assert len(timeouts_set) == 1
+
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() + SHORT_WAIT)
+    assert len(timeouts_set) == 2
+
+
+# The short timeout set by the first reception wakes the second one up
+# before its deadline, it goes back to wait for the time left
+@needs_batching
+def test_receptions_woken_up_early_wait_for_their_deadline(sockets):
+    _sender_socket, receiver_socket = sockets
+    receiver = DatagramBatcher(receiver_socket)
+
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, monotonic() + SHORT_WAIT)
+
+    start = monotonic()
+    with pytest.raises(TimeoutError):
+        receiver.receive(FULL_BUFFER_SIZE, start + 3 * SHORT_WAIT)
+    assert monotonic() - start >= 3 * SHORT_WAIT
@@ -0,0 +1,55 @@
+import pytest
+
+from lib.common import deadline_timer as deadline_timer_module
+from lib.common.deadline_timer import Timer, deadline_in, earliest_deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(deadline_timer_module, "monotonic", fake_clock)
+    return fake_clock
+
+
+def test_timers_expire_once_their_deadline_comes(clock):
+    timer = deadline_in(1)
+
+    clock.now = 0.5
+    assert not timer.expired
+    clock.now = 1
+    assert timer.expired
+
+
+def test_arming_again_moves_the_deadline(clock):
+    timer = deadline_in(1)
+
+    clock.now = 0.5
+    timer.arm(1)
+    clock.now = 1
+    assert not timer.expired
+    assert timer.deadline == 1.5
+
+
+def test_disarmed_timers_never_expire(clock):
+    timer = deadline_in(1)
+
+    timer.disarm()
+    clock.now = 10
+    assert not timer.expired
+
+
+def test_receivers_wait_for_the_earliest_armed_deadline(clock):
+    later = deadline_in(2)
+    sooner = deadline_in(1)
+    unarmed = Timer()
+
+    assert earliest_deadline([later, sooner, unarmed]) == sooner.deadline
+    assert earliest_deadline([unarmed]) is None
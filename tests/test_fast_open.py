@@ -0,0 +1,137 @@
+import pytest
+
+from lib.common.constants import (
+    DOWNLOAD_OPERATION,
+    FAST_OPEN_FILE_TOO_BIG,
+    FAST_OPEN_STATUS_FIELD,
+    LZ4_COMPRESSION,
+    UPLOAD_OPERATION,
+    ZLIB_COMPRESSION,
+)
+from lib.common.fast_open import (
+    FIELD_HEADER,
+    FastOpenAnswer,
+    FastOpenRequest,
+    decode_fields,
+)
+
+# Past every field type known so far, as one of a newer peer would be
+UNKNOWN_FIELD = 200
+
+
+def unknown_field(value: bytes) -> bytes:
+    return FIELD_HEADER.pack(UNKNOWN_FIELD, len(value)) + value
+
+
+def test_request_round_trip():
+    request = FastOpenRequest(
+        UPLOAD_OPERATION,
+        "ñandú.bin",
+        filesize=5 * 1024 ** 3,
+        resume_offset=1234,
+        stream=(0xDEADBEEF, 2, 4),
+        integrity=True,
+        codecs=[LZ4_COMPRESSION, ZLIB_COMPRESSION],
+        datagram_size=8972,
+    )
+
+    decoded = FastOpenRequest.from_bytes(request.to_bytes())
+
+    assert decoded.op_code == UPLOAD_OPERATION
+    assert decoded.filename == "ñandú.bin"
+    assert decoded.filesize == 5 * 1024 ** 3
+    assert decoded.resume_offset == 1234
+    assert decoded.session_files is None
+    assert decoded.stream == (0xDEADBEEF, 2, 4)
+    assert decoded.integrity
+    assert decoded.codecs == [LZ4_COMPRESSION, ZLIB_COMPRESSION]
+    assert decoded.datagram_size == 8972
+
+
+def test_request_leaves_out_what_was_not_asked_for():
+    request = FastOpenRequest(
+        DOWNLOAD_OPERATION,
+        "logs/*.log",
+        session_files=0,
+        integrity=False,
+        codecs=[],
+        datagram_size=None,
+    )
+
+    decoded = FastOpenRequest.from_bytes(request.to_bytes())
+
+    assert decoded.is_session and decoded.session_files == 0
+    assert not decoded.is_stream
+    assert decoded.filesize is None and decoded.resume_offset is None
+    assert not decoded.integrity
+    assert decoded.codecs == []
+    assert decoded.datagram_size is None
+
+
+def test_answer_round_trip():
+    answer = FastOpenAnswer(
+        resume_offset=0,
+        filesize=123456,
+        integrity=True,
+        codec=ZLIB_COMPRESSION,
+        datagram_size=1472,
+    )
+
+    decoded = FastOpenAnswer.from_bytes(answer.to_bytes())
+
+    assert decoded.is_accepted
+    assert decoded.resume_offset == 0
+    assert decoded.filesize == 123456
+    assert decoded.integrity
+    assert decoded.codec == ZLIB_COMPRESSION
+    assert decoded.datagram_size == 1472
+
+    rejection = FastOpenAnswer.from_bytes(
+        FastOpenAnswer(FAST_OPEN_FILE_TOO_BIG).to_bytes())
+    assert not rejection.is_accepted
+    assert rejection.status == FAST_OPEN_FILE_TOO_BIG
+    assert rejection.codec is None and not rejection.integrity
+
+
+def test_unknown_fields_are_skipped():
+    request = FastOpenRequest(UPLOAD_OPERATION, "file.bin", filesize=10)
+    answer = FastOpenAnswer(filesize=10)
+
+    decoded_request = FastOpenRequest.from_bytes(
+        unknown_field(b"newer") + request.to_bytes() + unknown_field(b""))
+    decoded_answer = FastOpenAnswer.from_bytes(
+        answer.to_bytes() + unknown_field(b"\x00" * 300))
+
+    assert decoded_request.filename == "file.bin"
+    assert decoded_request.filesize == 10
+    assert decoded_answer.filesize == 10
+    assert decode_fields(unknown_field(b"newer"))[UNKNOWN_FIELD] == b"newer"
+
+
+@pytest.mark.parametrize("cut", [1, 2, FIELD_HEADER.size + 1])
+def test_truncated_fields_are_rejected(cut):
+    request = FastOpenRequest(UPLOAD_OPERATION, "file.bin", filesize=10)
+    answer = FastOpenAnswer(filesize=10)
+
+    with pytest.raises(ValueError):
+        FastOpenRequest.from_bytes(request.to_bytes()[:-cut])
+    with pytest.raises(ValueError):
+        FastOpenAnswer.from_bytes(answer.to_bytes()[:-cut])
+
+
+def test_requests_missing_what_they_must_tell_are_rejected():
+    with pytest.raises(ValueError):
+        FastOpenRequest.from_bytes(unknown_field(b"only this"))
+    with pytest.raises(ValueError):
+        FastOpenAnswer.from_bytes(b"")
+
+    request = FastOpenRequest(UPLOAD_OPERATION, "name").to_bytes()
+    invalid_name = request.replace(b"name", b"\xff\xfe\xfd\xfc")
+    with pytest.raises(ValueError):
+        FastOpenRequest.from_bytes(invalid_name)
+
+
+def test_status_field_alone_is_an_answer():
+    status = FIELD_HEADER.pack(FAST_OPEN_STATUS_FIELD, 1) + b"\x00"
+
+    assert FastOpenAnswer.from_bytes(status).is_accepted
@@ -0,0 +1,59 @@
+import socket
+import time
+
+from benchmarks.transfers import ProxyThread
+from lib.common.address import Address
+from lib.common.constants import IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT
+from lib.common.logger import get_logger
+from lib.proxy.impaired_link import LinkImpairments
+from lib.proxy.impairment_proxy import ImpairmentProxy
+
+IDLE_TIMEOUT = 0.2  # seconds
+RECEIVE_TIMEOUT = 2  # seconds
+
+
+def bound_socket():
+    _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    _socket.bind((IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT))
+    _socket.settimeout(RECEIVE_TIMEOUT)
+    return _socket
+
+
+def test_idle_clients_are_forgotten_and_their_sockets_closed():
+    server = bound_socket()
+    client = bound_socket()
+    proxy = ImpairmentProxy(
+        Address(IPV4_LOCALHOST, USE_ANY_AVAILABLE_PORT),
+        Address(IPV4_LOCALHOST, server.getsockname()[1]),
+        LinkImpairments(),
+        LinkImpairments(),
+        get_logger(verbose=False, quiet=True),
+        idle_timeout=IDLE_TIMEOUT)
+    proxy_thread = ProxyThread(proxy)
+    proxy_thread.start()
+
+    try:
+        client.sendto(b"ping", (IPV4_LOCALHOST, proxy.port))
+        data, upstream_address = server.recvfrom(64)
+        assert data == b"ping"
+        server.sendto(b"pong", upstream_address)
+        assert client.recvfrom(64)[0] == b"pong"
+
+        assert client.getsockname() in proxy.clients
+        upstream = proxy.clients[client.getsockname()].upstream
+        assert len(proxy.sockets) == 2
+
+        time.sleep(3 * IDLE_TIMEOUT)
+
+        assert proxy.clients == {}
+        assert proxy.sockets == [proxy.listening_socket]
+        assert upstream.fileno() == -1
+
+        # A client coming back is relayed again, through a new socket
+        client.sendto(b"ping", (IPV4_LOCALHOST, proxy.port))
+        assert server.recvfrom(64)[0] == b"ping"
+        assert client.getsockname() in proxy.clients
+    finally:
+        proxy_thread.stop()
+        server.close()
+        client.close()
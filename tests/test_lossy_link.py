@@ -0,0 +1,111 @@
+import glob
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.transfers import ProxyThread, free_port
+from lib.common.address import Address
+from lib.common.constants import IPV4_LOCALHOST, TRACE_CHUNK_OUT_OF_ORDER
+from lib.common.logger import get_logger
+from lib.common.transfer_trace import load_transfer_trace
+from lib.proxy.impaired_link import LinkImpairments
+from lib.proxy.impairment_proxy import ImpairmentProxy
+from tests.common import (
+    PROJECT_ROOT,
+    RANDOM_SEED,
+    TESTS_DIR,
+    compute_sha256,
+    setup_directories,
+    teardown_directories,
+)
+
+FILE_SIZE = 1024 * 1024
+TRANSFER_TIMEOUT = 120  # seconds
+
+
+def run_script(script, *arguments):
+    return subprocess.run(
+        [sys.executable, f"{PROJECT_ROOT}/src/{script}", "-q", *arguments],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=TRANSFER_TIMEOUT,
+        check=True,
+    )
+
+
+def count_out_of_order(dirpath):
+    count = 0
+    for filepath in glob.glob(os.path.join(dirpath, "*.trace")):
+        count += sum(
+            1 for event in load_transfer_trace(filepath)
+            if event[1] == TRACE_CHUNK_OUT_OF_ORDER)
+    return count
+
+
+@pytest.fixture
+def lossy_sr_server():
+    tmp_path, _ = setup_directories(TESTS_DIR)
+    for dirname in ("server_trace", "client_trace"):
+        os.makedirs(os.path.join(tmp_path, dirname))
+
+    server_port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, f"{PROJECT_ROOT}/src/start-server.py", "-q",
+         "-H", IPV4_LOCALHOST, "-p", str(server_port),
+         "-s", f"{tmp_path}/server", "-r", "sr",
+         "-T", f"{tmp_path}/server_trace"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+
+    impairments = LinkImpairments(loss=0.05, reorder=0.2)
+    proxy = ImpairmentProxy(
+        Address(IPV4_LOCALHOST, 0),
+        Address(IPV4_LOCALHOST, server_port),
+        impairments,
+        impairments,
+        get_logger(verbose=False, quiet=True),
+    )
+    proxy_thread = ProxyThread(proxy)
+    proxy_thread.start()
+
+    yield tmp_path, proxy
+
+    proxy_thread.stop()
+    try:
+        server.communicate("q\n", timeout=TRANSFER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    teardown_directories(tmp_path)
+
+
+# Runs over loopback through the impairment proxy, so it needs neither
+# mininet nor root. Reordered and lost chunks arrive ahead of a gap, which
+# the Selective Repeat receivers have to buffer until it is filled
+def test_sr_buffers_chunks_out_of_order_over_lossy_link(lossy_sr_server):
+    tmp_path, proxy = lossy_sr_server
+    original = f"{tmp_path}/client/original.bin"
+    with open(original, "wb") as f:
+        f.write(random.Random(RANDOM_SEED).randbytes(FILE_SIZE))
+
+    client_arguments = (
+        "-H", IPV4_LOCALHOST, "-p", str(proxy.port), "-r", "sr",
+        "-n", "original.bin", "-T", f"{tmp_path}/client_trace")
+    run_script("upload.py", *client_arguments, "-s", original)
+    downloaded = f"{tmp_path}/client/downloaded.bin"
+    run_script("download.py", *client_arguments, "-d", downloaded)
+
+    assert compute_sha256(f"{tmp_path}/server/original.bin") == (
+        compute_sha256(original))
+    assert compute_sha256(downloaded) == compute_sha256(original)
+    assert proxy.uplink.lost > 0 and proxy.uplink.reordered > 0
+    # The server received the upload, the client the download
+    assert count_out_of_order(f"{tmp_path}/server_trace") > 0
+    assert count_out_of_order(f"{tmp_path}/client_trace") > 0
@@ -34,7 +34,10 @@ PROTOCOL = MutableVariable("saw")
                         "saw;40",
                         "gbn;0",
                         "gbn;10",
-                        "gbn;40"])
+                        "gbn;40",
+                        "sr;0",
+                        "sr;10",
+                        "sr;40"])
 def mininet_net_setup(request):
     protocol = request.param.split(";")[0]
     packet_loss_percentage = int(request.param.split(";")[1])
@@ -0,0 +1,37 @@
+import sys
+from time import monotonic
+
+import pytest
+
+from lib.common import path_mtu as path_mtu_module
+from lib.common.constants import (
+    IPV4_LOCALHOST,
+    MAX_PATH_MTU,
+    PATH_MTU_PROBE_TIMEOUT,
+)
+from lib.common.path_mtu import probe_path_mtu
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"),
+    reason="The MTU of a route is only asked to the kernel of linux")
+
+ETHERNET_ROUTE_MTU = 1400
+
+
+class SilentSocket(path_mtu_module.Socket):
+    def send(self, data, *args):
+        raise AssertionError("The kernel already told the MTU of the route")
+
+
+def test_loopback_is_probed_up_to_jumbo_frames():
+    assert probe_path_mtu(IPV4_LOCALHOST) == MAX_PATH_MTU
+
+
+def test_routes_up_to_ethernet_are_taken_from_the_kernel(monkeypatch):
+    monkeypatch.setattr(path_mtu_module, "Socket", SilentSocket)
+    monkeypatch.setattr(
+        path_mtu_module, "route_mtu", lambda _probe: ETHERNET_ROUTE_MTU)
+
+    start = monotonic()
+    assert probe_path_mtu(IPV4_LOCALHOST) == ETHERNET_ROUTE_MTU
+    assert monotonic() - start < PATH_MTU_PROBE_TIMEOUT
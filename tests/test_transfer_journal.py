@@ -0,0 +1,199 @@
+import json
+
+import pytest
+
+from lib.common import transfer_journal as transfer_journal_module
+from lib.common.constants import JOURNAL_FILE_SUFFIX
+from lib.common.exceptions.invalid_filename import InvalidFilename
+from lib.common.file_handler import FileHandler
+from lib.common.logger import get_logger
+from lib.common.mutable_variable import MutableVariable
+from lib.common.transfer_journal import TransferJournal
+
+FILESIZE = 1000
+
+
+@pytest.fixture
+def file_handler(tmp_path):
+    return FileHandler(str(tmp_path), get_logger(verbose=False, quiet=True))
+
+
+def partial_file(tmp_path, name, size, ranges, filesize=FILESIZE):
+    filepath = tmp_path / name
+    filepath.write_bytes(bytes(size))
+    journal = TransferJournal(str(filepath))
+    journal.reset(filesize)
+    for start, end in ranges:
+        journal.record(start, end)
+    journal.save()
+    return filepath, journal
+
+
+def test_recorded_ranges_merge_with_those_they_touch():
+    journal = TransferJournal("unused")
+
+    journal.record(100, 200)
+    journal.record(300, 400)
+    journal.record(50, 50)
+    assert journal.ranges == [[100, 200], [300, 400]]
+    assert journal.received_bytes == 0
+
+    journal.record(0, 100)
+    journal.record(200, 300)
+    assert journal.ranges == [[0, 400]]
+    assert journal.received_bytes == 400
+
+    journal.record(350, 600)
+    journal.record(800, 900)
+    assert journal.ranges == [[0, 600], [800, 900]]
+
+
+def test_forgotten_ranges_are_cut_out():
+    journal = TransferJournal("unused")
+    journal.record(0, 400)
+    journal.record(600, 800)
+
+    journal.forget(300, 700)
+    assert journal.ranges == [[0, 300], [700, 800]]
+
+    journal.forget(0, 1000)
+    assert journal.ranges == []
+
+
+def test_saved_journal_loads_back(tmp_path):
+    filepath = str(tmp_path / "file.bin")
+    journal = TransferJournal(filepath)
+    journal.reset(FILESIZE, transfer_id=7)
+    journal.record(0, 10)
+    journal.save()
+
+    loaded = TransferJournal(filepath)
+    assert loaded.load()
+    assert loaded.filesize == FILESIZE
+    assert loaded.ranges == [[0, 10]]
+    assert loaded.transfer_id == 7
+    assert (tmp_path / ("file.bin" + JOURNAL_FILE_SUFFIX)).is_file()
+
+    loaded.remove()
+    loaded.remove()
+    assert not loaded.exists()
+    assert not loaded.load()
+
+
+def test_failed_save_leaves_the_previous_journal_whole(tmp_path, monkeypatch):
+    filepath = str(tmp_path / "file.bin")
+    journal = TransferJournal(filepath)
+    journal.reset(FILESIZE)
+    journal.record(0, 100)
+    journal.save()
+
+    def dump_halfway(value, journal_file):
+        journal_file.write(json.dumps(value)[:10])
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(transfer_journal_module.json, "dump", dump_halfway)
+    journal.record(100, 200)
+    with pytest.raises(OSError):
+        journal.save()
+    monkeypatch.undo()
+
+    loaded = TransferJournal(filepath)
+    assert loaded.load()
+    assert loaded.ranges == [[0, 100]]
+
+
+def test_resume_goes_on_from_the_bytes_with_no_gap(tmp_path, file_handler):
+    filepath, _journal = partial_file(
+        tmp_path, "file.bin", 600, [(0, 300), (400, 600)])
+
+    file = file_handler.open_file_journaled_mode(
+        "file.bin", is_path_complete=False, resume=True)
+    try:
+        assert file.offset == 300
+        assert file.journal.ranges == [[0, 300]]
+        assert filepath.stat().st_size == 300
+    finally:
+        file.close()
+
+
+def test_without_resume_a_partial_file_starts_over(tmp_path, file_handler):
+    filepath, _journal = partial_file(tmp_path, "file.bin", 600, [(0, 300)])
+
+    file = file_handler.open_file_journaled_mode(
+        "file.bin", is_path_complete=False, resume=False)
+    try:
+        assert file.offset == 0
+        assert file.journal.ranges == []
+        assert filepath.stat().st_size == 0
+    finally:
+        file.close()
+
+
+def test_files_without_journal_are_never_overwritten(tmp_path, file_handler):
+    (tmp_path / "file.bin").write_bytes(b"complete")
+
+    with pytest.raises(InvalidFilename):
+        file_handler.open_file_journaled_mode(
+            "file.bin", is_path_complete=False, resume=True)
+    assert (tmp_path / "file.bin").read_bytes() == b"complete"
+
+
+def test_discarded_writes_are_forgotten(tmp_path, file_handler):
+    partial_file(tmp_path, "file.bin", 300, [(0, 300)])
+
+    file = file_handler.open_file_journaled_mode(
+        "file.bin", is_path_complete=False, resume=True)
+    file.write(bytes(200))
+    file.save()
+    file.write(bytes(100))
+    file.discard()
+
+    journal = TransferJournal(str(tmp_path / "file.bin"))
+    assert journal.load()
+    assert journal.ranges == [[0, 300]]
+
+
+@pytest.mark.parametrize(
+    ("size", "ranges"),
+    [
+        # Cut short
+        (600, [(0, 600)]),
+        # Preallocated for a striped transfer, with a gap in it
+        (FILESIZE, [(0, 300), (500, FILESIZE)]),
+    ])
+def test_journaled_partial_files_are_kept(
+        tmp_path, file_handler, size, ranges):
+    filepath, journal = partial_file(tmp_path, "file.bin", size, ranges)
+
+    file_handler.remove_file_if_corrupted_or_incomplete(
+        MutableVariable("file.bin"),
+        MutableVariable(FILESIZE),
+        is_path_complete=False)
+
+    assert filepath.is_file()
+    assert journal.exists()
+
+
+def test_partial_files_without_journal_are_removed(tmp_path, file_handler):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(bytes(600))
+
+    file_handler.remove_file_if_corrupted_or_incomplete(
+        MutableVariable("file.bin"),
+        MutableVariable(FILESIZE),
+        is_path_complete=False)
+
+    assert not filepath.exists()
+
+
+def test_complete_files_drop_their_journal(tmp_path, file_handler):
+    filepath, journal = partial_file(
+        tmp_path, "file.bin", FILESIZE, [(0, FILESIZE)])
+
+    file_handler.remove_file_if_corrupted_or_incomplete(
+        MutableVariable("file.bin"),
+        MutableVariable(FILESIZE),
+        is_path_complete=False)
+
+    assert filepath.is_file()
+    assert not journal.exists()
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from lib.common.exceptions.session_file_shrank import SessionFileShrank
+from lib.common.file_handler import FileHandler
+from lib.common.logger import get_logger
+from lib.common.transfer_session import (
+    MANIFEST_HEADER,
+    SessionReader,
+    SessionWriter,
+    decode_manifest,
+    encode_manifest,
+)
+
+FILES = {
+    "first.bin": 3000,
+    "empty.bin": 0,
+    "second.bin": 1,
+    "third.bin": 4321,
+}
+
+
+@pytest.fixture
+def logger():
+    return get_logger(verbose=False, quiet=True)
+
+
+@pytest.fixture
+def session(tmp_path, logger):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    generator = random.Random(0)
+    contents = {}
+    for name, filesize in FILES.items():
+        contents[name] = generator.randbytes(filesize)
+        (source_dir / name).write_bytes(contents[name])
+
+    file_handler = FileHandler(str(source_dir), logger)
+    reader = SessionReader(
+        file_handler,
+        [(name, name) for name in FILES],
+        is_path_complete=False)
+    yield reader, contents
+    reader.close()
+
+
+def receiving_end(tmp_path, logger):
+    target_dir = tmp_path / "target"
+    target_dir.mkdir(exist_ok=True)
+    file_handler = FileHandler(str(target_dir), logger)
+    return target_dir, SessionWriter(file_handler, logger)
+
+
+def test_manifest_round_trip():
+    entries = [
+        ("first.bin", 0),
+        ("ñandú.txt", 12345),
+        # Past what 4 bytes can tell
+        ("huge.iso", 5 * 1024 ** 3),
+    ]
+    manifest = encode_manifest(entries)
+
+    (length,) = MANIFEST_HEADER.unpack_from(manifest)
+    assert length == len(manifest) - MANIFEST_HEADER.size
+    assert decode_manifest(manifest[MANIFEST_HEADER.size:]) == entries
+    assert decode_manifest(b"") == []
+
+
+@pytest.mark.parametrize("cut", [1, 5, 11])
+def test_truncated_manifest_is_rejected(cut):
+    manifest = encode_manifest([("first.bin", 10)])[MANIFEST_HEADER.size:]
+
+    with pytest.raises(ValueError):
+        decode_manifest(manifest[:-cut])
+
+
+def test_manifest_with_invalid_name_is_rejected():
+    manifest = encode_manifest([("name", 10)])[MANIFEST_HEADER.size:]
+
+    with pytest.raises(ValueError):
+        decode_manifest(manifest.replace(b"name", b"\xff\xfe\xfd\xfc"))
+
+
+def test_reader_sends_manifest_and_files_back_to_back(session):
+    reader, contents = session
+    manifest = encode_manifest(
+        [(name, len(data)) for name, data in contents.items()])
+
+    assert len(reader) == len(FILES)
+    assert reader.size == len(manifest) + sum(FILES.values())
+    assert reader.read() == manifest + b"".join(contents.values())
+
+    reader.seek(len(manifest) + 2990)
+    assert reader.read(20) == (
+        contents["first.bin"][2990:] + contents["second.bin"]
+        + contents["third.bin"][:9])
+
+
+def test_reader_refuses_a_file_that_shrank(session, tmp_path):
+    reader, contents = session
+    (tmp_path / "source" / "third.bin").write_bytes(
+        contents["third.bin"][:100])
+
+    with pytest.raises(SessionFileShrank):
+        reader.read()
+
+
+@pytest.mark.parametrize("write_size", [1, 7, 1000, 100_000])
+def test_writer_splits_any_write_boundaries_into_files(
+        session, tmp_path, logger, write_size):
+    reader, contents = session
+    stream = reader.read()
+    target_dir, writer = receiving_end(tmp_path, logger)
+
+    for start in range(0, len(stream), write_size):
+        writer.write(stream[start:start + write_size])
+    writer.close()
+
+    assert writer.is_complete
+    assert writer.received_files == len(FILES)
+    assert writer.skipped_files == 0
+    assert writer.stored_names == list(FILES)
+    for name, data in contents.items():
+        assert (target_dir / name).read_bytes() == data
+
+
+def test_writer_skips_files_that_exist(session, tmp_path, logger):
+    reader, contents = session
+    target_dir, writer = receiving_end(tmp_path, logger)
+    (target_dir / "first.bin").write_bytes(b"kept")
+
+    writer.write(reader.read())
+    writer.close()
+
+    assert writer.is_complete
+    assert writer.skipped_files == 1
+    assert "first.bin" not in writer.stored_names
+    assert (target_dir / "first.bin").read_bytes() == b"kept"
+    assert (target_dir / "third.bin").read_bytes() == contents["third.bin"]
+
+
+def test_writer_removes_file_cut_short(session, tmp_path, logger):
+    reader, _contents = session
+    target_dir, writer = receiving_end(tmp_path, logger)
+    manifest_size = reader.size - sum(FILES.values())
+
+    writer.write(reader.read(manifest_size + 3000 + 1 + 50))
+    writer.close()
+
+    assert not writer.is_complete
+    assert writer.stored_names == ["first.bin", "empty.bin", "second.bin"]
+    assert not (target_dir / "third.bin").exists()
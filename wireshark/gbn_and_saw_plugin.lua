@@ -7,7 +7,8 @@ local fields_saw = {
     flags = ProtoField.uint16("packetformatsaw.flags", "Flags", base.HEX),
     protocol = ProtoField.uint8("packetformatsaw.protocol", "Protocol", base.DEC, {
         [0] = "Stop-and-Wait",
-        [1] = "Go-Back-N"
+        [1] = "Go-Back-N",
+        [2] = "Selective-Repeat"
     }, 0xC0),                                                                    -- Máscara para 2 bits (11000000)
     seq_num = ProtoField.uint8("packetformatsaw.seq_num", "Sequence Number", base.DEC, nil, 0x20), -- Changed from bool to uint8
     ack = ProtoField.bool("packetformatsaw.ack", "ACK flag", 8, nil, 0x10),
@@ -27,7 +28,8 @@ local fields_gbn = {
     flags = ProtoField.uint16("packetformatgbn.flags", "Flags", base.HEX),
   protocol = ProtoField.uint8("packetformatgbn.protocol", "Protocol", base.DEC, {
         [0] = "Stop-and-Wait",
-        [1] = "Go-Back-N"
+        [1] = "Go-Back-N",
+        [2] = "Selective-Repeat"
     }, 0xC0),
     ack = ProtoField.bool("packetformatgbn.ack", "ACK flag", 8, nil, 0x20),  -- Bit 3 (00010000)
     syn = ProtoField.bool("packetformatgbn.syn", "SYN flag", 8, nil, 0x10),  -- Bit 4 (00001000)
@@ -185,7 +187,7 @@ function gbn_proto_format.dissector(buffer, pinfo, tree)
 
     local protocol_type = bit.rshift(bit.band(buffer(0, 1):uint(), 0xC0), 6)
 
-    if protocol_type == 01 then
+    if protocol_type == 01 or protocol_type == 02 then
         if buffer:len() < 16 then
             pinfo.cols.info:set("Truncated GBN packet")
             return false
@@ -212,7 +214,7 @@ function saw_proto_format.dissector(buffer, pinfo, tree)
         dissect_saw(buffer, pinfo, tree)
         return true
 
-    elseif protocol_type == 01 then
+    elseif protocol_type == 01 or protocol_type == 02 then
         if buffer:len() < 16 then
             pinfo.cols.info:set("Truncated GBN packet")
             return false